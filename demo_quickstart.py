@@ -87,11 +87,12 @@ print("\n   ✅ Структура проекта проверена")
 # Проверка 3: Зависимости для OCR
 print("\n📝 Шаг 3: Проверка зависимостей OCR...")
 try:
-    import pytesseract
-    print("   ✅ pytesseract установлен")
-except ImportError:
-    print("   ⚠️  pytesseract не установлен")
-    print("   💡 pip install pytesseract")
+    from ocr_backends import load_libtesseract
+    load_libtesseract()
+    print("   ✅ libtesseract найдена")
+except (ImportError, OSError):
+    print("   ⚠️  libtesseract не найдена")
+    print("   💡 brew install tesseract tesseract-lang (macOS) или apt install tesseract-ocr")
 
 try:
     import PyMuPDF
@@ -17,6 +17,7 @@ from pathlib import Path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from ocr_engine import OCREngine
+from ocr_manifest import OCRManifest
 
 def prepare_legal_dataset(
     pdf_dir="/Volumes/MOZGACH/Advokat/Ugolovka/Viktor/Тома",
@@ -27,6 +28,10 @@ def prepare_legal_dataset(
     """
     Подготовка датасета из томов дела
     
+    Прерванный запуск продолжается: OCR учитывается постранично в
+    манифесте (output_dir/ocr), примеры дописываются в legal_dataset.jsonl
+    сразу после тома, а уже записанные примеры не повторяются.
+    
     Args:
         pdf_dir: Директория с томами PDF
         output_dir: Куда сохранить датасет
@@ -53,7 +58,7 @@ def prepare_legal_dataset(
         print("   ✅ OCR готов")
     except Exception as e:
         print(f"   ❌ Ошибка OCR: {e}")
-        print("   💡 Установите: pip install pytesseract PyMuPDF pdf2image")
+        print("   💡 Установите: pip install PyMuPDF pdf2image (и tesseract в системе)")
         return None
     
     # Находим все PDF
@@ -68,7 +73,13 @@ def prepare_legal_dataset(
     # Создаем выходную директорию
     os.makedirs(output_dir, exist_ok=True)
     
-    dataset = []
+    manifest = OCRManifest(os.path.join(output_dir, "ocr"))
+    dataset_file = os.path.join(output_dir, "legal_dataset.jsonl")
+    written = _load_written(dataset_file)
+    if written:
+        print(f"⏩ Продолжаем: уже записано примеров: {len(written)}")
+        print()
+    
     processed_tomes = 0
     total_pages = 0
     
@@ -77,13 +88,15 @@ def prepare_legal_dataset(
         
         try:
             # Извлекаем текст
-            texts = ocr.extract_text_from_pdf(
+            texts = ocr.ocr_pdf_resumable(
                 str(pdf_path),
+                manifest,
                 start_page=0,
                 end_page=sample_pages,
                 preserve_layout=True
             )
             
+            dataset = []
             pages_processed = 0
             
             # Создаем примеры для каждой страницы
@@ -130,17 +143,17 @@ def prepare_legal_dataset(
                 pages_processed += 1
                 total_pages += 1
             
+            # Дописываем новые примеры тома (без уже записанных)
+            _append_examples(dataset_file, dataset, written)
+            
             processed_tomes += 1
             print(f"   ✅ Обработано {pages_processed} страниц")
         
         except Exception as e:
             print(f"   ⚠️  Ошибка: {e}")
             continue
-        
-        # Сохраняем промежуточные результаты каждые 10 томов
-        if (i + 1) % 10 == 0:
-            print(f"\n💾 Промежуточное сохранение...")
-            _save_dataset(dataset, output_dir, partial=True)
+    
+    dataset = _load_dataset(dataset_file)
     
     print(f"\n{'='*80}")
     print(f"✅ Обработка завершена")
@@ -151,25 +164,67 @@ def prepare_legal_dataset(
     print(f"   Всего примеров: {len(dataset)}")
     print()
     
-    # Сохраняем финальный датасет
-    _save_dataset(dataset, output_dir, partial=False)
+    print(f"   💾 Сохранено: {dataset_file}")
+    _save_stats(dataset, output_dir)
     
     return dataset
 
 
-def _save_dataset(dataset, output_dir, partial=False):
-    """Сохранение датасета"""
-    suffix = "_partial" if partial else ""
+def _example_key(item):
+    """Ключ примера: том, страница, сфера"""
+    return (item['source_file'], item['page'], item['sphere'])
+
+
+def _load_dataset(dataset_file):
+    """
+    Читает датасет JSONL
     
-    # JSONL формат
-    output_file = os.path.join(output_dir, f"legal_dataset{suffix}.jsonl")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for item in dataset:
-            f.write(json.dumps(item, ensure_ascii=False) + '\n')
+    Оборванная при сбое последняя строка отбрасывается (и обрезается в файле).
+    """
+    dataset = []
+    if not os.path.exists(dataset_file):
+        return dataset
     
-    print(f"   💾 Сохранено: {output_file}")
+    valid_size = 0
+    with open(dataset_file, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                dataset.append(json.loads(line))
+            except ValueError:
+                break
+            valid_size += len(line)
     
-    # Статистика
+    if valid_size != os.path.getsize(dataset_file):
+        with open(dataset_file, 'r+b') as f:
+            f.truncate(valid_size)
+    
+    return dataset
+
+
+def _load_written(dataset_file):
+    """Ключи уже записанных примеров"""
+    return {_example_key(item) for item in _load_dataset(dataset_file)}
+
+
+def _append_examples(dataset_file, examples, written):
+    """Дописывает в датасет примеры, которых еще нет в файле"""
+    new_examples = [item for item in examples if _example_key(item) not in written]
+    if not new_examples:
+        return
+    
+    with open(dataset_file, 'a', encoding='utf-8') as f:
+        for item in new_examples:
+            f.write(json.dumps(item, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    
+    written.update(_example_key(item) for item in new_examples)
+
+
+def _save_stats(dataset, output_dir):
+    """Сохранение статистики датасета"""
     stats = {
         "total_examples": len(dataset),
         "examples_by_sphere": {
@@ -181,7 +236,7 @@ def _save_dataset(dataset, output_dir, partial=False):
         "avg_examples_per_tome": len(dataset) / len(set([d['source_file'] for d in dataset])) if dataset else 0
     }
     
-    stats_file = os.path.join(output_dir, f"stats{suffix}.json")
+    stats_file = os.path.join(output_dir, "stats.json")
     with open(stats_file, 'w', encoding='utf-8') as f:
         json.dump(stats, f, indent=2, ensure_ascii=False)
     
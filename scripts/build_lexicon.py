@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Сборка словаря для поиска общих опечаток
+
+Источники:
+- списки словоформ (по слову в строке);
+- словари Hunspell (.dic, "основа/ФЛАГИ" рядом с .aff): основы
+  разворачиваются в словоформы правилами PFX/SFX из .aff, иначе
+  в словаре были бы только начальные формы ("приговор", но не
+  "приговора");
+- корпуса JSONL (поля instruction/input/output): слова, встреченные
+  не реже --min-count раз, добавляются как юридическая лексика.
+
+Результат - .npy с отсортированными хэшами (8 байт на слово) или
+.marisa (нужен marisa-trie).
+
+Запуск (ru_RU.aff - в той же директории, что и ru_RU.dic):
+    python scripts/build_lexicon.py ru_RU.dic --corpus datasets/legal_108_perfect.jsonl -o lexicon.npy
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import os
+import re
+import sys
+import json
+from collections import Counter
+
+# Добавляем src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from typo_fingerprint import Lexicon, normalize_word, tokenize
+
+
+def _read_encoding(aff_path):
+    """Кодировка словаря из директивы SET (ru_RU.aff - обычно KOI8-R)"""
+    with open(aff_path, 'rb') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0] == b'SET':
+                return parts[1].decode('ascii')
+    return 'utf-8'
+
+
+def _split_flags(flags, flag_type):
+    """Флаги Hunspell: по символу, парами (FLAG long) или числами (FLAG num)"""
+    if flag_type == 'long':
+        return [flags[i:i + 2] for i in range(0, len(flags), 2)]
+    if flag_type == 'num':
+        return [flag for flag in flags.split(',') if flag]
+    return list(flags)
+
+
+def read_affixes(aff_path):
+    """
+    Правила аффиксов из .aff
+    
+    Returns:
+        (encoding, flag_type, {флаг: (тип PFX/SFX, cross_product, [(strip, add, condition)])},
+         флаг NEEDAFFIX или None)
+    """
+    encoding = _read_encoding(aff_path)
+    flag_type = None
+    need_affix = None
+    affixes = {}
+    
+    with open(aff_path, encoding=encoding, errors='replace') as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            
+            if parts[0] == 'FLAG' and len(parts) > 1:
+                flag_type = parts[1]
+            elif parts[0] == 'NEEDAFFIX' and len(parts) > 1:
+                need_affix = parts[1]
+            elif parts[0] in ('PFX', 'SFX') and len(parts) >= 4:
+                kind, flag = parts[0], parts[1]
+                if flag not in affixes:
+                    # Заголовок группы: PFX флаг Y|N число_правил
+                    affixes[flag] = (kind, parts[2] == 'Y', [])
+                    continue
+                
+                strip = '' if parts[2] == '0' else parts[2]
+                # Флаги продолжения (add/ФЛАГИ) не разворачиваются
+                add = parts[3].split('/')[0]
+                add = '' if add == '0' else add
+                condition = parts[4] if len(parts) > 4 else '.'
+                pattern = f"{condition}$" if kind == 'SFX' else f"^{condition}"
+                affixes[flag][2].append((strip, add, re.compile(pattern)))
+    
+    return encoding, flag_type, affixes, need_affix
+
+
+def expand_stem(stem, flags, affixes, need_affix=None):
+    """Словоформы основы: сама основа, суффиксы, префиксы и их сочетания"""
+    forms = set() if need_affix in flags else {stem}
+    suffixed = []
+    
+    for flag in flags:
+        kind, cross_product, rules = affixes.get(flag, (None, False, []))
+        if kind != 'SFX':
+            continue
+        for strip, add, condition in rules:
+            if condition.search(stem) and stem.endswith(strip):
+                form = stem[:len(stem) - len(strip)] + add
+                forms.add(form)
+                if cross_product:
+                    suffixed.append(form)
+    
+    for flag in flags:
+        kind, cross_product, rules = affixes.get(flag, (None, False, []))
+        if kind != 'PFX':
+            continue
+        for strip, add, condition in rules:
+            bases = [stem] + (suffixed if cross_product else [])
+            for base in bases:
+                if condition.search(base) and base.startswith(strip):
+                    forms.add(add + base[len(strip):])
+    
+    return forms
+
+
+def read_word_list(path):
+    """
+    Словоформы из списка слов или словаря Hunspell
+    
+    Для .dic нужен .aff с тем же именем: основы разворачиваются его
+    правилами. Без .aff словарь не читается - иначе в него попали бы
+    только основы (используйте список словоформ, например вывод
+    unmunch ru_RU.dic ru_RU.aff).
+    """
+    if not path.endswith('.dic'):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                word = line.strip()
+                if word:
+                    yield normalize_word(word)
+        return
+    
+    aff_path = path[:-len('.dic')] + '.aff'
+    if not os.path.exists(aff_path):
+        raise FileNotFoundError(
+            f"Для {path} нужен {aff_path} (или список словоформ вместо .dic)"
+        )
+    
+    encoding, flag_type, affixes, need_affix = read_affixes(aff_path)
+    
+    with open(path, encoding=encoding, errors='replace') as f:
+        for i, line in enumerate(f):
+            line = line.strip()
+            # Первая строка .dic - число слов
+            if not line or (i == 0 and line.isdigit()):
+                continue
+            
+            # Морфологические поля после табуляции/пробела не нужны
+            entry = line.split()[0]
+            stem, _, flags = entry.partition('/')
+            for form in expand_stem(stem, _split_flags(flags, flag_type), affixes, need_affix):
+                yield normalize_word(form)
+
+
+def corpus_words(path, min_count):
+    """Частые слова корпуса JSONL"""
+    counts = Counter()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            for field in ('instruction', 'input', 'output', 'text'):
+                if isinstance(item.get(field), str):
+                    counts.update(tokenize(item[field], min_length=1, skip_capitalized=False))
+    return [word for word, count in counts.items() if count >= min_count]
+
+
+def build_lexicon(word_lists, corpora, output, min_count=3):
+    """Собирает словарь и сохраняет его в output (.npy или .marisa)"""
+    words = set()
+    for path in word_lists:
+        words.update(read_word_list(path))
+        print(f"   📖 {path}: всего слов {len(words)}")
+    
+    for path in corpora:
+        words.update(corpus_words(path, min_count))
+        print(f"   📚 {path}: всего слов {len(words)}")
+    
+    if output.endswith('.marisa'):
+        import marisa_trie
+        marisa_trie.Trie(words).save(output)
+    else:
+        Lexicon.from_words(words).save(output)
+    
+    print(f"✅ Словарь сохранен: {output} ({len(words)} слов)")
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="Сборка словаря для поиска общих опечаток"
+    )
+    parser.add_argument(
+        "word_lists",
+        nargs="*",
+        help="Списки словоформ (.txt) или словари Hunspell (.dic рядом с .aff)"
+    )
+    parser.add_argument(
+        "--corpus",
+        action="append",
+        default=[],
+        help="Корпус JSONL для юридической лексики (можно несколько)"
+    )
+    parser.add_argument(
+        "--min-count",
+        type=int,
+        default=3,
+        help="Минимальная частота слова в корпусе"
+    )
+    parser.add_argument(
+        "-o", "--output",
+        default="lexicon.npy",
+        help="Файл словаря (.npy или .marisa)"
+    )
+    
+    args = parser.parse_args()
+    
+    build_lexicon(args.word_lists, args.corpus, args.output, args.min_count)
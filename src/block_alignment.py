@@ -0,0 +1,323 @@
+"""
+Ссылки на совпавшие блоки текста
+
+Результат анализа копипаста хранит не сами блоки (для большого дела -
+мегабайты повторяющегося текста), а ссылки: документ, страница,
+смещения начала и конца в тексте документа и оценку сходства.
+Текст блока и построчный diff извлекаются по требованию из CaseText.
+
+Сравниваются нормализованные тексты без шаблонов, поэтому смещения
+start/end относятся к ним. Если CaseText получил исходные тексты OCR,
+ссылка дополнительно хранит raw_start/raw_end - смещения в исходном
+тексте страниц page и end_page. Они находятся выравниванием страницы
+с исходной (Levenshtein.opcodes): нормализация и маскирование только
+удаляют и заменяют символы, поэтому выравнивание почти целиком
+состоит из совпадающих участков.
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import difflib
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+from Levenshtein import opcodes as levenshtein_opcodes
+
+
+@dataclass(frozen=True)
+class BlockRef:
+    """Блок текста: смещения [start, end) в тексте документа"""
+    document: str
+    page: int  # Страница начала блока
+    end_page: int  # Страница конца блока
+    start: int
+    end: int
+    raw_start: Optional[int] = None  # Смещение в исходном тексте страницы page
+    raw_end: Optional[int] = None  # Смещение в исходном тексте страницы end_page
+    
+    def to_dict(self) -> Dict[str, any]:
+        return {
+            'document': self.document,
+            'page': self.page,
+            'end_page': self.end_page,
+            'start': self.start,
+            'end': self.end,
+            'raw_start': self.raw_start,
+            'raw_end': self.raw_end,
+        }
+
+
+class PageOffsetMap:
+    """
+    Смещения в сравниваемом тексте страницы -> смещения в исходном
+    
+    При равенстве стоимостей выравнивание сдвигает пропуски вправо:
+    удаленный в начале страницы колонтитул "съел" бы первую букву
+    блока. Поэтому начала блоков отображаются по выравниванию
+    перевернутых строк (пропуски слева), концы - по прямому.
+    """
+    
+    def __init__(
+        self,
+        text: str,
+        raw_text: str,
+        canonical: Optional[Callable[[str], str]] = None,
+    ):
+        """
+        Args:
+            text: Сравниваемый текст страницы (нормализованный, без шаблонов)
+            raw_text: Исходный текст страницы (OCR)
+            canonical: Замены символов нормализации, сохраняющие длину
+                текста; применяются к исходному тексту перед выравниванием
+        """
+        self.length = len(text)
+        self.raw_length = len(raw_text)
+        self.identity = text == raw_text
+        if self.identity:
+            return
+        
+        target = canonical(raw_text) if canonical is not None else raw_text
+        n, m = len(text), len(target)
+        
+        self._end_ops = [op for op in levenshtein_opcodes(text, target) if op[0] != 'insert']
+        self._start_ops = [
+            (tag, n - i2, n - i1, m - j2, m - j1)
+            for tag, i1, i2, j1, j2 in reversed(levenshtein_opcodes(text[::-1], target[::-1]))
+            if tag != 'insert'
+        ]
+        self._end_bounds = [op[2] for op in self._end_ops]
+        self._start_bounds = [op[1] for op in self._start_ops]
+    
+    @staticmethod
+    def _aligned(tag: str, i1: int, i2: int, j1: int, j2: int) -> bool:
+        return tag == 'equal' or (tag == 'replace' and i2 - i1 == j2 - j1)
+    
+    def start(self, position: int) -> int:
+        """Исходное смещение начала фрагмента"""
+        if self.identity:
+            return position
+        if position >= self.length:
+            return self.raw_length
+        
+        tag, i1, i2, j1, j2 = self._start_ops[bisect_right(self._start_bounds, position) - 1]
+        return j1 + position - i1 if self._aligned(tag, i1, i2, j1, j2) else j1
+    
+    def end(self, position: int) -> int:
+        """Исходное смещение конца фрагмента (не включая)"""
+        if self.identity:
+            return position
+        if position <= 0:
+            return 0
+        
+        tag, i1, i2, j1, j2 = self._end_ops[bisect_left(self._end_bounds, position)]
+        return j1 + position - i1 if self._aligned(tag, i1, i2, j1, j2) else j2
+
+
+@dataclass(frozen=True)
+class BlockMatch:
+    """Пара похожих блоков прокурора и следователя"""
+    prosecutor: BlockRef
+    investigator: BlockRef
+    score: float  # Сходство (0-100)
+    
+    def to_dict(self) -> Dict[str, any]:
+        return {
+            'prosecutor': self.prosecutor.to_dict(),
+            'investigator': self.investigator.to_dict(),
+            'score': self.score,
+        }
+
+
+class CaseText:
+    """
+    Тексты документов одной стороны, склеенные в одну строку
+    
+    Страницы и документы разделены separator, как в
+    LegalDocumentAnalyzer._merge_all_texts, поэтому text совпадает с
+    результатом склейки. Смещения BlockRef отсчитываются от начала
+    документа, а не всей строки.
+    """
+    
+    def __init__(
+        self,
+        documents: Mapping[str, Mapping[int, str]],
+        separator: str = '\n\n',
+        raw_documents: Optional[Mapping[str, Mapping[int, str]]] = None,
+        canonical: Optional[Callable[[str], str]] = None,
+    ):
+        """
+        Args:
+            documents: Сравниваемые тексты {файл: {страница: текст}}
+            separator: Разделитель страниц и документов
+            raw_documents: Исходные тексты OCR тех же страниц; если заданы,
+                ссылки получают raw_start/raw_end
+            canonical: Замены символов нормализации (см. PageOffsetMap)
+        """
+        parts = []
+        position = 0
+        
+        self.separator = separator
+        self.raw_documents = raw_documents
+        self.canonical = canonical
+        self._offset_maps: Dict[int, PageOffsetMap] = {}
+        self.documents: List[str] = []
+        self._doc_bounds: Dict[str, Tuple[int, int]] = {}
+        self._page_starts: List[int] = []
+        self._page_ends: List[int] = []
+        self._page_nums: List[int] = []
+        self._page_docs: List[int] = []
+        
+        for name, pages in documents.items():
+            doc_start = position + (len(separator) if parts and pages else 0)
+            for page_num in sorted(pages):
+                if parts:
+                    parts.append(separator)
+                    position += len(separator)
+                self._page_starts.append(position)
+                self._page_nums.append(page_num)
+                self._page_docs.append(len(self.documents))
+                parts.append(pages[page_num])
+                position += len(pages[page_num])
+                self._page_ends.append(position)
+            
+            self._doc_bounds[name] = (doc_start, max(position, doc_start))
+            self.documents.append(name)
+        
+        self.text = ''.join(parts)
+    
+    def _offset_map(self, page_index: int) -> PageOffsetMap:
+        """Выравнивание страницы с исходной (строится при первом обращении)"""
+        offset_map = self._offset_maps.get(page_index)
+        if offset_map is None:
+            start = self._page_starts[page_index]
+            document = self.documents[self._page_docs[page_index]]
+            page_num = self._page_nums[page_index]
+            offset_map = PageOffsetMap(
+                self.text[start:self._page_ends[page_index]],
+                self.raw_documents[document][page_num],
+                self.canonical,
+            )
+            self._offset_maps[page_index] = offset_map
+        return offset_map
+    
+    def document_spans(self) -> Iterator[Tuple[str, int, int]]:
+        """(файл, начало, конец) документов в общей строке"""
+        for name in self.documents:
+            start, end = self._doc_bounds[name]
+            yield name, start, end
+    
+    def ref(self, start: int, end: int) -> BlockRef:
+        """Ссылка на фрагмент [start, end) общей строки (внутри одного документа)"""
+        first = max(bisect_right(self._page_starts, start) - 1, 0)
+        last = max(bisect_right(self._page_starts, max(end - 1, start)) - 1, first)
+        document = self.documents[self._page_docs[first]]
+        doc_start = self._doc_bounds[document][0]
+        
+        raw_start = raw_end = None
+        if self.raw_documents is not None:
+            page_start = self._page_starts[first]
+            raw_start = self._offset_map(first).start(
+                min(max(start - page_start, 0), self._page_ends[first] - page_start)
+            )
+            page_start = self._page_starts[last]
+            raw_end = self._offset_map(last).end(
+                min(max(end - page_start, 0), self._page_ends[last] - page_start)
+            )
+        
+        return BlockRef(
+            document=document,
+            page=self._page_nums[first],
+            end_page=self._page_nums[last],
+            start=start - doc_start,
+            end=end - doc_start,
+            raw_start=raw_start,
+            raw_end=raw_end,
+        )
+    
+    def block_text(self, ref: BlockRef) -> str:
+        """Текст блока по ссылке"""
+        doc_start = self._doc_bounds[ref.document][0]
+        return self.text[doc_start + ref.start:doc_start + ref.end]
+    
+    def raw_block_text(self, ref: BlockRef) -> str:
+        """Исходный текст OCR блока (страницы склеиваются через separator)"""
+        if self.raw_documents is None or ref.raw_start is None:
+            raise ValueError("Исходные тексты недоступны: CaseText создан без raw_documents")
+        return raw_block_text(self.raw_documents, ref, self.separator)
+
+
+def raw_block_text(
+    raw_documents: Mapping[str, Mapping[int, str]],
+    ref: BlockRef,
+    separator: str = '\n\n',
+) -> str:
+    """
+    Исходный текст OCR блока по ссылке
+    
+    Работает и для ссылки, восстановленной из to_dict: нужны только
+    исходные тексты страниц (например, CaseTextStore дела).
+    """
+    pages = raw_documents[ref.document]
+    if ref.page == ref.end_page:
+        return pages[ref.page][ref.raw_start:ref.raw_end]
+    
+    middle = [pages[page_num] for page_num in sorted(pages) if ref.page < page_num < ref.end_page]
+    return separator.join(
+        [pages[ref.page][ref.raw_start:]] + middle + [pages[ref.end_page][:ref.raw_end]]
+    )
+
+
+def diff_blocks(
+    match: BlockMatch,
+    prosecutor_text: CaseText,
+    investigator_text: CaseText,
+    context: int = 3,
+) -> str:
+    """
+    Построчный diff пары блоков (unified), строится по требованию
+    
+    Args:
+        match: Пара блоков
+        prosecutor_text: Тексты прокурора
+        investigator_text: Тексты следователя
+        context: Строк контекста вокруг различий
+    """
+    block1 = prosecutor_text.block_text(match.prosecutor)
+    block2 = investigator_text.block_text(match.investigator)
+    
+    return '\n'.join(difflib.unified_diff(
+        block1.splitlines(),
+        block2.splitlines(),
+        fromfile=f"{match.prosecutor.document}:{match.prosecutor.page}",
+        tofile=f"{match.investigator.document}:{match.investigator.page}",
+        n=context,
+        lineterm='',
+    ))
+
+
+def matching_spans(
+    match: BlockMatch,
+    prosecutor_text: CaseText,
+    investigator_text: CaseText,
+    min_length: int = 20,
+) -> List[Tuple[int, int, int, int]]:
+    """
+    Совпадающие участки пары блоков для подсветки в интерфейсе
+    
+    Returns:
+        [(начало1, конец1, начало2, конец2)] - смещения в текстах документов
+    """
+    block1 = prosecutor_text.block_text(match.prosecutor)
+    block2 = investigator_text.block_text(match.investigator)
+    matcher = difflib.SequenceMatcher(None, block1, block2, autojunk=False)
+    
+    return [
+        (
+            match.prosecutor.start + a,
+            match.prosecutor.start + a + size,
+            match.investigator.start + b,
+            match.investigator.start + b + size,
+        )
+        for a, b, size in matcher.get_matching_blocks()
+        if size >= min_length
+    ]
@@ -0,0 +1,92 @@
+"""
+Пакетное сравнение блоков текста "многие со многими"
+
+Вместо вызова fuzzywuzzy.fuzz.ratio для каждой пары блоков из Python
+матрица оценок считается одним вызовом rapidfuzz.process.cdist: сравнение
+идет в C++ без GIL на всех ядрах, а score_cutoff позволяет прекращать
+сравнение пар, которые заведомо не дотягивают до порога.
+
+Оценки совпадают с fuzz.ratio: round(100 * отношение Индел) с
+банковским округлением, одинаковые строки (и две пустые) - 100, пустая
+с непустой - 0. Без rapidfuzz используется fuzz.ratio по парам.
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import math
+from typing import Sequence
+import numpy as np
+
+try:
+    from rapidfuzz import fuzz as rapid_fuzz
+    from rapidfuzz import process as rapid_process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+
+def ratio(s1: str, s2: str) -> int:
+    """Оценка сходства пары строк (0-100), как fuzzywuzzy.fuzz.ratio"""
+    return int(score_matrix([s1], [s2])[0, 0])
+
+
+def _raw_cutoff(score_cutoff: float) -> float:
+    """
+    Порог для несокращенной оценки
+    
+    Целые оценки >= score_cutoff получаются из сырых >= ceil(cutoff) - 0.5
+    (69.5 округляется до 70); запас 1e-6 - на погрешность деления.
+    """
+    if score_cutoff <= 0:
+        return 0.0
+    return max(0.0, math.ceil(score_cutoff) - 0.5 - 1e-6)
+
+
+def score_matrix(
+    queries: Sequence[str],
+    choices: Sequence[str],
+    score_cutoff: float = 0,
+    workers: int = -1,
+    chunk_size: int = 512,
+) -> np.ndarray:
+    """
+    Матрица оценок сходства блоков
+    
+    Args:
+        queries: Блоки первой стороны (строки матрицы)
+        choices: Блоки второй стороны (столбцы)
+        score_cutoff: Оценки ниже порога могут быть заменены нулем
+            (сравнение таких пар прекращается досрочно); оценки не ниже
+            порога точные
+        workers: Потоков rapidfuzz (-1 - все ядра)
+        chunk_size: Строк матрицы за один вызов cdist; ограничивает
+            промежуточную float64-матрицу
+    
+    Returns:
+        np.uint8 [len(queries), len(choices)] - оценки 0-100
+    """
+    scores = np.zeros((len(queries), len(choices)), dtype=np.uint8)
+    if not len(queries) or not len(choices):
+        return scores
+    
+    if not RAPIDFUZZ_AVAILABLE:
+        from fuzzywuzzy import fuzz
+        for i, query in enumerate(queries):
+            for j, choice in enumerate(choices):
+                scores[i, j] = fuzz.ratio(query, choice)
+        return scores
+    
+    cutoff = _raw_cutoff(score_cutoff)
+    for start in range(0, len(queries), chunk_size):
+        raw = rapid_process.cdist(
+            queries[start:start + chunk_size],
+            choices,
+            scorer=rapid_fuzz.ratio,
+            score_cutoff=cutoff,
+            dtype=np.float64,
+            workers=workers,
+        )
+        # np.round, как и round() в fuzzywuzzy, округляет 0.5 к четному
+        scores[start:start + len(raw)] = np.round(raw)
+    
+    return scores
@@ -0,0 +1,223 @@
+"""
+Шаблонный текст дела: колонтитулы, штампы, процессуальные формулы
+
+Тома дела повторяют шапки страниц, штампы и стандартные формулировки
+("руководствуясь ст. ст. 144, 145 и 151 УПК РФ"). Они завышают
+текстовое сходство и порождают тысячи бесполезных пар блоков.
+
+Модель частот обучается на всех страницах дела: строка или фрагмент
+из n слов, встречающиеся на многих разных страницах, считаются
+шаблоном и маскируются перед сравнением. Скопированный текст обычно
+встречается на паре страниц (по одной у прокурора и следователя) и
+под порог не попадает.
+
+N-граммы хэшируются полиномиальным скользящим хэшем в NumPy; частоты
+считаются через np.unique по хэшам всех страниц.
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import re
+from collections import Counter
+from typing import Callable, Iterable, List, Optional, Tuple
+import numpy as np
+
+
+_WORD = re.compile(r'\w+')
+_DIGITS = re.compile(r'\d+')
+_SPACES = re.compile(r'\s+')
+_BLANK_LINES = re.compile(r'\n{3,}')
+_WHITESPACE = re.compile(r'\s+')
+
+# Основание полиномиального хэша (нечетное, арифметика по модулю 2**64)
+_HASH_BASE = np.uint64(1099511628211)
+
+
+def line_key(line: str) -> str:
+    """Ключ строки: регистр, числа и пробелы не различаются ("Лист 12" = "Лист 340")"""
+    return _SPACES.sub(' ', _DIGITS.sub('#', line.lower())).strip()
+
+
+def visible_chars(text: str) -> int:
+    """Число символов без пробелов и переводов строк"""
+    return len(text) - sum(len(match) for match in _WHITESPACE.findall(text))
+
+
+def _word_spans(text: str) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
+    """Хэши слов (uint64) и их позиции в тексте"""
+    matches = list(_WORD.finditer(text))
+    hashes = np.fromiter(
+        (hash(line_key(match.group(0))) for match in matches),
+        dtype=np.int64,
+        count=len(matches)
+    ).view(np.uint64)
+    return hashes, [match.span() for match in matches]
+
+
+def ngram_hashes(word_hashes: np.ndarray, n: int) -> np.ndarray:
+    """Скользящие хэши n-грамм слов (uint64, переполнение - модуль 2**64)"""
+    if len(word_hashes) < n:
+        return np.empty(0, dtype=np.uint64)
+    
+    count = len(word_hashes) - n + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for k in range(n):
+            hashes = hashes * _HASH_BASE + word_hashes[k:k + count]
+    return hashes
+
+
+class BoilerplateModel:
+    """
+    Частотная модель шаблонного текста дела
+    
+    Шаблон - нормализованная строка (line_key) или n-грамма слов,
+    встреченная не менее чем на min_pages разных страницах.
+    """
+    
+    def __init__(
+        self,
+        min_pages: int = 5,
+        ngram_size: int = 8,
+        min_line_length: int = 3,
+    ):
+        """
+        Args:
+            min_pages: На скольких страницах должен встретиться фрагмент
+            ngram_size: Длина n-граммы (слов) для процессуальных формул
+            min_line_length: Более короткие строки не считаются шаблоном
+        """
+        self.min_pages = min_pages
+        self.ngram_size = ngram_size
+        self.min_line_length = min_line_length
+        
+        self.boilerplate_lines: set = set()
+        self.boilerplate_ngrams = np.empty(0, dtype=np.uint64)  # Отсортированы
+        self.pages_seen = 0
+    
+    def fit(self, pages: Iterable[str]) -> "BoilerplateModel":
+        """
+        Обучает модель на страницах дела (обеих сторон)
+        
+        Каждая строка и n-грамма учитывается один раз на страницу.
+        """
+        line_counts = Counter()
+        page_ngrams = []
+        self.pages_seen = 0
+        
+        for text in pages:
+            self.pages_seen += 1
+            line_counts.update({
+                key for key in (line_key(line) for line in text.split('\n'))
+                if len(key) >= self.min_line_length
+            })
+            
+            word_hashes, _ = _word_spans(text)
+            page_ngrams.append(np.unique(ngram_hashes(word_hashes, self.ngram_size)))
+        
+        self.boilerplate_lines = {
+            key for key, count in line_counts.items() if count >= self.min_pages
+        }
+        
+        if page_ngrams:
+            values, counts = np.unique(np.concatenate(page_ngrams), return_counts=True)
+            self.boilerplate_ngrams = values[counts >= self.min_pages]
+        
+        return self
+    
+    def mask(self, text: str) -> Tuple[str, int]:
+        """
+        Удаляет шаблонные строки и фрагменты из текста страницы
+        
+        Переводы строк внутри удаленных фрагментов сохраняются, чтобы
+        не склеивать абзацы.
+        
+        Returns:
+            (текст без шаблонов, число удаленных символов без пробелов)
+        """
+        lines = text.split('\n')
+        kept_lines = [line for line in lines if line_key(line) not in self.boilerplate_lines]
+        masked_chars = sum(
+            visible_chars(line) for line in lines if line_key(line) in self.boilerplate_lines
+        )
+        text = '\n'.join(kept_lines)
+        
+        if len(self.boilerplate_ngrams):
+            text, ngram_chars = self._mask_ngrams(text)
+            masked_chars += ngram_chars
+        
+        return _BLANK_LINES.sub('\n\n', text).strip(), masked_chars
+    
+    def _mask_ngrams(self, text: str) -> Tuple[str, int]:
+        word_hashes, spans = _word_spans(text)
+        hashes = ngram_hashes(word_hashes, self.ngram_size)
+        if not len(hashes):
+            return text, 0
+        
+        positions = np.searchsorted(self.boilerplate_ngrams, hashes)
+        positions = np.minimum(positions, len(self.boilerplate_ngrams) - 1)
+        starts = np.flatnonzero(self.boilerplate_ngrams[positions] == hashes)
+        if not len(starts):
+            return text, 0
+        
+        # Слова, покрытые шаблонными n-граммами
+        coverage = np.zeros(len(spans) + 1, dtype=np.int32)
+        np.add.at(coverage, starts, 1)
+        np.add.at(coverage, starts + self.ngram_size, -1)
+        covered = np.cumsum(coverage[:-1]) > 0
+        
+        # Непрерывные участки покрытых слов
+        edges = np.diff(covered.astype(np.int8), prepend=0, append=0)
+        run_starts = np.flatnonzero(edges == 1)
+        run_ends = np.flatnonzero(edges == -1) - 1
+        
+        parts, position, masked_chars = [], 0, 0
+        for first, last in zip(run_starts, run_ends):
+            start, end = spans[first][0], spans[last][1]
+            removed = text[start:end]
+            parts.append(text[position:start])
+            parts.append('\n' * removed.count('\n'))
+            masked_chars += visible_chars(removed)
+            position = end
+        parts.append(text[position:])
+        
+        return ''.join(parts), masked_chars
+
+
+def mask_documents(
+    model: BoilerplateModel,
+    documents,
+    collect: Optional[Callable] = None,
+) -> Tuple[object, int, int]:
+    """
+    Маскирует шаблоны во всех документах {файл: {страница: текст}}
+    
+    Args:
+        model: Обученная модель шаблонов
+        documents: Документы {файл: {страница: текст}}
+        collect: collect(страницы, имена_документов) собирает поток
+            (файл, страница, текст) в результат - например,
+            CaseTextStore.from_pages; по умолчанию - вложенные словари
+    
+    Returns:
+        (замаскированные документы, удалено символов, всего символов)
+        Символы считаются без пробелов.
+    """
+    totals = [0, 0]
+    
+    def masked_pages():
+        for name, pages in documents.items():
+            for page_num, text in pages.items():
+                masked, masked_chars = model.mask(text)
+                totals[0] += masked_chars
+                totals[1] += visible_chars(text)
+                yield name, page_num, masked
+    
+    if collect is not None:
+        masked_documents = collect(masked_pages(), list(documents))
+    else:
+        masked_documents = {name: {} for name in documents}
+        for name, page_num, masked in masked_pages():
+            masked_documents[name][page_num] = masked
+    
+    return masked_documents, totals[0], totals[1]
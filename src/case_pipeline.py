@@ -0,0 +1,351 @@
+"""
+Конвейер обработки дела: СЛЕДОВАТЕЛЬ → ПРОКУРОР → СУДЬЯ
+
+Дело описывается графом этапов (DAG). Общие этапы (OCR) выполняются
+один раз и используются всеми сферами, независимые этапы выполняются
+параллельно, а результаты сохраняются на диск, чтобы после сбоя
+продолжить с места остановки.
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import os
+import time
+import pickle
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class Stage:
+    """Этап конвейера"""
+    name: str
+    func: Callable[[Dict[str, Any]], Any]  # Получает результаты зависимостей по именам
+    deps: List[str] = field(default_factory=list)
+    checkpoint: bool = True  # Сохранять результат на диск (False - дешевые или большие)
+
+
+class CasePipeline:
+    """
+    Исполнитель графа этапов с контрольными точками
+    
+    Этап запускается, как только готовы все его зависимости. Результаты
+    этапов с checkpoint=True сохраняются в checkpoint_dir/<этап>.pkl;
+    при повторном запуске они загружаются, и этап не выполняется.
+    
+    Пример:
+        pipeline = CasePipeline([
+            Stage("ocr", lambda r: ocr_all()),
+            Stage("evidence", lambda r: collect(r["ocr"]), deps=["ocr"]),
+        ], checkpoint_dir="runs/дело_1")
+        results = pipeline.run()
+    """
+    
+    def __init__(
+        self,
+        stages: List[Stage],
+        checkpoint_dir: Optional[str] = None,
+        fingerprint: Optional[str] = None,
+        max_workers: int = 4,
+    ):
+        """
+        Args:
+            stages: Этапы конвейера
+            checkpoint_dir: Директория контрольных точек (None - без сохранения)
+            fingerprint: Отпечаток входных данных; контрольные точки
+                с другим отпечатком не используются
+            max_workers: Максимум одновременно выполняемых этапов
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        self.checkpoint_dir = checkpoint_dir
+        self.fingerprint = fingerprint
+        self.max_workers = max_workers
+        
+        if len(self.stages) != len(stages):
+            raise ValueError("Имена этапов должны быть уникальны")
+        
+        self.order = self._topological_order()
+        
+        # Время выполнения этапов (секунды) и загруженные из контрольных точек
+        self.timings: Dict[str, float] = {}
+        self.resumed: List[str] = []
+    
+    def _topological_order(self) -> List[str]:
+        """Проверяет граф и возвращает этапы в порядке зависимостей"""
+        for stage in self.stages.values():
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Этап '{stage.name}' зависит от неизвестного этапа '{dep}'")
+        
+        order = []
+        state: Dict[str, int] = {}  # 1 - в обходе, 2 - обработан
+        
+        def visit(name: str):
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"Цикл в графе этапов через '{name}'")
+            state[name] = 1
+            for dep in self.stages[name].deps:
+                visit(dep)
+            state[name] = 2
+            order.append(name)
+        
+        for name in self.stages:
+            visit(name)
+        
+        return order
+    
+    def _checkpoint_path(self, name: str) -> Optional[str]:
+        if self.checkpoint_dir is None:
+            return None
+        return os.path.join(self.checkpoint_dir, f"{name}.pkl")
+    
+    def _load_checkpoint(self, name: str):
+        """Загружает результат этапа; (True, результат) или (False, None)"""
+        path = self._checkpoint_path(name)
+        if path is None or not self.stages[name].checkpoint or not os.path.exists(path):
+            return False, None
+        
+        try:
+            with open(path, 'rb') as f:
+                fingerprint, result = pickle.load(f)
+        except Exception as e:
+            print(f"   ⚠️  Контрольная точка '{name}' повреждена: {e}")
+            return False, None
+        
+        if fingerprint != self.fingerprint:
+            return False, None
+        
+        return True, result
+    
+    def _save_checkpoint(self, name: str, result: Any):
+        """Атомарно сохраняет результат этапа"""
+        path = self._checkpoint_path(name)
+        if path is None or not self.stages[name].checkpoint:
+            return
+        
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((self.fingerprint, result), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    
+    def run(self, targets: Optional[List[str]] = None, resume: bool = True) -> Dict[str, Any]:
+        """
+        Выполняет конвейер
+        
+        Если этап падает, уже запущенные этапы дорабатывают и сохраняются,
+        после чего исключение пробрасывается; повторный run продолжит
+        с невыполненных этапов.
+        
+        Args:
+            targets: Этапы, результаты которых нужны (None - конечные этапы графа)
+            resume: Использовать контрольные точки предыдущих запусков
+        
+        Returns:
+            {имя_этапа: результат} для выполненных и восстановленных этапов
+        """
+        results: Dict[str, Any] = {}
+        self.resumed = []
+        
+        # Обход от целевых этапов: этап с контрольной точкой не выполняется,
+        # и его зависимости не нужны
+        to_run = set()
+        if targets is None:
+            used = {dep for stage in self.stages.values() for dep in stage.deps}
+            targets = [name for name in self.order if name not in used]
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.stages:
+                raise ValueError(f"Неизвестный этап: {name}")
+            if name in to_run or name in results:
+                continue
+            
+            loaded, result = self._load_checkpoint(name) if resume else (False, None)
+            if loaded:
+                results[name] = result
+                self.resumed.append(name)
+            else:
+                to_run.add(name)
+                stack.extend(self.stages[name].deps)
+        
+        if self.resumed:
+            print(f"   ♻️  Восстановлено из контрольных точек: {', '.join(self.resumed)}")
+        
+        remaining = [name for name in self.order if name in to_run]
+        
+        running = {}
+        failure: Optional[BaseException] = None
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while remaining or running:
+                if failure is None:
+                    for name in list(remaining):
+                        if len(running) >= self.max_workers:
+                            break
+                        if all(dep in results for dep in self.stages[name].deps):
+                            remaining.remove(name)
+                            running[pool.submit(self._run_stage, name, results)] = name
+                
+                if not running:
+                    break
+                
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        print(f"   ❌ Этап '{name}' завершился ошибкой: {e}")
+                        failure = failure or e
+        
+        if failure is not None:
+            raise failure
+        
+        return results
+    
+    def _run_stage(self, name: str, results: Dict[str, Any]) -> Any:
+        """Выполняет этап и сохраняет контрольную точку"""
+        stage = self.stages[name]
+        inputs = {dep: results[dep] for dep in stage.deps}
+        
+        print(f"   ▶️  Этап: {name}")
+        start = time.perf_counter()
+        result = stage.func(inputs)
+        self.timings[name] = time.perf_counter() - start
+        
+        self._save_checkpoint(name, result)
+        print(f"   ✅ Этап '{name}' завершен за {self.timings[name]:.1f} с")
+        
+        return result
+
+
+def inputs_fingerprint(paths: List[str], *extra: str) -> str:
+    """Отпечаток входных файлов (путь, размер, время изменения) и параметров"""
+    digest = hashlib.sha1()
+    
+    for path in paths:
+        digest.update(path.encode('utf-8'))
+        if os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f":{stat.st_size}:{stat.st_mtime_ns}".encode())
+    
+    for value in extra:
+        digest.update(b"\0" + value.encode('utf-8'))
+    
+    return digest.hexdigest()
+
+
+def build_case_pipeline(
+    system: Dict[str, Any],
+    prosecutor_docs: List[str],
+    investigator_docs: List[str],
+    case_description: str,
+    case_name: str = "Уголовное дело",
+    checkpoint_dir: Optional[str] = None,
+    batch_size: int = 8,
+) -> CasePipeline:
+    """
+    Конвейер полного рассмотрения дела тремя сферами
+    
+    Граф этапов:
+        ocr_prosecutor, ocr_investigator (параллельно)
+        case ← ocr_*
+        evidence ← ocr_investigator          (СЛЕДОВАТЕЛЬ)
+        copypaste ← case
+        prosecution ← case, copypaste         (ПРОКУРОР)
+        judgment ← evidence, prosecution      (СУДЬЯ)
+    
+    OCR выполняется один раз: следователь получает готовые тексты
+    документов (один анализ на документ), прокурор - дело с теми же
+    текстами. Страницы для визуального сравнения растеризуются этапом
+    copypaste по одной, без списка изображений всего дела.
+    
+    Args:
+        system: Сферы из LegalModelsFactory.create_full_legal_system()
+        prosecutor_docs: Документы прокурора (PDF)
+        investigator_docs: Документы следователя (PDF)
+        case_description: Описание дела
+        case_name: Название дела
+        checkpoint_dir: Директория контрольных точек
+        batch_size: Размер пакета генерации следователя
+    
+    Returns:
+        CasePipeline; результат решения - этап 'judgment'
+    """
+    investigator = system['investigator']
+    prosecutor = system['prosecutor']
+    judge = system['judge']
+    analyzer = prosecutor.legal_analyzer
+    
+    def make_case(results):
+        return analyzer.make_case(
+            case_name,
+            prosecutor_docs,
+            investigator_docs,
+            results['ocr_prosecutor'],
+            results['ocr_investigator']
+        )
+    
+    def collect_evidence(results):
+        ocr_results = results['ocr_investigator']
+        
+        # Документ - PDF со всеми страницами; результаты OCR - по имени файла
+        documents = [path for path in investigator_docs if os.path.basename(path) in ocr_results]
+        texts = []
+        for path in documents:
+            pages = ocr_results[os.path.basename(path)]
+            texts.append('\n\n'.join(pages[page_num] for page_num in sorted(pages)))
+        
+        return investigator.collect_evidence(
+            documents,
+            case_description,
+            batch_size=batch_size,
+            texts=texts
+        )
+    
+    def detect_copypaste(results):
+        return analyzer.detect_copypaste(results['case'])
+    
+    def supervise(results):
+        copypaste = results['copypaste']
+        return {
+            'case': results['case'],
+            'copypaste_analysis': copypaste,
+            'prosecutor_conclusion': prosecutor.make_prosecutor_conclusion(
+                results['case'],
+                copypaste
+            ),
+            'spiritual_verdict': copypaste.spiritual_verdict
+        }
+    
+    def judge_case(results):
+        return judge.make_judgment(
+            results['evidence'],
+            results['prosecution'],
+            case_description
+        )
+    
+    stages = [
+        Stage("ocr_prosecutor", lambda _: analyzer.ocr.batch_process_pdfs(prosecutor_docs)),
+        Stage("ocr_investigator", lambda _: analyzer.ocr.batch_process_pdfs(investigator_docs)),
+        Stage("case", make_case, deps=["ocr_prosecutor", "ocr_investigator"]),
+        Stage("evidence", collect_evidence, deps=["ocr_investigator"]),
+        Stage("copypaste", detect_copypaste, deps=["case"]),
+        Stage("prosecution", supervise, deps=["case", "copypaste"]),
+        Stage("judgment", judge_case, deps=["evidence", "prosecution"]),
+    ]
+    
+    return CasePipeline(
+        stages,
+        checkpoint_dir=checkpoint_dir,
+        fingerprint=inputs_fingerprint(
+            list(prosecutor_docs) + list(investigator_docs),
+            case_name,
+            case_description
+        ),
+    )
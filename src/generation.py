@@ -0,0 +1,159 @@
+"""
+Управление генерацией: критерии остановки и статистика вызовов
+
+Длина ответа задается в новых токенах (max_new_tokens), генерация
+останавливается по стоп-строкам сферы или по дедлайну, а каждый
+вызов отчитывается временем prefill, скоростью декодирования и
+причиной остановки.
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+import torch
+from transformers import StoppingCriteria
+
+
+# Причины остановки генерации
+STOP_EOS = "eos"
+STOP_MAX_NEW_TOKENS = "max_new_tokens"
+STOP_STRING = "stop_string"
+STOP_DEADLINE = "deadline"
+STOP_CACHE = "cache"  # Ответ взят из кэша, генерации не было
+
+
+@dataclass
+class GenerationStats:
+    """Статистика одного вызова генерации"""
+    prompt_tokens: int = 0  # Токенов промпта (самый длинный в пакете)
+    new_tokens: int = 0  # Сгенерированных токенов (самая длинная последовательность)
+    prefill_time: float = 0.0  # Секунд до первого токена
+    decode_time: float = 0.0  # Секунд на остальные токены
+    stop_reasons: List[str] = field(default_factory=list)  # По последовательностям
+    draft_tokens: int = 0  # Предложено черновой моделью (спекулятивное декодирование)
+    accepted_tokens: int = 0  # Из них принято основной моделью
+    
+    @property
+    def acceptance_rate(self) -> float:
+        """Доля принятых черновых токенов"""
+        if self.draft_tokens == 0:
+            return 0.0
+        return self.accepted_tokens / self.draft_tokens
+    
+    @property
+    def decode_tokens_per_second(self) -> float:
+        """Скорость декодирования после prefill (токенов/с на последовательность)"""
+        if self.decode_time <= 0 or self.new_tokens <= 1:
+            return 0.0
+        return (self.new_tokens - 1) / self.decode_time
+    
+    @property
+    def stop_reason(self) -> str:
+        """Причина остановки (через запятую, если в пакете разные)"""
+        return ','.join(sorted(set(self.stop_reasons)))
+
+
+class GenerationMonitor(StoppingCriteria):
+    """
+    Критерий остановки по стоп-строкам и дедлайну
+    
+    Вызывается transformers после каждого шага генерации, поэтому
+    заодно засекает время первого токена (конец prefill).
+    """
+    
+    def __init__(
+        self,
+        tokenizer,
+        prompt_length: int,
+        stop_strings: Optional[List[str]] = None,
+        deadline_ms: Optional[float] = None,
+    ):
+        """
+        Args:
+            tokenizer: Токенизатор модели
+            prompt_length: Длина входа (с паддингом) в токенах
+            stop_strings: Строки, появление которых завершает последовательность
+            deadline_ms: Ограничение времени всего вызова в миллисекундах
+        """
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.stop_strings = [s for s in (stop_strings or []) if s]
+        
+        self.start_time = time.perf_counter()
+        self.deadline = (
+            self.start_time + deadline_ms / 1000.0 if deadline_ms is not None else None
+        )
+        self.first_token_time: Optional[float] = None
+        self.reasons: dict = {}
+        
+        # Достаточно декодировать хвост: стоп-строка не длиннее символов в токенах
+        self._tail_tokens = max((len(s) for s in self.stop_strings), default=0) + 2
+    
+    def __call__(self, input_ids: torch.LongTensor, scores, **kwargs) -> torch.BoolTensor:
+        now = time.perf_counter()
+        if self.first_token_time is None:
+            self.first_token_time = now
+        
+        done = torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+        
+        if self.stop_strings:
+            new_tokens = input_ids[:, self.prompt_length:]
+            tails = self.tokenizer.batch_decode(
+                new_tokens[:, -self._tail_tokens:],
+                skip_special_tokens=True,
+            )
+            for row, tail in enumerate(tails):
+                if row not in self.reasons and any(s in tail for s in self.stop_strings):
+                    self.reasons[row] = STOP_STRING
+                    done[row] = True
+        
+        if self.deadline is not None and now >= self.deadline:
+            for row in range(input_ids.shape[0]):
+                self.reasons.setdefault(row, STOP_DEADLINE)
+            done[:] = True
+        
+        return done
+    
+    def finish(
+        self,
+        new_token_counts: List[int],
+        max_new_tokens: int,
+        prompt_tokens: int,
+    ) -> GenerationStats:
+        """
+        Собирает статистику после завершения generate
+        
+        Args:
+            new_token_counts: Сгенерированных токенов по последовательностям (без паддинга)
+            max_new_tokens: Лимит новых токенов
+            prompt_tokens: Длина промпта
+        """
+        end_time = time.perf_counter()
+        first_token_time = self.first_token_time or end_time
+        
+        stop_reasons = []
+        for row, count in enumerate(new_token_counts):
+            if row in self.reasons:
+                stop_reasons.append(self.reasons[row])
+            elif count >= max_new_tokens:
+                stop_reasons.append(STOP_MAX_NEW_TOKENS)
+            else:
+                stop_reasons.append(STOP_EOS)
+        
+        return GenerationStats(
+            prompt_tokens=prompt_tokens,
+            new_tokens=max(new_token_counts, default=0),
+            prefill_time=first_token_time - self.start_time,
+            decode_time=end_time - first_token_time,
+            stop_reasons=stop_reasons,
+        )
+
+
+def cut_at_stop_strings(text: str, stop_strings: Optional[List[str]]) -> str:
+    """Обрезает ответ по первой встреченной стоп-строке"""
+    positions = [text.find(s) for s in (stop_strings or []) if s and s in text]
+    if positions:
+        text = text[:min(positions)]
+    return text.strip()
@@ -0,0 +1,689 @@
+#!/usr/bin/env python3
+"""
+Сервис приема документов дела
+
+Следит за директорией с томами PDF: новые и измененные файлы ставятся
+в ограниченную очередь, распознаются пулом обработчиков и сразу
+попадают в рабочую директорию дела и ее индексы. Удаленные и
+перемещенные файлы убираются из реестра и индексов. HTTP: /health и /metrics.
+
+Рабочая директория:
+    documents.json          - реестр принятых документов (размер, mtime, страницы)
+    documents/<документ>/   - результаты OCR документа с манифестом
+                              (прерванное распознавание продолжается)
+    text_store/             - тексты документов (CaseTextStore на документ
+                              и их список documents.json)
+    page_index/             - CLIP эмбеддинги страниц (PageEmbeddingIndex),
+                              если задан vision_encoder
+
+Запуск:
+    python -m src.ingestion /Volumes/MOZGACH/.../Тома ./workspace --port 8765
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import os
+import json
+import queue
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from .page_index import PageEmbeddingIndex
+from .text_store import CaseTextStore
+
+
+# Индексатор: (путь к PDF, {номер_страницы: текст}) -> None; может иметь
+# метод remove(путь к PDF) для удаленных документов
+Indexer = Callable[[str, Dict[int, str]], None]
+
+REGISTRY_FILE = "documents.json"
+TEXT_STORE_DIR = "text_store"
+PAGE_INDEX_DIR = "page_index"
+
+
+def _replace_dir(tmp_path: str, path: str):
+    """Подменяет директорию path новой версией tmp_path"""
+    old_path = path + ".old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+class TextStoreIndexer:
+    """
+    Тексты принятых документов в CaseTextStore рабочей директории
+    
+    Документы хранятся под путем относительно watch_dir, каждый - в своем
+    CaseTextStore, а documents.json перечисляет их по порядку приема.
+    Прием или удаление документа переписывает только его хранилище и
+    небольшой список, а не тексты всего дела.
+    
+    Директория:
+        documents.json   - {документ: поддиректория}
+        <поддиректория>/ - CaseTextStore документа
+    """
+    
+    def __init__(self, store_dir: str, root: str):
+        """
+        Args:
+            store_dir: Директория хранилища
+            root: Директория, относительно которой именуются документы
+        """
+        self.store_dir = store_dir
+        self.root = root
+        self._lock = threading.Lock()
+        
+        self._index_path = os.path.join(store_dir, REGISTRY_FILE)
+        self.documents: Dict[str, str] = {}
+        if os.path.exists(self._index_path):
+            with open(self._index_path, encoding='utf-8') as f:
+                self.documents = json.load(f)
+    
+    def _name(self, path: str) -> str:
+        return os.path.relpath(path, self.root)
+    
+    def document_store(self, name: str, mmap: bool = True) -> CaseTextStore:
+        """Хранилище одного документа"""
+        return CaseTextStore.load(os.path.join(self.store_dir, self.documents[name]), mmap=mmap)
+    
+    def load(self) -> Optional[CaseTextStore]:
+        """Тексты всех документов одним хранилищем (None - документов еще нет)"""
+        with self._lock:
+            names = list(self.documents)
+            if not names:
+                return None
+            return CaseTextStore.concatenate([self.document_store(name) for name in names])
+    
+    def _save_index(self):
+        """Атомарная запись списка документов (вызывается под self._lock)"""
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.documents, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self._index_path)
+    
+    def __call__(self, path: str, texts: Dict[int, str]):
+        name = self._name(path)
+        directory = name.replace(os.sep, "__")
+        doc_path = os.path.join(self.store_dir, directory)
+        
+        with self._lock:
+            os.makedirs(self.store_dir, exist_ok=True)
+            tmp_path = doc_path + ".tmp"
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            CaseTextStore.from_documents({name: texts}).save(tmp_path)
+            _replace_dir(tmp_path, doc_path)
+            
+            if self.documents.get(name) != directory:
+                self.documents[name] = directory
+                self._save_index()
+    
+    def remove(self, path: str):
+        with self._lock:
+            directory = self.documents.pop(self._name(path), None)
+            if directory is not None:
+                self._save_index()
+                shutil.rmtree(os.path.join(self.store_dir, directory), ignore_errors=True)
+
+
+class PageIndexIndexer:
+    """
+    CLIP эмбеддинги страниц принятых документов в PageEmbeddingIndex
+    
+    Ключи страниц - 'документ#N' (путь относительно watch_dir, N с 0,
+    как в LegalDocumentAnalyzer.build_page_index). Страницы измененного
+    документа заменяются, удаленного - удаляются из индекса.
+    """
+    
+    def __init__(
+        self,
+        index_dir: str,
+        root: str,
+        render: Callable[[str], list],
+        visual_engine,
+    ):
+        """
+        Args:
+            index_dir: Директория индекса
+            root: Директория, относительно которой именуются документы
+            render: Растеризация страниц PDF (OCREngine.iter_page_images)
+            visual_engine: VisualSimilarityEngine с vision_encoder
+        """
+        if visual_engine.vision_encoder is None:
+            raise ValueError("Для индекса страниц нужен vision_encoder")
+        
+        self.index_dir = index_dir
+        self.root = root
+        self.render = render
+        self.visual_engine = visual_engine
+        self._lock = threading.Lock()
+        
+        if os.path.exists(os.path.join(index_dir, "index.json")):
+            self.index = PageEmbeddingIndex.load(index_dir, mmap=False)
+        else:
+            self.index = PageEmbeddingIndex(visual_engine.vision_encoder.get_embedding_dim())
+    
+    def _document_keys(self, name: str) -> List[str]:
+        prefix = f"{name}#"
+        return [key for key in self.index.keys if key.startswith(prefix)]
+    
+    def __call__(self, path: str, texts: Dict[int, str]):
+        name = os.path.relpath(path, self.root)
+        fingerprints = self.visual_engine.fingerprint(self.render(path))
+        
+        with self._lock:
+            self.index.remove(self._document_keys(name))
+            if len(fingerprints):
+                self.index.add(
+                    fingerprints.embeddings,
+                    [f"{name}#{page_num}" for page_num in range(len(fingerprints))]
+                )
+            self.index.save(self.index_dir)
+    
+    def remove(self, path: str):
+        name = os.path.relpath(path, self.root)
+        with self._lock:
+            if self.index.remove(self._document_keys(name)):
+                self.index.save(self.index_dir)
+
+
+def default_indexers(
+    workspace_dir: str,
+    watch_dir: str,
+    ocr,
+    vision_encoder=None,
+) -> List[Indexer]:
+    """
+    Индексы рабочей директории: тексты и (с vision_encoder) эмбеддинги страниц
+    
+    Args:
+        workspace_dir: Рабочая директория дела
+        watch_dir: Директория с входящими PDF
+        ocr: OCR движок (для индекса страниц - с iter_page_images)
+        vision_encoder: VisionEncoder для индекса страниц (None - без него)
+    """
+    indexers: List[Indexer] = [
+        TextStoreIndexer(os.path.join(workspace_dir, TEXT_STORE_DIR), watch_dir)
+    ]
+    
+    if vision_encoder is not None:
+        from .visual_similarity import VisualSimilarityEngine
+        indexers.append(PageIndexIndexer(
+            os.path.join(workspace_dir, PAGE_INDEX_DIR),
+            watch_dir,
+            ocr.iter_page_images,
+            VisualSimilarityEngine(vision_encoder),
+        ))
+    
+    return indexers
+
+
+class IngestionService:
+    """
+    Наблюдение за директорией и прием PDF
+    
+    Файл ставится в очередь, когда его размер и время изменения не
+    менялись между двумя проходами сканера (копирование завершено).
+    Очередь ограничена: если обработчики не успевают, файл остается
+    ожидать следующего прохода, сканер не блокируется. Принятый файл,
+    которого нет два прохода подряд (удален или перемещен), удаляется
+    из реестра и индексов; пока watch_dir недоступна (том отключен),
+    сканирование пропускается.
+    
+    OCR выполняется через ocr.batch_process_pdfs с отдельной директорией
+    результатов на документ, поэтому прерванный документ продолжается
+    с нераспознанных страниц (см. OCRManifest).
+    """
+    
+    def __init__(
+        self,
+        watch_dir: str,
+        workspace_dir: str,
+        ocr=None,
+        workers: int = 2,
+        max_queue: int = 8,
+        poll_interval: float = 2.0,
+        indexers: Optional[List[Indexer]] = None,
+        vision_encoder=None,
+    ):
+        """
+        Args:
+            watch_dir: Директория с входящими PDF (просматривается рекурсивно)
+            workspace_dir: Рабочая директория дела
+            ocr: OCR движок с batch_process_pdfs (None - OCREngine rus+eng)
+            workers: Количество обработчиков
+            max_queue: Максимум документов в очереди
+            poll_interval: Интервал сканирования (секунды)
+            indexers: Обновление индексов после каждого документа
+                (None - default_indexers: тексты и индекс страниц)
+            vision_encoder: VisionEncoder для индекса страниц по умолчанию
+                (None - индекс страниц не ведется)
+        """
+        if ocr is None:
+            from .ocr_engine import OCREngine
+            ocr = OCREngine(languages=['rus', 'eng'])
+        
+        self.watch_dir = watch_dir
+        self.workspace_dir = workspace_dir
+        self.ocr = ocr
+        self.workers = workers
+        self.poll_interval = poll_interval
+        
+        os.makedirs(os.path.join(workspace_dir, "documents"), exist_ok=True)
+        self.indexers = list(
+            indexers if indexers is not None
+            else default_indexers(workspace_dir, watch_dir, ocr, vision_encoder)
+        )
+        self._registry_path = os.path.join(workspace_dir, REGISTRY_FILE)
+        self.registry: Dict[str, Dict[str, any]] = {}
+        if os.path.exists(self._registry_path):
+            with open(self._registry_path, 'r', encoding='utf-8') as f:
+                self.registry = json.load(f)
+        
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._http: Optional[ThreadingHTTPServer] = None
+        
+        # Сигнатуры (размер, mtime) с прошлого прохода, документы в работе
+        # (удаление - сигнатура None), документы с ошибкой (повтор - только
+        # после изменения файла) и принятые документы, не найденные в
+        # прошлом проходе
+        self._last_seen: Dict[str, Tuple[int, int]] = {}
+        self._in_flight: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._failed: Dict[str, Tuple[int, int]] = {}
+        self._missing: set = set()
+        
+        self.counters = {
+            'scans': 0,
+            'discovered': 0,
+            'processed': 0,
+            'removed': 0,
+            'failed': 0,
+            'pages': 0,
+            'backpressure': 0,
+        }
+        self.started_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+    
+    def _pdf_files(self) -> Dict[str, Tuple[int, int]]:
+        """{относительный путь: (размер, mtime_ns)} для PDF в watch_dir"""
+        files = {}
+        for root, _, names in os.walk(self.watch_dir):
+            for name in names:
+                if not name.lower().endswith('.pdf'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files[os.path.relpath(path, self.watch_dir)] = (stat.st_size, stat.st_mtime_ns)
+        return files
+    
+    def scan_once(self) -> int:
+        """
+        Один проход сканера
+        
+        Returns:
+            Количество документов, поставленных в очередь (включая удаления)
+        """
+        if not os.path.isdir(self.watch_dir):
+            self.last_error = f"scan: директория недоступна: {self.watch_dir}"
+            return 0
+        
+        files = self._pdf_files()
+        queued = 0
+        
+        with self._lock:
+            self.counters['scans'] += 1
+            
+            # Удаленные и перемещенные документы: нет два прохода подряд
+            missing = {name for name in self.registry if name not in files}
+            for name in sorted(missing & self._missing):
+                if name in self._in_flight:
+                    continue
+                try:
+                    self._queue.put_nowait((name, None))
+                except queue.Full:
+                    self.counters['backpressure'] += 1
+                    continue
+                self._in_flight[name] = None
+                queued += 1
+            self._missing = missing
+            
+            for name, signature in files.items():
+                entry = self.registry.get(name)
+                if entry and (entry['size'], entry['mtime_ns']) == tuple(signature):
+                    continue
+                if name in self._in_flight or self._failed.get(name) == signature:
+                    continue
+                
+                # Файл еще копируется - ждем стабильной сигнатуры
+                if self._last_seen.get(name) != signature:
+                    continue
+                
+                try:
+                    self._queue.put_nowait((name, signature))
+                except queue.Full:
+                    self.counters['backpressure'] += 1
+                    continue
+                
+                self._in_flight[name] = signature
+                self.counters['discovered'] += 1
+                queued += 1
+            
+            self._last_seen = files
+        
+        return queued
+    
+    def _scan_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.scan_once()
+            except Exception as e:
+                self.last_error = f"scan: {e}"
+                print(f"   ⚠️  Ошибка сканирования: {e}")
+            self._stop.wait(self.poll_interval)
+    
+    def document_dir(self, name: str) -> str:
+        """Директория результатов документа в рабочей директории"""
+        return os.path.join(self.workspace_dir, "documents", name.replace(os.sep, "__"))
+    
+    def _save_registry(self):
+        """Атомарная запись реестра (вызывается под self._lock)"""
+        tmp_path = self._registry_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.registry, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self._registry_path)
+    
+    def process_document(self, name: str, signature: Tuple[int, int]) -> Dict[int, str]:
+        """
+        Распознает документ и обновляет рабочую директорию и индексы
+        
+        Args:
+            name: Путь относительно watch_dir
+            signature: (размер, mtime_ns) на момент постановки в очередь
+        """
+        path = os.path.join(self.watch_dir, name)
+        output_dir = self.document_dir(name)
+        
+        # Документ изменился - прежние страницы недействительны
+        previous = self.registry.get(name)
+        if previous and (previous['size'], previous['mtime_ns']) != tuple(signature):
+            shutil.rmtree(output_dir, ignore_errors=True)
+        
+        results = self.ocr.batch_process_pdfs([path], output_dir=output_dir)
+        texts = results.get(os.path.basename(path)) or {}
+        if not texts:
+            raise RuntimeError(f"OCR не вернул страниц: {name}")
+        
+        for indexer in self.indexers:
+            indexer(path, texts)
+        
+        with self._lock:
+            self.registry[name] = {
+                'size': signature[0],
+                'mtime_ns': signature[1],
+                'pages': len(texts),
+                'chars': sum(len(text) for text in texts.values()),
+                'ingested_at': time.time(),
+            }
+            self._save_registry()
+        
+        return texts
+    
+    def remove_document(self, name: str):
+        """
+        Удаляет документ из индексов, реестра и рабочей директории
+        
+        Args:
+            name: Путь относительно watch_dir
+        """
+        path = os.path.join(self.watch_dir, name)
+        for indexer in self.indexers:
+            remove = getattr(indexer, 'remove', None)
+            if remove is not None:
+                remove(path)
+        
+        shutil.rmtree(self.document_dir(name), ignore_errors=True)
+        
+        with self._lock:
+            self.registry.pop(name, None)
+            self._save_registry()
+    
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            try:
+                name, signature = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            
+            if signature is None:
+                try:
+                    self.remove_document(name)
+                    with self._lock:
+                        self.counters['removed'] += 1
+                    print(f"   🗑️  Удален документ: {name}")
+                except Exception as e:
+                    self.last_error = f"{name}: {e}"
+                    print(f"   ❌ Ошибка удаления {name}: {e}")
+                finally:
+                    with self._lock:
+                        self._in_flight.pop(name, None)
+                    self._queue.task_done()
+                continue
+            
+            try:
+                texts = self.process_document(name, signature)
+                with self._lock:
+                    self.counters['processed'] += 1
+                    self._failed.pop(name, None)
+                    self.counters['pages'] += len(texts)
+                print(f"   ✅ Принят документ: {name} ({len(texts)} страниц)")
+            except Exception as e:
+                with self._lock:
+                    self.counters['failed'] += 1
+                    self._failed[name] = signature
+                self.last_error = f"{name}: {e}"
+                print(f"   ❌ Ошибка приема {name}: {e}")
+            finally:
+                with self._lock:
+                    self._in_flight.pop(name, None)
+                self._queue.task_done()
+    
+    def start(self, http_port: Optional[int] = None, http_host: str = "127.0.0.1"):
+        """
+        Запускает сканер, обработчики и (опционально) HTTP сервер
+        
+        Args:
+            http_port: Порт /health и /metrics (None - без HTTP, 0 - свободный порт)
+            http_host: Адрес HTTP сервера
+        """
+        self._stop.clear()
+        self.started_at = time.time()
+        
+        self._threads = [
+            threading.Thread(target=self._worker_loop, name=f"ingest-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        self._threads.append(threading.Thread(target=self._scan_loop, name="ingest-scanner", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        
+        if http_port is not None:
+            self._http = ThreadingHTTPServer((http_host, http_port), _make_handler(self))
+            threading.Thread(target=self._http.serve_forever, name="ingest-http", daemon=True).start()
+            print(f"   🌐 /health и /metrics: http://{http_host}:{self.http_port}")
+        
+        print(f"👀 Наблюдение за {self.watch_dir} ({self.workers} обработчиков)")
+    
+    @property
+    def http_port(self) -> Optional[int]:
+        """Фактический порт HTTP сервера"""
+        return self._http.server_address[1] if self._http else None
+    
+    def wait_idle(self, timeout: float = 30.0) -> bool:
+        """Ждет, пока очередь опустеет и обработчики освободятся"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._in_flight:
+                    return True
+            time.sleep(0.05)
+        return False
+    
+    def stop(self, timeout: float = 10.0):
+        """Останавливает сервис (текущие документы дорабатываются)"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+            self._http = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    def health(self) -> Dict[str, any]:
+        """Состояние сервиса: все потоки живы и директория доступна"""
+        alive = sum(thread.is_alive() for thread in self._threads)
+        healthy = (
+            not self._stop.is_set()
+            and alive == len(self._threads) > 0
+            and os.path.isdir(self.watch_dir)
+        )
+        return {
+            'status': 'ok' if healthy else 'unhealthy',
+            'threads_alive': alive,
+            'watch_dir': self.watch_dir,
+            'last_error': self.last_error,
+        }
+    
+    def metrics(self) -> Dict[str, float]:
+        """Счетчики и текущие значения"""
+        with self._lock:
+            values = dict(self.counters)
+            values['in_flight'] = len(self._in_flight)
+            values['documents'] = len(self.registry)
+        values['queue_depth'] = self._queue.qsize()
+        values['uptime_seconds'] = time.time() - self.started_at if self.started_at else 0.0
+        return values
+
+
+def format_metrics(metrics: Dict[str, float], prefix: str = "braindler_ingest") -> str:
+    """Метрики в текстовом формате Prometheus"""
+    counters = {'scans', 'discovered', 'processed', 'removed', 'failed', 'pages', 'backpressure'}
+    lines = []
+    for name, value in sorted(metrics.items()):
+        metric = f"{prefix}_{name}_total" if name in counters else f"{prefix}_{name}"
+        lines.append(f"# TYPE {metric} {'counter' if name in counters else 'gauge'}")
+        lines.append(f"{metric} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+def _make_handler(service: IngestionService):
+    """Обработчик HTTP запросов для сервиса"""
+    
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: str, content_type: str):
+            payload = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        
+        def do_GET(self):
+            if self.path == '/health':
+                health = service.health()
+                status = 200 if health['status'] == 'ok' else 503
+                self._send(status, json.dumps(health, ensure_ascii=False), 'application/json; charset=utf-8')
+            elif self.path == '/metrics':
+                self._send(200, format_metrics(service.metrics()), 'text/plain; version=0.0.4')
+            else:
+                self._send(404, '{"error": "not found"}', 'application/json')
+        
+        def log_message(self, format, *args):
+            pass
+    
+    return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="Сервис приема PDF документов дела"
+    )
+    parser.add_argument(
+        "watch_dir",
+        help="Директория с входящими PDF"
+    )
+    parser.add_argument(
+        "workspace_dir",
+        help="Рабочая директория дела"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=2,
+        help="Количество обработчиков OCR"
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=8,
+        help="Максимум документов в очереди"
+    )
+    parser.add_argument(
+        "--poll",
+        type=float,
+        default=2.0,
+        help="Интервал сканирования (секунды)"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="Порт /health и /metrics"
+    )
+    parser.add_argument(
+        "--no-page-index",
+        action="store_true",
+        help="Не вести индекс CLIP эмбеддингов страниц (без загрузки CLIP)"
+    )
+    
+    args = parser.parse_args()
+    
+    vision_encoder = None
+    if not args.no_page_index:
+        from .vision_encoder import VisionEncoder
+        vision_encoder = VisionEncoder()
+    
+    service = IngestionService(
+        args.watch_dir,
+        args.workspace_dir,
+        workers=args.workers,
+        max_queue=args.max_queue,
+        poll_interval=args.poll,
+        vision_encoder=vision_encoder,
+    )
+    service.start(http_port=args.port)
+    
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n🛑 Остановка...")
+        service.stop()
@@ -10,12 +10,27 @@
 """
 
 import os
+import json
+import asyncio
 import difflib
-from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from concurrent.futures import Executor
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Mapping, Tuple, Optional, Union
+from dataclasses import dataclass, field
+import numpy as np
 from Levenshtein import ratio as levenshtein_ratio
 from fuzzywuzzy import fuzz
 from .ocr_engine import OCREngine
+from .visual_similarity import VisualSimilarityEngine
+from .page_index import PageEmbeddingIndex
+from .text_store import CaseTextStore
+from .text_normalizer import TextNormalizer, canonical_chars
+from .boilerplate import BoilerplateModel, mask_documents
+from .typo_fingerprint import Lexicon, find_shared_typos
+from .structure_fingerprint import StructureFingerprinter, rank_document_pairs
+from .block_alignment import BlockMatch, CaseText, diff_blocks, matching_spans
+from .segmentation import ParagraphSegmenter, Segmenter, TextOffsets, make_segmenter
+from .block_scoring import score_matrix
 
 
 @dataclass
@@ -23,19 +38,67 @@ class CopyPasteResult:
     """Результат обнаружения копипаста"""
     text_similarity: float  # Процент текстового совпадения (0-100)
     visual_similarity: float  # Визуальное сходство (0-100)
-    suspicious_blocks: List[Tuple[str, str]]  # [(блок_прокурора, блок_следователя)]
-    identical_sections: List[str]  # Полностью идентичные секции
+    suspicious_blocks: List[BlockMatch]  # Частично скопированные пары блоков
+    identical_sections: List[BlockMatch]  # Идентичные блоки (лучшая пара для блока прокурора)
     suspicious_patterns: List[str]  # Подозрительные паттерны
     spiritual_verdict: str  # Вердикт с духовной точки зрения
+    boilerplate_masked: float = 0.0  # Доля текста, скрытого как шаблонный (0-100)
+    # Сравнивавшиеся тексты (прокурора, следователя) для diff; не сериализуются
+    texts: Optional[Tuple[CaseText, CaseText]] = field(default=None, repr=False, compare=False)
+    
+    def block_texts(self, match: BlockMatch) -> Tuple[str, str]:
+        """Тексты пары блоков (прокурора, следователя)"""
+        prosecutor_text, investigator_text = self._require_texts()
+        return (
+            prosecutor_text.block_text(match.prosecutor),
+            investigator_text.block_text(match.investigator),
+        )
+    
+    def diff(self, match: BlockMatch, context: int = 3) -> str:
+        """Построчный diff пары блоков (строится по требованию)"""
+        return diff_blocks(match, *self._require_texts(), context=context)
+    
+    def matching_spans(self, match: BlockMatch, min_length: int = 20) -> List[Tuple[int, int, int, int]]:
+        """Совпадающие участки пары блоков: смещения в текстах документов"""
+        return matching_spans(match, *self._require_texts(), min_length=min_length)
+    
+    def _require_texts(self) -> Tuple[CaseText, CaseText]:
+        if self.texts is None:
+            raise ValueError("Тексты документов недоступны: результат создан без них")
+        return self.texts
+    
+    def to_dict(self) -> Dict[str, any]:
+        """
+        Результат без текстов: блоки - ссылки (документ, страница, смещения)
+        
+        raw_start/raw_end ссылок указывают в исходные тексты OCR страниц
+        (см. block_alignment.raw_block_text), start/end - в сравниваемые.
+        """
+        return {
+            'text_similarity': self.text_similarity,
+            'visual_similarity': self.visual_similarity,
+            'suspicious_blocks': [match.to_dict() for match in self.suspicious_blocks],
+            'identical_sections': [match.to_dict() for match in self.identical_sections],
+            'suspicious_patterns': self.suspicious_patterns,
+            'spiritual_verdict': self.spiritual_verdict,
+            'boilerplate_masked': self.boilerplate_masked,
+        }
+    
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False)
 
 
 @dataclass
 class LegalCase:
     """Уголовное дело"""
     case_name: str
-    prosecutor_documents: Dict[str, Dict[int, str]]  # {filename: {page: text}}
-    investigator_documents: Dict[str, Dict[int, str]]
+    # {filename: {page: text}} - обычно CaseTextStore (один буфер UTF-8)
+    prosecutor_documents: Mapping[str, Mapping[int, str]]
+    investigator_documents: Mapping[str, Mapping[int, str]]
     metadata: Dict[str, any]  # Метаданные (даты, подписи и т.д.)
+    # Нормализованные тексты для сравнения (см. TextNormalizer)
+    normalized_prosecutor_documents: Optional[Mapping[str, Mapping[int, str]]] = None
+    normalized_investigator_documents: Optional[Mapping[str, Mapping[int, str]]] = None
 
 
 class LegalDocumentAnalyzer:
@@ -51,22 +114,42 @@ class LegalDocumentAnalyzer:
         как симптома возможной несправедливости
     """
     
-    def __init__(self, use_easyocr: bool = False):
+    def __init__(self, use_easyocr: bool = False, vision_encoder=None, ocr=None):
         """
         Инициализация юридического анализатора
         
         Args:
             use_easyocr: Использовать EasyOCR для лучшего распознавания
+            vision_encoder: VisionEncoder для сравнения макетов страниц
+                (опционально, без него - только перцептивные хэши)
+            ocr: Готовый OCR движок (по умолчанию OCREngine rus+eng)
         """
         print("⚖️  Инициализация LegalDocumentAnalyzer...")
         print("   🙏 Духовная миссия: Служение истине и справедливости")
         
         # OCR движок
-        self.ocr = OCREngine(languages=['rus', 'eng'], use_easyocr=use_easyocr)
+        self.ocr = ocr if ocr is not None else OCREngine(languages=['rus', 'eng'], use_easyocr=use_easyocr)
+        
+        # Визуальное сравнение страниц
+        self.visual_engine = VisualSimilarityEngine(vision_encoder)
+        self.page_index: Optional[PageEmbeddingIndex] = None
+        
+        # Нормализация текста OCR перед сравнением (None - сравнивать сырой текст)
+        self.normalizer: Optional[TextNormalizer] = TextNormalizer()
+        
+        # Шаблон - фрагмент, встреченный на стольких страницах дела (None - не маскировать)
+        self.boilerplate_min_pages: Optional[int] = 5
+        
+        # Словарь для поиска общих опечаток (см. load_lexicon)
+        self.lexicon: Optional[Lexicon] = None
+        
+        # Структурные отпечатки документов (кэшируются между делами)
+        self.fingerprinter = StructureFingerprinter()
         
         # Пороги для определения подозрительных совпадений
         self.SUSPICIOUS_THRESHOLD = 70.0  # % сходства
         self.IDENTICAL_THRESHOLD = 95.0   # % для идентичных блоков
+        self.STRUCTURE_THRESHOLD = 0.9    # Сходство структуры (0-1)
         
         print("   ✅ Анализатор готов к служению истине")
     
@@ -99,17 +182,93 @@ class LegalDocumentAnalyzer:
         print("\n📄 Обработка документов следователя...")
         investigator_data = self.ocr.batch_process_pdfs(investigator_docs)
         
-        # Создаем объект дела
+        return self.make_case(
+            case_name,
+            prosecutor_docs,
+            investigator_docs,
+            prosecutor_data,
+            investigator_data
+        )
+    
+    async def process_case_async(
+        self,
+        prosecutor_docs: List[str],
+        investigator_docs: List[str],
+        case_name: str = "Уголовное дело",
+        executor: Optional[Executor] = None,
+    ) -> LegalCase:
+        """
+        Асинхронная обработка документов дела
+        
+        OCR документов прокурора и следователя выполняется параллельно
+        в executor, не блокируя цикл событий.
+        
+        Args:
+            prosecutor_docs: Список PDF документов прокурора
+            investigator_docs: Список PDF документов следователя
+            case_name: Название дела
+            executor: Executor для OCR (None - executor цикла по умолчанию)
+            
+        Returns:
+            LegalCase с извлеченными данными
+        """
+        print(f"\n📚 Обработка дела: {case_name}")
+        print(f"   Документы прокурора: {len(prosecutor_docs)}")
+        print(f"   Документы следователя: {len(investigator_docs)}")
+        
+        loop = asyncio.get_running_loop()
+        prosecutor_data, investigator_data = await asyncio.gather(
+            loop.run_in_executor(executor, self.ocr.batch_process_pdfs, prosecutor_docs),
+            loop.run_in_executor(executor, self.ocr.batch_process_pdfs, investigator_docs),
+        )
+        
+        return self.make_case(
+            case_name,
+            prosecutor_docs,
+            investigator_docs,
+            prosecutor_data,
+            investigator_data
+        )
+    
+    def make_case(
+        self,
+        case_name: str,
+        prosecutor_docs: List[str],
+        investigator_docs: List[str],
+        prosecutor_data: Dict[str, Dict[int, str]],
+        investigator_data: Dict[str, Dict[int, str]],
+    ) -> LegalCase:
+        """
+        Создает объект дела из результатов OCR
+        
+        Результаты batch_process_pdfs можно получить заранее (например,
+        отдельными этапами CasePipeline) и передать сюда.
+        
+        Тексты переносятся в CaseTextStore: вложенные словари строк
+        после этого не держатся в памяти. Нормализованные для сравнения
+        тексты вычисляются здесь один раз на страницу и хранятся в деле
+        рядом с результатом OCR.
+        """
         case = LegalCase(
             case_name=case_name,
-            prosecutor_documents=prosecutor_data,
-            investigator_documents=investigator_data,
+            prosecutor_documents=CaseTextStore.from_documents(prosecutor_data),
+            investigator_documents=CaseTextStore.from_documents(investigator_data),
             metadata={
                 'prosecutor_files': prosecutor_docs,
                 'investigator_files': investigator_docs,
             }
         )
         
+        if self.normalizer is not None:
+            case.normalized_prosecutor_documents = self.normalizer.normalize_documents(
+                case.prosecutor_documents,
+                collect=CaseTextStore.from_pages
+            )
+            case.normalized_investigator_documents = self.normalizer.normalize_documents(
+                case.investigator_documents,
+                collect=CaseTextStore.from_pages
+            )
+        
         print(f"\n✅ Дело обработано")
         return case
     
@@ -117,6 +276,8 @@ class LegalDocumentAnalyzer:
         self,
         case: LegalCase,
         block_size: int = 500,  # Размер блока для сравнения (символов)
+        pages: Optional[Tuple[list, list]] = None,
+        segmentation: Union[str, Segmenter] = "paragraph",
     ) -> CopyPasteResult:
         """
         Обнаруживает копипаст между документами
@@ -129,16 +290,125 @@ class LegalDocumentAnalyzer:
         Args:
             case: Уголовное дело
             block_size: Размер блока текста для анализа
+            pages: Уже растеризованные страницы (прокурора, следователя);
+                по умолчанию растеризуются файлы из case.metadata
+            segmentation: Разбиение на блоки - paragraph, sentence (OCR без
+                пустых строк), window, tokens или готовый Segmenter
             
         Returns:
             CopyPasteResult с результатами анализа
         """
+        analyze_texts, calculate_visual_similarity = self._copypaste_stages(
+            case, block_size, pages, segmentation
+        )
+        
+        return self._make_copypaste_result(analyze_texts(), calculate_visual_similarity())
+    
+    async def detect_copypaste_async(
+        self,
+        case: LegalCase,
+        block_size: int = 500,
+        pages: Optional[Tuple[list, list]] = None,
+        segmentation: Union[str, Segmenter] = "paragraph",
+        executor: Optional[Executor] = None,
+    ) -> CopyPasteResult:
+        """
+        Асинхронное обнаружение копипаста
+        
+        Текстовый анализ и визуальное сравнение страниц выполняются
+        параллельно в executor.
+        
+        Args:
+            case: Уголовное дело
+            block_size: Размер блока текста для анализа
+            pages: Уже растеризованные страницы (см. detect_copypaste)
+            segmentation: Разбиение на блоки (см. detect_copypaste)
+            executor: Executor для сравнения (None - executor цикла по умолчанию)
+            
+        Returns:
+            CopyPasteResult с результатами анализа
+        """
+        analyze_texts, calculate_visual_similarity = self._copypaste_stages(
+            case, block_size, pages, segmentation
+        )
+        
+        loop = asyncio.get_running_loop()
+        text_analysis, visual_similarity = await asyncio.gather(
+            loop.run_in_executor(executor, analyze_texts),
+            loop.run_in_executor(executor, calculate_visual_similarity),
+        )
+        
+        return self._make_copypaste_result(text_analysis, visual_similarity)
+    
+    def _copypaste_stages(
+        self,
+        case: LegalCase,
+        block_size: int,
+        pages: Optional[Tuple[list, list]],
+        segmentation: Union[str, Segmenter],
+    ) -> Tuple[Callable[[], Dict[str, any]], Callable[[], float]]:
+        """
+        Независимые части анализа копипаста: текстовая (шаги 1-4) и
+        визуальная (шаг 5); вызываются по очереди или параллельно
+        """
         print(f"\n🔍 Анализ копипаста: {case.case_name}")
         print("   🙏 Служение истине через обнаружение несправедливости...")
         
-        # Объединяем все тексты
-        prosecutor_text = self._merge_all_texts(case.prosecutor_documents)
-        investigator_text = self._merge_all_texts(case.investigator_documents)
+        return (
+            partial(self._analyze_texts, case, block_size, segmentation),
+            partial(self._calculate_visual_similarity, case, pages),
+        )
+    
+    def _analyze_texts(
+        self,
+        case: LegalCase,
+        block_size: int,
+        segmentation: Union[str, Segmenter] = "paragraph",
+    ) -> Dict[str, any]:
+        """Текстовая часть анализа копипаста (шаги 1-4)"""
+        segmenter = (
+            make_segmenter(segmentation, block_size)
+            if isinstance(segmentation, str) else segmentation
+        )
+        
+        # Нормализованные тексты, если есть
+        prosecutor_documents = case.normalized_prosecutor_documents or case.prosecutor_documents
+        investigator_documents = case.normalized_investigator_documents or case.investigator_documents
+        
+        # Маскируем шаблоны (колонтитулы, штампы, формулы) по частотам всего дела
+        boilerplate_masked = 0.0
+        if self.boilerplate_min_pages is not None:
+            model = BoilerplateModel(min_pages=self.boilerplate_min_pages).fit(
+                text
+                for documents in (prosecutor_documents, investigator_documents)
+                for pages in documents.values()
+                for text in pages.values()
+            )
+            prosecutor_documents, masked1, total1 = mask_documents(
+                model, prosecutor_documents, collect=CaseTextStore.from_pages
+            )
+            investigator_documents, masked2, total2 = mask_documents(
+                model, investigator_documents, collect=CaseTextStore.from_pages
+            )
+            
+            if total1 + total2:
+                boilerplate_masked = (masked1 + masked2) / (total1 + total2) * 100
+            print(f"   🧹 Скрыто шаблонного текста: {boilerplate_masked:.1f}%")
+        
+        # Объединяем все тексты (со смещениями страниц для ссылок на блоки);
+        # ссылки получают и смещения в исходных текстах OCR
+        prosecutor_case_text = CaseText(
+            prosecutor_documents,
+            raw_documents=case.prosecutor_documents,
+            canonical=canonical_chars,
+        )
+        investigator_case_text = CaseText(
+            investigator_documents,
+            raw_documents=case.investigator_documents,
+            canonical=canonical_chars,
+        )
+        prosecutor_text = prosecutor_case_text.text
+        investigator_text = investigator_case_text.text
         
         # 1. Общее текстовое сходство
         text_similarity = self._calculate_text_similarity(
@@ -148,31 +418,47 @@ class LegalDocumentAnalyzer:
         
         print(f"   📊 Общее текстовое сходство: {text_similarity:.2f}%")
         
-        # 2. Поиск идентичных блоков
-        identical_sections = self._find_identical_sections(
-            prosecutor_text,
-            investigator_text,
-            block_size
+        # 2-3. Идентичные и подозрительные (частично скопированные) блоки
+        identical_sections, suspicious_blocks = self._find_block_matches(
+            prosecutor_case_text,
+            investigator_case_text,
+            segmenter
         )
         
         print(f"   🔴 Обнаружено идентичных блоков: {len(identical_sections)}")
-        
-        # 3. Поиск подозрительных блоков (частично скопированных)
-        suspicious_blocks = self._find_suspicious_blocks(
-            prosecutor_text,
-            investigator_text,
-            block_size
-        )
-        
         print(f"   ⚠️  Подозрительных блоков: {len(suspicious_blocks)}")
         
         # 4. Анализ подозрительных паттернов
         suspicious_patterns = self._analyze_patterns(
             prosecutor_text,
-            investigator_text
+            investigator_text,
+            prosecutor_documents,
+            investigator_documents
         )
         
-        # 5. Духовный вердикт
+        return {
+            'text_similarity': text_similarity,
+            'identical_sections': identical_sections,
+            'suspicious_blocks': suspicious_blocks,
+            'suspicious_patterns': suspicious_patterns,
+            'boilerplate_masked': boilerplate_masked,
+            'texts': (prosecutor_case_text, investigator_case_text),
+        }
+    
+    def _make_copypaste_result(
+        self,
+        text_analysis: Dict[str, any],
+        visual_similarity: float,
+    ) -> CopyPasteResult:
+        """Выносит духовный вердикт и собирает результат анализа"""
+        print(f"   👁️  Визуальное сходство: {visual_similarity:.2f}%")
+        
+        text_similarity = text_analysis['text_similarity']
+        identical_sections = text_analysis['identical_sections']
+        suspicious_blocks = text_analysis['suspicious_blocks']
+        suspicious_patterns = text_analysis['suspicious_patterns']
+        
+        # 6. Духовный вердикт
         spiritual_verdict = self._make_spiritual_verdict(
             text_similarity,
             len(identical_sections),
@@ -184,15 +470,148 @@ class LegalDocumentAnalyzer:
         
         return CopyPasteResult(
             text_similarity=text_similarity,
-            visual_similarity=0.0,  # TODO: визуальное сравнение
+            visual_similarity=visual_similarity,
             suspicious_blocks=suspicious_blocks,
             identical_sections=identical_sections,
             suspicious_patterns=suspicious_patterns,
             spiritual_verdict=spiritual_verdict,
+            boilerplate_masked=text_analysis.get('boilerplate_masked', 0.0),
+            texts=text_analysis.get('texts'),
         )
     
-    def _merge_all_texts(self, documents: Dict[str, Dict[int, str]]) -> str:
+    def _calculate_visual_similarity(
+        self,
+        case: LegalCase,
+        pages: Optional[Tuple[list, list]] = None
+    ) -> float:
+        """
+        Вычисляет визуальное сходство страниц прокурора и следователя
+        
+        Страницы растеризуются с низким DPI и хэшируются по одной (без
+        списка изображений всех страниц), после чего матрица сходства
+        всех пар страниц считается векторно (см. VisualSimilarityEngine).
+        
+        Returns:
+            Процент страниц прокурора с визуальной копией у следователя (0-100)
+        """
+        if pages is not None:
+            prosecutor_pages, investigator_pages = pages
+        else:
+            prosecutor_pages = self._iter_pages(case.metadata.get('prosecutor_files', []))
+            investigator_pages = self._iter_pages(case.metadata.get('investigator_files', []))
+        
+        try:
+            prosecutor_fingerprints = self.visual_engine.fingerprint(prosecutor_pages)
+            investigator_fingerprints = self.visual_engine.fingerprint(investigator_pages)
+        except Exception as e:
+            if pages is not None:
+                raise
+            print(f"   ⚠️  Визуальное сравнение недоступно: {e}")
+            return 0.0
+        
+        if not len(prosecutor_fingerprints) or not len(investigator_fingerprints):
+            return 0.0
+        
+        return self.visual_engine.visual_similarity(
+            prosecutor_fingerprints,
+            investigator_fingerprints
+        )
+    
+    def _iter_pages(self, pdf_paths: List[str]) -> Iterator[object]:
+        """Растеризует страницы всех существующих PDF по одной для визуального сравнения"""
+        for _, image in self._iter_keyed_pages(pdf_paths):
+            yield image
+    
+    def _iter_keyed_pages(
+        self,
+        pdf_paths: List[str],
+        prefix: str = ""
+    ) -> Iterator[Tuple[str, object]]:
+        """Страницы PDF по одной вместе с ключами вида 'prefix/файл.pdf#страница'"""
+        for pdf_path in pdf_paths:
+            if os.path.exists(pdf_path):
+                filename = os.path.basename(pdf_path)
+                for page_num, image in enumerate(self.ocr.iter_page_images(pdf_path)):
+                    yield f"{prefix}{filename}#{page_num}", image
+    
+    def build_page_index(
+        self,
+        case: LegalCase,
+        index_path: Optional[str] = None
+    ) -> PageEmbeddingIndex:
+        """
+        Строит ANN-индекс CLIP эмбеддингов всех страниц дела
+        
+        Ключи страниц: 'prosecutor/файл.pdf#N' и 'investigator/файл.pdf#N'
+        (N - номер страницы с 0).
+        
+        Args:
+            case: Уголовное дело
+            index_path: Директория для сохранения индекса (опционально)
+            
+        Returns:
+            PageEmbeddingIndex, также доступный как self.page_index
+        """
+        if self.visual_engine.vision_encoder is None:
+            raise ValueError("Для индекса страниц нужен vision_encoder")
+        
+        print(f"\n🗂️  Индексация страниц дела: {case.case_name}")
+        
+        index = PageEmbeddingIndex(self.visual_engine.vision_encoder.get_embedding_dim())
+        
+        for side in ('prosecutor', 'investigator'):
+            keys = []
+            
+            def images():
+                for key, image in self._iter_keyed_pages(
+                    case.metadata.get(f'{side}_files', []),
+                    prefix=f"{side}/"
+                ):
+                    keys.append(key)
+                    yield image
+            
+            fingerprints = self.visual_engine.fingerprint(images())
+            if keys:
+                index.add(fingerprints.embeddings, keys)
+        
+        print(f"   ✅ Проиндексировано страниц: {len(index)}")
+        
+        if index_path:
+            index.save(index_path)
+            print(f"   💾 Индекс сохранен в {index_path}")
+        
+        self.page_index = index
+        return index
+    
+    def find_duplicate_pages(
+        self,
+        page_key: str,
+        k: int = 10
+    ) -> List[Tuple[str, float]]:
+        """
+        Находит кандидатов в визуальные копии страницы
+        
+        Args:
+            page_key: Ключ страницы в индексе (например, 'prosecutor/том_1.pdf#12')
+            k: Количество кандидатов
+            
+        Returns:
+            [(ключ_страницы, косинусное_сходство)] по убыванию сходства
+        """
+        if self.page_index is None:
+            raise ValueError("Индекс страниц не построен: вызовите build_page_index()")
+        
+        query = self.page_index.reconstruct(page_key)
+        
+        # Первый результат - сама страница
+        matches = self.page_index.search_keys(query, k + 1)
+        return [(key, score) for key, score in matches if key != page_key][:k]
+    
+    def _merge_all_texts(self, documents: Mapping[str, Mapping[int, str]]) -> str:
         """Объединяет все тексты из документов"""
+        if isinstance(documents, CaseTextStore):
+            return documents.joined_text('\n\n')
+        
         all_texts = []
         
         for filename, pages in documents.items():
@@ -227,78 +646,96 @@ class LegalDocumentAnalyzer:
         
         return similarity
     
-    def _find_identical_sections(
+    def _find_block_matches(
         self,
-        text1: str,
-        text2: str,
-        block_size: int
-    ) -> List[str]:
-        """Находит полностью идентичные блоки текста"""
-        identical = []
-        
-        # Разбиваем на блоки
-        blocks1 = self._split_into_blocks(text1, block_size)
-        blocks2 = self._split_into_blocks(text2, block_size)
+        case_text1: CaseText,
+        case_text2: CaseText,
+        segmenter: Segmenter
+    ) -> Tuple[List[BlockMatch], List[BlockMatch]]:
+        """
+        Находит идентичные и подозрительно похожие блоки
         
-        # Сравниваем
-        for block1 in blocks1:
-            for block2 in blocks2:
-                similarity = fuzz.ratio(block1, block2)
-                
-                if similarity >= self.IDENTICAL_THRESHOLD:
-                    if block1 not in identical:
-                        identical.append(block1)
+        Оценки всех пар считаются одной матрицей (block_scoring.score_matrix,
+        как fuzz.ratio); пары ниже порогов отсекаются досрочно. Блоки не
+        пересекают границы документов.
         
-        return identical
-    
-    def _find_suspicious_blocks(
-        self,
-        text1: str,
-        text2: str,
-        block_size: int
-    ) -> List[Tuple[str, str]]:
-        """Находит подозрительно похожие блоки"""
-        suspicious = []
+        Returns:
+            (идентичные - лучшая пара для каждого блока первой стороны,
+             подозрительные - все пары в [SUSPICIOUS, IDENTICAL))
+        """
+        spans1 = self._document_block_spans(case_text1, segmenter)
+        spans2 = self._document_block_spans(case_text2, segmenter)
         
-        blocks1 = self._split_into_blocks(text1, block_size)
-        blocks2 = self._split_into_blocks(text2, block_size)
+        scores = score_matrix(
+            [case_text1.text[start:end] for start, end in spans1],
+            [case_text2.text[start:end] for start, end in spans2],
+            score_cutoff=min(self.SUSPICIOUS_THRESHOLD, self.IDENTICAL_THRESHOLD),
+        )
         
-        for block1 in blocks1:
-            for block2 in blocks2:
-                similarity = fuzz.ratio(block1, block2)
-                
-                if self.SUSPICIOUS_THRESHOLD <= similarity < self.IDENTICAL_THRESHOLD:
-                    suspicious.append((block1, block2))
+        identical = []
+        if scores.size:
+            best = scores.argmax(axis=1)
+            best_scores = scores[np.arange(len(spans1)), best]
+            for i in np.flatnonzero(best_scores >= self.IDENTICAL_THRESHOLD):
+                identical.append(BlockMatch(
+                    prosecutor=case_text1.ref(*spans1[i]),
+                    investigator=case_text2.ref(*spans2[best[i]]),
+                    score=float(best_scores[i]),
+                ))
+        
+        suspicious = [
+            BlockMatch(
+                prosecutor=case_text1.ref(*spans1[i]),
+                investigator=case_text2.ref(*spans2[j]),
+                score=float(scores[i, j]),
+            )
+            for i, j in zip(*np.nonzero(
+                (scores >= self.SUSPICIOUS_THRESHOLD) & (scores < self.IDENTICAL_THRESHOLD)
+            ))
+        ]
         
-        return suspicious
+        return identical, suspicious
+    
+    def _document_block_spans(self, case_text: CaseText, segmenter: Segmenter) -> List[Tuple[int, int]]:
+        """Блоки всех документов: смещения [начало, конец) в общей строке"""
+        offsets = TextOffsets(case_text.text)
+        spans = []
+        for _, doc_start, doc_end in case_text.document_spans():
+            spans.extend(segmenter.segment(offsets, doc_start, doc_end).tolist())
+        return spans
     
     def _split_into_blocks(self, text: str, block_size: int) -> List[str]:
         """Разбивает текст на блоки"""
-        # Разбиваем по параграфам
-        paragraphs = text.split('\n\n')
-        
-        blocks = []
-        current_block = ""
-        
-        for para in paragraphs:
-            if len(current_block) + len(para) < block_size:
-                current_block += para + '\n\n'
-            else:
-                if current_block.strip():
-                    blocks.append(current_block.strip())
-                current_block = para + '\n\n'
-        
-        if current_block.strip():
-            blocks.append(current_block.strip())
+        return [text[start:end] for start, end in ParagraphSegmenter(block_size).split(text)]
+    
+    def load_lexicon(self, path: str):
+        """
+        Загружает словарь для поиска общих опечаток
         
-        return blocks
+        Args:
+            path: .npy (scripts/build_lexicon.py), .marisa или список слов
+        """
+        self.lexicon = Lexicon.load(path)
+        print(f"   📖 Словарь загружен: {len(self.lexicon)} слов")
     
-    def _analyze_patterns(self, text1: str, text2: str) -> List[str]:
+    def _analyze_patterns(
+        self,
+        text1: str,
+        text2: str,
+        documents1: Optional[Mapping[str, Mapping[int, str]]] = None,
+        documents2: Optional[Mapping[str, Mapping[int, str]]] = None,
+    ) -> List[str]:
         """Анализирует подозрительные паттерны"""
         patterns = []
         
-        # Одинаковые опечатки/ошибки
-        # TODO: реализовать анализ опечаток
+        # Одинаковые опечатки/ошибки (нужен словарь)
+        if self.lexicon is not None and documents1 is not None and documents2 is not None:
+            shared_typos = find_shared_typos(documents1, documents2, self.lexicon)
+            if shared_typos:
+                examples = ', '.join(typo.word for typo in shared_typos[:10])
+                patterns.append(
+                    f"Обнаружено {len(shared_typos)} общих опечаток: {examples}"
+                )
         
         # Одинаковые формулировки
         common_phrases = self._find_common_phrases(text1, text2)
@@ -307,10 +744,24 @@ class LegalDocumentAnalyzer:
                 f"Обнаружено {len(common_phrases)} повторяющихся формулировок"
             )
         
-        # Одинаковая структура
+        # Одинаковая структура: документы целиком и пары документов
         if self._similar_structure(text1, text2):
             patterns.append("Идентичная структура документов")
         
+        if documents1 is not None and documents2 is not None:
+            similar_pairs = [
+                pair for pair in self.rank_structure_pairs(documents1, documents2)
+                if pair[2] >= self.STRUCTURE_THRESHOLD
+            ]
+            if similar_pairs:
+                examples = ', '.join(
+                    f"{name1} ↔ {name2} ({score:.0%})"
+                    for name1, name2, score in similar_pairs[:5]
+                )
+                patterns.append(
+                    f"Пар документов со сходной структурой: {len(similar_pairs)} ({examples})"
+                )
+        
         return patterns
     
     def _find_common_phrases(self, text1: str, text2: str, min_length: int = 30) -> List[str]:
@@ -328,16 +779,40 @@ class LegalDocumentAnalyzer:
         return common
     
     def _similar_structure(self, text1: str, text2: str) -> bool:
-        """Проверяет похожесть структуры документов"""
-        # Упрощенная проверка через количество параграфов
-        para1 = len(text1.split('\n\n'))
-        para2 = len(text2.split('\n\n'))
+        """
+        Проверяет похожесть структуры документов
+        
+        Сравниваются структурные отпечатки: последовательности заголовков,
+        пунктов, перечней и длин абзацев.
+        """
+        fingerprint1 = self.fingerprinter.fingerprint_text(text1)
+        fingerprint2 = self.fingerprinter.fingerprint_text(text2)
         
-        if para1 == 0 or para2 == 0:
+        if not len(fingerprint1) or not len(fingerprint2):
             return False
         
-        ratio = min(para1, para2) / max(para1, para2)
-        return ratio > 0.9
+        return fingerprint1.similarity(fingerprint2) >= self.STRUCTURE_THRESHOLD
+    
+    def rank_structure_pairs(
+        self,
+        documents1: Mapping[str, Mapping[int, str]],
+        documents2: Mapping[str, Mapping[int, str]],
+        top_k: Optional[int] = None,
+    ) -> List[Tuple[str, str, float]]:
+        """
+        Пары документов (сторона 1, сторона 2) по сходству структуры
+        
+        Дешевый сигнал для выбора пар под дорогое посимвольное сравнение:
+        отпечатки считаются один раз на документ и кэшируются.
+        
+        Returns:
+            [(файл1, файл2, сходство 0-1)] по убыванию сходства
+        """
+        return rank_document_pairs(
+            self.fingerprinter.fingerprint_documents(documents1),
+            self.fingerprinter.fingerprint_documents(documents2),
+            top_k=top_k,
+        )
     
     def _make_spiritual_verdict(
         self,
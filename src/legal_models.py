@@ -10,10 +10,17 @@
 © 2025 NativeMind - NativeMindNONC License
 """
 
-from typing import Dict, List, Optional, Union
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Union
 from PIL import Image
 from .multimodal_model import MultimodalMozgach
 from .legal_analyzer import LegalDocumentAnalyzer, CopyPasteResult, LegalCase
+from .visual_similarity import load_image, phash, hash_similarity, cosine_similarity
+
+
+# Функция прогресса: progress_callback(готово, всего)
+ProgressCallback = Callable[[int, int], None]
 
 
 class MozgachSphere047_Investigator(MultimodalMozgach):
@@ -27,18 +34,30 @@ class MozgachSphere047_Investigator(MultimodalMozgach):
     Специализация: Сбор и первичный анализ доказательств
     """
     
-    def __init__(self, device: str = "auto"):
+    # Модель начала повторять шаблон промпта - ответ закончен
+    STOP_STRINGS = ["\nТы - СЛЕДОВАТЕЛЬ", "\nДокумент содержит:", "\nЗадача следователя:"]
+    
+    def __init__(self, device: str = "auto", ocr=None, **components):
+        """
+        Args:
+            device: Устройство (auto, cuda, mps, cpu)
+            ocr: Готовый OCR движок (по умолчанию OCREngine rus+eng)
+            **components: Готовые модели (см. MultimodalBraindler)
+        """
         print("\n⚖️  Инициализация Мозгач108 - СФЕРА 047: СЛЕДОВАТЕЛЬ")
         print("   🙏 Духовная миссия: Беспристрастный сбор доказательств")
         
         super().__init__(
             language_model_name="nativemind/mozgach_full_trained_model",
-            device=device
+            device=device,
+            **components
         )
         
         # OCR для документов
-        from .ocr_engine import OCREngine
-        self.ocr = OCREngine(languages=['rus', 'eng'])
+        if ocr is None:
+            from .ocr_engine import OCREngine
+            ocr = OCREngine(languages=['rus', 'eng'])
+        self.ocr = ocr
         
         print("   ✅ СЛЕДОВАТЕЛЬ готов к служению истине")
     
@@ -60,12 +79,26 @@ class MozgachSphere047_Investigator(MultimodalMozgach):
         # Извлекаем текст через OCR
         text = self.ocr.extract_text_from_image(document)
         
-        # Формируем промпт следователя
-        investigator_prompt = f"""
+        # Анализируем через мультимодальную модель
+        response = self.chat(
+            self._investigator_prompt(text, question),
+            image=document
+        )
+        
+        return response
+    
+    def _investigator_prompt(self, text: str, question: str) -> str:
+        """
+        Формирует промпт следователя для текста документа
+        
+        Текст документа сжимается до бюджета токенов: сохраняются
+        фрагменты, наиболее значимые для вопроса следователя.
+        """
+        return self.prompt_builder().add_fixed("""
 Ты - СЛЕДОВАТЕЛЬ (Сфера 047). Твоя духовная миссия - беспристрастный сбор доказательств.
 
 Документ содержит:
-{text[:1000]}...
+""").add_section(text, query=question).add_fixed(f"""
 
 Задача следователя: {question}
 
@@ -77,24 +110,32 @@ class MozgachSphere047_Investigator(MultimodalMozgach):
 5. Объективность изложения
 
 Ответ следователя:
-"""
-        
-        # Анализируем через мультимодальную модель
-        response = self.chat(investigator_prompt, image=document)
-        
-        return response
+""").build()
     
     def collect_evidence(
         self,
         documents: List[Union[str, Image.Image]],
-        case_description: str
+        case_description: str,
+        batch_size: int = 8,
+        ocr_workers: int = 2,
+        progress_callback: Optional[ProgressCallback] = None,
+        texts: Optional[List[str]] = None,
     ) -> Dict[str, any]:
         """
         Сбор доказательств по делу
         
+        Документы обрабатываются конвейером: OCR следующих документов
+        выполняется в фоновых потоках, пока модель пакетно генерирует
+        анализ текущих.
+        
         Args:
             documents: Список документов для анализа
             case_description: Описание дела
+            batch_size: Количество документов в одном пакете генерации
+            ocr_workers: Количество потоков OCR
+            progress_callback: Функция progress_callback(готово, всего),
+                вызываемая после каждого пакета
+            texts: Уже распознанные тексты документов (OCR пропускается)
             
         Returns:
             Сводка собранных доказательств
@@ -107,20 +148,61 @@ class MozgachSphere047_Investigator(MultimodalMozgach):
             'recommendations': []
         }
         
-        print(f"\n🔍 СЛЕДОВАТЕЛЬ: Анализ {len(documents)} документов...")
+        total = len(documents)
+        print(f"\n🔍 СЛЕДОВАТЕЛЬ: Анализ {total} документов...")
         
-        for i, doc in enumerate(documents):
-            print(f"   Документ {i+1}/{len(documents)}...")
+        with ThreadPoolExecutor(max_workers=ocr_workers) as pool:
+            # OCR опережает генерацию не более чем на два пакета
+            pending = deque()
+            next_index = 0
             
-            analysis = self.investigate_document(
-                doc,
-                f"Проанализируй документ #{i+1} по делу: {case_description}"
-            )
+            def recognize(index: int) -> str:
+                if texts is not None:
+                    return texts[index]
+                return self.ocr.extract_text_from_image(documents[index])
+            
+            def schedule_ocr():
+                nonlocal next_index
+                while next_index < total and len(pending) < 2 * batch_size:
+                    pending.append(pool.submit(recognize, next_index))
+                    next_index += 1
+            
+            schedule_ocr()
+            done = 0
             
-            evidence['findings'].append({
-                'document': i+1,
-                'analysis': analysis
-            })
+            while pending:
+                batch_texts = [
+                    pending.popleft().result()
+                    for _ in range(min(batch_size, len(pending)))
+                ]
+                
+                # Следующие документы распознаются во время генерации
+                schedule_ocr()
+                
+                prompts = [
+                    self._investigator_prompt(
+                        text,
+                        f"Проанализируй документ #{done + j + 1} по делу: {case_description}"
+                    )
+                    for j, text in enumerate(batch_texts)
+                ]
+                
+                analyses = self.batch_chat(
+                    prompts,
+                    images=documents[done:done + len(batch_texts)],
+                    batch_size=batch_size
+                )
+                
+                for j, analysis in enumerate(analyses):
+                    evidence['findings'].append({
+                        'document': done + j + 1,
+                        'analysis': analysis
+                    })
+                
+                done += len(batch_texts)
+                
+                if progress_callback is not None:
+                    progress_callback(done, total)
         
         print("   ✅ Сбор доказательств завершен")
         
@@ -143,18 +225,36 @@ class MozgachSphere048_Prosecutor(MultimodalMozgach):
     Специализация: Надзор за законностью, обнаружение копипаста
     """
     
-    def __init__(self, device: str = "auto"):
+    # Модель начала повторять шаблон промпта - ответ закончен
+    STOP_STRINGS = ["\nТы - ПРОКУРОР", "\nДЕЛО:", "\nРЕЗУЛЬТАТЫ АНАЛИЗА КОПИПАСТА:"]
+    
+    # Пороги предварительного фильтра визуального сравнения (0-1):
+    # пара ниже обоих порогов считается явно различающейся
+    VISUAL_HASH_THRESHOLD = 0.75
+    VISUAL_EMBEDDING_THRESHOLD = 0.8
+    
+    def __init__(self, device: str = "auto", ocr=None, **components):
+        """
+        Args:
+            device: Устройство (auto, cuda, mps, cpu)
+            ocr: Готовый OCR движок для юридического анализатора
+            **components: Готовые модели (см. MultimodalBraindler)
+        """
         print("\n⚖️  Инициализация Мозгач108 - СФЕРА 048: ПРОКУРОР")
         print("   🙏 Духовная миссия: Обнаружение копипаста - служение истине")
         print("   🔍 Ключевая функция: Выявление несправедливости через анализ документов")
         
         super().__init__(
             language_model_name="nativemind/mozgach_full_trained_model",
-            device=device
+            device=device,
+            **components
         )
         
         # Юридический анализатор с детектором копипаста
-        self.legal_analyzer = LegalDocumentAnalyzer()
+        self.legal_analyzer = LegalDocumentAnalyzer(
+            vision_encoder=self.vision_encoder,
+            ocr=ocr
+        )
         
         print("   ✅ ПРОКУРОР готов к служению истине")
     
@@ -193,7 +293,7 @@ class MozgachSphere048_Prosecutor(MultimodalMozgach):
         copypaste_result = self.legal_analyzer.detect_copypaste(case)
         
         # Формируем заключение прокурора
-        prosecutor_conclusion = self._make_prosecutor_conclusion(
+        prosecutor_conclusion = self.make_prosecutor_conclusion(
             case,
             copypaste_result
         )
@@ -205,7 +305,57 @@ class MozgachSphere048_Prosecutor(MultimodalMozgach):
             'spiritual_verdict': copypaste_result.spiritual_verdict
         }
     
-    def _make_prosecutor_conclusion(
+    async def supervise_investigation_async(
+        self,
+        prosecutor_docs: List[str],
+        investigator_docs: List[str],
+        case_name: str = "Уголовное дело",
+        executor: Optional[Executor] = None,
+    ) -> Dict[str, any]:
+        """
+        Асинхронный надзор за следствием
+        
+        OCR и сравнение документов выполняются в executor, заключение
+        генерируется через планировщик модели, поэтому несколько дел
+        (или сферы одного дела) обрабатываются одновременно.
+        
+        Args:
+            prosecutor_docs: Документы прокурора (PDF)
+            investigator_docs: Документы следователя (PDF)
+            case_name: Название дела
+            executor: Executor для OCR и сравнения (None - по умолчанию)
+            
+        Returns:
+            Результаты надзора с обнаружением копипаста
+        """
+        print(f"\n⚖️  ПРОКУРОР: Надзор за делом '{case_name}'")
+        print("   🙏 Служение истине через обнаружение несправедливости...")
+        
+        case = await self.legal_analyzer.process_case_async(
+            prosecutor_docs,
+            investigator_docs,
+            case_name,
+            executor=executor
+        )
+        
+        print("\n🔍 ПРОКУРОР: Обнаружение копипаста...")
+        copypaste_result = await self.legal_analyzer.detect_copypaste_async(
+            case,
+            executor=executor
+        )
+        
+        prosecutor_conclusion = await self.chat_async(
+            self._prosecutor_conclusion_prompt(case, copypaste_result)
+        )
+        
+        return {
+            'case': case,
+            'copypaste_analysis': copypaste_result,
+            'prosecutor_conclusion': prosecutor_conclusion,
+            'spiritual_verdict': copypaste_result.spiritual_verdict
+        }
+    
+    def make_prosecutor_conclusion(
         self,
         case: LegalCase,
         copypaste: CopyPasteResult
@@ -215,18 +365,30 @@ class MozgachSphere048_Prosecutor(MultimodalMozgach):
         
         Включает анализ через мультимодальную модель
         """
-        prompt = f"""
+        prompt = self._prosecutor_conclusion_prompt(case, copypaste)
+        
+        conclusion = self.chat(prompt)
+        
+        return conclusion
+    
+    def _prosecutor_conclusion_prompt(
+        self,
+        case: LegalCase,
+        copypaste: CopyPasteResult
+    ) -> str:
+        """Промпт заключения прокурора"""
+        return self.prompt_builder().add_fixed(f"""
 Ты - ПРОКУРОР (Сфера 048). Твоя духовная миссия - служение истине через надзор за законностью.
 
 ДЕЛО: {case.case_name}
 
 РЕЗУЛЬТАТЫ АНАЛИЗА КОПИПАСТА:
-- Текстовое сходство: {copypaste.text_similarity:.2f}%
+- Текстовое сходство: {copypaste.text_similarity:.2f}% (без шаблонного текста: скрыто {copypaste.boilerplate_masked:.1f}%)
 - Идентичных блоков: {len(copypaste.identical_sections)}
 - Подозрительных блоков: {len(copypaste.suspicious_blocks)}
 
 ДУХОВНЫЙ ВЕРДИКТ:
-{copypaste.spiritual_verdict}
+""").add_section(copypaste.spiritual_verdict).add_fixed("""
 
 Как прокурор, дай свое заключение:
 1. Соблюдена ли прокурором независимость проверки?
@@ -235,11 +397,7 @@ class MozgachSphere048_Prosecutor(MultimodalMozgach):
 4. Служит ли это дело истине и справедливости?
 
 ЗАКЛЮЧЕНИЕ ПРОКУРОРА:
-"""
-        
-        conclusion = self.chat(prompt)
-        
-        return conclusion
+""").build()
     
     def detect_copypaste_visual(
         self,
@@ -249,8 +407,31 @@ class MozgachSphere048_Prosecutor(MultimodalMozgach):
         """
         Визуальное обнаружение копипаста
         
-        Использует мультимодальные возможности для сравнения изображений документов
+        Использует мультимодальные возможности для сравнения изображений документов.
+        Явно различающиеся документы (по pHash и косинусу CLIP эмбеддингов)
+        отсеиваются без обращения к языковой модели.
         """
+        prosecutor_image = load_image(prosecutor_image)
+        investigator_image = load_image(investigator_image)
+        
+        # Дешевый предварительный фильтр
+        hash_score = hash_similarity(
+            phash(prosecutor_image),
+            phash(investigator_image)
+        )
+        embedding_score = cosine_similarity(
+            self.encode_vision(prosecutor_image).cpu().numpy(),
+            self.encode_vision(investigator_image).cpu().numpy()
+        )
+        
+        if (hash_score < self.VISUAL_HASH_THRESHOLD
+                and embedding_score < self.VISUAL_EMBEDDING_THRESHOLD):
+            return (
+                "✅ Документы визуально различаются "
+                f"(pHash: {hash_score * 100:.1f}%, CLIP: {embedding_score * 100:.1f}%). "
+                "Признаков визуального копирования не обнаружено."
+            )
+        
         prompt = """
 Ты - ПРОКУРОР (Сфера 048) с мультимодальными возможностями.
 
@@ -265,27 +446,27 @@ class MozgachSphere048_Prosecutor(MultimodalMozgach):
 Вердикт прокурора:
 """
         
-        # Анализируем оба документа
-        analysis_prosecutor = self.chat(
-            "Проанализируй этот документ прокурора визуально",
-            image=prosecutor_image
-        )
-        
-        analysis_investigator = self.chat(
-            "Проанализируй этот документ следователя визуально",
-            image=investigator_image
+        # Анализируем оба документа одним пакетом
+        analysis_prosecutor, analysis_investigator = self.batch_chat(
+            [
+                "Проанализируй этот документ прокурора визуально",
+                "Проанализируй этот документ следователя визуально",
+            ],
+            images=[prosecutor_image, investigator_image]
         )
         
         # Сравнение
-        comparison = self.chat(f"""
+        comparison = self.chat(self.prompt_builder().add_fixed(f"""
 ПРОКУРОР: Сравни два документа.
 
-Документ прокурора: {analysis_prosecutor}
+Визуальное сходство: pHash {hash_score * 100:.1f}%, CLIP {embedding_score * 100:.1f}%
+
+Документ прокурора: """).add_section(analysis_prosecutor).add_fixed("""
 
-Документ следователя: {analysis_investigator}
+Документ следователя: """).add_section(analysis_investigator).add_fixed(f"""
 
 {prompt}
-""")
+""").build())
         
         return comparison
 
@@ -302,14 +483,26 @@ class MozgachSphere049_Judge(MultimodalMozgach):
     Специализация: Судебное решение, восстановление справедливости
     """
     
-    def __init__(self, device: str = "auto"):
+    # Модель начала повторять шаблон промпта - ответ закончен
+    STOP_STRINGS = ["\nТы - СУДЬЯ", "\nДЕЛО:", "\nМАТЕРИАЛЫ СЛЕДСТВИЯ:"]
+    
+    # Судебное решение подробнее остальных ответов
+    MAX_NEW_TOKENS = 512
+    
+    def __init__(self, device: str = "auto", **components):
+        """
+        Args:
+            device: Устройство (auto, cuda, mps, cpu)
+            **components: Готовые модели (см. MultimodalBraindler)
+        """
         print("\n⚖️  Инициализация Мозгач108 - СФЕРА 049: СУДЬЯ")
         print("   🙏 Духовная миссия: Вынесение справедливого решения")
         print("   ⚖️  Высшая цель: Восстановление справедливости")
         
         super().__init__(
             language_model_name="nativemind/mozgach_full_trained_model",
-            device=device
+            device=device,
+            **components
         )
         
         print("   ✅ СУДЬЯ готов к служению истине")
@@ -337,20 +530,78 @@ class MozgachSphere049_Judge(MultimodalMozgach):
         print(f"\n⚖️  СУДЬЯ: Вынесение решения по делу")
         print("   🙏 Служение справедливости...")
         
+        judge_prompt = self._judge_prompt(
+            investigator_evidence,
+            prosecutor_analysis,
+            case_description
+        )
+        
+        judgment = self.chat(judge_prompt)
+        
+        return self._make_judgment_result(case_description, judgment)
+    
+    async def make_judgment_async(
+        self,
+        investigator_evidence: Dict[str, any],
+        prosecutor_analysis: Dict[str, any],
+        case_description: str
+    ) -> Dict[str, str]:
+        """
+        Асинхронное вынесение судебного решения
+        
+        Решение генерируется через планировщик модели без блокировки
+        цикла событий.
+        
+        Args:
+            investigator_evidence: Доказательства следователя
+            prosecutor_analysis: Анализ прокурора
+            case_description: Описание дела
+            
+        Returns:
+            Судебное решение
+        """
+        print(f"\n⚖️  СУДЬЯ: Вынесение решения по делу")
+        print("   🙏 Служение справедливости...")
+        
+        judgment = await self.chat_async(self._judge_prompt(
+            investigator_evidence,
+            prosecutor_analysis,
+            case_description
+        ))
+        
+        return self._make_judgment_result(case_description, judgment)
+    
+    def _judge_prompt(
+        self,
+        investigator_evidence: Dict[str, any],
+        prosecutor_analysis: Dict[str, any],
+        case_description: str
+    ) -> str:
+        """Промпт судебного решения"""
         # Формируем промпт судьи
-        judge_prompt = f"""
+        findings = '\n'.join(
+            f"Документ {finding['document']}: {finding['analysis']}"
+            for finding in investigator_evidence.get('findings', [])
+        ) or 'Нет данных'
+        
+        # Материалы следствия получают половину бюджета секций
+        return self.prompt_builder().add_fixed(f"""
 Ты - СУДЬЯ (Сфера 049). Твоя духовная миссия - вынесение справедливого решения.
 
 ДЕЛО: {case_description}
 
 МАТЕРИАЛЫ СЛЕДСТВИЯ:
-{investigator_evidence.get('findings', [])}
+""").add_section(findings, weight=2.0, query=case_description).add_fixed("""
 
 ЗАКЛЮЧЕНИЕ ПРОКУРОРА:
-{prosecutor_analysis.get('prosecutor_conclusion', 'Нет данных')}
+""").add_section(
+            prosecutor_analysis.get('prosecutor_conclusion', 'Нет данных')
+        ).add_fixed("""
 
 АНАЛИЗ КОПИПАСТА:
-{prosecutor_analysis.get('spiritual_verdict', 'Нет данных')}
+""").add_section(
+            prosecutor_analysis.get('spiritual_verdict', 'Нет данных')
+        ).add_fixed("""
 
 Как СУДЬЯ, вынеси справедливое решение:
 
@@ -375,10 +626,10 @@ class MozgachSphere049_Judge(MultimodalMozgach):
    - Рекомендации
 
 РЕШЕНИЕ СУДЬИ:
-"""
-        
-        judgment = self.chat(judge_prompt)
-        
+""").build()
+    
+    def _make_judgment_result(self, case_description: str, judgment: str) -> Dict[str, str]:
+        """Оформляет судебное решение"""
         return {
             'case': case_description,
             'judgment': judgment,
@@ -389,22 +640,43 @@ class MozgachSphere049_Judge(MultimodalMozgach):
     def analyze_case_visually(
         self,
         case_documents: List[Union[str, Image.Image]],
-        case_description: str
+        case_description: str,
+        batch_size: int = 8,
+        group_token_budget: int = 1024,
+        max_reduce_levels: int = 8,
+        progress_callback: Optional[ProgressCallback] = None,
     ) -> str:
         """
         Визуальный анализ дела судьей
         
-        Использует мультимодальные возможности для полного анализа
+        Использует мультимодальные возможности для полного анализа.
+        Работает по схеме map-reduce: анализы документов генерируются
+        пакетами, затем сворачиваются группами не длиннее
+        group_token_budget токенов, пока все не поместится в итоговый промпт.
+        Задержка и память остаются ограниченными при любом размере дела.
+        
+        Args:
+            case_documents: Документы дела
+            case_description: Описание дела
+            batch_size: Размер пакета генерации
+            group_token_budget: Бюджет токенов на одну группу свертки
+                и на материалы итогового вердикта
+            max_reduce_levels: Максимальное количество уровней свертки
+            progress_callback: Функция progress_callback(готово, всего)
+                для этапа анализа документов
         """
-        print(f"\n⚖️  СУДЬЯ: Визуальный анализ {len(case_documents)} документов...")
+        total = len(case_documents)
+        print(f"\n⚖️  СУДЬЯ: Визуальный анализ {total} документов...")
         
+        # MAP: анализ каждого документа, пакетами
+        # Элементы: (первый_документ, последний_документ, текст_анализа)
         analyses = []
         
-        for i, doc in enumerate(case_documents):
-            print(f"   Документ {i+1}/{len(case_documents)}...")
+        for start in range(0, total, batch_size):
+            batch = case_documents[start:start + batch_size]
             
-            analysis = self.chat(f"""
-Ты - СУДЬЯ (Сфера 049). Проанализируй документ #{i+1} по делу.
+            prompts = [f"""
+Ты - СУДЬЯ (Сфера 049). Проанализируй документ #{start + j + 1} по делу.
 
 Дело: {case_description}
 
@@ -415,25 +687,111 @@ class MozgachSphere049_Judge(MultimodalMozgach):
 4. Служение истине
 
 Судебный анализ:
-""", image=doc)
+""" for j in range(len(batch))]
+            
+            responses = self.batch_chat(prompts, images=batch, batch_size=batch_size)
+            analyses.extend(
+                self._format_analysis(start + j + 1, start + j + 1, analysis, group_token_budget)
+                for j, analysis in enumerate(responses)
+            )
             
-            analyses.append(analysis)
+            if progress_callback is not None:
+                progress_callback(len(analyses), total)
         
-        # Итоговый вердикт
-        final_verdict = self.chat(f"""
+        # REDUCE: сворачиваем группы анализов, пока не уложимся в бюджет
+        level = 0
+        
+        while (self._count_tokens(self._join_analyses(analyses)) > group_token_budget
+               and level < max_reduce_levels):
+            level += 1
+            groups = self._pack_by_tokens(analyses, group_token_budget)
+            
+            print(f"   Уровень свертки {level}: {len(analyses)} → {len(groups)}")
+            
+            prompts = [f"""
+Ты - СУДЬЯ (Сфера 049). Обобщи судебные анализы части документов дела.
+
+ДЕЛО: {case_description}
+
+АНАЛИЗЫ:
+{self._join_analyses(group)}
+
+Сохрани номера документов, ключевые нарушения, противоречия
+и признаки копирования.
+
+ОБОБЩЕНИЕ:
+""" for group in groups]
+            
+            summaries = self.batch_chat(prompts, batch_size=batch_size)
+            analyses = [
+                self._format_analysis(group[0][0], group[-1][1], summary, group_token_budget)
+                for group, summary in zip(groups, summaries)
+            ]
+        
+        # Итоговый вердикт: group_token_budget - на материалы, инструкции сверх него
+        header = f"""
 Ты - СУДЬЯ (Сфера 049). На основе анализа всех документов вынеси итоговый вердикт.
 
 ДЕЛО: {case_description}
 
 АНАЛИЗЫ ДОКУМЕНТОВ:
-{chr(10).join([f"Документ {i+1}: {a}" for i, a in enumerate(analyses)])}
+"""
+        footer = """
 
 ИТОГОВЫЙ ВЕРДИКТ СУДЬИ:
 (включая духовную оценку служения истине)
-""")
+"""
+        budget = group_token_budget + self._count_tokens(header) + self._count_tokens(footer)
+        
+        final_verdict = self.chat(self.prompt_builder(budget).add_fixed(header).add_section(
+            self._join_analyses(analyses),
+            query=case_description
+        ).add_fixed(footer).build())
         
         return final_verdict
     
+    def _pack_by_tokens(self, items: List[tuple], budget: int) -> List[List[tuple]]:
+        """
+        Жадно упаковывает анализы по порядку в группы не длиннее budget токенов
+        
+        В группе всегда не меньше двух анализов: каждый уровень свертки
+        как минимум вдвое сокращает их количество.
+        """
+        groups = []
+        current = []
+        current_tokens = 0
+        
+        for item in items:
+            tokens = self._count_tokens(item[2])
+            
+            if len(current) >= 2 and current_tokens + tokens > budget:
+                groups.append(current)
+                current = []
+                current_tokens = 0
+            
+            current.append(item)
+            current_tokens += tokens
+        
+        if current:
+            groups.append(current)
+        
+        return groups
+    
+    @staticmethod
+    def _join_analyses(items: List[tuple]) -> str:
+        """Тексты анализов по строке на анализ"""
+        return '\n'.join(item[2] for item in items)
+    
+    def _format_analysis(self, first: int, last: int, text: str, budget: int) -> tuple:
+        """
+        Подписывает анализ номерами документов, которые он покрывает
+        
+        Текст ограничивается половиной бюджета группы, чтобы в каждую
+        группу попадало не меньше двух анализов и свертка сходилась.
+        """
+        label = f"Документ {first}" if first == last else f"Документы {first}-{last}"
+        return (first, last, self._truncate_tokens(f"{label}: {text}", budget // 2))
+    
     def _get_current_date(self) -> str:
         """Возвращает текущую дату"""
         from datetime import datetime
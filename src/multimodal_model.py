@@ -9,11 +9,23 @@
 
 import torch
 import torch.nn as nn
+from collections import OrderedDict
 from typing import Optional, Union, List
 from PIL import Image
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from transformers import AutoModelForCausalLM, AutoTokenizer, StoppingCriteriaList
 from .vision_encoder import VisionEncoder
 from .projection import ProjectionLayer
+from .visual_similarity import image_digest
+from .prompt_builder import PromptBuilder, TokenCounter
+from .generation import (
+    GenerationMonitor,
+    GenerationStats,
+    STOP_CACHE,
+    STOP_DEADLINE,
+    cut_at_stop_strings,
+)
+from .response_cache import ResponseCache
+from .scheduler import GenerationScheduler
 
 
 class MultimodalBraindler(nn.Module):
@@ -26,12 +38,37 @@ class MultimodalBraindler(nn.Module):
     - Комбинированные запросы (текст + изображение)
     """
     
+    # Бюджет токенов промпта по умолчанию (см. prompt_builder)
+    PROMPT_TOKEN_BUDGET = 1024
+    
+    # Лимит новых токенов ответа по умолчанию
+    MAX_NEW_TOKENS = 256
+    
+    # Стоп-строки: модель начала писать следующий запрос вместо ответа
+    STOP_STRINGS: List[str] = []
+    
+    # Черновая модель для спекулятивного декодирования (None - выключено)
+    DRAFT_MODEL_NAME: Optional[str] = None
+    NUM_ASSISTANT_TOKENS = 5
+    
     def __init__(
         self,
         language_model_name: str = "nativemind/braindler_final_model",
         vision_model_name: str = "openai/clip-vit-large-patch14",
         device: str = "auto",
+        vision_encoder: Optional[VisionEncoder] = None,
+        tokenizer=None,
+        language_model=None,
     ):
+        """
+        Args:
+            language_model_name: Языковая модель (HuggingFace)
+            vision_model_name: CLIP модель
+            device: Устройство (auto, cuda, mps, cpu)
+            vision_encoder: Готовый VisionEncoder (не загружается по имени)
+            tokenizer: Готовый токенизатор языковой модели
+            language_model: Готовая языковая модель (вместе с tokenizer)
+        """
         super().__init__()
         
         print("🚀 Инициализация MultimodalBraindler...")
@@ -50,20 +87,29 @@ class MultimodalBraindler(nn.Module):
         print(f"   📱 Устройство: {self.device}")
         
         # Загружаем vision encoder
-        print(f"   👁️  Загрузка Vision Encoder: {vision_model_name}")
-        self.vision_encoder = VisionEncoder(vision_model_name)
+        if vision_encoder is None:
+            print(f"   👁️  Загрузка Vision Encoder: {vision_model_name}")
+            vision_encoder = VisionEncoder(vision_model_name)
+        self.vision_encoder = vision_encoder
         
         # Загружаем языковую модель
-        print(f"   🧠 Загрузка Language Model: {language_model_name}")
-        self.tokenizer = AutoTokenizer.from_pretrained(language_model_name)
-        self.language_model = AutoModelForCausalLM.from_pretrained(
-            language_model_name,
-            torch_dtype=torch.float32 if self.device == "cpu" else torch.float16,
-            device_map=self.device if self.device != "mps" else None,
-        )
+        self.language_model_name = language_model_name
+        if language_model is None:
+            print(f"   🧠 Загрузка Language Model: {language_model_name}")
+            tokenizer = AutoTokenizer.from_pretrained(language_model_name)
+            language_model = AutoModelForCausalLM.from_pretrained(
+                language_model_name,
+                torch_dtype=torch.float32 if self.device == "cpu" else torch.float16,
+                device_map=self.device if self.device != "mps" else None,
+            )
+            
+            if self.device == "mps":
+                language_model = language_model.to("mps")
+        elif tokenizer is None:
+            raise ValueError("Вместе с language_model нужно передать tokenizer")
         
-        if self.device == "mps":
-            self.language_model = self.language_model.to("mps")
+        self.tokenizer = tokenizer
+        self.language_model = language_model
         
         # Проекционный слой: CLIP embedding → Language model embedding
         vision_dim = self.vision_encoder.get_embedding_dim()
@@ -73,6 +119,32 @@ class MultimodalBraindler(nn.Module):
         self.projection = ProjectionLayer(vision_dim, language_dim)
         self.projection = self.projection.to(self.device)
         
+        # LRU-кэш CLIP эмбеддингов: повторные изображения не кодируются заново
+        self.vision_cache_size = 128
+        self._vision_cache = OrderedDict()
+        
+        # Подсчет токенов с кэшем для сборки промптов
+        self.token_counter = TokenCounter(self.tokenizer)
+        
+        # Статистика последнего вызова генерации
+        self.last_generation_stats: Optional[GenerationStats] = None
+        
+        # Кэш ответов (см. enable_response_cache)
+        self.response_cache: Optional[ResponseCache] = None
+        self.default_seed: Optional[int] = None
+        
+        # Асинхронный планировщик генерации (создается при первом chat_async)
+        self._scheduler: Optional[GenerationScheduler] = None
+        
+        # Спекулятивное декодирование (см. enable_speculative_decoding)
+        self.draft_model = None
+        self.draft_tokenizer = None
+        self._draft_shares_vocab = True
+        self._target_forward_hook = None
+        self._draft_forward_hook = None
+        self._target_forward_calls = 0
+        self._draft_forward_calls = 0
+        
         # Pad token
         if self.tokenizer.pad_token is None:
             self.tokenizer.pad_token = self.tokenizer.eos_token
@@ -91,76 +163,492 @@ class MultimodalBraindler(nn.Module):
             Tensor эмбеддинга изображения
         """
         # Получаем CLIP эмбеддинг
-        vision_embedding = self.vision_encoder.encode(image)
-        vision_embedding = vision_embedding.to(self.device)
+        vision_embedding = self.encode_vision(image).to(self.device)
         
         # Проецируем в пространство языковой модели
         language_embedding = self.projection(vision_embedding)
         
         return language_embedding
     
+    def encode_vision(self, image: Union[str, Image.Image]) -> torch.Tensor:
+        """
+        Возвращает CLIP эмбеддинг изображения с кэшированием
+        
+        Ключ кэша - хэш содержимого изображения, поэтому один и тот же
+        документ кодируется один раз, даже если передан повторно.
+        
+        Args:
+            image: Путь к изображению или PIL.Image
+            
+        Returns:
+            Tensor CLIP эмбеддинга размерности [1, vision_dim]
+        """
+        key = image_digest(image)
+        
+        if key in self._vision_cache:
+            self._vision_cache.move_to_end(key)
+            return self._vision_cache[key]
+        
+        embedding = self.vision_encoder.encode(image)
+        
+        self._vision_cache[key] = embedding
+        if len(self._vision_cache) > self.vision_cache_size:
+            self._vision_cache.popitem(last=False)
+        
+        return embedding
+    
     def chat(
         self,
         prompt: str,
         image: Optional[Union[str, Image.Image]] = None,
-        max_length: int = 512,
+        max_new_tokens: Optional[int] = None,
         temperature: float = 0.7,
         top_p: float = 0.9,
+        stop_strings: Optional[List[str]] = None,
+        deadline_ms: Optional[float] = None,
+        do_sample: bool = True,
+        seed: Optional[int] = None,
     ) -> str:
         """
         Мультимодальный чат
         
+        Статистика вызова сохраняется в self.last_generation_stats.
+        Если включено спекулятивное декодирование, черновые токены
+        предлагает малая модель, а основная их проверяет.
+        
         Args:
             prompt: Текстовый запрос
             image: Опциональное изображение
-            max_length: Максимальная длина ответа
+            max_new_tokens: Максимальное количество новых токенов ответа
+                (по умолчанию MAX_NEW_TOKENS)
             temperature: Температура генерации
             top_p: Top-p sampling
+            stop_strings: Стоп-строки (по умолчанию STOP_STRINGS сферы)
+            deadline_ms: Прервать генерацию через указанное время (мс)
+            do_sample: Сэмплирование (False - жадное декодирование)
+            seed: Seed сэмплирования (по умолчанию default_seed)
             
         Returns:
             Сгенерированный ответ
         """
-        # Формируем входные данные
-        if image is not None:
-            # Мультимодальный режим
-            image_embedding = self.encode_image(image)
+        full_prompt = self._format_prompt(prompt, image)
+        
+        return self._cached_generate(
+            [full_prompt],
+            [image],
+            batch_size=1,
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            stop_strings=stop_strings,
+            deadline_ms=deadline_ms,
+            do_sample=do_sample,
+            seed=seed,
+        )[0]
+    
+    def batch_chat(
+        self,
+        prompts: List[str],
+        images: Optional[List[Optional[Union[str, Image.Image]]]] = None,
+        max_new_tokens: Optional[int] = None,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+        batch_size: int = 8,
+        stop_strings: Optional[List[str]] = None,
+        deadline_ms: Optional[float] = None,
+        do_sample: bool = True,
+        seed: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Пакетный мультимодальный чат
+        
+        Генерирует ответы сразу для нескольких запросов: промпты
+        выравниваются левым паддингом и проходят через generate пакетами.
+        Изображения влияют только на префикс промпта, как и в chat.
+        Статистика последнего пакета сохраняется в self.last_generation_stats.
+        
+        Args:
+            prompts: Список текстовых запросов
+            images: Опциональные изображения (по одному на запрос или None)
+            max_new_tokens: Максимальное количество новых токенов ответа
+            temperature: Температура генерации
+            top_p: Top-p sampling
+            batch_size: Размер пакета для generate
+            stop_strings: Стоп-строки (по умолчанию STOP_STRINGS сферы)
+            deadline_ms: Ограничение времени каждого пакета (мс)
+            do_sample: Сэмплирование (False - жадное декодирование)
+            seed: Seed сэмплирования (по умолчанию default_seed)
             
-            # Создаем префикс для изображения
-            image_prefix = "[ИЗОБРАЖЕНИЕ] "
-            full_prompt = image_prefix + prompt
-        else:
-            # Только текст
-            full_prompt = prompt
-        
-        # Токенизация
-        inputs = self.tokenizer(
-            full_prompt,
-            return_tensors="pt",
-            padding=True,
-            truncation=True,
+        Returns:
+            Список ответов в порядке запросов
+        """
+        if images is None:
+            images = [None] * len(prompts)
+        elif len(images) != len(prompts):
+            raise ValueError("images должен содержать по одному элементу на каждый промпт")
+        
+        full_prompts = [
+            self._format_prompt(prompt, image)
+            for prompt, image in zip(prompts, images)
+        ]
+        
+        return self._cached_generate(
+            full_prompts,
+            images,
+            batch_size=batch_size,
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            stop_strings=stop_strings,
+            deadline_ms=deadline_ms,
+            do_sample=do_sample,
+            seed=seed,
         )
+    
+    @property
+    def scheduler(self) -> GenerationScheduler:
+        """Планировщик генерации для асинхронных вызовов"""
+        if self._scheduler is None:
+            self._scheduler = GenerationScheduler(self)
+        return self._scheduler
+    
+    async def chat_async(
+        self,
+        prompt: str,
+        image: Optional[Union[str, Image.Image]] = None,
+        **generate_kwargs
+    ) -> str:
+        """
+        Асинхронный мультимодальный чат
+        
+        Запрос ставится в очередь планировщика и генерируется в пакете
+        с другими одновременными запросами к этой модели; цикл событий
+        при этом не блокируется.
+        
+        Args:
+            prompt: Текстовый запрос
+            image: Опциональное изображение
+            **generate_kwargs: Параметры генерации как у chat
+            
+        Returns:
+            Сгенерированный ответ
+        """
+        return await self.scheduler.submit(prompt, image, **generate_kwargs)
+    
+    def _cached_generate(
+        self,
+        full_prompts: List[str],
+        images: List[Optional[Union[str, Image.Image]]],
+        batch_size: int = 8,
+        max_new_tokens: Optional[int] = None,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+        stop_strings: Optional[List[str]] = None,
+        deadline_ms: Optional[float] = None,
+        do_sample: bool = True,
+        seed: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Генерация пакетами с кэшем ответов
+        
+        Кэш применяется только к детерминированным вызовам: жадному
+        декодированию или сэмплированию с seed. Сэмплирование с seed
+        выполняется по одному запросу, иначе результат зависел бы
+        от состава пакета. Ответы, прерванные дедлайном, не кэшируются.
+        """
+        if max_new_tokens is None:
+            max_new_tokens = self.MAX_NEW_TOKENS
+        if stop_strings is None:
+            stop_strings = self.STOP_STRINGS
+        if seed is None:
+            seed = self.default_seed
+        
+        generate_kwargs = {
+            'max_new_tokens': max_new_tokens,
+            'temperature': temperature,
+            'top_p': top_p,
+            'stop_strings': stop_strings,
+            'deadline_ms': deadline_ms,
+            'do_sample': do_sample,
+            'seed': seed,
+        }
+        
+        cacheable = self.response_cache is not None and (not do_sample or seed is not None)
+        if do_sample and seed is not None:
+            batch_size = 1
+        
+        responses: List[Optional[str]] = [None] * len(full_prompts)
+        keys: List[Optional[str]] = [None] * len(full_prompts)
+        
+        if cacheable:
+            params = {
+                'max_new_tokens': max_new_tokens,
+                'stop_strings': list(stop_strings),
+                'do_sample': do_sample,
+            }
+            if do_sample:
+                params.update(temperature=temperature, top_p=top_p, seed=seed)
+            
+            for i, (prompt, image) in enumerate(zip(full_prompts, images)):
+                keys[i] = ResponseCache.make_key(
+                    prompt,
+                    image_digest(image) if image is not None else None,
+                    self.language_model_name,
+                    self._adapter_name(),
+                    params,
+                )
+                responses[i] = self.response_cache.get(keys[i])
+        
+        misses = [i for i, response in enumerate(responses) if response is None]
+        
+        if not misses:
+            self.last_generation_stats = GenerationStats(
+                stop_reasons=[STOP_CACHE] * len(full_prompts)
+            )
+            return responses
+        
+        for start in range(0, len(misses), batch_size):
+            chunk = misses[start:start + batch_size]
+            generated = self._generate([full_prompts[i] for i in chunk], **generate_kwargs)
+            
+            for i, reason, response in zip(
+                chunk, self.last_generation_stats.stop_reasons, generated
+            ):
+                responses[i] = response
+                if cacheable and reason != STOP_DEADLINE:
+                    self.response_cache.put(keys[i], response)
+        
+        return responses
+    
+    def enable_response_cache(
+        self,
+        path: Optional[str] = None,
+        max_entries: int = 10000,
+        ttl_seconds: Optional[float] = 30 * 24 * 3600,
+        default_seed: Optional[int] = None,
+    ) -> ResponseCache:
+        """
+        Включает кэш ответов для детерминированных вызовов
+        
+        Args:
+            path: Файл кэша на диске (None - только в памяти)
+            max_entries: Максимальное количество записей (LRU)
+            ttl_seconds: Срок жизни записи в секундах
+            default_seed: Seed для вызовов без явного seed: делает
+                сэмплирование воспроизводимым и кэшируемым
+                
+        Returns:
+            ResponseCache
+        """
+        self.response_cache = ResponseCache(path, max_entries, ttl_seconds)
+        self.default_seed = default_seed
+        return self.response_cache
+    
+    def disable_response_cache(self):
+        """Выключает кэш ответов"""
+        if self.response_cache is not None:
+            self.response_cache.close()
+        self.response_cache = None
+        self.default_seed = None
+    
+    def _adapter_name(self) -> Optional[str]:
+        """Активный адаптер (LoRA) языковой модели, если есть"""
+        adapter = getattr(self.language_model, 'active_adapter', None)
+        if callable(adapter):
+            adapter = adapter()
+        return str(adapter) if adapter is not None else None
+    
+    def _generate(
+        self,
+        full_prompts: List[str],
+        max_new_tokens: Optional[int] = None,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+        stop_strings: Optional[List[str]] = None,
+        deadline_ms: Optional[float] = None,
+        do_sample: bool = True,
+        seed: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Генерирует ответы для пакета готовых промптов
+        
+        Спекулятивное декодирование применяется к одиночным запросам:
+        assisted generation в transformers не поддерживает пакеты,
+        а пакетная генерация и так эффективнее по пропускной способности.
+        
+        Returns:
+            Ответы без промптов, обрезанные по стоп-строкам
+        """
+        if max_new_tokens is None:
+            max_new_tokens = self.MAX_NEW_TOKENS
+        if stop_strings is None:
+            stop_strings = self.STOP_STRINGS
+        
+        # Для decoder-only моделей паддинг должен быть слева
+        padding_side = self.tokenizer.padding_side
+        self.tokenizer.padding_side = "left"
+        
+        try:
+            inputs = self.tokenizer(
+                full_prompts,
+                return_tensors="pt",
+                padding=True,
+                truncation=True,
+            )
+        finally:
+            self.tokenizer.padding_side = padding_side
         
         inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        prompt_length = inputs["input_ids"].shape[1]
+        
+        monitor = GenerationMonitor(
+            self.tokenizer,
+            prompt_length,
+            stop_strings=stop_strings,
+            deadline_ms=deadline_ms,
+        )
+        
+        generate_kwargs = {
+            'max_new_tokens': max_new_tokens,
+            'do_sample': do_sample,
+            'pad_token_id': self.tokenizer.pad_token_id,
+            'stopping_criteria': StoppingCriteriaList([monitor]),
+        }
+        if do_sample:
+            generate_kwargs.update(temperature=temperature, top_p=top_p)
+            if seed is not None:
+                torch.manual_seed(seed)
+        
+        speculative = self.draft_model is not None and len(full_prompts) == 1
+        if speculative:
+            generate_kwargs['assistant_model'] = self.draft_model
+            if not self._draft_shares_vocab:
+                # Universal assisted generation: перевод токенов между словарями
+                generate_kwargs.update(
+                    tokenizer=self.tokenizer,
+                    assistant_tokenizer=self.draft_tokenizer,
+                )
+            draft_calls = self._draft_forward_calls
+            target_calls = self._target_forward_calls
         
         # Генерация
         with torch.no_grad():
-            outputs = self.language_model.generate(
-                **inputs,
-                max_length=max_length,
-                temperature=temperature,
-                top_p=top_p,
-                do_sample=True,
-                pad_token_id=self.tokenizer.pad_token_id,
+            outputs = self.language_model.generate(**inputs, **generate_kwargs)
+        
+        # Декодируем только сгенерированные токены
+        new_tokens = outputs[:, prompt_length:]
+        stats = monitor.finish(
+            (new_tokens != self.tokenizer.pad_token_id).sum(dim=1).tolist(),
+            max_new_tokens,
+            prompt_length,
+        )
+        
+        if speculative:
+            # Каждый проход черновой модели предлагает один токен, каждый
+            # проход основной - проверка, дающая один собственный токен
+            stats.draft_tokens = self._draft_forward_calls - draft_calls
+            verify_steps = self._target_forward_calls - target_calls
+            stats.accepted_tokens = max(0, stats.new_tokens - verify_steps)
+        
+        self.last_generation_stats = stats
+        
+        decoded = self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+        return [cut_at_stop_strings(text, stop_strings) for text in decoded]
+    
+    def enable_speculative_decoding(
+        self,
+        draft_model_name: Optional[str] = None,
+        num_assistant_tokens: Optional[int] = None,
+    ):
+        """
+        Включает спекулятивное декодирование с малой черновой моделью
+        
+        Черновая модель быстро предлагает несколько токенов, основная
+        проверяет их за один проход. При жадном декодировании (do_sample=False)
+        ответы совпадают с обычной генерацией.
+        
+        Args:
+            draft_model_name: Черновая модель (по умолчанию DRAFT_MODEL_NAME сферы)
+            num_assistant_tokens: Черновых токенов за шаг
+                (по умолчанию NUM_ASSISTANT_TOKENS сферы)
+        """
+        draft_model_name = draft_model_name or self.DRAFT_MODEL_NAME
+        if draft_model_name is None:
+            raise ValueError("Не задана черновая модель для спекулятивного декодирования")
+        
+        print(f"   ✏️  Загрузка черновой модели: {draft_model_name}")
+        self.draft_tokenizer = AutoTokenizer.from_pretrained(draft_model_name)
+        self.draft_model = AutoModelForCausalLM.from_pretrained(
+            draft_model_name,
+            torch_dtype=self.language_model.dtype,
+        ).to(self.language_model.device)
+        self.draft_model.eval()
+        
+        self.draft_model.generation_config.num_assistant_tokens = (
+            num_assistant_tokens or self.NUM_ASSISTANT_TOKENS
+        )
+        
+        self._draft_shares_vocab = (
+            self.draft_tokenizer.get_vocab() == self.tokenizer.get_vocab()
+        )
+        
+        # Счетчики проходов для метрики принятия черновых токенов
+        if self._target_forward_hook is None:
+            self._target_forward_hook = self.language_model.register_forward_hook(
+                self._count_target_forward
             )
+        self._draft_forward_hook = self.draft_model.register_forward_hook(
+            self._count_draft_forward
+        )
         
-        # Декодируем ответ
-        response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+        print("   ✅ Спекулятивное декодирование включено")
+    
+    def disable_speculative_decoding(self):
+        """Выключает спекулятивное декодирование и выгружает черновую модель"""
+        # Без хуков проходы моделей больше не считаются
+        for hook in (self._target_forward_hook, self._draft_forward_hook):
+            if hook is not None:
+                hook.remove()
+        self._target_forward_hook = None
+        self._draft_forward_hook = None
         
-        # Убираем исходный промпт из ответа
-        if response.startswith(full_prompt):
-            response = response[len(full_prompt):].strip()
+        self.draft_model = None
+        self.draft_tokenizer = None
+    
+    def _count_target_forward(self, module, inputs, outputs):
+        """Forward hook основной модели"""
+        self._target_forward_calls += 1
+    
+    def _count_draft_forward(self, module, inputs, outputs):
+        """Forward hook черновой модели"""
+        self._draft_forward_calls += 1
+    
+    def prompt_builder(self, budget: Optional[int] = None) -> PromptBuilder:
+        """
+        Создает сборщик промпта с бюджетом токенов
         
-        return response
+        Args:
+            budget: Бюджет токенов (по умолчанию PROMPT_TOKEN_BUDGET)
+        """
+        return PromptBuilder(self.token_counter, budget or self.PROMPT_TOKEN_BUDGET)
+    
+    def _count_tokens(self, text: str) -> int:
+        """Количество токенов текста для токенизатора модели"""
+        return self.token_counter.count(text)
+    
+    def _truncate_tokens(self, text: str, max_tokens: int) -> str:
+        """Обрезает текст до max_tokens токенов"""
+        return self.token_counter.truncate(text, max_tokens)
+    
+    @staticmethod
+    def _format_prompt(
+        prompt: str,
+        image: Optional[Union[str, Image.Image]] = None
+    ) -> str:
+        """Добавляет к промпту префикс изображения, если оно передано"""
+        if image is not None:
+            return "[ИЗОБРАЖЕНИЕ] " + prompt
+        return prompt
     
     def batch_encode_images(self, images: List[Union[str, Image.Image]]) -> torch.Tensor:
         """
@@ -226,14 +714,26 @@ class MultimodalMozgach(MultimodalBraindler):
     для универсального AI-ассистента
     """
     
+    # Черновая модель: на TinyLlama обучаются LoRA сфер (finetune/)
+    DRAFT_MODEL_NAME = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
+    
     def __init__(
         self,
         language_model_name: str = "nativemind/mozgach_full_trained_model",
         vision_model_name: str = "openai/clip-vit-large-patch14",
         device: str = "auto",
+        **components
     ):
+        """
+        Args:
+            language_model_name: Языковая модель Mozgach
+            vision_model_name: CLIP модель
+            device: Устройство (auto, cuda, mps, cpu)
+            **components: Готовые vision_encoder, tokenizer, language_model
+                (см. MultimodalBraindler)
+        """
         print("🚀 Инициализация MultimodalMozgach...")
-        super().__init__(language_model_name, vision_model_name, device)
+        super().__init__(language_model_name, vision_model_name, device, **components)
         print("   ✅ MultimodalMozgach готов к работе!")
     
     def analyze_code_screenshot(self, image: Union[str, Image.Image]) -> str:
@@ -0,0 +1,521 @@
+"""
+Бэкенды Tesseract для OCREngine
+
+pytesseract на каждую страницу запускает процесс tesseract, пишет
+изображение во временный файл и заново загружает rus+eng traineddata.
+Здесь страницы передаются в памяти:
+
+- TesserocrBackend: пул долгоживущих экземпляров Tesseract API
+  (tesserocr), модели языков загружаются один раз на экземпляр;
+- CAPIBackend: тот же пул без tesserocr - C API libtesseract через
+  ctypes; библиотека ставится вместе с tesseract, сборка не нужна;
+- PipeBackend: последний вариант, если libtesseract не найдена -
+  изображение передается процессу tesseract через stdin, результат
+  читается из stdout, без временных файлов (процесс на страницу).
+
+EasyOCRBackend использует один Reader на процесс (общий для всех
+OCREngine) и распознает страницы пакетами.
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import ctypes
+import ctypes.util
+import io
+import os
+import queue
+import shutil
+import subprocess
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from PIL import Image
+
+
+# Page segmentation mode Tesseract
+PSM_AUTO = 3
+PSM_SINGLE_BLOCK = 6
+
+_TSV_FIELDS = (
+    'level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+    'left', 'top', 'width', 'height', 'conf', 'text'
+)
+
+
+def parse_tsv(tsv: str) -> Dict[str, list]:
+    """
+    Разбирает TSV Tesseract в словарь колонок
+    
+    Формат совпадает с pytesseract.image_to_data(output_type=Output.DICT).
+    Строка заголовка (есть у CLI, нет у tesserocr) пропускается.
+    """
+    data: Dict[str, list] = {field: [] for field in _TSV_FIELDS}
+    
+    for line in tsv.splitlines():
+        if not line or line.startswith('level'):
+            continue
+        
+        values = line.split('\t')
+        if len(values) < len(_TSV_FIELDS) - 1:
+            continue
+        
+        for field, value in zip(_TSV_FIELDS[:-1], values):
+            data[field].append(float(value) if field == 'conf' else int(value))
+        data['text'].append(values[-1] if len(values) == len(_TSV_FIELDS) else '')
+    
+    return data
+
+
+def source_dpi(image: Image.Image, dpi: Optional[int] = None) -> Optional[int]:
+    """
+    Разрешение страницы для Tesseract
+    
+    Явный dpi, иначе image.info['dpi']. Без него Tesseract считает
+    буфер пикселей и PNM изображением 70 DPI и неверно оценивает
+    размер шрифта.
+    """
+    if dpi:
+        return int(dpi)
+    if image.info.get('dpi'):
+        return int(image.info['dpi'][0])
+    return None
+
+
+class PipeBackend:
+    """
+    Tesseract CLI через каналы stdin/stdout
+    
+    Изображение кодируется в несжатый PNM в памяти; временные файлы
+    не создаются. Параллельных процессов - не больше workers.
+    """
+    
+    name = "tesseract-pipe"
+    
+    def __init__(
+        self,
+        languages: str = "rus+eng",
+        workers: int = 2,
+        tesseract_cmd: Optional[str] = None,
+    ):
+        """
+        Args:
+            languages: Языки в формате Tesseract ('rus+eng')
+            workers: Максимум одновременно работающих процессов
+            tesseract_cmd: Путь к исполняемому файлу tesseract
+        """
+        self.languages = languages
+        self.workers = workers
+        self.tesseract_cmd = tesseract_cmd or shutil.which('tesseract') or 'tesseract'
+        self._slots = threading.Semaphore(workers)
+        
+        # Каждый процесс однопоточный: параллелизм - за счет пула
+        self._env = dict(os.environ, OMP_THREAD_LIMIT='1')
+    
+    @staticmethod
+    def _encode(image: Image.Image) -> bytes:
+        """Несжатый PNM: быстрее PNG и читается Tesseract из stdin"""
+        if image.mode not in ('L', 'RGB'):
+            image = image.convert('RGB' if 'A' in image.mode or image.mode == 'P' else 'L')
+        buffer = io.BytesIO()
+        image.save(buffer, format='PPM')
+        return buffer.getvalue()
+    
+    def _run(self, image: Image.Image, psm: int, dpi: Optional[int], extra: List[str]) -> str:
+        command = [
+            self.tesseract_cmd, 'stdin', 'stdout',
+            '-l', self.languages,
+            '--psm', str(psm),
+        ]
+        # PNM не несет разрешения - передаем его явно
+        dpi = source_dpi(image, dpi)
+        if dpi:
+            command += ['--dpi', str(dpi)]
+        command += extra
+        
+        with self._slots:
+            completed = subprocess.run(
+                command,
+                input=self._encode(image),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=self._env,
+            )
+        
+        if completed.returncode != 0:
+            raise RuntimeError(
+                f"tesseract завершился с кодом {completed.returncode}: "
+                f"{completed.stderr.decode('utf-8', 'replace').strip()}"
+            )
+        
+        return completed.stdout.decode('utf-8')
+    
+    def image_to_string(self, image: Image.Image, psm: int = PSM_AUTO, dpi: Optional[int] = None) -> str:
+        """Распознанный текст страницы (dpi - разрешение растеризации, см. source_dpi)"""
+        return self._run(image, psm, dpi, [])
+    
+    def image_to_data(self, image: Image.Image, psm: int = PSM_AUTO, dpi: Optional[int] = None) -> Dict[str, list]:
+        """Слова с рамками и уверенностью (как pytesseract.image_to_data)"""
+        return parse_tsv(self._run(image, psm, dpi, ['tsv']))
+    
+    def close(self):
+        pass
+
+
+class TesserocrBackend:
+    """
+    Пул долгоживущих экземпляров Tesseract API (tesserocr)
+    
+    Экземпляр API не потокобезопасен, поэтому каждый вызов берет
+    свободный экземпляр из пула. tesserocr отпускает GIL на время
+    распознавания - страницы распознаются параллельно в потоках.
+    """
+    
+    name = "tesserocr"
+    
+    def __init__(self, languages: str = "rus+eng", workers: int = 2):
+        """
+        Args:
+            languages: Языки в формате Tesseract ('rus+eng')
+            workers: Количество экземпляров API (модели загружаются в каждый)
+        """
+        import tesserocr
+        
+        self.languages = languages
+        self.workers = workers
+        self._pool: "queue.Queue" = queue.Queue()
+        
+        for _ in range(workers):
+            self._pool.put(tesserocr.PyTessBaseAPI(lang=languages))
+    
+    @contextmanager
+    def _api(self, image: Image.Image, psm: int, dpi: Optional[int]):
+        api = self._pool.get()
+        try:
+            api.SetPageSegMode(psm)
+            api.SetImage(image)
+            dpi = source_dpi(image, dpi)
+            if dpi:
+                api.SetSourceResolution(dpi)
+            yield api
+        finally:
+            self._pool.put(api)
+    
+    def image_to_string(self, image: Image.Image, psm: int = PSM_AUTO, dpi: Optional[int] = None) -> str:
+        """Распознанный текст страницы (dpi - разрешение растеризации, см. source_dpi)"""
+        with self._api(image, psm, dpi) as api:
+            return api.GetUTF8Text()
+    
+    def image_to_data(self, image: Image.Image, psm: int = PSM_AUTO, dpi: Optional[int] = None) -> Dict[str, list]:
+        """Слова с рамками и уверенностью (как pytesseract.image_to_data)"""
+        with self._api(image, psm, dpi) as api:
+            return parse_tsv(api.GetTSVText(0))
+    
+    def close(self):
+        """Освобождает экземпляры API"""
+        while not self._pool.empty():
+            self._pool.get().End()
+
+
+# Имена библиотеки, если ctypes.util.find_library ее не находит
+_LIBTESSERACT_NAMES = (
+    'libtesseract.so.5',
+    'libtesseract.so.4',
+    'libtesseract.5.dylib',
+    '/opt/homebrew/lib/libtesseract.dylib',
+    '/usr/local/lib/libtesseract.dylib',
+    'libtesseract-5.dll',
+)
+
+
+def load_libtesseract(path: Optional[str] = None) -> ctypes.CDLL:
+    """
+    Загружает libtesseract и объявляет сигнатуры функций C API
+    
+    Args:
+        path: Путь к библиотеке (по умолчанию - поиск в системе)
+    
+    Raises:
+        OSError: Библиотека не найдена
+    """
+    candidates = [path] if path else [ctypes.util.find_library('tesseract'), *_LIBTESSERACT_NAMES]
+    
+    lib = None
+    for candidate in candidates:
+        if not candidate:
+            continue
+        try:
+            lib = ctypes.CDLL(candidate)
+            break
+        except OSError:
+            continue
+    
+    if lib is None:
+        raise OSError("libtesseract не найдена")
+    
+    handle = ctypes.c_void_p
+    signatures = {
+        'TessBaseAPICreate': (handle, []),
+        'TessBaseAPIInit3': (ctypes.c_int, [handle, ctypes.c_char_p, ctypes.c_char_p]),
+        'TessBaseAPISetPageSegMode': (None, [handle, ctypes.c_int]),
+        'TessBaseAPISetImage': (None, [
+            handle, ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int
+        ]),
+        'TessBaseAPISetSourceResolution': (None, [handle, ctypes.c_int]),
+        # Строки результата освобождаются TessDeleteText, поэтому c_void_p
+        'TessBaseAPIGetUTF8Text': (ctypes.c_void_p, [handle]),
+        'TessBaseAPIGetTsvText': (ctypes.c_void_p, [handle, ctypes.c_int]),
+        'TessBaseAPIClear': (None, [handle]),
+        'TessDeleteText': (None, [ctypes.c_void_p]),
+        'TessBaseAPIEnd': (None, [handle]),
+        'TessBaseAPIDelete': (None, [handle]),
+    }
+    for function_name, (restype, argtypes) in signatures.items():
+        function = getattr(lib, function_name)
+        function.restype = restype
+        function.argtypes = argtypes
+    
+    return lib
+
+
+class CAPIBackend:
+    """
+    Пул долгоживущих экземпляров Tesseract C API (libtesseract через ctypes)
+    
+    Замена tesserocr, когда его не удалось собрать: модели языков
+    загружаются один раз на экземпляр, страницы передаются буфером
+    пикселей. ctypes отпускает GIL на время вызова, поэтому страницы
+    распознаются параллельно в потоках, как в TesserocrBackend.
+    """
+    
+    name = "tesseract-capi"
+    
+    def __init__(
+        self,
+        languages: str = "rus+eng",
+        workers: int = 2,
+        library: Optional[str] = None,
+    ):
+        """
+        Args:
+            languages: Языки в формате Tesseract ('rus+eng')
+            workers: Количество экземпляров API (модели загружаются в каждый)
+            library: Путь к libtesseract (по умолчанию - поиск в системе)
+        
+        Raises:
+            OSError: libtesseract не найдена
+            RuntimeError: Не удалось загрузить модели языков
+        """
+        self.languages = languages
+        self.workers = workers
+        self._lib = load_libtesseract(library)
+        self._pool: "queue.Queue" = queue.Queue()
+        
+        for _ in range(workers):
+            api = self._lib.TessBaseAPICreate()
+            if self._lib.TessBaseAPIInit3(api, None, languages.encode('utf-8')) != 0:
+                self._lib.TessBaseAPIDelete(api)
+                self.close()
+                raise RuntimeError(f"Tesseract не загрузил модели языков: {languages}")
+            self._pool.put(api)
+    
+    @contextmanager
+    def _api(self, image: Image.Image, psm: int, dpi: Optional[int]):
+        dpi = source_dpi(image, dpi)
+        if image.mode not in ('L', 'RGB'):
+            image = image.convert('RGB' if 'A' in image.mode or image.mode == 'P' else 'L')
+        pixels = image.tobytes()
+        bytes_per_pixel = len(image.mode)
+        
+        api = self._pool.get()
+        try:
+            self._lib.TessBaseAPISetPageSegMode(api, psm)
+            self._lib.TessBaseAPISetImage(
+                api, pixels, image.width, image.height,
+                bytes_per_pixel, image.width * bytes_per_pixel,
+            )
+            if dpi:
+                self._lib.TessBaseAPISetSourceResolution(api, dpi)
+            yield api
+        finally:
+            self._lib.TessBaseAPIClear(api)
+            self._pool.put(api)
+    
+    def _take_text(self, pointer: Optional[int]) -> str:
+        """Копирует строку результата и освобождает ее в libtesseract"""
+        if not pointer:
+            return ""
+        try:
+            return ctypes.string_at(pointer).decode('utf-8')
+        finally:
+            self._lib.TessDeleteText(pointer)
+    
+    def image_to_string(self, image: Image.Image, psm: int = PSM_AUTO, dpi: Optional[int] = None) -> str:
+        """Распознанный текст страницы (dpi - разрешение растеризации, см. source_dpi)"""
+        with self._api(image, psm, dpi) as api:
+            return self._take_text(self._lib.TessBaseAPIGetUTF8Text(api))
+    
+    def image_to_data(self, image: Image.Image, psm: int = PSM_AUTO, dpi: Optional[int] = None) -> Dict[str, list]:
+        """Слова с рамками и уверенностью (как pytesseract.image_to_data)"""
+        with self._api(image, psm, dpi) as api:
+            return parse_tsv(self._take_text(self._lib.TessBaseAPIGetTsvText(api, 0)))
+    
+    def close(self):
+        """Освобождает экземпляры API"""
+        while not self._pool.empty():
+            api = self._pool.get()
+            self._lib.TessBaseAPIEnd(api)
+            self._lib.TessBaseAPIDelete(api)
+
+
+def create_tesseract_backend(languages: str = "rus+eng", workers: Optional[int] = None):
+    """
+    Создает бэкенд Tesseract с долгоживущими экземплярами API
+    
+    tesserocr, если установлен, иначе libtesseract через ctypes.
+    PipeBackend (процесс tesseract на страницу) - только если
+    libtesseract не найдена.
+    
+    Args:
+        languages: Языки в формате Tesseract ('rus+eng')
+        workers: Размер пула (по умолчанию - число ядер, не больше 4)
+    """
+    if workers is None:
+        workers = max(1, min(4, os.cpu_count() or 1))
+    
+    try:
+        return TesserocrBackend(languages, workers)
+    except ImportError:
+        pass
+    
+    try:
+        return CAPIBackend(languages, workers)
+    except OSError:
+        print("   ⚠️  libtesseract не найдена: tesseract запускается на каждую страницу")
+        return PipeBackend(languages, workers)
+
+
+# Коды языков Tesseract -> EasyOCR
+EASYOCR_LANGUAGES = {
+    'rus': 'ru',
+    'eng': 'en',
+    'ukr': 'uk',
+    'bel': 'be',
+    'deu': 'de',
+    'fra': 'fr',
+}
+
+# Общие Reader EasyOCR: {(языки, gpu): (reader, lock)}
+_easyocr_readers: Dict[Tuple[Tuple[str, ...], bool], tuple] = {}
+_easyocr_readers_lock = threading.Lock()
+
+
+def to_easyocr_languages(languages: Sequence[str]) -> List[str]:
+    """Переводит коды языков Tesseract ('rus', 'eng') в коды EasyOCR ('ru', 'en')"""
+    return [EASYOCR_LANGUAGES.get(language, language) for language in languages]
+
+
+def get_easyocr_reader(
+    languages: Sequence[str],
+    gpu: bool = False,
+    num_threads: Optional[int] = None,
+):
+    """
+    Общий Reader EasyOCR для набора языков
+    
+    Детектор и распознаватель загружаются один раз на процесс, сколько бы
+    OCREngine (по одному в каждой сфере) ни было создано.
+    
+    Args:
+        languages: Языки (коды Tesseract или EasyOCR)
+        gpu: Использовать GPU
+        num_threads: Потоков PyTorch на CPU (torch.set_num_threads,
+            настройка процесса; None - не менять)
+    
+    Returns:
+        (reader, lock): Reader и блокировка для последовательных вызовов
+    """
+    key = (tuple(to_easyocr_languages(languages)), gpu)
+    
+    with _easyocr_readers_lock:
+        if key not in _easyocr_readers:
+            import easyocr
+            
+            if num_threads is not None and not gpu:
+                import torch
+                torch.set_num_threads(num_threads)
+            
+            reader = easyocr.Reader(list(key[0]), gpu=gpu, verbose=False)
+            _easyocr_readers[key] = (reader, threading.Lock())
+        
+        return _easyocr_readers[key]
+
+
+class EasyOCRBackend:
+    """
+    Пакетное распознавание EasyOCR с общим Reader
+    
+    Страницы одного размера (обычно все страницы тома) распознаются
+    одним вызовом readtext_batched: детектор и распознаватель получают
+    пакеты вместо отдельных страниц.
+    """
+    
+    name = "easyocr"
+    
+    def __init__(
+        self,
+        languages: Sequence[str] = ('rus', 'eng'),
+        gpu: bool = False,
+        num_threads: Optional[int] = None,
+        batch_size: int = 16,
+    ):
+        """
+        Args:
+            languages: Языки (коды Tesseract или EasyOCR)
+            gpu: Использовать GPU
+            num_threads: Потоков PyTorch на CPU
+            batch_size: Размер пакета распознавателя
+        """
+        self.languages = list(languages)
+        self.batch_size = batch_size
+        self.reader, self._lock = get_easyocr_reader(languages, gpu, num_threads)
+    
+    @staticmethod
+    def _to_array(image: Image.Image) -> np.ndarray:
+        return np.asarray(image if image.mode in ('L', 'RGB') else image.convert('RGB'))
+    
+    @staticmethod
+    def _join(results: list) -> str:
+        return '\n'.join(result[1] for result in results)
+    
+    def image_to_string(self, image: Image.Image) -> str:
+        """Распознанный текст страницы"""
+        with self._lock:
+            results = self.reader.readtext(self._to_array(image))
+        return self._join(results)
+    
+    def images_to_strings(self, images: List[Image.Image]) -> List[str]:
+        """
+        Распознает страницы пакетами
+        
+        Страницы группируются по размеру, чтобы не масштабировать их
+        к общему размеру; порядок результатов совпадает с порядком страниц.
+        """
+        groups: Dict[Tuple[int, int], List[int]] = {}
+        for i, image in enumerate(images):
+            groups.setdefault(image.size, []).append(i)
+        
+        texts = [""] * len(images)
+        for indices in groups.values():
+            arrays = [self._to_array(images[i]) for i in indices]
+            
+            with self._lock:
+                batch_results = self.reader.readtext_batched(arrays, batch_size=self.batch_size)
+            
+            for i, results in zip(indices, batch_results):
+                texts[i] = self._join(results)
+        
+        return texts
+    
+    def close(self):
+        pass
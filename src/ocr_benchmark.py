@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк точности и скорости OCR
+
+Сравнивает режимы OCREngine на PDF с текстовым слоем: текстовый слой
+служит эталоном, а страницы распознаются как сканы (растеризация + OCR).
+Отчет: секунды на страницу, посимвольная точность, средний DPI.
+Tesseract и EasyOCR (если установлен) сравниваются на одних страницах.
+
+Запуск:
+    python -m src.ocr_benchmark документ1.pdf документ2.pdf --max-pages 20
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import importlib.util
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import fitz  # PyMuPDF
+from Levenshtein import distance as levenshtein_distance
+
+from .ocr_engine import OCREngine
+
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+@dataclass
+class OCRBenchmarkResult:
+    """Результат одного режима OCR"""
+    name: str
+    pages: int
+    seconds: float
+    char_accuracy: float  # 1 - расстояние Левенштейна / длина эталона
+    mean_dpi: float
+    rerendered: int  # Страниц, распознанных повторно с высоким DPI
+    
+    @property
+    def seconds_per_page(self) -> float:
+        return self.seconds / self.pages if self.pages else 0.0
+
+
+def character_accuracy(reference: str, hypothesis: str) -> float:
+    """Посимвольная точность распознавания (пробелы нормализуются)"""
+    reference = _WHITESPACE.sub(' ', reference).strip()
+    hypothesis = _WHITESPACE.sub(' ', hypothesis).strip()
+    
+    if not reference:
+        return 1.0 if not hypothesis else 0.0
+    
+    return max(0.0, 1.0 - levenshtein_distance(reference, hypothesis) / len(reference))
+
+
+def reference_texts(pdf_path: str, max_pages: Optional[int] = None) -> Dict[int, str]:
+    """Эталонный текст страниц из текстового слоя PDF"""
+    texts = {}
+    
+    doc = fitz.open(pdf_path)
+    try:
+        last_page = len(doc) if max_pages is None else min(max_pages, len(doc))
+        for page_num in range(last_page):
+            text = doc[page_num].get_text()
+            if text.strip():
+                texts[page_num] = text
+    finally:
+        doc.close()
+    
+    return texts
+
+
+def default_engines() -> Dict[str, OCREngine]:
+    """
+    Фиксированный DPI без предобработки против адаптивного конвейера
+    
+    Если установлен EasyOCR - еще и пакетный EasyOCR с общим Reader.
+    """
+    engines = {
+        'fixed_300dpi': OCREngine(dpi=300, adaptive_dpi=False, preprocess=False),
+        'adaptive': OCREngine(dpi=300, adaptive_dpi=True, preprocess=True),
+    }
+    
+    if importlib.util.find_spec('easyocr') is not None:
+        engines['easyocr'] = OCREngine(dpi=300, use_easyocr=True)
+    
+    return engines
+
+
+def run_ocr_benchmark(
+    pdf_paths: List[str],
+    max_pages: Optional[int] = 20,
+    engines: Optional[Dict[str, OCREngine]] = None,
+) -> List[OCRBenchmarkResult]:
+    """
+    Запускает бенчмарк
+    
+    Args:
+        pdf_paths: PDF с текстовым слоем (эталон)
+        max_pages: Максимум страниц каждого PDF
+        engines: Режимы {название: OCREngine} (по умолчанию default_engines())
+    
+    Returns:
+        Результаты по режимам
+    """
+    references = {path: reference_texts(path, max_pages) for path in pdf_paths}
+    if engines is None:
+        engines = default_engines()
+    
+    results = []
+    for name, engine in engines.items():
+        pages, seconds, accuracy_sum, dpi_sum, rerendered = 0, 0.0, 0.0, 0.0, 0
+        
+        for path, reference in references.items():
+            if not reference:
+                continue
+            
+            start = time.perf_counter()
+            recognized = engine.ocr_pdf(path, end_page=max(reference) + 1)
+            seconds += time.perf_counter() - start
+            
+            stats = {page_stats.page_num: page_stats for page_stats in engine.last_page_stats}
+            
+            for page_num, text in reference.items():
+                pages += 1
+                accuracy_sum += character_accuracy(text, recognized.get(page_num, ""))
+                if page_num in stats:
+                    dpi_sum += stats[page_num].dpi
+                    rerendered += stats[page_num].rerendered
+        
+        results.append(OCRBenchmarkResult(
+            name=name,
+            pages=pages,
+            seconds=seconds,
+            char_accuracy=accuracy_sum / pages if pages else 0.0,
+            mean_dpi=dpi_sum / pages if pages else 0.0,
+            rerendered=rerendered,
+        ))
+    
+    return results
+
+
+def print_benchmark(results: List[OCRBenchmarkResult]):
+    """Печатает таблицу результатов"""
+    print("\n" + "=" * 72)
+    print(f"{'Режим':<16}{'Страниц':>8}{'с/стр':>10}{'Точность':>11}{'DPI':>8}{'Повтор':>9}")
+    print("=" * 72)
+    for result in results:
+        print(
+            f"{result.name:<16}{result.pages:>8}{result.seconds_per_page:>10.2f}"
+            f"{result.char_accuracy * 100:>10.1f}%{result.mean_dpi:>8.0f}{result.rerendered:>9}"
+        )
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="Бенчмарк точности и скорости OCR на PDF с текстовым слоем"
+    )
+    parser.add_argument(
+        "pdf_paths",
+        nargs="+",
+        help="PDF с текстовым слоем (эталон для сравнения)"
+    )
+    parser.add_argument(
+        "--max-pages",
+        type=int,
+        default=20,
+        help="Максимум страниц каждого PDF"
+    )
+    
+    args = parser.parse_args()
+    
+    print_benchmark(run_ocr_benchmark(args.pdf_paths, args.max_pages))
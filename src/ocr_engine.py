@@ -8,11 +8,34 @@ OCR Engine для распознавания текста в документа
 """
 
 import os
-from typing import Union, List, Dict, Optional
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Union, Iterator, List, Dict, Optional, Tuple
 from PIL import Image
-import pytesseract
 from pdf2image import convert_from_path
 import fitz  # PyMuPDF
+from .ocr_backends import (
+    PSM_AUTO,
+    PSM_SINGLE_BLOCK,
+    EasyOCRBackend,
+    create_tesseract_backend,
+)
+from .ocr_layout import OCRLayout
+from .ocr_manifest import OCRManifest, page_runs
+from .ocr_preprocessing import preprocess_page
+
+
+@dataclass
+class PageOCRStats:
+    """Статистика распознавания страницы"""
+    page_num: int
+    dpi: int  # DPI растеризации итогового распознавания
+    text_height: float  # Медианная высота строк (пиксели)
+    confidence: float  # Средняя уверенность Tesseract
+    rerendered: bool  # Страница растеризована повторно с высоким DPI
+    seconds: float
 
 
 class OCREngine:
@@ -23,19 +46,39 @@ class OCREngine:
         Извлечение истины из документов для служения справедливости
     """
     
+    # Высота строки (пиксели), при которой Tesseract распознает надежно
+    TARGET_TEXT_HEIGHT = 28
+    
     def __init__(
         self,
         languages: List[str] = None,
         dpi: int = 300,
         use_easyocr: bool = False,
+        adaptive_dpi: bool = True,
+        min_dpi: int = 150,
+        min_confidence: float = 75.0,
+        preprocess: bool = True,
+        tesseract_workers: Optional[int] = None,
+        easyocr_threads: Optional[int] = None,
+        easyocr_batch_size: int = 16,
     ):
         """
         Инициализация OCR Engine
         
         Args:
             languages: Список языков для распознавания (по умолчанию: ['rus', 'eng'])
-            dpi: DPI для конвертации PDF в изображения
+            dpi: DPI для конвертации PDF в изображения (максимальный при adaptive_dpi)
             use_easyocr: Использовать EasyOCR (нейросетевой, лучше для рукописного текста)
+            adaptive_dpi: Растеризовать сканы сначала с min_dpi и повышать DPI
+                только для мелкого шрифта или низкой уверенности
+            min_dpi: Начальный DPI адаптивной растеризации
+            min_confidence: Уверенность, ниже которой страница распознается
+                повторно с DPI dpi
+            preprocess: Бинаризация, выравнивание наклона и обрезка полей перед OCR
+            tesseract_workers: Размер пула Tesseract (по умолчанию - по числу ядер)
+            easyocr_threads: Потоков PyTorch для EasyOCR на CPU
+                (настройка процесса; None - не менять)
+            easyocr_batch_size: Размер пакета распознавателя EasyOCR
         """
         if languages is None:
             languages = ['rus', 'eng']  # Русский и английский по умолчанию
@@ -43,22 +86,62 @@ class OCREngine:
         self.languages = '+'.join(languages)
         self.dpi = dpi
         self.use_easyocr = use_easyocr
+        self.adaptive_dpi = adaptive_dpi
+        self.min_dpi = min(min_dpi, dpi)
+        self.min_confidence = min_confidence
+        self.preprocess = preprocess
+        
+        # Статистика страниц последнего распознанного PDF
+        self.last_page_stats: List[PageOCRStats] = []
+        
+        # Бэкенд Tesseract создается при первом распознавании
+        self.tesseract_workers = tesseract_workers
+        self._backend = None
+        self._backend_lock = threading.Lock()
         
         if use_easyocr:
             try:
-                import easyocr
-                self.easyocr_reader = easyocr.Reader(languages)
-                print("   ✅ EasyOCR инициализирован")
+                self.easyocr = EasyOCRBackend(
+                    languages,
+                    num_threads=easyocr_threads,
+                    batch_size=easyocr_batch_size,
+                )
+                print("   ✅ EasyOCR инициализирован (общий Reader)")
             except ImportError:
                 print("   ⚠️  EasyOCR не установлен, используем Tesseract")
                 self.use_easyocr = False
         
         print(f"   ✅ OCR Engine готов (языки: {', '.join(languages)})")
     
+    @property
+    def backend(self):
+        """
+        Бэкенд Tesseract с долгоживущими обработчиками
+        
+        tesserocr или libtesseract через ctypes (модели загружены один
+        раз); tesseract CLI через stdin/stdout - если библиотеки нет.
+        """
+        if self._backend is None:
+            with self._backend_lock:
+                if self._backend is None:
+                    self._backend = create_tesseract_backend(
+                        self.languages,
+                        self.tesseract_workers
+                    )
+                    print(f"   ✅ Tesseract бэкенд: {self._backend.name}")
+        return self._backend
+    
+    def close(self):
+        """Освобождает обработчики Tesseract"""
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
+    
     def extract_text_from_image(
         self,
         image: Union[str, Image.Image],
         preserve_layout: bool = True,
+        dpi: Optional[int] = None,
     ) -> str:
         """
         Извлекает текст из изображения
@@ -66,6 +149,8 @@ class OCREngine:
         Args:
             image: Путь к изображению или PIL.Image
             preserve_layout: Сохранять ли структуру документа
+            dpi: Разрешение изображения для Tesseract (по умолчанию
+                image.info['dpi'], если есть)
             
         Returns:
             Распознанный текст
@@ -77,25 +162,63 @@ class OCREngine:
             img = image
         
         # OCR
+        if self.preprocess and not self.use_easyocr:
+            img, _ = preprocess_page(img)
+        
         if self.use_easyocr:
             # EasyOCR (нейросетевой)
-            results = self.easyocr_reader.readtext(img)
-            text = '\n'.join([result[1] for result in results])
+            text = self.easyocr.image_to_string(img)
         else:
             # Tesseract OCR
             if preserve_layout:
                 # Сохраняем структуру документа
-                text = pytesseract.image_to_string(
+                text = self.backend.image_to_string(
                     img,
-                    lang=self.languages,
-                    config='--psm 6'  # Assume uniform block of text
+                    psm=PSM_SINGLE_BLOCK,  # Assume uniform block of text
+                    dpi=dpi
                 )
             else:
                 # Простое распознавание
-                text = pytesseract.image_to_string(img, lang=self.languages)
+                text = self.backend.image_to_string(img, dpi=dpi)
         
         return text.strip()
     
+    def extract_text_from_images(
+        self,
+        images: List[Union[str, Image.Image]],
+        preserve_layout: bool = True,
+        dpi: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Распознает несколько страниц
+        
+        EasyOCR распознает страницы пакетами одним вызовом, Tesseract -
+        параллельно обработчиками пула бэкенда.
+        
+        Args:
+            images: Страницы (пути или PIL.Image)
+            preserve_layout: Сохранять ли структуру документа
+            dpi: Разрешение страниц для Tesseract (см. extract_text_from_image)
+            
+        Returns:
+            Тексты в порядке страниц
+        """
+        images = [Image.open(image) if isinstance(image, str) else image for image in images]
+        
+        if self.use_easyocr:
+            # Без обрезки полей: страницы одного размера идут одним пакетом
+            return [text.strip() for text in self.easyocr.images_to_strings(images)]
+        
+        workers = getattr(self.backend, 'workers', 1)
+        if workers <= 1 or len(images) <= 1:
+            return [self.extract_text_from_image(image, preserve_layout, dpi) for image in images]
+        
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(
+                lambda image: self.extract_text_from_image(image, preserve_layout, dpi),
+                images
+            ))
+    
     def extract_text_from_pdf(
         self,
         pdf_path: str,
@@ -106,6 +229,10 @@ class OCREngine:
         """
         Извлекает текст из PDF (сканированного или текстового)
         
+        Решение принимается для каждой страницы: текстовый слой
+        используется, если он есть, страницы без него (сканы внутри
+        текстового PDF) распознаются через OCR.
+        
         Args:
             pdf_path: Путь к PDF файлу
             preserve_layout: Сохранять структуру документа
@@ -120,31 +247,61 @@ class OCREngine:
         # Сначала пробуем извлечь текст напрямую (если PDF текстовый)
         try:
             doc = fitz.open(pdf_path)
-            has_text = False
-            
-            for page_num in range(len(doc)):
-                if end_page is not None and page_num >= end_page:
-                    break
-                if page_num < start_page:
-                    continue
-                
-                page = doc[page_num]
-                text = page.get_text()
+            try:
+                last_page = len(doc) if end_page is None else min(end_page, len(doc))
+                scanned = []
                 
-                if text.strip():
-                    has_text = True
-                    results[page_num] = text
-            
-            doc.close()
-            
-            if has_text:
-                print(f"   ✅ Извлечен текст из PDF напрямую ({len(results)} страниц)")
-                return results
+                for page_num in range(start_page, last_page):
+                    text = doc[page_num].get_text()
+                    
+                    if text.strip():
+                        results[page_num] = text
+                    else:
+                        scanned.append(page_num)
+            finally:
+                doc.close()
         
         except Exception as e:
             print(f"   ⚠️  Не удалось извлечь текст напрямую: {e}")
+            return self.ocr_pdf(pdf_path, preserve_layout, start_page, end_page)
+        
+        if results:
+            print(f"   ✅ Извлечен текст из PDF напрямую ({len(results)} страниц)")
+        
+        # Страницы без текстового слоя - OCR, подряд идущие одним вызовом
+        page_stats = []
+        for run_start, run_end in page_runs(scanned, max(1, len(scanned))):
+            results.update(self.ocr_pdf(pdf_path, preserve_layout, run_start, run_end))
+            page_stats.extend(self.last_page_stats)
+        self.last_page_stats = page_stats
+        
+        return dict(sorted(results.items()))
+    
+    def ocr_pdf(
+        self,
+        pdf_path: str,
+        preserve_layout: bool = True,
+        start_page: int = 0,
+        end_page: Optional[int] = None,
+    ) -> Dict[int, str]:
+        """
+        Распознает страницы PDF через OCR (текстовый слой не используется)
+        
+        Args:
+            pdf_path: Путь к PDF файлу
+            preserve_layout: Сохранять структуру документа
+            start_page: Начальная страница (0-indexed)
+            end_page: Конечная страница (None = до конца)
+            
+        Returns:
+            Словарь {номер_страницы: текст}
+        """
+        if self.adaptive_dpi and not self.use_easyocr:
+            return self._ocr_pdf_adaptive(pdf_path, preserve_layout, start_page, end_page)
+        
+        results = {}
+        self.last_page_stats = []
         
-        # Если не получилось, OCR для сканированного PDF
         print(f"   📄 Конвертация PDF в изображения (DPI: {self.dpi})...")
         
         images = convert_from_path(
@@ -156,18 +313,233 @@ class OCREngine:
         
         print(f"   🔍 OCR распознавание {len(images)} страниц...")
         
-        for i, image in enumerate(images):
+        start = time.perf_counter()
+        texts = self.extract_text_from_images(images, preserve_layout, dpi=self.dpi)
+        seconds_per_page = (time.perf_counter() - start) / max(1, len(images))
+        
+        for i, text in enumerate(texts):
             page_num = start_page + i
-            text = self.extract_text_from_image(image, preserve_layout)
             results[page_num] = text
             
-            if (i + 1) % 10 == 0:
-                print(f"      Обработано {i + 1}/{len(images)} страниц")
+            self.last_page_stats.append(PageOCRStats(
+                page_num=page_num,
+                dpi=self.dpi,
+                text_height=0.0,
+                confidence=0.0,
+                rerendered=False,
+                seconds=seconds_per_page,
+            ))
         
         print(f"   ✅ OCR завершен ({len(results)} страниц)")
         
         return results
     
+    def _ocr_pdf_adaptive(
+        self,
+        pdf_path: str,
+        preserve_layout: bool,
+        start_page: int,
+        end_page: Optional[int],
+    ) -> Dict[int, str]:
+        """
+        OCR страниц PDF с адаптивным DPI (см. _ocr_page_adaptive)
+        
+        Страницы распознаются параллельно потоками по числу обработчиков
+        бэкенда. Документ fitz не потокобезопасен, поэтому каждый поток
+        открывает PDF сам.
+        """
+        results = {}
+        self.last_page_stats = []
+        
+        doc = fitz.open(pdf_path)
+        last_page = len(doc) if end_page is None else min(end_page, len(doc))
+        doc.close()
+        total = max(0, last_page - start_page)
+        
+        print(f"   🔍 OCR распознавание {total} страниц (адаптивный DPI {self.min_dpi}-{self.dpi})...")
+        
+        local = threading.local()
+        docs = []
+        docs_lock = threading.Lock()
+        
+        def recognize(page_num: int) -> Tuple[str, PageOCRStats]:
+            thread_doc = getattr(local, 'doc', None)
+            if thread_doc is None:
+                thread_doc = local.doc = fitz.open(pdf_path)
+                with docs_lock:
+                    docs.append(thread_doc)
+            return self._ocr_page_adaptive(thread_doc[page_num], page_num, preserve_layout)
+        
+        workers = max(1, min(getattr(self.backend, 'workers', 1), total))
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                pages = pool.map(recognize, range(start_page, last_page))
+                for i, (text, stats) in enumerate(pages):
+                    results[stats.page_num] = text
+                    self.last_page_stats.append(stats)
+                    
+                    if (i + 1) % 10 == 0:
+                        print(f"      Обработано {i + 1}/{total} страниц")
+        finally:
+            for thread_doc in docs:
+                thread_doc.close()
+        
+        rerendered = sum(stats.rerendered for stats in self.last_page_stats)
+        print(f"   ✅ OCR завершен ({len(results)} страниц, повторно с {self.dpi} DPI: {rerendered})")
+        
+        return results
+    
+    def _ocr_page_adaptive(
+        self,
+        page,
+        page_num: int,
+        preserve_layout: bool = True,
+    ) -> Tuple[str, PageOCRStats]:
+        """
+        Распознает страницу PDF с адаптивным DPI
+        
+        1. Растеризация с min_dpi и оценка высоты строк
+        2. Для мелкого шрифта - растеризация с DPI, при котором строка
+           достигает TARGET_TEXT_HEIGHT пикселей (не выше dpi)
+        3. При уверенности ниже min_confidence - повтор с dpi,
+           используется более уверенный результат
+        """
+        start = time.perf_counter()
+        
+        dpi = self.min_dpi
+        image, info = self._prepare_page(page, dpi)
+        
+        if info.text_height == 0:
+            # Пустая страница - распознавать нечего
+            return "", PageOCRStats(page_num, dpi, 0.0, 0.0, False, time.perf_counter() - start)
+        
+        if info.text_height < self.TARGET_TEXT_HEIGHT:
+            needed_dpi = min(self.dpi, int(round(dpi * self.TARGET_TEXT_HEIGHT / info.text_height)))
+            if needed_dpi > dpi:
+                dpi = needed_dpi
+                image, info = self._prepare_page(page, dpi, info.skew_angle)
+        
+        layout = self._recognize_layout(image, preserve_layout, dpi)
+        rerendered = False
+        
+        if layout.confidence < self.min_confidence and dpi < self.dpi:
+            image, info = self._prepare_page(page, self.dpi, info.skew_angle)
+            high_dpi_layout = self._recognize_layout(image, preserve_layout, self.dpi)
+            rerendered = True
+            
+            if high_dpi_layout.confidence >= layout.confidence:
+                layout = high_dpi_layout
+                dpi = self.dpi
+        
+        return layout.text, PageOCRStats(
+            page_num=page_num,
+            dpi=dpi,
+            text_height=info.text_height,
+            confidence=layout.confidence,
+            rerendered=rerendered,
+            seconds=time.perf_counter() - start,
+        )
+    
+    def _prepare_page(self, page, dpi: int, skew_angle: Optional[float] = None):
+        """Растеризует страницу PDF в оттенках серого и предобрабатывает"""
+        pixmap = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        image = Image.frombytes("L", (pixmap.width, pixmap.height), pixmap.samples)
+        
+        return preprocess_page(
+            image,
+            to_binary=self.preprocess,
+            fix_skew=self.preprocess,
+            crop=self.preprocess,
+            skew_angle=skew_angle,
+        )
+    
+    def _recognize_layout(
+        self,
+        image: Image.Image,
+        preserve_layout: bool = True,
+        dpi: Optional[int] = None,
+    ) -> OCRLayout:
+        """Распознает подготовленную страницу (растеризованную с dpi) с разметкой и уверенностью"""
+        data = self.backend.image_to_data(
+            image,
+            psm=PSM_SINGLE_BLOCK if preserve_layout else PSM_AUTO,
+            dpi=dpi
+        )
+        return OCRLayout.from_tesseract(data)
+    
+    def render_page_images(
+        self,
+        pdf_path: str,
+        dpi: int = 36,
+        start_page: int = 0,
+        end_page: Optional[int] = None,
+    ) -> List[Image.Image]:
+        """
+        Растеризует страницы PDF в изображения в оттенках серого
+        
+        Низкий DPI по умолчанию достаточен для перцептивных хэшей
+        и CLIP (вход 224x224) и на порядки быстрее OCR-растеризации.
+        
+        Args:
+            pdf_path: Путь к PDF файлу
+            dpi: Разрешение растеризации
+            start_page: Начальная страница (0-indexed)
+            end_page: Конечная страница (None = до конца)
+            
+        Returns:
+            Список PIL.Image по страницам
+        """
+        return list(self.iter_page_images(pdf_path, dpi, start_page, end_page))
+    
+    def iter_page_images(
+        self,
+        pdf_path: str,
+        dpi: int = 36,
+        start_page: int = 0,
+        end_page: Optional[int] = None,
+    ) -> Iterator[Image.Image]:
+        """
+        Растеризует страницы PDF по одной (см. render_page_images)
+        
+        Страница отдается сразу после растеризации: потребитель
+        (VisualSimilarityEngine.fingerprint) обрабатывает том, не
+        накапливая изображения всех страниц.
+        """
+        doc = fitz.open(pdf_path)
+        try:
+            last_page = len(doc) if end_page is None else min(end_page, len(doc))
+            
+            for page_num in range(start_page, last_page):
+                pixmap = doc[page_num].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+                yield Image.frombytes(
+                    "L",
+                    (pixmap.width, pixmap.height),
+                    pixmap.samples
+                )
+        finally:
+            doc.close()
+    
+    def extract_layout(self, image: Union[str, Image.Image]) -> OCRLayout:
+        """
+        Распознает страницу с разметкой слов, строк и блоков
+        
+        Args:
+            image: Путь к изображению или PIL.Image
+            
+        Returns:
+            OCRLayout: текст страницы и массивы смещений, уверенности и рамок
+        """
+        # Загружаем изображение
+        if isinstance(image, str):
+            img = Image.open(image)
+        else:
+            img = image
+        
+        # Получаем детальные данные OCR
+        data = self.backend.image_to_data(img)
+        
+        return OCRLayout.from_tesseract(data)
+    
     def extract_structured_data(
         self,
         image: Union[str, Image.Image]
@@ -179,77 +551,117 @@ class OCREngine:
             {
                 'text': полный текст,
                 'lines': список строк,
-                'words': список слов,
-                'confidence': уровень уверенности
+                'words': слова ({'text', 'confidence', 'bbox'}, создаются при обращении),
+                'confidence': уровень уверенности,
+                'layout': OCRLayout с колоночными данными
             }
         """
-        # Загружаем изображение
-        if isinstance(image, str):
-            img = Image.open(image)
-        else:
-            img = image
+        layout = self.extract_layout(image)
         
-        # Получаем детальные данные OCR
-        data = pytesseract.image_to_data(
-            img,
-            lang=self.languages,
-            output_type=pytesseract.Output.DICT
-        )
+        return {
+            'text': ' '.join(layout.lines),
+            'lines': layout.lines,
+            'words': layout.word_records(),
+            'confidence': layout.confidence,
+            'layout': layout,
+        }
+    
+    def ocr_pdf_resumable(
+        self,
+        pdf_path: str,
+        manifest: OCRManifest,
+        preserve_layout: bool = True,
+        start_page: int = 0,
+        end_page: Optional[int] = None,
+        chunk_pages: int = 8,
+    ) -> Dict[int, str]:
+        """
+        Извлекает текст из PDF с возобновлением по манифесту
         
-        # Фильтруем пустые блоки
-        words = []
-        confidences = []
-        
-        for i in range(len(data['text'])):
-            if data['text'][i].strip():
-                words.append({
-                    'text': data['text'][i],
-                    'confidence': data['conf'][i],
-                    'bbox': (
-                        data['left'][i],
-                        data['top'][i],
-                        data['width'][i],
-                        data['height'][i]
-                    )
-                })
-                confidences.append(data['conf'][i])
+        Распознаются только страницы, которых нет в манифесте; результаты
+        дописываются после каждых chunk_pages страниц, так что после сбоя
+        теряется не больше одной порции.
         
-        # Полный текст
-        full_text = ' '.join([w['text'] for w in words])
+        Args:
+            pdf_path: Путь к PDF файлу
+            manifest: Манифест директории результатов
+            preserve_layout: Сохранять структуру документа
+            start_page: Начальная страница (0-indexed)
+            end_page: Конечная страница (None = до конца)
+            chunk_pages: Страниц в одной порции (пакет EasyOCR / пула Tesseract)
+            
+        Returns:
+            Словарь {номер_страницы: текст} для диапазона
+        """
+        pdf_name = os.path.basename(pdf_path)
+        
+        if manifest.is_complete(pdf_path):
+            done = manifest.load_pages(pdf_name)
+        else:
+            doc = fitz.open(pdf_path)
+            total_pages = len(doc)
+            doc.close()
+            done = manifest.begin(pdf_path, total_pages)
+        
+        pending = manifest.pending_pages(pdf_name, done, start_page, end_page)
+        if done:
+            print(f"   ⏩ Уже распознано {len(done)} страниц, осталось {len(pending)}")
         
-        # Средняя уверенность
-        avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+        for run_start, run_end in page_runs(pending, chunk_pages):
+            # Текстовый слой или OCR - по каждой странице. Отмечаются только
+            # страницы с результатом (пустой результат OCR - тоже результат);
+            # пропущенные останутся в очереди следующего запуска
+            texts = self.extract_text_from_pdf(pdf_path, preserve_layout, run_start, run_end)
+            manifest.record_pages(pdf_name, texts)
+            done.update(texts)
         
+        if not manifest.pending_pages(pdf_name, done):
+            manifest.mark_complete(pdf_name)
+        
+        last_page = manifest.entries[pdf_name]['pages'] if end_page is None else end_page
         return {
-            'text': full_text,
-            'words': words,
-            'confidence': avg_confidence,
+            page_num: text
+            for page_num, text in sorted(done.items())
+            if start_page <= page_num < last_page
         }
     
     def batch_process_pdfs(
         self,
         pdf_paths: List[str],
         output_dir: Optional[str] = None,
+        resume: bool = True,
+        keep_results: bool = True,
     ) -> Dict[str, Dict[int, str]]:
         """
         Пакетная обработка нескольких PDF файлов
         
+        С output_dir и resume страницы учитываются в манифесте
+        (см. OCRManifest): прерванный запуск продолжается с
+        нераспознанных страниц, готовые тома не распознаются заново.
+        
         Args:
             pdf_paths: Список путей к PDF
             output_dir: Директория для сохранения результатов (опционально)
+            resume: Продолжать по манифесту в output_dir
+            keep_results: Возвращать тексты (False - только сохранять на диск,
+                тексты томов не накапливаются в памяти)
             
         Returns:
-            {pdf_name: {page_num: text}}
+            {pdf_name: {page_num: text}} (пустые словари при keep_results=False)
         """
         all_results = {}
+        manifest = OCRManifest(output_dir) if output_dir and resume else None
         
         for pdf_path in pdf_paths:
             pdf_name = os.path.basename(pdf_path)
             print(f"\n📄 Обработка: {pdf_name}")
             
             try:
-                results = self.extract_text_from_pdf(pdf_path)
-                all_results[pdf_name] = results
+                if manifest is not None:
+                    results = self.ocr_pdf_resumable(pdf_path, manifest)
+                else:
+                    results = self.extract_text_from_pdf(pdf_path)
+                all_results[pdf_name] = results if keep_results else {}
                 
                 # Сохраняем результаты если указана директория
                 if output_dir:
@@ -0,0 +1,266 @@
+"""
+Колоночное представление результатов OCR с разметкой страницы
+
+Вместо списка словарей на каждое слово страница хранится как текст
+и набор массивов NumPy: смещения слов в тексте, уверенность, рамки,
+номера строк и блоков. Для страницы 300 DPI с тысячами слов это на
+порядок меньше памяти, а массивы сериализуются в Arrow/Parquet
+и загружаются обратно без копирования.
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Dict, List
+import numpy as np
+
+
+# Колонки слов в Arrow/Parquet
+_COLUMNS = ('starts', 'ends', 'confidences', 'line_ids', 'block_ids')
+_BOX_COLUMNS = ('left', 'top', 'width', 'height')
+
+
+def _require_pyarrow():
+    """Импортирует pyarrow (опциональная зависимость)"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(
+            "Для Arrow/Parquet установите pyarrow: pip install pyarrow"
+        )
+    return pyarrow
+
+
+@dataclass
+class OCRLayout:
+    """
+    Слова страницы в колоночном виде
+    
+    Текст страницы: слова строки через пробел, строки через перевод
+    строки, абзацы и блоки Tesseract через пустую строку (как в
+    image_to_string). Слово i - text[starts[i]:ends[i]].
+    """
+    text: str
+    starts: np.ndarray  # int32 [n] начало слова в text
+    ends: np.ndarray  # int32 [n] конец слова в text
+    confidences: np.ndarray  # float32 [n] уверенность Tesseract (0-100)
+    boxes: np.ndarray  # uint16 [n, 4] left, top, width, height
+    line_ids: np.ndarray  # int32 [n] номер строки на странице (с 0)
+    block_ids: np.ndarray  # int32 [n] номер блока Tesseract
+    
+    def __len__(self) -> int:
+        return len(self.starts)
+    
+    @classmethod
+    def empty(cls) -> "OCRLayout":
+        """Пустая страница"""
+        return cls(
+            text="",
+            starts=np.zeros(0, dtype=np.int32),
+            ends=np.zeros(0, dtype=np.int32),
+            confidences=np.zeros(0, dtype=np.float32),
+            boxes=np.zeros((0, 4), dtype=np.uint16),
+            line_ids=np.zeros(0, dtype=np.int32),
+            block_ids=np.zeros(0, dtype=np.int32),
+        )
+    
+    @classmethod
+    def from_tesseract(cls, data: Dict[str, list]) -> "OCRLayout":
+        """
+        Строит разметку из результата pytesseract.image_to_data
+        
+        Args:
+            data: Результат image_to_data(..., output_type=Output.DICT)
+                или ocr_backends (тот же формат)
+        """
+        texts = data['text']
+        keep = np.fromiter(
+            (bool(text and not text.isspace()) for text in texts),
+            dtype=bool,
+            count=len(texts)
+        )
+        if not keep.any():
+            return cls.empty()
+        
+        words = [text.strip() for text, kept in zip(texts, keep) if kept]
+        
+        def column(name: str, dtype) -> np.ndarray:
+            return np.asarray(data[name], dtype=np.float64)[keep].astype(dtype)
+        
+        block_nums = column('block_num', np.int32)
+        par_nums = column('par_num', np.int32)
+        line_nums = column('line_num', np.int32)
+        
+        # Новый абзац - при смене номера блока или абзаца, новая строка - еще и строки
+        new_paragraph = np.ones(len(words), dtype=bool)
+        new_paragraph[1:] = (
+            (block_nums[1:] != block_nums[:-1])
+            | (par_nums[1:] != par_nums[:-1])
+        )
+        new_line = new_paragraph.copy()
+        new_line[1:] |= line_nums[1:] != line_nums[:-1]
+        line_ids = (np.cumsum(new_line) - 1).astype(np.int32)
+        
+        # Разделитель перед словом: пустая строка между абзацами (как в
+        # image_to_string), перевод строки между строками, иначе пробел
+        separators = [
+            '\n\n' if paragraph else '\n' if line else ' '
+            for paragraph, line in zip(new_paragraph.tolist(), new_line.tolist())
+        ]
+        separators[0] = ''
+        
+        lengths = np.fromiter((len(word) for word in words), dtype=np.int32, count=len(words))
+        separator_lengths = np.fromiter((len(sep) for sep in separators), dtype=np.int32, count=len(words))
+        starts = np.cumsum(separator_lengths + np.concatenate([[0], lengths[:-1]])).astype(np.int32)
+        text = ''.join(separator + word for separator, word in zip(separators, words))
+        
+        boxes = np.stack(
+            [np.clip(column(name, np.int64), 0, 65535) for name in _BOX_COLUMNS],
+            axis=1
+        ).astype(np.uint16)
+        
+        return cls(
+            text=text,
+            starts=starts,
+            ends=starts + lengths,
+            confidences=column('conf', np.float32),
+            boxes=boxes,
+            line_ids=line_ids,
+            block_ids=block_nums,
+        )
+    
+    @property
+    def words(self) -> List[str]:
+        """Слова страницы"""
+        text = self.text
+        return [text[start:end] for start, end in zip(self.starts.tolist(), self.ends.tolist())]
+    
+    @property
+    def lines(self) -> List[str]:
+        """Строки страницы (без пустых строк между абзацами)"""
+        return [line for line in self.text.split('\n') if line]
+    
+    @property
+    def confidence(self) -> float:
+        """Средняя уверенность распознавания"""
+        if len(self) == 0:
+            return 0.0
+        return float(self.confidences.mean())
+    
+    @property
+    def nbytes(self) -> int:
+        """Объем памяти разметки (текст в UTF-8 и массивы)"""
+        arrays = (self.starts, self.ends, self.confidences, self.boxes, self.line_ids, self.block_ids)
+        return len(self.text.encode('utf-8')) + sum(array.nbytes for array in arrays)
+    
+    def line_boxes(self) -> np.ndarray:
+        """
+        Рамки строк
+        
+        Returns:
+            Массив int32 [число_строк, 4]: left, top, width, height
+        """
+        if len(self) == 0:
+            return np.zeros((0, 4), dtype=np.int32)
+        
+        boxes = self.boxes.astype(np.int32)
+        right = boxes[:, 0] + boxes[:, 2]
+        bottom = boxes[:, 1] + boxes[:, 3]
+        
+        # Слова одной строки идут подряд
+        first = np.flatnonzero(np.diff(self.line_ids, prepend=-1))
+        left = np.minimum.reduceat(boxes[:, 0], first)
+        top = np.minimum.reduceat(boxes[:, 1], first)
+        
+        return np.stack([
+            left,
+            top,
+            np.maximum.reduceat(right, first) - left,
+            np.maximum.reduceat(bottom, first) - top,
+        ], axis=1)
+    
+    def block_text(self, block_id: int) -> str:
+        """Текст блока Tesseract"""
+        indices = np.flatnonzero(self.block_ids == block_id)
+        if len(indices) == 0:
+            return ""
+        return self.text[self.starts[indices[0]]:self.ends[indices[-1]]]
+    
+    def word_records(self) -> "WordRecords":
+        """Слова в виде словарей (совместимость с extract_structured_data)"""
+        return WordRecords(self)
+    
+    def to_arrow(self):
+        """
+        Таблица Arrow: по строке на слово, текст страницы - в метаданных схемы
+        """
+        pa = _require_pyarrow()
+        
+        columns = {name: getattr(self, name) for name in _COLUMNS}
+        for i, name in enumerate(_BOX_COLUMNS):
+            columns[name] = np.ascontiguousarray(self.boxes[:, i])
+        
+        table = pa.table(columns)
+        return table.replace_schema_metadata({b'text': self.text.encode('utf-8')})
+    
+    @classmethod
+    def from_arrow(cls, table) -> "OCRLayout":
+        """
+        Разметка из таблицы Arrow
+        
+        Колонки слов отображаются в NumPy без копирования.
+        """
+        metadata = table.schema.metadata or {}
+        
+        def column(name: str) -> np.ndarray:
+            return table.column(name).combine_chunks().to_numpy(zero_copy_only=True)
+        
+        return cls(
+            text=metadata.get(b'text', b'').decode('utf-8'),
+            starts=column('starts'),
+            ends=column('ends'),
+            confidences=column('confidences'),
+            boxes=np.stack([column(name) for name in _BOX_COLUMNS], axis=1),
+            line_ids=column('line_ids'),
+            block_ids=column('block_ids'),
+        )
+    
+    def save_parquet(self, path: str):
+        """Сохраняет разметку в Parquet"""
+        pa = _require_pyarrow()
+        pa.parquet.write_table(self.to_arrow(), path)
+    
+    @classmethod
+    def load_parquet(cls, path: str) -> "OCRLayout":
+        """Загружает разметку из Parquet (с memory-map файла)"""
+        pa = _require_pyarrow()
+        return cls.from_arrow(pa.parquet.read_table(path, memory_map=True))
+
+
+class WordRecords(Sequence):
+    """
+    Ленивая последовательность слов-словарей поверх OCRLayout
+    
+    Словарь слова создается только при обращении, поэтому код,
+    ожидающий список слов, не хранит тысячи словарей в памяти.
+    """
+    
+    def __init__(self, layout: OCRLayout):
+        self.layout = layout
+    
+    def __len__(self) -> int:
+        return len(self.layout)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        
+        layout = self.layout
+        left, top, width, height = (int(value) for value in layout.boxes[index])
+        return {
+            'text': layout.text[layout.starts[index]:layout.ends[index]],
+            'confidence': float(layout.confidences[index]),
+            'bbox': (left, top, width, height),
+        }
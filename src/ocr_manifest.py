@@ -0,0 +1,182 @@
+"""
+Манифест пакетного OCR
+
+Результаты распознавания дописываются постранично в JSONL рядом с
+итоговыми _ocr.txt: после сбоя повторный запуск распознает только
+страницы, которых нет в файле. Отдельный manifest.json отмечает
+полностью обработанные PDF - их страницы не перечитываются.
+
+Файлы в output_dir:
+    manifest.json          - {pdf_name: {"size", "mtime_ns", "pages", "complete"}}
+    <pdf_name>_pages.jsonl - {"page": n, "text": "..."} по строке на страницу
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+MANIFEST_FILE = "manifest.json"
+
+
+def file_signature(path: str) -> Tuple[int, int]:
+    """(размер, время изменения в нс) - как в case_pipeline.inputs_fingerprint"""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class OCRManifest:
+    """
+    Учет распознанных страниц в директории результатов
+    
+    Страница считается распознанной, когда ее строка целиком записана
+    в <pdf_name>_pages.jsonl (запись сбрасывается на диск сразу).
+    Оборванная при сбое последняя строка отбрасывается при чтении.
+    """
+    
+    def __init__(self, output_dir: str):
+        """
+        Args:
+            output_dir: Директория результатов (создается при необходимости)
+        """
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        
+        self._path = os.path.join(output_dir, MANIFEST_FILE)
+        self.entries: Dict[str, Dict[str, any]] = {}
+        if os.path.exists(self._path):
+            with open(self._path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+    
+    def pages_path(self, pdf_name: str) -> str:
+        """Путь к постраничному JSONL документа"""
+        return os.path.join(self.output_dir, f"{pdf_name}_pages.jsonl")
+    
+    def _save(self):
+        """Атомарная запись manifest.json"""
+        tmp_path = self._path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self._path)
+    
+    def _unchanged(self, entry: Optional[Dict[str, any]], pdf_path: str) -> bool:
+        """Файл совпадает с записанным в манифесте (размер и mtime)"""
+        return bool(entry) and (entry.get('size'), entry.get('mtime_ns')) == file_signature(pdf_path)
+    
+    def begin(self, pdf_path: str, total_pages: int) -> Dict[int, str]:
+        """
+        Начинает (или продолжает) обработку документа
+        
+        Если файл изменился (другой размер или время изменения),
+        прежние результаты отбрасываются. Замена тома файлом того же
+        размера (переснятый скан) тоже распознается заново.
+        
+        Args:
+            pdf_path: Путь к PDF
+            total_pages: Число страниц документа
+        
+        Returns:
+            Уже распознанные страницы {номер_страницы: текст}
+        """
+        pdf_name = os.path.basename(pdf_path)
+        
+        if not self._unchanged(self.entries.get(pdf_name), pdf_path):
+            if os.path.exists(self.pages_path(pdf_name)):
+                os.remove(self.pages_path(pdf_name))
+            size, mtime_ns = file_signature(pdf_path)
+            self.entries[pdf_name] = {
+                'size': size,
+                'mtime_ns': mtime_ns,
+                'pages': total_pages,
+                'complete': False,
+            }
+            self._save()
+            return {}
+        
+        return self.load_pages(pdf_name)
+    
+    def load_pages(self, pdf_name: str) -> Dict[int, str]:
+        """
+        Читает распознанные страницы документа
+        
+        Оборванная последняя строка (сбой во время записи) обрезается,
+        чтобы следующие записи начинались с новой строки.
+        """
+        path = self.pages_path(pdf_name)
+        pages: Dict[int, str] = {}
+        if not os.path.exists(path):
+            return pages
+        
+        valid_size = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                pages[record['page']] = record['text']
+                valid_size += len(line)
+        
+        if valid_size != os.path.getsize(path):
+            with open(path, 'r+b') as f:
+                f.truncate(valid_size)
+        
+        return pages
+    
+    def record_pages(self, pdf_name: str, texts: Dict[int, str]):
+        """Дописывает распознанные страницы и сбрасывает запись на диск"""
+        with open(self.pages_path(pdf_name), 'a', encoding='utf-8') as f:
+            for page_num in sorted(texts):
+                f.write(json.dumps({'page': page_num, 'text': texts[page_num]}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def pending_pages(
+        self,
+        pdf_name: str,
+        done: Iterable[int],
+        start_page: int = 0,
+        end_page: Optional[int] = None,
+    ) -> List[int]:
+        """
+        Нераспознанные страницы диапазона
+        
+        Args:
+            pdf_name: Документ
+            done: Распознанные страницы
+            start_page: Начальная страница (0-indexed)
+            end_page: Конечная страница (None = до конца документа)
+        """
+        total_pages = self.entries[pdf_name]['pages']
+        end_page = total_pages if end_page is None else min(end_page, total_pages)
+        
+        done_set: Set[int] = set(done)
+        return [page_num for page_num in range(start_page, end_page) if page_num not in done_set]
+    
+    def mark_complete(self, pdf_name: str):
+        """Отмечает документ полностью обработанным"""
+        self.entries[pdf_name]['complete'] = True
+        self._save()
+    
+    def is_complete(self, pdf_path: str) -> bool:
+        """Документ обработан целиком и с тех пор не менялся"""
+        entry = self.entries.get(os.path.basename(pdf_path))
+        return self._unchanged(entry, pdf_path) and bool(entry.get('complete'))
+
+
+def page_runs(pages: Iterable[int], max_run: int) -> List[Tuple[int, int]]:
+    """
+    Разбивает номера страниц на непрерывные диапазоны [start, end)
+    длиной не больше max_run
+    """
+    runs = []
+    for page_num in sorted(pages):
+        if runs and runs[-1][1] == page_num and runs[-1][1] - runs[-1][0] < max_run:
+            runs[-1][1] = page_num + 1
+        else:
+            runs.append([page_num, page_num + 1])
+    return [tuple(run) for run in runs]
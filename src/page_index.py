@@ -0,0 +1,365 @@
+"""
+Индекс приближенного поиска ближайших соседей по эмбеддингам страниц
+
+IVF (inverted file) на NumPy: эмбеддинги разбиваются на кластеры
+k-means, запрос сравнивается только со страницами из n_probe ближайших
+кластеров. Поиск визуально скопированных страниц перестает быть
+задачей сравнения всех пар.
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import os
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+
+class PageEmbeddingIndex:
+    """
+    IVF-индекс для CLIP эмбеддингов страниц
+    
+    Метрика - косинусное сходство (векторы нормируются при добавлении).
+    Векторы хранятся в float16, отсортированными по кластерам, поэтому
+    каждый кластер - непрерывный срез массива, пригодный для mmap.
+    """
+    
+    def __init__(
+        self,
+        dim: int,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        seed: int = 0,
+        retrain_factor: Optional[float] = 4.0,
+    ):
+        """
+        Инициализация индекса
+        
+        Args:
+            dim: Размерность эмбеддингов
+            n_lists: Количество кластеров (None = ~sqrt(N) при обучении)
+            n_probe: Количество просматриваемых кластеров при поиске
+            seed: Seed для k-means
+            retrain_factor: Переобучать кластеры, когда индекс вырастет
+                во столько раз от обучающей выборки (None - не переобучать)
+        """
+        self.dim = dim
+        self.n_lists = n_lists
+        self.requested_lists = n_lists
+        self.n_probe = n_probe
+        self.seed = seed
+        self.retrain_factor = retrain_factor
+        self.trained_size = 0  # количество векторов при последнем обучении
+        
+        self.centroids: Optional[np.ndarray] = None  # float32 [n_lists, dim]
+        self.vectors = np.zeros((0, dim), dtype=np.float16)  # отсортированы по кластерам
+        self.ids = np.zeros(0, dtype=np.int64)  # порядковые номера страниц для vectors
+        self.list_offsets = np.zeros(1, dtype=np.int64)  # границы кластеров в vectors
+        self.keys: List[str] = []  # ключи страниц по порядковому номеру
+        self._key_ids: Dict[str, int] = {}
+        
+        # Добавленные, но еще не разложенные по кластерам векторы: [(векторы, номера)]
+        self._pending: List[Tuple[np.ndarray, np.ndarray]] = []
+    
+    def __len__(self) -> int:
+        return len(self.keys)
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """Нормирует векторы для косинусного сходства"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+    
+    def train(self, vectors: np.ndarray, n_iter: int = 10):
+        """
+        Обучает кластеры k-means (сферический, по косинусу)
+        
+        Args:
+            vectors: Обучающие векторы [n, dim]
+            n_iter: Количество итераций k-means
+        """
+        vectors = self._normalize(vectors)
+        rng = np.random.default_rng(self.seed)
+        self.trained_size = len(vectors)
+        
+        n_lists = self.requested_lists or max(1, int(np.sqrt(len(vectors))))
+        n_lists = min(n_lists, len(vectors))
+        
+        # Для обучения достаточно подвыборки
+        if len(vectors) > 256 * n_lists:
+            vectors = vectors[rng.choice(len(vectors), 256 * n_lists, replace=False)]
+        
+        centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+        
+        for _ in range(n_iter):
+            assignment = (vectors @ centroids.T).argmax(axis=1)
+            
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, vectors)
+            counts = np.bincount(assignment, minlength=n_lists)
+            
+            # Пустые кластеры сохраняют прежний центр
+            filled = counts > 0
+            centroids[filled] = self._normalize(sums[filled])
+        
+        self.centroids = centroids
+        self.n_lists = n_lists
+        
+        # Уже добавленные векторы раскладываем по новым кластерам
+        if len(self.vectors):
+            self._pending.insert(0, (
+                np.asarray(self.vectors, dtype=np.float32),
+                np.asarray(self.ids)
+            ))
+            self.vectors = np.zeros((0, self.dim), dtype=np.float16)
+            self.ids = np.zeros(0, dtype=np.int64)
+        
+        self.list_offsets = np.zeros(self.n_lists + 1, dtype=np.int64)
+    
+    def add(self, vectors: np.ndarray, keys: List[str]):
+        """
+        Добавляет эмбеддинги страниц в индекс
+        
+        Args:
+            vectors: Эмбеддинги [n, dim]
+            keys: Ключи страниц (например, "prosecutor/том_1.pdf#12")
+        """
+        vectors = self._normalize(vectors)
+        
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Ожидалась размерность {self.dim}, получено {vectors.shape[1]}")
+        if len(vectors) != len(keys):
+            raise ValueError("Количество ключей должно совпадать с количеством векторов")
+        
+        ids = np.arange(len(self.keys), len(self.keys) + len(keys), dtype=np.int64)
+        self.keys.extend(keys)
+        self._pending.append((vectors, ids))
+    
+    def remove(self, keys: Iterable[str]) -> int:
+        """
+        Удаляет страницы из индекса (например, измененного документа)
+        
+        Кластеры не переобучаются; порядковые номера оставшихся страниц
+        сдвигаются, чтобы keys оставался плотным.
+        
+        Args:
+            keys: Ключи удаляемых страниц (неизвестные пропускаются)
+        
+        Returns:
+            Количество удаленных страниц
+        """
+        self._flush()
+        
+        positions = {key: i for i, key in enumerate(self.keys)}
+        removed = np.array(sorted({positions[key] for key in keys if key in positions}), dtype=np.int64)
+        if not len(removed):
+            return 0
+        
+        ids = np.asarray(self.ids)
+        keep = ~np.isin(ids, removed)
+        lists = np.repeat(np.arange(len(self.list_offsets) - 1), np.diff(self.list_offsets))[keep]
+        
+        # Новые номера: старый номер минус число удаленных перед ним
+        new_ids = ids[keep] - np.searchsorted(removed, ids[keep])
+        
+        self.vectors = np.asarray(self.vectors)[keep]
+        self.ids = new_ids
+        self.list_offsets = np.concatenate([
+            [0],
+            np.cumsum(np.bincount(lists, minlength=len(self.list_offsets) - 1))
+        ]).astype(np.int64)
+        
+        removed_set = set(removed.tolist())
+        self.keys = [key for i, key in enumerate(self.keys) if i not in removed_set]
+        self._key_ids = {}
+        
+        return len(removed)
+    
+    def _flush(self):
+        """Раскладывает добавленные векторы по кластерам"""
+        if not self._pending:
+            return
+        
+        # Кластеры, обученные на первых документах, не отражают выросший
+        # индекс: при росте в retrain_factor раз обучаем заново на всех векторах
+        total = len(self.vectors) + sum(len(vectors) for vectors, _ in self._pending)
+        if self.centroids is None or (
+            self.retrain_factor is not None
+            and total >= self.retrain_factor * self.trained_size
+        ):
+            self.train(np.concatenate(
+                [np.asarray(self.vectors, dtype=np.float32)]
+                + [vectors for vectors, _ in self._pending]
+            ))
+        
+        new_vectors = np.concatenate([vectors for vectors, _ in self._pending])
+        new_ids = np.concatenate([ids for _, ids in self._pending])
+        self._pending = []
+        
+        old_lists = np.repeat(np.arange(self.n_lists), np.diff(self.list_offsets))
+        new_lists = (new_vectors @ self.centroids.T).argmax(axis=1)
+        
+        lists = np.concatenate([old_lists, new_lists])
+        vectors = np.concatenate([np.asarray(self.vectors), new_vectors.astype(np.float16)])
+        ids = np.concatenate([np.asarray(self.ids), new_ids])
+        
+        order = np.argsort(lists, kind='stable')
+        self.vectors = vectors[order]
+        self.ids = ids[order]
+        self.list_offsets = np.concatenate([
+            [0],
+            np.cumsum(np.bincount(lists, minlength=self.n_lists))
+        ]).astype(np.int64)
+    
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int = 10,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ищет k ближайших страниц для каждого запроса
+        
+        Args:
+            queries: Эмбеддинги запросов [q, dim] или [dim]
+            k: Количество соседей
+        
+        Returns:
+            (scores [q, k], ids [q, k]) - косинусное сходство и порядковые
+            номера страниц; недостающие позиции заполнены -inf и -1
+        """
+        self._flush()
+        queries = self._normalize(queries)
+        
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        
+        if self.centroids is None:
+            return scores, ids
+        
+        n_probe = min(self.n_probe, self.n_lists)
+        probes = np.argpartition(-(queries @ self.centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+        
+        for q, query in enumerate(queries):
+            candidates = np.concatenate([
+                np.arange(self.list_offsets[l], self.list_offsets[l + 1])
+                for l in probes[q]
+            ])
+            if len(candidates) == 0:
+                continue
+            
+            candidate_scores = np.asarray(self.vectors[candidates], dtype=np.float32) @ query
+            
+            top = min(k, len(candidates))
+            best = np.argpartition(-candidate_scores, top - 1)[:top]
+            best = best[np.argsort(-candidate_scores[best])]
+            
+            scores[q, :top] = candidate_scores[best]
+            ids[q, :top] = self.ids[candidates[best]]
+        
+        return scores, ids
+    
+    def search_keys(self, query: np.ndarray, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Поиск для одного запроса с возвратом ключей страниц
+        
+        Returns:
+            [(ключ_страницы, сходство)] по убыванию сходства
+        """
+        scores, ids = self.search(query, k)
+        return [
+            (self.keys[i], float(s))
+            for s, i in zip(scores[0], ids[0])
+            if i >= 0
+        ]
+    
+    def reconstruct(self, key: str) -> np.ndarray:
+        """
+        Возвращает сохраненный (нормированный) эмбеддинг страницы по ключу
+        
+        Args:
+            key: Ключ страницы
+        
+        Returns:
+            Вектор float32 [dim]
+        """
+        self._flush()
+        
+        # Словарь ключей дополняется только новыми страницами
+        known = len(self._key_ids)
+        if known != len(self.keys):
+            self._key_ids.update(
+                (page_key, known + i)
+                for i, page_key in enumerate(self.keys[known:])
+            )
+        
+        if key not in self._key_ids:
+            raise KeyError(f"Страница не найдена в индексе: {key}")
+        page_id = self._key_ids[key]
+        
+        position = np.flatnonzero(np.asarray(self.ids) == page_id)[0]
+        return np.asarray(self.vectors[position], dtype=np.float32)
+    
+    def save(self, path: str):
+        """
+        Сохраняет индекс в директорию
+        
+        Массивы сохраняются в .npy, чтобы load мог открыть их через mmap.
+        """
+        self._flush()
+        os.makedirs(path, exist_ok=True)
+        
+        np.save(os.path.join(path, "vectors.npy"), np.asarray(self.vectors))
+        np.save(os.path.join(path, "ids.npy"), np.asarray(self.ids))
+        np.save(os.path.join(path, "list_offsets.npy"), self.list_offsets)
+        if self.centroids is not None:
+            np.save(os.path.join(path, "centroids.npy"), self.centroids)
+        
+        with open(os.path.join(path, "index.json"), 'w', encoding='utf-8') as f:
+            json.dump({
+                'dim': self.dim,
+                'n_lists': self.n_lists,
+                'n_probe': self.n_probe,
+                'seed': self.seed,
+                'requested_lists': self.requested_lists,
+                'retrain_factor': self.retrain_factor,
+                'trained_size': self.trained_size,
+                'keys': self.keys,
+            }, f, ensure_ascii=False)
+    
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "PageEmbeddingIndex":
+        """
+        Загружает индекс из директории
+        
+        Args:
+            path: Директория, созданная save()
+            mmap: Открыть векторы через memory-map без чтения в память
+        """
+        with open(os.path.join(path, "index.json"), encoding='utf-8') as f:
+            config = json.load(f)
+        
+        index = cls(
+            dim=config['dim'],
+            n_lists=config.get('requested_lists', config['n_lists']),
+            n_probe=config['n_probe'],
+            seed=config['seed'],
+            retrain_factor=config.get('retrain_factor', 4.0),
+        )
+        index.n_lists = config['n_lists']
+        index.keys = config['keys']
+        
+        mmap_mode = 'r' if mmap else None
+        index.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode=mmap_mode)
+        index.ids = np.load(os.path.join(path, "ids.npy"), mmap_mode=mmap_mode)
+        index.list_offsets = np.load(os.path.join(path, "list_offsets.npy"))
+        
+        centroids_path = os.path.join(path, "centroids.npy")
+        if os.path.exists(centroids_path):
+            index.centroids = np.load(centroids_path)
+        # Индексы, сохраненные до переобучения, считаются обученными на всех векторах
+        index.trained_size = config.get('trained_size', len(index.vectors))
+        
+        return index
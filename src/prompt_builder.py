@@ -0,0 +1,246 @@
+"""
+Сборка промптов с бюджетом токенов
+
+Промпты сфер собираются из неизменяемых частей (инструкции) и
+сжимаемых секций (текст документа, материалы дела). Бюджет токенов
+распределяется между секциями, а не помещающиеся секции сжимаются
+экстрактивно: сохраняются самые ценные фрагменты в исходном порядке.
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import math
+import re
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+# Границы фрагментов: конец предложения или перевод строки
+_PASSAGE_SPLIT = re.compile(r'(?<=[.!?;])\s+|\n+')
+_WORD = re.compile(r'\w{3,}')
+_DIGIT = re.compile(r'\d')
+
+
+class TokenCounter:
+    """
+    Подсчет токенов загруженным токенизатором с LRU-кэшем
+    
+    Фрагменты одних и тех же документов попадают в разные промпты,
+    поэтому повторная токенизация не выполняется.
+    """
+    
+    def __init__(self, tokenizer, cache_size: int = 8192):
+        """
+        Args:
+            tokenizer: Токенизатор HuggingFace
+            cache_size: Максимальное количество кэшированных текстов
+        """
+        self.tokenizer = tokenizer
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+    
+    def count(self, text: str) -> int:
+        """Количество токенов текста"""
+        cached = self._cache.get(text)
+        if cached is not None:
+            self._cache.move_to_end(text)
+            return cached
+        
+        tokens = len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+        
+        self._cache[text] = tokens
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        
+        return tokens
+    
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Обрезает текст до max_tokens токенов"""
+        if self.count(text) <= max_tokens:
+            return text
+        
+        token_ids = self.tokenizer(text, add_special_tokens=False)["input_ids"]
+        return self.tokenizer.decode(token_ids[:max_tokens], skip_special_tokens=True)
+
+
+def split_passages(text: str) -> List[str]:
+    """Разбивает текст на фрагменты (предложения и строки)"""
+    return [p.strip() for p in _PASSAGE_SPLIT.split(text) if p and p.strip()]
+
+
+def rank_passages(passages: List[str], query: Optional[str] = None) -> List[float]:
+    """
+    Оценивает ценность фрагментов для экстрактивного сжатия
+    
+    Оценка - сумма TF-IDF терминов фрагмента (редкие в секции слова
+    информативнее шаблонных), с бонусом за слова запроса и за числа
+    (даты, суммы, номера статей), нормированная на длину.
+    """
+    terms = [Counter(w.lower() for w in _WORD.findall(p)) for p in passages]
+    
+    document_frequency = Counter()
+    for passage_terms in terms:
+        document_frequency.update(passage_terms.keys())
+    
+    query_terms = set(w.lower() for w in _WORD.findall(query or ""))
+    n = len(passages)
+    
+    scores = []
+    for passage, passage_terms in zip(passages, terms):
+        if not passage_terms:
+            scores.append(0.0)
+            continue
+        
+        score = 0.0
+        for term, tf in passage_terms.items():
+            weight = math.log(1 + n / document_frequency[term])
+            if term in query_terms:
+                weight *= 3.0
+            score += tf * weight
+        
+        if _DIGIT.search(passage):
+            score *= 1.2
+        
+        scores.append(score / math.sqrt(sum(passage_terms.values())))
+    
+    return scores
+
+
+@dataclass
+class _Part:
+    """Часть промпта"""
+    text: str
+    fixed: bool
+    weight: float = 1.0
+    query: Optional[str] = None
+
+
+class PromptBuilder:
+    """
+    Сборщик промпта с бюджетом токенов
+    
+    Пример:
+        builder = PromptBuilder(counter, budget=384)
+        builder.add_fixed("Документ содержит:\\n")
+        builder.add_section(text, query=question)
+        builder.add_fixed("\\nОтвет следователя:\\n")
+        prompt = builder.build()
+    """
+    
+    # Разделитель пропущенных фрагментов
+    ELLIPSIS = " … "
+    
+    def __init__(self, counter: TokenCounter, budget: int):
+        """
+        Args:
+            counter: Счетчик токенов
+            budget: Бюджет токенов на весь промпт
+        """
+        self.counter = counter
+        self.budget = budget
+        self.parts: List[_Part] = []
+    
+    def add_fixed(self, text: str) -> "PromptBuilder":
+        """Добавляет неизменяемую часть (инструкции, заголовки)"""
+        self.parts.append(_Part(text=text, fixed=True))
+        return self
+    
+    def add_section(
+        self,
+        text: str,
+        weight: float = 1.0,
+        query: Optional[str] = None,
+    ) -> "PromptBuilder":
+        """
+        Добавляет сжимаемую секцию
+        
+        Args:
+            text: Текст секции
+            weight: Доля бюджета относительно других секций
+            query: Запрос, фрагменты с терминами которого ценнее
+        """
+        self.parts.append(_Part(text=text, fixed=False, weight=weight, query=query))
+        return self
+    
+    def _allocate(self, available: int, sections: List[_Part]) -> List[int]:
+        """
+        Распределяет бюджет между секциями пропорционально весам
+        
+        Секциям, которым нужно меньше доли, выдается ровно нужное,
+        а излишек перераспределяется между остальными.
+        """
+        needs = [self.counter.count(part.text) for part in sections]
+        allocation = [0] * len(sections)
+        open_sections = set(range(len(sections)))
+        
+        while open_sections and available > 0:
+            total_weight = sum(sections[i].weight for i in open_sections)
+            shares = {
+                i: int(available * sections[i].weight / total_weight)
+                for i in open_sections
+            }
+            
+            satisfied = [i for i in open_sections if needs[i] <= shares[i]]
+            if not satisfied:
+                for i in open_sections:
+                    allocation[i] = shares[i]
+                break
+            
+            for i in satisfied:
+                allocation[i] = needs[i]
+                available -= needs[i]
+                open_sections.remove(i)
+        
+        return allocation
+    
+    def compress(self, text: str, max_tokens: int, query: Optional[str] = None) -> str:
+        """
+        Экстрактивно сжимает текст до max_tokens токенов
+        
+        Фрагменты выбираются по убыванию ценности, пока помещаются
+        в бюджет, без повторов, и выводятся в исходном порядке.
+        """
+        if max_tokens <= 0:
+            return ""
+        if self.counter.count(text) <= max_tokens:
+            return text
+        
+        passages = split_passages(text)
+        scores = rank_passages(passages, query)
+        separator_tokens = self.counter.count(self.ELLIPSIS)
+        
+        selected = []
+        seen = set()
+        used = 0
+        for i in sorted(range(len(passages)), key=lambda i: -scores[i]):
+            # Повторяющиеся фрагменты (шаблонные фразы) не дублируем
+            if passages[i] in seen:
+                continue
+            
+            tokens = self.counter.count(passages[i]) + separator_tokens
+            if used + tokens <= max_tokens:
+                selected.append(i)
+                seen.add(passages[i])
+                used += tokens
+        
+        if not selected:
+            # Ни один фрагмент целиком не помещается - обрезаем лучший
+            best = max(range(len(passages)), key=lambda i: scores[i]) if passages else None
+            return self.counter.truncate(passages[best], max_tokens) if best is not None else ""
+        
+        return self.ELLIPSIS.join(passages[i] for i in sorted(selected))
+    
+    def build(self) -> str:
+        """Собирает промпт в пределах бюджета"""
+        fixed_tokens = sum(self.counter.count(p.text) for p in self.parts if p.fixed)
+        sections = [p for p in self.parts if not p.fixed]
+        
+        allocation = self._allocate(max(0, self.budget - fixed_tokens), sections)
+        budgets = dict(zip(map(id, sections), allocation))
+        
+        return ''.join(
+            part.text if part.fixed
+            else self.compress(part.text, budgets[id(part)], part.query)
+            for part in self.parts
+        )
@@ -0,0 +1,152 @@
+"""
+Кэш ответов для детерминированных вызовов сфер
+
+Повторные проверки неизменившихся дел выполняют те же промпты.
+Для жадного или сэмплирования с фиксированным seed ответ однозначно
+определяется промптом, изображением, моделью, адаптером и параметрами
+декодирования, поэтому его можно взять из кэша.
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class ResponseCache:
+    """
+    Кэш ответов с вытеснением LRU и сроком жизни записей (TTL)
+    
+    Хранится в SQLite: на диске (path) или в памяти (path=None).
+    Безопасен для использования из нескольких потоков.
+    """
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: int = 10000,
+        ttl_seconds: Optional[float] = 30 * 24 * 3600,
+    ):
+        """
+        Args:
+            path: Файл SQLite для сохранения между запусками (None - только в памяти)
+            max_entries: Максимальное количество записей
+            ttl_seconds: Срок жизни записи в секундах (None - бессрочно)
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        
+        self.hits = 0
+        self.misses = 0
+        
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+        )
+        self._db.commit()
+    
+    @staticmethod
+    def make_key(
+        prompt: str,
+        image_digest: Optional[str],
+        model: str,
+        adapter: Optional[str],
+        params: Dict[str, Any],
+    ) -> str:
+        """
+        Ключ кэша
+        
+        Промпт нормализуется (пробелы схлопываются), поэтому различия
+        в отступах шаблонов не приводят к промахам.
+        """
+        payload = json.dumps({
+            'prompt': _WHITESPACE.sub(' ', prompt).strip(),
+            'image': image_digest,
+            'model': model,
+            'adapter': adapter,
+            'params': params,
+        }, ensure_ascii=False, sort_keys=True)
+        
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Возвращает ответ из кэша или None"""
+        now = time.time()
+        
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            
+            if row is None:
+                self.misses += 1
+                return None
+            
+            response, created = row
+            
+            if self.ttl_seconds is not None and now - created > self.ttl_seconds:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                self.misses += 1
+                return None
+            
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+        
+        return response
+    
+    def put(self, key: str, response: str):
+        """Сохраняет ответ и вытесняет давно не использованные записи"""
+        now = time.time()
+        
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created, accessed) "
+                "VALUES (?, ?, ?, ?)",
+                (key, response, now, now)
+            )
+            
+            if self.ttl_seconds is not None:
+                self._db.execute(
+                    "DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,)
+                )
+            
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._db.commit()
+    
+    def clear(self):
+        """Очищает кэш"""
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    
+    def close(self):
+        """Закрывает соединение с базой"""
+        with self._lock:
+            self._db.close()
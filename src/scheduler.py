@@ -0,0 +1,173 @@
+"""
+Асинхронный планировщик генерации
+
+Запросы к модели из разных корутин собираются в микро-пакеты и
+выполняются через batch_chat в отдельном потоке. Пока модель генерирует,
+цикл событий продолжает OCR и сравнение документов.
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+
+class GenerationScheduler:
+    """
+    Планировщик генерации с микро-пакетами и ограничением параллелизма
+    
+    Все вызовы модели выполняются в одном рабочем потоке: модель не
+    используется одновременно из нескольких потоков. Запросы, пришедшие
+    в пределах max_wait_ms, объединяются в один batch_chat (по группам
+    одинаковых параметров генерации).
+    
+    Пример:
+        scheduler = GenerationScheduler(model)
+        answers = await asyncio.gather(
+            scheduler.submit("Вопрос 1"),
+            scheduler.submit("Вопрос 2"),
+        )
+    """
+    
+    def __init__(
+        self,
+        model,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        max_pending: int = 64,
+    ):
+        """
+        Args:
+            model: Модель с методом batch_chat (MultimodalBraindler)
+            max_batch_size: Максимальный размер микро-пакета
+            max_wait_ms: Сколько ждать остальные запросы пакета
+            max_pending: Максимум запросов в очереди и в работе
+                (остальные ждут в submit)
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_pending = max_pending
+        
+        self.batches = 0
+        self.requests = 0
+        
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+    
+    def _ensure_started(self):
+        """Запускает обработчик очереди в текущем цикле событий"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._worker is not None and not self._worker.done():
+            return
+        
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="generation")
+        
+        # Очередь и семафор привязаны к циклу событий
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(self.max_pending)
+        self._worker = loop.create_task(self._run())
+    
+    async def submit(self, prompt: str, image=None, **generate_kwargs) -> str:
+        """
+        Ставит запрос в очередь и ждет ответ
+        
+        Args:
+            prompt: Текстовый запрос
+            image: Опциональное изображение
+            **generate_kwargs: Параметры batch_chat (max_new_tokens,
+                temperature, stop_strings, ...)
+        
+        Returns:
+            Ответ модели
+        """
+        self._ensure_started()
+        
+        async with self._semaphore:
+            future = self._loop.create_future()
+            await self._queue.put((prompt, image, generate_kwargs, future))
+            return await future
+    
+    async def _collect_batch(self) -> List[tuple]:
+        """Ждет первый запрос и добирает пакет в течение max_wait_ms"""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait_ms / 1000.0
+        
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        
+        return batch
+    
+    async def _run(self):
+        """Обработчик очереди: выполняет микро-пакеты по одному"""
+        while True:
+            batch = await self._collect_batch()
+            
+            # Пакет генерируется с общими параметрами - группируем запросы
+            groups: Dict[Any, List[tuple]] = {}
+            for request in batch:
+                key = repr(sorted(request[2].items()))
+                groups.setdefault(key, []).append(request)
+            
+            for requests in groups.values():
+                await self._generate(requests)
+    
+    async def _generate(self, requests: List[tuple]):
+        """Выполняет группу запросов одним batch_chat"""
+        requests = [request for request in requests if not request[3].cancelled()]
+        if not requests:
+            return
+        
+        prompts = [prompt for prompt, _, _, _ in requests]
+        images = [image for _, image, _, _ in requests]
+        generate_kwargs = requests[0][2]
+        
+        self.batches += 1
+        self.requests += len(requests)
+        
+        try:
+            responses = await self._loop.run_in_executor(
+                self._executor,
+                partial(
+                    self.model.batch_chat,
+                    prompts,
+                    images=images,
+                    batch_size=len(prompts),
+                    **generate_kwargs
+                )
+            )
+        except Exception as e:
+            for _, _, _, future in requests:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, _, _, future), response in zip(requests, responses):
+            if not future.done():
+                future.set_result(response)
+    
+    async def aclose(self):
+        """Останавливает обработчик очереди и рабочий поток"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
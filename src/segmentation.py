@@ -0,0 +1,293 @@
+"""
+Разбиение текста на блоки для поиска копипаста
+
+Блоки задаются массивами смещений, а не копиями строк: текст один раз
+переводится в массив кодов символов, по нему находятся границы слов
+и абзацев (np.diff по маске пробелов), а стратегии режут эти массивы.
+Результат - np.ndarray [блоков, 2] с полуинтервалами [начало, конец)
+без пробелов по краям.
+
+Стратегии:
+    paragraph - абзацы ('\\n\\n') набираются в блок до block_size символов
+                (как прежний LegalDocumentAnalyzer._split_into_blocks)
+    sentence  - то же по предложениям; подходит для OCR без пустых строк
+    window    - скользящее окно block_size символов с шагом stride
+    tokens    - окна фиксированного числа слов с шагом stride
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+from bisect import bisect_left
+from typing import Dict, Optional, Tuple, Type
+import numpy as np
+
+
+# Таблицы по коду символа: пробельный (str.isspace), конец предложения
+# (все пробельные символы Unicode меньше U+3001)
+_IS_SPACE = np.zeros(0x110000, dtype=bool)
+_IS_SPACE[[code for code in range(0x3001) if chr(code).isspace()]] = True
+_IS_SENTENCE_END = np.zeros(0x110000, dtype=bool)
+_IS_SENTENCE_END[[ord(c) for c in '.!?…']] = True
+_NEWLINE = 10
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Начала и концы серий True в булевой маске"""
+    padded = np.zeros(len(mask) + 2, dtype=bool)
+    padded[1:-1] = mask
+    changes = np.flatnonzero(padded[1:] != padded[:-1])
+    return np.ascontiguousarray(changes[0::2]), np.ascontiguousarray(changes[1::2])
+
+
+class TextOffsets:
+    """
+    Массивы смещений текста: слова и переводы строк
+    
+    Строится один раз на текст (например, все документы стороны),
+    после чего блоки режутся для любых диапазонов [start, end).
+    """
+    
+    def __init__(self, text: str):
+        self.length = len(text)
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        
+        # Слова: непрерывные участки без пробелов
+        self.token_starts, self.token_ends = _runs(~_IS_SPACE[codes])
+        
+        # Конец предложения: слово, оканчивающееся на . ! ? …
+        self.sentence_ends = _IS_SENTENCE_END[codes[self.token_ends - 1]]
+        
+        # Серии переводов строк: из них получаются разделители абзацев
+        self.newline_starts, self.newline_ends = _runs(codes == _NEWLINE)
+    
+    def tokens(self, start: int, end: int) -> Tuple[int, int]:
+        """Индексы слов [first, last) внутри диапазона"""
+        first = int(np.searchsorted(self.token_starts, start, side='left'))
+        last = int(np.searchsorted(self.token_ends, end, side='right'))
+        return first, max(first, last)
+    
+    def paragraph_separators(self, start: int, end: int) -> np.ndarray:
+        """
+        Позиции разделителей '\\n\\n' в диапазоне
+        
+        Как str.split('\\n\\n') для text[start:end]: серия из L переводов
+        строк дает L // 2 разделителей слева направо.
+        """
+        first = int(np.searchsorted(self.newline_ends, start, side='right'))
+        last = int(np.searchsorted(self.newline_starts, end, side='left'))
+        run_starts = np.maximum(self.newline_starts[first:last], start)
+        run_ends = np.minimum(self.newline_ends[first:last], end)
+        
+        counts = (run_ends - run_starts) // 2
+        if not counts.sum():
+            return np.zeros(0, dtype=np.int64)
+        
+        # Разделитель k серии: начало серии + 2k
+        run_index = np.repeat(np.arange(len(counts)), counts)
+        within = np.arange(len(run_index)) - np.repeat(np.cumsum(counts) - counts, counts)
+        return run_starts[run_index] + 2 * within
+    
+    def trim(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """
+        Спаны [начало, конец) без пробелов по краям; пустые удаляются
+        
+        Как str.strip() для text[start:end]: слово на границе спана обрезается.
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        first = np.searchsorted(self.token_ends, starts, side='right')
+        last = np.searchsorted(self.token_starts, ends, side='left') - 1
+        keep = (first <= last) & (first < len(self.token_starts)) & (starts < ends)
+        if not keep.any():
+            return np.zeros((0, 2), dtype=np.int64)
+        
+        return np.stack([
+            np.maximum(self.token_starts[first[keep]], starts[keep]),
+            np.minimum(self.token_ends[last[keep]], ends[keep]),
+        ], axis=1).astype(np.int64)
+    
+    def snap(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Спаны, суженные до целых слов; пустые удаляются"""
+        first = np.searchsorted(self.token_starts, starts, side='left')
+        last = np.searchsorted(self.token_ends, ends, side='right') - 1
+        keep = (first <= last) & (first < len(self.token_starts))
+        if not keep.any():
+            return np.zeros((0, 2), dtype=np.int64)
+        
+        return np.stack([
+            self.token_starts[first[keep]],
+            self.token_ends[last[keep]],
+        ], axis=1).astype(np.int64)
+
+
+def _greedy_blocks(unit_starts: np.ndarray, unit_ends: np.ndarray, block_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Набирает единицы (абзацы, предложения) в блоки
+    
+    Блок с единицы i включает ее и следующие, пока конец единицы
+    отстоит от начала блока меньше чем на block_size. Цикл идет по
+    блокам, следующий блок находится бинарным поиском.
+    """
+    unit_starts = unit_starts.tolist()
+    unit_ends = unit_ends.tolist()
+    
+    starts, ends = [], []
+    i = 0
+    while i < len(unit_starts):
+        block_start = unit_starts[i]
+        j = max(i + 1, bisect_left(unit_ends, block_start + block_size))
+        starts.append(block_start)
+        ends.append(unit_ends[j - 1])
+        i = j
+    return np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64)
+
+
+class Segmenter:
+    """Стратегия разбиения: segment() возвращает спаны [блоков, 2]"""
+    
+    name = ""
+    
+    def segment(self, offsets: TextOffsets, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        raise NotImplementedError
+    
+    def split(self, text: str) -> np.ndarray:
+        """Спаны блоков текста"""
+        return self.segment(TextOffsets(text))
+
+
+class ParagraphSegmenter(Segmenter):
+    """Абзацы, набранные в блоки до block_size символов"""
+    
+    name = "paragraph"
+    
+    def __init__(self, block_size: int = 500):
+        self.block_size = block_size
+    
+    def segment(self, offsets: TextOffsets, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        end = offsets.length if end is None else end
+        separators = offsets.paragraph_separators(start, end)
+        
+        unit_starts = np.concatenate([[start], separators + 2]).astype(np.int64)
+        unit_ends = np.concatenate([separators, [end]]).astype(np.int64)
+        
+        return offsets.trim(*_greedy_blocks(unit_starts, unit_ends, self.block_size))
+
+
+class SentenceSegmenter(Segmenter):
+    """
+    Предложения, набранные в блоки до block_size символов
+    
+    Предложение заканчивается словом на . ! ? … или абзацем.
+    """
+    
+    name = "sentence"
+    
+    def __init__(self, block_size: int = 500):
+        self.block_size = block_size
+    
+    def segment(self, offsets: TextOffsets, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        end = offsets.length if end is None else end
+        first, last = offsets.tokens(start, end)
+        if first == last:
+            return np.zeros((0, 2), dtype=np.int64)
+        
+        token_ends = offsets.token_ends[first:last]
+        is_end = offsets.sentence_ends[first:last].copy()
+        is_end[-1] = True
+        
+        # Граница абзаца тоже завершает предложение
+        separators = offsets.paragraph_separators(start, end)
+        before_separator = np.searchsorted(token_ends, separators, side='right') - 1
+        is_end[before_separator[before_separator >= 0]] = True
+        
+        last_tokens = np.flatnonzero(is_end)
+        first_tokens = np.concatenate([[0], last_tokens[:-1] + 1])
+        
+        return offsets.trim(*_greedy_blocks(
+            offsets.token_starts[first + first_tokens],
+            token_ends[last_tokens],
+            self.block_size,
+        ))
+
+
+class WindowSegmenter(Segmenter):
+    """Скользящее окно block_size символов с шагом stride (по границам слов)"""
+    
+    name = "window"
+    
+    def __init__(self, block_size: int = 500, stride: Optional[int] = None):
+        self.block_size = block_size
+        self.stride = stride or max(1, block_size // 2)
+    
+    def segment(self, offsets: TextOffsets, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        end = offsets.length if end is None else end
+        first, last = offsets.tokens(start, end)
+        if first == last:
+            return np.zeros((0, 2), dtype=np.int64)
+        
+        text_start = int(offsets.token_starts[first])
+        text_end = int(offsets.token_ends[last - 1])
+        
+        # Окна до первого, которое доходит до конца текста
+        count = max(0, -(-(text_end - text_start - self.block_size) // self.stride)) + 1
+        window_starts = text_start + self.stride * np.arange(count, dtype=np.int64)
+        window_ends = np.minimum(window_starts + self.block_size, text_end)
+        
+        # Окно сужается до целых слов; совпавшие после сужения окна удаляются
+        spans = offsets.snap(window_starts, window_ends)
+        return np.unique(spans, axis=0) if len(spans) else spans
+
+
+class TokenWindowSegmenter(Segmenter):
+    """Окна по tokens слов с шагом stride слов"""
+    
+    name = "tokens"
+    
+    def __init__(self, tokens: int = 80, stride: Optional[int] = None):
+        self.tokens = tokens
+        self.stride = stride or tokens
+    
+    def segment(self, offsets: TextOffsets, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        end = offsets.length if end is None else end
+        first, last = offsets.tokens(start, end)
+        count = last - first
+        if not count:
+            return np.zeros((0, 2), dtype=np.int64)
+        
+        # Окна до первого, которое доходит до последнего слова
+        windows = max(0, -(-(count - self.tokens) // self.stride)) + 1
+        window_first = first + self.stride * np.arange(windows, dtype=np.int64)
+        window_last = np.minimum(window_first + self.tokens, last) - 1
+        
+        return np.stack([
+            offsets.token_starts[window_first],
+            offsets.token_ends[window_last],
+        ], axis=1).astype(np.int64)
+
+
+SEGMENTERS: Dict[str, Type[Segmenter]] = {
+    segmenter.name: segmenter
+    for segmenter in (ParagraphSegmenter, SentenceSegmenter, WindowSegmenter, TokenWindowSegmenter)
+}
+
+
+def make_segmenter(strategy: str = "paragraph", block_size: int = 500, **kwargs) -> Segmenter:
+    """
+    Стратегия разбиения по имени
+    
+    Args:
+        strategy: paragraph, sentence, window или tokens
+        block_size: Размер блока в символах; для tokens - число слов
+            (block_size // 6, если tokens не задан явно)
+        **kwargs: Параметры стратегии (stride, tokens)
+    """
+    if strategy not in SEGMENTERS:
+        raise ValueError(
+            f"Неизвестная стратегия разбиения: {strategy} (доступны: {', '.join(SEGMENTERS)})"
+        )
+    
+    if strategy == "tokens":
+        kwargs.setdefault("tokens", max(1, block_size // 6))
+        return TokenWindowSegmenter(**kwargs)
+    
+    return SEGMENTERS[strategy](block_size=block_size, **kwargs)
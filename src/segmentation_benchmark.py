@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк стратегий разбиения текста на блоки
+
+Сравнивает прежнее разбиение склейкой строк с массивами смещений
+(segmentation.py) по времени и пиковой памяти (tracemalloc) на
+текстовых файлах или синтетическом тексте: с абзацами и в стиле OCR
+без пустых строк.
+
+Запуск:
+    python -m src.segmentation_benchmark текст1.txt текст2.txt --block-size 500
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import random
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+from .segmentation import SEGMENTERS, TextOffsets, make_segmenter
+
+
+@dataclass
+class SegmentationBenchmarkResult:
+    """Результат одной стратегии на одном тексте"""
+    text_name: str
+    strategy: str
+    blocks: int
+    seconds: float
+    peak_bytes: int
+    mean_block: float  # Средняя длина блока (символов)
+
+
+def legacy_split(text: str, block_size: int) -> List[str]:
+    """Прежний LegalDocumentAnalyzer._split_into_blocks (склейка строк)"""
+    blocks = []
+    current_block = ""
+    
+    for para in text.split('\n\n'):
+        if len(current_block) + len(para) < block_size:
+            current_block += para + '\n\n'
+        else:
+            if current_block.strip():
+                blocks.append(current_block.strip())
+            current_block = para + '\n\n'
+    
+    if current_block.strip():
+        blocks.append(current_block.strip())
+    
+    return blocks
+
+
+def synthetic_texts(chars: int = 2_000_000, seed: int = 0) -> Dict[str, str]:
+    """Синтетический текст дела: с абзацами и сплошной (OCR без пустых строк)"""
+    rng = random.Random(seed)
+    words = (
+        "свидетель показал что видел автомобиль около дома подозреваемый "
+        "пояснил вечером находился квартире протокол допроса следователь "
+        "установил обстоятельства уголовного дела постановление"
+    ).split()
+    
+    sentences = []
+    length = 0
+    while length < chars:
+        sentence = ' '.join(rng.choice(words) for _ in range(rng.randint(6, 20))).capitalize() + '.'
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    
+    paragraphs = [' '.join(sentences[i:i + 4]) for i in range(0, len(sentences), 4)]
+    return {
+        'абзацы': '\n\n'.join(paragraphs),
+        'ocr_без_абзацев': '\n'.join(paragraphs),
+    }
+
+
+def _measure(function: Callable[[], list], repeat: int = 3) -> tuple:
+    """(результат, лучшее время, пиковая память); память - в отдельном прогоне"""
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        seconds = min(seconds, time.perf_counter() - start)
+        del result
+    
+    tracemalloc.start()
+    result = function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def run_segmentation_benchmark(
+    texts: Dict[str, str],
+    block_size: int = 500,
+) -> List[SegmentationBenchmarkResult]:
+    """
+    Измеряет все стратегии на каждом тексте
+    
+    Для стратегий на смещениях время и память включают построение
+    TextOffsets (в анализаторе оно выполняется один раз на сторону).
+    """
+    results = []
+    
+    for text_name, text in texts.items():
+        blocks, seconds, peak = _measure(lambda: legacy_split(text, block_size))
+        results.append(SegmentationBenchmarkResult(
+            text_name=text_name,
+            strategy='legacy',
+            blocks=len(blocks),
+            seconds=seconds,
+            peak_bytes=peak,
+            mean_block=sum(map(len, blocks)) / len(blocks) if blocks else 0.0,
+        ))
+        del blocks
+        
+        for strategy in SEGMENTERS:
+            segmenter = make_segmenter(strategy, block_size)
+            spans, seconds, peak = _measure(lambda: segmenter.segment(TextOffsets(text)))
+            lengths = spans[:, 1] - spans[:, 0] if len(spans) else []
+            results.append(SegmentationBenchmarkResult(
+                text_name=text_name,
+                strategy=strategy,
+                blocks=len(spans),
+                seconds=seconds,
+                peak_bytes=peak,
+                mean_block=float(sum(lengths) / len(lengths)) if len(lengths) else 0.0,
+            ))
+    
+    return results
+
+
+def print_benchmark(results: List[SegmentationBenchmarkResult]):
+    """Печатает таблицу результатов"""
+    print("\n" + "=" * 78)
+    print(f"{'Текст':<18}{'Стратегия':<12}{'Блоков':>9}{'Время, с':>11}{'Пик, МБ':>10}{'Ср. блок':>10}")
+    print("=" * 78)
+    for result in results:
+        print(
+            f"{result.text_name[:17]:<18}{result.strategy:<12}{result.blocks:>9}"
+            f"{result.seconds:>11.3f}{result.peak_bytes / 2**20:>10.1f}{result.mean_block:>10.0f}"
+        )
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    
+    parser = argparse.ArgumentParser(
+        description="Бенчмарк стратегий разбиения текста на блоки"
+    )
+    parser.add_argument(
+        "text_paths",
+        nargs="*",
+        help="Текстовые файлы (по умолчанию - синтетический текст)"
+    )
+    parser.add_argument(
+        "--block-size",
+        type=int,
+        default=500,
+        help="Размер блока (символов)"
+    )
+    parser.add_argument(
+        "--chars",
+        type=int,
+        default=2_000_000,
+        help="Размер синтетического текста (символов)"
+    )
+    
+    args = parser.parse_args()
+    
+    if args.text_paths:
+        texts = {}
+        for path in args.text_paths:
+            with open(path, encoding='utf-8') as f:
+                texts[os.path.basename(path)] = f.read()
+    else:
+        texts = synthetic_texts(args.chars)
+    
+    print_benchmark(run_segmentation_benchmark(texts, args.block_size))
@@ -0,0 +1,178 @@
+"""
+Структурный отпечаток документа
+
+Документ сводится к последовательности символов по абзацам:
+заголовок (с учетом его текста), пункт перечня, нумерованный пункт,
+обычный абзац (с корзиной длины). Скопированный документ сохраняет
+структуру, даже если текст отредактирован, поэтому сходство
+отпечатков - дешевый сигнал, какие пары документов стоит выравнивать
+дорогим посимвольным сравнением.
+
+Отпечатки сравниваются отношением Левенштейна над строками символов
+(выравнивание последовательностей на C) и кэшируются по содержимому
+документа.
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import re
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Tuple
+from Levenshtein import ratio as levenshtein_ratio
+
+
+_NUMBERED = re.compile(r'^\s*(?:\d{1,3}[.)](?:\d{1,3}[.)]?)*|[IVXLC]{1,5}[.)])\s+\S')
+_LISTED = re.compile(r'^\s*(?:[-*•–—]|[а-яa-z]\))\s+\S')
+_SPACES = re.compile(r'\s+')
+
+# Символы отпечатка: фиксированные типы и диапазон для заголовков
+_LIST_ITEM = '•'
+_CLAUSE = '№'
+_PARAGRAPH_BASE = 0x2460  # Абзацы: по корзине длины
+_HEADING_BASE = 0x4E00  # Заголовки: по хэшу текста (4096 значений)
+
+
+def _is_heading(paragraph: str) -> bool:
+    """Короткая строка прописными или с двоеточием в конце ("УСТАНОВИЛ:")"""
+    if '\n' in paragraph or len(paragraph) > 80:
+        return False
+    letters = [c for c in paragraph if c.isalpha()]
+    if not letters:
+        return False
+    uppercase = sum(c.isupper() for c in letters) / len(letters)
+    return uppercase > 0.8 or (paragraph.endswith(':') and len(paragraph) <= 40)
+
+
+def paragraph_symbol(paragraph: str) -> str:
+    """Символ отпечатка для абзаца"""
+    paragraph = paragraph.strip()
+    
+    if _is_heading(paragraph):
+        key = _SPACES.sub(' ', paragraph.lower().replace('ё', 'е'))
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=2).digest()
+        return chr(_HEADING_BASE + int.from_bytes(digest, 'little') % 4096)
+    
+    if _NUMBERED.match(paragraph):
+        return _CLAUSE
+    if _LISTED.match(paragraph):
+        return _LIST_ITEM
+    
+    # Корзина длины: 0-63, 64-127, 128-255, ... символов
+    bucket = min(max(len(paragraph).bit_length() - 6, 0), 15)
+    return chr(_PARAGRAPH_BASE + bucket)
+
+
+@dataclass
+class StructureFingerprint:
+    """Отпечаток структуры документа"""
+    symbols: str  # Символ на абзац
+    headings: int
+    clauses: int
+    list_items: int
+    
+    def __len__(self) -> int:
+        return len(self.symbols)
+    
+    def similarity(self, other: "StructureFingerprint") -> float:
+        """Сходство структуры (0-1): отношение Левенштейна последовательностей"""
+        if not self.symbols and not other.symbols:
+            return 0.0
+        return levenshtein_ratio(self.symbols, other.symbols)
+
+
+def fingerprint_text(text: str) -> StructureFingerprint:
+    """Отпечаток текста (абзацы разделены пустой строкой или нумерацией)"""
+    paragraphs = []
+    for block in text.split('\n\n'):
+        # Заголовки, пункты и перечни внутри блока - отдельные абзацы
+        current = []
+        for line in block.split('\n'):
+            if not line.strip():
+                continue
+            if _is_heading(line.strip()):
+                if current:
+                    paragraphs.append('\n'.join(current))
+                paragraphs.append(line)
+                current = []
+                continue
+            if current and (_NUMBERED.match(line) or _LISTED.match(line)):
+                paragraphs.append('\n'.join(current))
+                current = []
+            current.append(line)
+        if current:
+            paragraphs.append('\n'.join(current))
+    
+    symbols = ''.join(paragraph_symbol(paragraph) for paragraph in paragraphs)
+    return StructureFingerprint(
+        symbols=symbols,
+        headings=sum(ord(symbol) >= _HEADING_BASE for symbol in symbols),
+        clauses=symbols.count(_CLAUSE),
+        list_items=symbols.count(_LIST_ITEM),
+    )
+
+
+class StructureFingerprinter:
+    """
+    Отпечатки документов с кэшем по содержимому
+    
+    Повторный анализ того же дела (или тех же томов в другом деле)
+    не пересчитывает отпечатки.
+    """
+    
+    def __init__(self, max_cache: int = 10000):
+        self.max_cache = max_cache
+        self._cache: Dict[bytes, StructureFingerprint] = {}
+    
+    def fingerprint(self, pages: Mapping[int, str]) -> StructureFingerprint:
+        """Отпечаток документа {страница: текст}"""
+        return self.fingerprint_text('\n\n'.join(pages[page_num] for page_num in sorted(pages)))
+    
+    def fingerprint_text(self, text: str) -> StructureFingerprint:
+        """Отпечаток текста (с кэшем)"""
+        key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+        
+        fingerprint = self._cache.get(key)
+        if fingerprint is None:
+            fingerprint = fingerprint_text(text)
+            if len(self._cache) >= self.max_cache:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[key] = fingerprint
+        
+        return fingerprint
+    
+    def fingerprint_documents(
+        self,
+        documents: Mapping[str, Mapping[int, str]],
+    ) -> Dict[str, StructureFingerprint]:
+        """Отпечатки всех документов {файл: {страница: текст}}"""
+        return {name: self.fingerprint(pages) for name, pages in documents.items()}
+
+
+def rank_document_pairs(
+    fingerprints1: Dict[str, StructureFingerprint],
+    fingerprints2: Dict[str, StructureFingerprint],
+    min_paragraphs: int = 3,
+    top_k: Optional[int] = None,
+) -> List[Tuple[str, str, float]]:
+    """
+    Пары документов, упорядоченные по сходству структуры
+    
+    Args:
+        fingerprints1: Отпечатки первой стороны
+        fingerprints2: Отпечатки второй стороны
+        min_paragraphs: Более короткие документы не ранжируются
+        top_k: Вернуть только лучшие пары
+    
+    Returns:
+        [(файл1, файл2, сходство 0-1)] по убыванию сходства
+    """
+    pairs = [
+        (name1, name2, fingerprint1.similarity(fingerprint2))
+        for name1, fingerprint1 in fingerprints1.items()
+        if len(fingerprint1) >= min_paragraphs
+        for name2, fingerprint2 in fingerprints2.items()
+        if len(fingerprint2) >= min_paragraphs
+    ]
+    pairs.sort(key=lambda pair: pair[2], reverse=True)
+    return pairs[:top_k] if top_k is not None else pairs
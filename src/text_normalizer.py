@@ -0,0 +1,269 @@
+"""
+Нормализация текста OCR перед сравнением
+
+Сырой вывод OCR сравнивается плохо: переносы слов, лигатуры, лишние
+пробелы, колонтитулы и латинские буквы-двойники в русских словах
+(латинская "o" вместо "о") дают ложные различия и удлиняют строки.
+Нормализация выполняется один раз на страницу: таблицы str.translate
+и регулярные выражения компилируются при импорте модуля.
+
+Границы абзацев ('\\n\\n') сохраняются - по ним текст делится на блоки.
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import re
+from collections import Counter
+from typing import Callable, Dict, List, Mapping, Optional
+
+
+# Латинские двойники кириллических букв (заменяются только в словах с кириллицей)
+_HOMOGLYPHS = str.maketrans(
+    "AaBCcEeHKMOoPpTXxy",
+    "АаВСсЕеНКМОоРрТХху",
+)
+
+# Лигатуры, невидимые символы, варианты пробелов, тире и кавычек, ё
+_CHARACTERS = str.maketrans({
+    '\ufb00': 'ff',
+    '\ufb01': 'fi',
+    '\ufb02': 'fl',
+    '\ufb03': 'ffi',
+    '\ufb04': 'ffl',
+    '\u00ad': None,  # Мягкий перенос
+    '\u200b': None,  # Пробелы нулевой ширины
+    '\u200c': None,
+    '\u200d': None,
+    '\ufeff': None,
+    '\u00a0': ' ',  # Неразрывные и узкие пробелы
+    '\u2009': ' ',
+    '\u202f': ' ',
+    '\u2010': '-',  # Дефисы и тире
+    '\u2011': '-',
+    '\u2012': '-',
+    '\u2013': '-',
+    '\u2014': '-',
+    '\u2212': '-',
+    '\u00ab': '"',  # Кавычки
+    '\u00bb': '"',
+    '\u201c': '"',
+    '\u201d': '"',
+    '\u201e': '"',
+    '\u2018': "'",
+    '\u2019': "'",
+    'ё': 'е',
+    'Ё': 'Е',
+})
+
+# Замены _CHARACTERS один к одному и пробельные символы: сохраняют длину текста
+_SAME_LENGTH = str.maketrans({
+    **{
+        chr(code): replacement
+        for code, replacement in _CHARACTERS.items()
+        if replacement is not None and len(replacement) == 1
+    },
+    '\t': ' ',
+    '\f': ' ',
+    '\v': ' ',
+    '\r': '\n',
+})
+
+_LETTERS = 'А-Яа-яЁёA-Za-z'
+
+# Слова со смесью кириллицы и латиницы
+_MIXED_WORD = re.compile(
+    rf'(?<![{_LETTERS}])(?=[{_LETTERS}]*[А-Яа-яЁё])(?=[{_LETTERS}]*[A-Za-z])[{_LETTERS}]+'
+)
+
+# Слова только из латинских двойников ("o", "OOO") - кириллица на русской странице
+_HOMOGLYPH_WORD = re.compile(rf'(?<![{_LETTERS}])[AaBCcEeHKMOoPpTXxy]+(?![{_LETTERS}])')
+_CYRILLIC = re.compile(r'[А-Яа-яЁё]')
+_LATIN = re.compile(r'[A-Za-z]')
+
+# Перенос слова в конце строки: "дока-\nзательство"
+_HYPHENATION = re.compile(rf'([{_LETTERS}])-[ \t]*\n[ \t]*([а-яёa-z])')
+
+_SPACES = re.compile(r'[ \t\f\v]+')
+_TRAILING_SPACES = re.compile(r' *\n *')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+# Строки-номера страниц: "12", "- 12 -", "стр. 12", "Лист 12", "12 из 300"
+_PAGE_NUMBER_LINE = re.compile(
+    r'^\s*(?:(?:стр\.?|страница|лист|л\.)\s*)?[-–]?\s*\d{1,4}\s*[-–]?\s*(?:из\s+\d{1,4})?\s*$',
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+def fix_homoglyphs(text: str) -> str:
+    """
+    Заменяет латинские двойники кириллических букв
+    
+    В словах со смесью алфавитов - всегда; слова целиком из двойников
+    ("o", "OOO") - только если на странице кириллицы больше, чем латиницы.
+    """
+    text = _MIXED_WORD.sub(lambda match: match.group(0).translate(_HOMOGLYPHS), text)
+    
+    if len(_CYRILLIC.findall(text)) > len(_LATIN.findall(text)):
+        text = _HOMOGLYPH_WORD.sub(lambda match: match.group(0).translate(_HOMOGLYPHS), text)
+    
+    return text
+
+
+def canonical_chars(text: str) -> str:
+    """
+    Замены символов нормализации, сохраняющие длину текста
+    
+    Исходный текст OCR в таком виде выравнивается с нормализованным
+    (см. block_alignment.PageOffsetMap): отличаются только удаленные
+    и вставленные символы, а смещения совпадают с исходными.
+    """
+    return fix_homoglyphs(text.translate(_SAME_LENGTH))
+
+
+def normalize_text(text: str, dehyphenate: bool = True) -> str:
+    """
+    Канонический текст страницы
+    
+    Args:
+        text: Текст OCR
+        dehyphenate: Склеивать слова, перенесенные через дефис
+    
+    Returns:
+        Нормализованный текст (абзацы разделены '\\n\\n')
+    """
+    text = text.translate(_CHARACTERS)
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    text = fix_homoglyphs(text)
+    
+    if dehyphenate:
+        text = _HYPHENATION.sub(r'\1\2', text)
+    
+    text = _SPACES.sub(' ', text)
+    text = _TRAILING_SPACES.sub('\n', text)
+    text = _BLANK_LINES.sub('\n\n', text)
+    
+    return text.strip()
+
+
+def strip_page_numbers(text: str) -> str:
+    """Удаляет строки, состоящие только из номера страницы"""
+    return _PAGE_NUMBER_LINE.sub('', text)
+
+
+def _edge_lines(text: str, edge_lines: int) -> List[str]:
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    return lines[:edge_lines] + lines[-edge_lines:]
+
+
+def find_running_headers(
+    pages: List[str],
+    edge_lines: int = 2,
+    min_share: float = 0.5,
+    min_pages: int = 3,
+) -> set:
+    """
+    Колонтитулы документа: строки у краев страницы, повторяющиеся
+    на большинстве страниц
+    
+    Args:
+        pages: Нормализованные тексты страниц документа
+        edge_lines: Сколько строк сверху и снизу проверять
+        min_share: Минимальная доля страниц с этой строкой
+        min_pages: Меньше страниц - колонтитулы не ищутся
+    """
+    if len(pages) < min_pages:
+        return set()
+    
+    counts = Counter()
+    for text in pages:
+        counts.update(set(_edge_lines(text, edge_lines)))
+    
+    threshold = max(2, min_share * len(pages))
+    return {line for line, count in counts.items() if count >= threshold}
+
+
+def _remove_lines(text: str, lines: set) -> str:
+    if not lines:
+        return text
+    kept = [line for line in text.split('\n') if line.strip() not in lines]
+    return _BLANK_LINES.sub('\n\n', '\n'.join(kept)).strip()
+
+
+class TextNormalizer:
+    """
+    Нормализация страниц документа с колонтитулами
+    
+    Результат кэшируется по тексту страницы: одинаковые страницы
+    (копии документов) нормализуются один раз.
+    """
+    
+    def __init__(
+        self,
+        dehyphenate: bool = True,
+        strip_headers: bool = True,
+        cache_size: int = 4096,
+    ):
+        """
+        Args:
+            dehyphenate: Склеивать слова, перенесенные через дефис
+            strip_headers: Удалять номера страниц и колонтитулы
+            cache_size: Размер кэша нормализованных страниц
+        """
+        self.dehyphenate = dehyphenate
+        self.strip_headers = strip_headers
+        self.cache_size = cache_size
+        self._cache: Dict[str, str] = {}
+    
+    def normalize_page(self, text: str) -> str:
+        """Нормализует одну страницу (с кэшем)"""
+        cached = self._cache.get(text)
+        if cached is not None:
+            return cached
+        
+        normalized = normalize_text(text, self.dehyphenate)
+        if self.strip_headers:
+            normalized = _BLANK_LINES.sub('\n\n', strip_page_numbers(normalized)).strip()
+        
+        if len(self._cache) >= self.cache_size:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[text] = normalized
+        
+        return normalized
+    
+    def normalize_document(self, pages: Mapping[int, str]) -> Dict[int, str]:
+        """Нормализует страницы документа и удаляет его колонтитулы"""
+        page_nums = sorted(pages)
+        texts = [self.normalize_page(pages[page_num]) for page_num in page_nums]
+        
+        if self.strip_headers:
+            headers = find_running_headers(texts)
+            texts = [_remove_lines(text, headers) for text in texts]
+        
+        return dict(zip(page_nums, texts))
+    
+    def normalize_documents(
+        self,
+        documents: Mapping[str, Mapping[int, str]],
+        collect: Optional[Callable] = None,
+    ):
+        """
+        Нормализует все документы {файл: {страница: текст}}
+        
+        Args:
+            documents: Документы {файл: {страница: текст}}
+            collect: collect(страницы, имена_документов) собирает поток
+                (файл, страница, текст) - например, CaseTextStore.from_pages;
+                по умолчанию - вложенные словари
+        """
+        if collect is None:
+            return {name: self.normalize_document(pages) for name, pages in documents.items()}
+        
+        # В памяти - нормализованные страницы одного документа
+        return collect(
+            (
+                (name, page_num, text)
+                for name, pages in documents.items()
+                for page_num, text in self.normalize_document(pages).items()
+            ),
+            list(documents),
+        )
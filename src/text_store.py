@@ -0,0 +1,354 @@
+"""
+Компактное хранилище текста дела
+
+Вместо вложенных словарей {файл: {страница: текст}} страницы всех
+документов хранятся в одном буфере UTF-8 со смещениями:
+
+    data        - uint8, тексты страниц подряд
+    offsets     - int64 [страниц + 1], границы страниц в data
+    page_nums   - int32, номер страницы в документе
+    doc_offsets - int64 [документов + 1], диапазоны страниц документов
+
+Буферы открываются через mmap, отдаются в Arrow без копирования
+(LargeString), а срезы документов разделяют те же буферы. Для кода,
+работающего со словарями, хранилище - Mapping[файл, Mapping[страница, текст]]
+с декодированием страниц по запросу.
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import os
+import json
+from collections.abc import Mapping
+from typing import Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+
+
+def _require_pyarrow():
+    """Импортирует pyarrow (опциональная зависимость)"""
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(
+            "Для Arrow установите pyarrow: pip install pyarrow"
+        ) from e
+    return pyarrow
+
+
+class DocumentPages(Mapping):
+    """Страницы одного документа: Mapping[номер_страницы, текст] поверх буфера"""
+    
+    def __init__(self, store: "CaseTextStore", doc_index: int):
+        self._store = store
+        self._first = int(store.doc_offsets[doc_index])
+        self._last = int(store.doc_offsets[doc_index + 1])
+    
+    def __len__(self) -> int:
+        return self._last - self._first
+    
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._store.page_nums[self._first:self._last].tolist())
+    
+    def _position(self, page_num: int) -> int:
+        page_nums = self._store.page_nums[self._first:self._last]
+        position = int(np.searchsorted(page_nums, page_num))
+        if position == len(page_nums) or page_nums[position] != page_num:
+            raise KeyError(page_num)
+        return self._first + position
+    
+    def __getitem__(self, page_num: int) -> str:
+        return self._store.page_text(self._position(page_num))
+    
+    def __contains__(self, page_num) -> bool:
+        try:
+            self._position(page_num)
+        except (KeyError, TypeError):
+            return False
+        return True
+    
+    def page_bytes(self, page_num: int) -> memoryview:
+        """UTF-8 байты страницы без копирования"""
+        return self._store.page_bytes(self._position(page_num))
+
+
+class CaseTextStore(Mapping):
+    """
+    Тексты страниц дела в одном буфере UTF-8
+    
+    Страницы документа упорядочены по номеру. Смещения абсолютные
+    (в data), поэтому срез документов - это срез массивов смещений
+    над тем же буфером.
+    """
+    
+    def __init__(
+        self,
+        data: np.ndarray,
+        offsets: np.ndarray,
+        page_nums: np.ndarray,
+        doc_offsets: np.ndarray,
+        doc_names: List[str],
+    ):
+        self.data = data
+        self.offsets = offsets
+        self.page_nums = page_nums
+        self.doc_offsets = doc_offsets
+        self.doc_names = list(doc_names)
+        self._doc_index = {name: i for i, name in enumerate(self.doc_names)}
+    
+    @classmethod
+    def from_documents(cls, documents: Mapping) -> "CaseTextStore":
+        """
+        Хранилище из результатов OCR {файл: {страница: текст}}
+        
+        Тексты кодируются сразу в общий буфер; промежуточная
+        склейка в одну строку не создается.
+        """
+        return cls.from_pages(
+            (
+                (name, page_num, pages[page_num])
+                for name, pages in documents.items()
+                for page_num in sorted(pages)
+            ),
+            doc_names=list(documents.keys()),
+        )
+    
+    @classmethod
+    def from_pages(
+        cls,
+        pages: Iterable[Tuple[str, int, str]],
+        doc_names: Optional[List[str]] = None,
+    ) -> "CaseTextStore":
+        """
+        Хранилище из потока страниц (файл, номер_страницы, текст)
+        
+        Страницы кодируются в буфер по мере поступления: преобразованные
+        тексты (нормализация, маскирование) не собираются во вложенные
+        словари. Страницы документа идут подряд по возрастанию номера.
+        
+        Args:
+            pages: Страницы в порядке документов
+            doc_names: Все документы по порядку, включая документы без
+                страниц (по умолчанию - в порядке появления в pages)
+        """
+        buffer = bytearray()
+        offsets = [0]
+        page_nums = []
+        names = list(doc_names) if doc_names is not None else []
+        index = {name: i for i, name in enumerate(names)}
+        counts = [0] * len(names)
+        current = -1
+        
+        for name, page_num, text in pages:
+            if current < 0 or names[current] != name:
+                if doc_names is None and name not in index:
+                    index[name] = len(names)
+                    names.append(name)
+                    counts.append(0)
+                if index.get(name, -1) <= current:
+                    raise ValueError(f"Страницы документа '{name}' должны идти подряд и в порядке doc_names")
+                current = index[name]
+            
+            buffer += text.encode('utf-8')
+            offsets.append(len(buffer))
+            page_nums.append(page_num)
+            counts[current] += 1
+        
+        return cls(
+            # Массив над самим bytearray: буфер не копируется
+            data=np.frombuffer(buffer, dtype=np.uint8),
+            offsets=np.asarray(offsets, dtype=np.int64),
+            page_nums=np.asarray(page_nums, dtype=np.int32),
+            doc_offsets=np.concatenate([[0], np.cumsum(counts, dtype=np.int64)]).astype(np.int64),
+            doc_names=names,
+        )
+    
+    @classmethod
+    def concatenate(cls, stores: List["CaseTextStore"]) -> "CaseTextStore":
+        """
+        Одно хранилище из нескольких (документы по порядку хранилищ)
+        
+        Тексты копируются в новый буфер; от срезов берутся только их страницы.
+        """
+        data, offsets, page_nums, doc_offsets, doc_names = [], [], [], [], []
+        byte_base = page_base = 0
+        
+        for store in stores:
+            start, end = int(store.offsets[0]), int(store.offsets[-1])
+            data.append(np.asarray(store.data[start:end]))
+            offsets.append(np.asarray(store.offsets[:-1]) - start + byte_base)
+            page_nums.append(np.asarray(store.page_nums))
+            doc_offsets.append(np.asarray(store.doc_offsets[:-1]) + page_base)
+            doc_names.extend(store.doc_names)
+            byte_base += end - start
+            page_base += store.num_pages
+        
+        return cls(
+            data=np.concatenate(data + [np.zeros(0, dtype=np.uint8)]),
+            offsets=np.concatenate(offsets + [[byte_base]]).astype(np.int64),
+            page_nums=np.concatenate(page_nums + [np.zeros(0, dtype=np.int32)]).astype(np.int32),
+            doc_offsets=np.concatenate(doc_offsets + [[page_base]]).astype(np.int64),
+            doc_names=doc_names,
+        )
+    
+    def __len__(self) -> int:
+        return len(self.doc_names)
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.doc_names)
+    
+    def __getitem__(self, name: str) -> DocumentPages:
+        return DocumentPages(self, self._doc_index[name])
+    
+    @property
+    def num_pages(self) -> int:
+        """Всего страниц во всех документах"""
+        return len(self.page_nums)
+    
+    @property
+    def nbytes(self) -> int:
+        """Размер текста в UTF-8 (байты)"""
+        return int(self.offsets[-1] - self.offsets[0]) if len(self.offsets) else 0
+    
+    def page_bytes(self, index: int) -> memoryview:
+        """UTF-8 байты страницы (сквозной индекс) без копирования"""
+        return memoryview(self.data[self.offsets[index]:self.offsets[index + 1]])
+    
+    def page_text(self, index: int) -> str:
+        """Текст страницы (сквозной индекс)"""
+        return str(self.page_bytes(index), 'utf-8')
+    
+    def iter_pages(self) -> Iterator[tuple]:
+        """(файл, номер_страницы, текст) по всем страницам"""
+        for doc_index, name in enumerate(self.doc_names):
+            for index in range(self.doc_offsets[doc_index], self.doc_offsets[doc_index + 1]):
+                yield name, int(self.page_nums[index]), self.page_text(index)
+    
+    def joined_text(self, separator: str = '\n\n') -> str:
+        """Все страницы одной строкой (как LegalDocumentAnalyzer._merge_all_texts)"""
+        if not separator:
+            return str(memoryview(self.data[self.offsets[0]:self.offsets[-1]]), 'utf-8')
+        return separator.join(self.page_text(i) for i in range(self.num_pages))
+    
+    def document_text(self, name: str, separator: str = '\n\n') -> str:
+        """Страницы одного документа одной строкой"""
+        doc_index = self._doc_index[name]
+        return separator.join(
+            self.page_text(i)
+            for i in range(self.doc_offsets[doc_index], self.doc_offsets[doc_index + 1])
+        )
+    
+    def slice_documents(self, start: int, stop: Optional[int] = None) -> "CaseTextStore":
+        """Документы [start, stop) над тем же буфером (без копирования)"""
+        stop = len(self.doc_names) if stop is None else stop
+        first_page = int(self.doc_offsets[start])
+        last_page = int(self.doc_offsets[stop])
+        
+        return CaseTextStore(
+            data=self.data,
+            offsets=self.offsets[first_page:last_page + 1],
+            page_nums=self.page_nums[first_page:last_page],
+            doc_offsets=self.doc_offsets[start:stop + 1] - first_page,
+            doc_names=self.doc_names[start:stop],
+        )
+    
+    def save(self, path: str):
+        """
+        Сохраняет хранилище в директорию
+        
+        Массивы сохраняются в .npy, чтобы load мог открыть их через mmap.
+        Срез сохраняется компактно (только его страницы).
+        """
+        os.makedirs(path, exist_ok=True)
+        
+        start, end = int(self.offsets[0]), int(self.offsets[-1])
+        np.save(os.path.join(path, "data.npy"), np.asarray(self.data[start:end]))
+        np.save(os.path.join(path, "offsets.npy"), self.offsets - start)
+        np.save(os.path.join(path, "page_nums.npy"), np.asarray(self.page_nums))
+        np.save(os.path.join(path, "doc_offsets.npy"), np.asarray(self.doc_offsets))
+        
+        with open(os.path.join(path, "store.json"), 'w', encoding='utf-8') as f:
+            json.dump({'doc_names': self.doc_names}, f, ensure_ascii=False)
+    
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "CaseTextStore":
+        """
+        Загружает хранилище из директории
+        
+        Args:
+            path: Директория, созданная save()
+            mmap: Открыть текст через memory-map без чтения в память
+        """
+        with open(os.path.join(path, "store.json"), encoding='utf-8') as f:
+            config = json.load(f)
+        
+        mmap_mode = 'r' if mmap else None
+        return cls(
+            data=np.load(os.path.join(path, "data.npy"), mmap_mode=mmap_mode),
+            offsets=np.load(os.path.join(path, "offsets.npy"), mmap_mode=mmap_mode),
+            page_nums=np.load(os.path.join(path, "page_nums.npy"), mmap_mode=mmap_mode),
+            doc_offsets=np.load(os.path.join(path, "doc_offsets.npy")),
+            doc_names=config['doc_names'],
+        )
+    
+    def to_arrow(self):
+        """
+        Таблица Arrow (document, page, text)
+        
+        Колонка text - LargeString над буферами data/offsets без копирования,
+        document - словарная колонка над doc_names.
+        """
+        pa = _require_pyarrow()
+        
+        doc_ids = np.repeat(
+            np.arange(len(self.doc_names), dtype=np.int32),
+            np.diff(self.doc_offsets)
+        )
+        text = pa.LargeStringArray.from_buffers(
+            self.num_pages,
+            pa.py_buffer(np.ascontiguousarray(self.offsets)),
+            pa.py_buffer(self.data),
+        )
+        
+        return pa.table({
+            'document': pa.DictionaryArray.from_arrays(doc_ids, pa.array(self.doc_names, pa.string())),
+            'page': pa.array(self.page_nums, pa.int32()),
+            'text': text,
+        })
+    
+    @classmethod
+    def from_arrow(cls, table) -> "CaseTextStore":
+        """
+        Хранилище из таблицы Arrow (document, page, text)
+        
+        Строки одного документа должны идти подряд. Буферы колонки text
+        (LargeString из одного фрагмента) отображаются в NumPy без копирования.
+        """
+        pa = _require_pyarrow()
+        
+        column = table.column('text')
+        text = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+        if text.type != pa.large_string():
+            text = text.cast(pa.large_string())
+        
+        _, offsets_buffer, data_buffer = text.buffers()
+        offsets = np.frombuffer(offsets_buffer, dtype=np.int64)[text.offset:text.offset + len(text) + 1]
+        data = np.frombuffer(data_buffer, dtype=np.uint8)
+        
+        documents = table.column('document').to_pylist()
+        doc_names, doc_offsets = [], [0]
+        for i, name in enumerate(documents):
+            if not doc_names or doc_names[-1] != name:
+                if doc_names:
+                    doc_offsets.append(i)
+                doc_names.append(name)
+        doc_offsets.append(len(documents))
+        if not documents:
+            doc_offsets = [0]
+        
+        return cls(
+            data=data,
+            offsets=offsets,
+            page_nums=table.column('page').to_numpy().astype(np.int32, copy=False),
+            doc_offsets=np.asarray(doc_offsets, dtype=np.int64),
+            doc_names=doc_names,
+        )
@@ -0,0 +1,210 @@
+"""
+Общие опечатки в документах прокурора и следователя
+
+Одинаковая опечатка в двух документах - самый сильный признак
+копирования: независимые авторы ошибаются по-разному. Слова каждого
+документа проверяются по словарю (русский + юридический), слова вне
+словаря индексируются, и отчет показывает те, что встречаются у обеих
+сторон.
+
+Словарь хранится компактно: отсортированный массив 64-битных хэшей
+(8 байт на слово, поиск - np.searchsorted по всем словам документа
+сразу) или marisa-trie, если установлен пакет marisa-trie.
+Время работы - линейное по числу слов дела.
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import re
+import hashlib
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Set
+import numpy as np
+
+
+# Русские слова (с дефисом внутри): опечатки ищутся только в них
+_TOKEN = re.compile(r'(?<![\w-])[А-Яа-яЁё]+(?:-[А-Яа-яЁё]+)*(?![\w-])')
+
+
+def normalize_word(word: str) -> str:
+    """Словарная форма записи: нижний регистр, ё -> е"""
+    return word.lower().replace('ё', 'е')
+
+
+def word_hash(word: str) -> int:
+    """Стабильный 64-битный хэш слова (одинаков между запусками)"""
+    return int.from_bytes(
+        hashlib.blake2b(normalize_word(word).encode('utf-8'), digest_size=8).digest(),
+        'little'
+    )
+
+
+def tokenize(text: str, min_length: int = 4, skip_capitalized: bool = True) -> List[str]:
+    """
+    Слова-кандидаты в опечатки
+    
+    Args:
+        text: Текст страницы
+        min_length: Более короткие слова пропускаются (предлоги, обрывки OCR)
+        skip_capitalized: Пропускать слова с заглавной буквы - фамилии и
+            названия вне словаря, общие для всех документов дела
+    """
+    tokens = []
+    for match in _TOKEN.finditer(text):
+        word = match.group(0)
+        if len(word) < min_length:
+            continue
+        if skip_capitalized and word[0].isupper():
+            continue
+        tokens.append(normalize_word(word))
+    return tokens
+
+
+class Lexicon:
+    """
+    Словарь для проверки слов
+    
+    Хранение - отсортированный np.uint64 массив хэшей word_hash или
+    marisa_trie.Trie (загружается из .marisa).
+    """
+    
+    def __init__(self, hashes: Optional[np.ndarray] = None, trie=None):
+        self.hashes = np.unique(hashes) if hashes is not None else np.empty(0, dtype=np.uint64)
+        self.trie = trie
+    
+    @classmethod
+    def from_words(cls, words: Iterable[str]) -> "Lexicon":
+        """Словарь из списка слов"""
+        return cls(np.fromiter(
+            (word_hash(word) for word in words),
+            dtype=np.uint64
+        ))
+    
+    def __len__(self) -> int:
+        return len(self.trie) if self.trie is not None else len(self.hashes)
+    
+    def __contains__(self, word: str) -> bool:
+        return bool(self.contains_many([word])[0])
+    
+    def contains_many(self, words: List[str]) -> np.ndarray:
+        """Маска слов, найденных в словаре"""
+        if self.trie is not None:
+            return np.fromiter(
+                (normalize_word(word) in self.trie for word in words),
+                dtype=bool,
+                count=len(words)
+            )
+        
+        if not len(self.hashes) or not words:
+            return np.zeros(len(words), dtype=bool)
+        
+        queries = np.fromiter((word_hash(word) for word in words), dtype=np.uint64, count=len(words))
+        positions = np.minimum(np.searchsorted(self.hashes, queries), len(self.hashes) - 1)
+        return self.hashes[positions] == queries
+    
+    def out_of_vocabulary(self, words: Iterable[str]) -> Set[str]:
+        """Уникальные слова вне словаря"""
+        unique = list(set(words))
+        known = self.contains_many(unique)
+        return {word for word, is_known in zip(unique, known) if not is_known}
+    
+    def save(self, path: str):
+        """Сохраняет массив хэшей (.npy)"""
+        np.save(path, self.hashes)
+    
+    @classmethod
+    def load(cls, path: str) -> "Lexicon":
+        """
+        Загружает словарь
+        
+        Args:
+            path: .npy (хэши, создается scripts/build_lexicon.py),
+                .marisa (нужен marisa-trie) или текстовый список слов
+        """
+        if path.endswith('.npy'):
+            return cls(np.load(path))
+        
+        if path.endswith('.marisa'):
+            try:
+                import marisa_trie
+            except ImportError as e:
+                raise ImportError(
+                    "Для словаря .marisa установите marisa-trie: pip install marisa-trie"
+                ) from e
+            trie = marisa_trie.Trie()
+            trie.load(path)
+            return cls(trie=trie)
+        
+        with open(path, encoding='utf-8') as f:
+            return cls.from_words(line.split('/')[0].strip() for line in f if line.strip())
+
+
+@dataclass
+class SharedTypo:
+    """Слово вне словаря, встреченное у обеих сторон"""
+    word: str
+    prosecutor_documents: List[str]
+    investigator_documents: List[str]
+    
+    @property
+    def document_count(self) -> int:
+        return len(self.prosecutor_documents) + len(self.investigator_documents)
+
+
+def index_typos(
+    documents: Mapping[str, Mapping[int, str]],
+    lexicon: Lexicon,
+    skip_capitalized: bool = True,
+) -> Dict[str, Set[str]]:
+    """
+    Индекс опечаток: {слово вне словаря: {файлы}}
+    
+    Каждый документ проверяется по словарю одним пакетом уникальных слов.
+    """
+    index: Dict[str, Set[str]] = defaultdict(set)
+    for name, pages in documents.items():
+        words = []
+        for text in pages.values():
+            words.extend(tokenize(text, skip_capitalized=skip_capitalized))
+        for word in lexicon.out_of_vocabulary(words):
+            index[word].add(name)
+    return index
+
+
+def find_shared_typos(
+    prosecutor_documents: Mapping[str, Mapping[int, str]],
+    investigator_documents: Mapping[str, Mapping[int, str]],
+    lexicon: Lexicon,
+    max_documents: int = 4,
+    skip_capitalized: bool = True,
+) -> List[SharedTypo]:
+    """
+    Опечатки, общие для документов прокурора и следователя
+    
+    Args:
+        prosecutor_documents: {файл: {страница: текст}} прокурора
+        investigator_documents: {файл: {страница: текст}} следователя
+        lexicon: Словарь
+        max_documents: Слова из большего числа документов пропускаются -
+            это термины и имена, которых нет в словаре, а не опечатки
+        skip_capitalized: Пропускать слова с заглавной буквы
+    
+    Returns:
+        Общие опечатки, самые редкие первыми
+    """
+    prosecutor_index = index_typos(prosecutor_documents, lexicon, skip_capitalized)
+    investigator_index = index_typos(investigator_documents, lexicon, skip_capitalized)
+    
+    shared = []
+    for word in prosecutor_index.keys() & investigator_index.keys():
+        typo = SharedTypo(
+            word=word,
+            prosecutor_documents=sorted(prosecutor_index[word]),
+            investigator_documents=sorted(investigator_index[word]),
+        )
+        if typo.document_count <= max_documents:
+            shared.append(typo)
+    
+    shared.sort(key=lambda typo: (typo.document_count, typo.word))
+    return shared
@@ -0,0 +1,333 @@
+"""
+Визуальное сходство документов
+
+Перцептивные хэши (pHash/dHash) и CLIP эмбеддинги для сравнения
+изображений страниц: от дешевого фильтра пары документов до матрицы
+сходства всех страниц дела.
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple, Union
+import numpy as np
+from PIL import Image
+
+
+def load_image(image: Union[str, Image.Image]) -> Image.Image:
+    """Загружает изображение, если передан путь"""
+    if isinstance(image, str):
+        return Image.open(image)
+    elif isinstance(image, Image.Image):
+        return image
+    raise ValueError("image должен быть либо путём к файлу, либо PIL.Image")
+
+
+def image_digest(image: Union[str, Image.Image]) -> str:
+    """
+    Стабильный ключ изображения для кэшей
+    
+    Для пути хэшируется содержимое файла, для PIL.Image - пиксели,
+    режим и размер.
+    """
+    digest = hashlib.sha1()
+    
+    if isinstance(image, str):
+        with open(image, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    else:
+        image = load_image(image)
+        digest.update(f"{image.mode}:{image.size}".encode())
+        digest.update(image.tobytes())
+    
+    return digest.hexdigest()
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Матрица DCT-II размера n x n"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+    matrix[0] *= 1 / np.sqrt(2)
+    return matrix * np.sqrt(2 / n)
+
+
+def _pack_bits(bits: np.ndarray) -> np.uint64:
+    """Упаковывает 64 булевых значения в uint64"""
+    return np.packbits(bits.astype(np.uint8).ravel()).view('>u8')[0].astype(np.uint64)
+
+
+def dhash(image: Union[str, Image.Image], hash_size: int = 8) -> np.uint64:
+    """
+    Разностный хэш (dHash)
+    
+    Сравнивает яркость соседних пикселей уменьшенного изображения.
+    Устойчив к масштабированию и изменению яркости.
+    """
+    if hash_size != 8:
+        raise ValueError("Поддерживаются только 64-битные хэши (hash_size=8)")
+    
+    img = load_image(image).convert('L').resize(
+        (hash_size + 1, hash_size),
+        Image.LANCZOS
+    )
+    pixels = np.asarray(img, dtype=np.float32)
+    
+    return _pack_bits(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash(
+    image: Union[str, Image.Image],
+    hash_size: int = 8,
+    highfreq_factor: int = 4
+) -> np.uint64:
+    """
+    Перцептивный хэш (pHash)
+    
+    Низкочастотные коэффициенты DCT сравниваются с медианой.
+    Устойчив к пересжатию, шуму сканирования и небольшим искажениям.
+    """
+    if hash_size != 8:
+        raise ValueError("Поддерживаются только 64-битные хэши (hash_size=8)")
+    
+    size = hash_size * highfreq_factor
+    img = load_image(image).convert('L').resize((size, size), Image.LANCZOS)
+    pixels = np.asarray(img, dtype=np.float64)
+    
+    dct = _dct_matrix(size)
+    coefficients = (dct @ pixels @ dct.T)[:hash_size, :hash_size]
+    
+    return _pack_bits(coefficients > np.median(coefficients))
+
+
+def hash_similarity(hash1: np.uint64, hash2: np.uint64) -> float:
+    """Сходство 64-битных хэшей: 1 - доля различающихся битов"""
+    distance = bin(int(hash1) ^ int(hash2)).count('1')
+    return 1.0 - distance / 64.0
+
+
+def cosine_similarity(vector1: np.ndarray, vector2: np.ndarray) -> float:
+    """Косинусное сходство двух векторов"""
+    vector1 = np.asarray(vector1, dtype=np.float32).ravel()
+    vector2 = np.asarray(vector2, dtype=np.float32).ravel()
+    
+    norm = np.linalg.norm(vector1) * np.linalg.norm(vector2)
+    if norm == 0:
+        return 0.0
+    
+    return float(np.dot(vector1, vector2) / norm)
+
+
+# Таблица количества единичных битов для каждого байта
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _popcount64(values: np.ndarray) -> np.ndarray:
+    """Векторизованный подсчет единичных битов в массиве uint64"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    
+    as_bytes = values.view(np.uint8).reshape(values.shape + (8,))
+    return _POPCOUNT_TABLE[as_bytes].sum(axis=-1, dtype=np.uint8)
+
+
+def hash_similarity_matrix(hashes1: np.ndarray, hashes2: np.ndarray) -> np.ndarray:
+    """
+    Матрица сходства двух наборов 64-битных хэшей
+    
+    Args:
+        hashes1: Массив uint64 размерности [n]
+        hashes2: Массив uint64 размерности [m]
+    
+    Returns:
+        Матрица float32 [n, m]: 1 - доля различающихся битов
+    """
+    hashes1 = np.asarray(hashes1, dtype=np.uint64)
+    hashes2 = np.asarray(hashes2, dtype=np.uint64)
+    
+    distance = _popcount64(hashes1[:, None] ^ hashes2[None, :])
+    return 1.0 - distance.astype(np.float32) / 64.0
+
+
+@dataclass
+class PageFingerprints:
+    """Визуальные отпечатки набора страниц"""
+    phashes: np.ndarray  # uint64 [n]
+    dhashes: np.ndarray  # uint64 [n]
+    embeddings: Optional[np.ndarray] = None  # float32 [n, dim], нормированные CLIP эмбеддинги
+    
+    def __len__(self) -> int:
+        return len(self.phashes)
+
+
+class VisualSimilarityEngine:
+    """
+    Векторизованное визуальное сравнение страниц
+    
+    Комбинирует два сигнала:
+    - pHash/dHash для почти точных копий (ксерокопия, пересканирование)
+    - косинус CLIP эмбеддингов для повторного использования макета
+    
+    Матрица сходства страниц прокурора и следователя считается
+    матричными операциями NumPy блоками по chunk_size строк.
+    """
+    
+    # Страницы считаются визуальной копией при превышении любого порога
+    HASH_THRESHOLD = 0.9
+    EMBEDDING_THRESHOLD = 0.95
+    
+    def __init__(
+        self,
+        vision_encoder=None,
+        batch_size: int = 32,
+        chunk_size: int = 1024,
+    ):
+        """
+        Инициализация движка визуального сходства
+        
+        Args:
+            vision_encoder: VisionEncoder для CLIP эмбеддингов (опционально,
+                без него используются только перцептивные хэши)
+            batch_size: Размер пакета для CLIP
+            chunk_size: Количество строк матрицы, обрабатываемых за раз
+        """
+        self.vision_encoder = vision_encoder
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+    
+    def fingerprint(self, images: Iterable[Union[str, Image.Image]]) -> PageFingerprints:
+        """
+        Вычисляет визуальные отпечатки страниц
+        
+        Страницы обрабатываются по мере поступления: хэши считаются
+        сразу, для CLIP копится не больше batch_size страниц. С
+        генератором растеризации (OCREngine.iter_page_images) весь том
+        в памяти не держится.
+        
+        Args:
+            images: Изображения страниц (список или генератор)
+        
+        Returns:
+            PageFingerprints с хэшами и (если есть encoder) эмбеддингами
+        """
+        phashes, dhashes = [], []
+        batches, batch = [], []
+        
+        for image in images:
+            image = load_image(image)
+            gray = image.convert('L')
+            phashes.append(phash(gray))
+            dhashes.append(dhash(gray))
+            
+            if self.vision_encoder is not None:
+                batch.append(image.convert('RGB'))
+                if len(batch) == self.batch_size:
+                    batches.append(self.vision_encoder.encode_batch(batch).cpu().numpy())
+                    batch = []
+        
+        if batch:
+            batches.append(self.vision_encoder.encode_batch(batch).cpu().numpy())
+        
+        embeddings = None
+        if batches:
+            embeddings = np.concatenate(batches).astype(np.float32)
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.maximum(norms, 1e-12)
+        
+        return PageFingerprints(
+            phashes=np.array(phashes, dtype=np.uint64),
+            dhashes=np.array(dhashes, dtype=np.uint64),
+            embeddings=embeddings,
+        )
+    
+    def _chunk_scores(
+        self,
+        fingerprints1: PageFingerprints,
+        fingerprints2: PageFingerprints,
+        start: int,
+        end: int,
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Хэш- и CLIP-сходство для строк [start, end)"""
+        hash_scores = (
+            hash_similarity_matrix(fingerprints1.phashes[start:end], fingerprints2.phashes)
+            + hash_similarity_matrix(fingerprints1.dhashes[start:end], fingerprints2.dhashes)
+        ) / 2.0
+        
+        embedding_scores = None
+        if fingerprints1.embeddings is not None and fingerprints2.embeddings is not None:
+            embedding_scores = fingerprints1.embeddings[start:end] @ fingerprints2.embeddings.T
+        
+        return hash_scores, embedding_scores
+    
+    def similarity_matrix(
+        self,
+        fingerprints1: PageFingerprints,
+        fingerprints2: PageFingerprints,
+    ) -> np.ndarray:
+        """
+        Полная матрица визуального сходства [n, m]
+        
+        Значение - максимум из хэш-сходства и косинуса CLIP.
+        """
+        matrix = np.zeros((len(fingerprints1), len(fingerprints2)), dtype=np.float32)
+        
+        for start in range(0, len(fingerprints1), self.chunk_size):
+            end = start + self.chunk_size
+            hash_scores, embedding_scores = self._chunk_scores(
+                fingerprints1, fingerprints2, start, end
+            )
+            if embedding_scores is not None:
+                hash_scores = np.maximum(hash_scores, embedding_scores)
+            matrix[start:end] = hash_scores
+        
+        return matrix
+    
+    def find_copied_pages(
+        self,
+        fingerprints1: PageFingerprints,
+        fingerprints2: PageFingerprints,
+    ) -> np.ndarray:
+        """
+        Находит для каждой страницы первого набора визуальную копию во втором
+        
+        Returns:
+            Массив int64 [n]: индекс скопированной страницы или -1
+        """
+        matches = np.full(len(fingerprints1), -1, dtype=np.int64)
+        if len(fingerprints1) == 0 or len(fingerprints2) == 0:
+            return matches
+        
+        for start in range(0, len(fingerprints1), self.chunk_size):
+            end = start + self.chunk_size
+            hash_scores, embedding_scores = self._chunk_scores(
+                fingerprints1, fingerprints2, start, end
+            )
+            
+            # Нормируем оба сигнала на свои пороги: копия, если >= 1
+            scores = hash_scores / self.HASH_THRESHOLD
+            if embedding_scores is not None:
+                scores = np.maximum(scores, embedding_scores / self.EMBEDDING_THRESHOLD)
+            
+            best = scores.argmax(axis=1)
+            found = scores[np.arange(len(best)), best] >= 1.0
+            matches[start:end] = np.where(found, best, -1)
+        
+        return matches
+    
+    def visual_similarity(
+        self,
+        fingerprints1: PageFingerprints,
+        fingerprints2: PageFingerprints,
+    ) -> float:
+        """
+        Визуальное сходство наборов страниц (0-100)
+        
+        Процент страниц первого набора, имеющих визуальную копию во втором.
+        """
+        if len(fingerprints1) == 0:
+            return 0.0
+        
+        matches = self.find_copied_pages(fingerprints1, fingerprints2)
+        return float((matches >= 0).mean() * 100)
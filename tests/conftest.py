@@ -0,0 +1,54 @@
+"""
+Общие фикстуры тестов
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+
+import pytest
+
+# Корень репозитория в путь: сферы и анализатор - модули пакета src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+@pytest.fixture
+def make_sphere():
+    """
+    Создает модель (MultimodalBraindler или сферу) настоящим конструктором
+    
+    Модели по умолчанию - заглушки из stubs; любые можно передать явно.
+    """
+    from stubs import StubLanguageModel, StubVisionEncoder, WhitespaceTokenizer
+    
+    def make(cls, **components):
+        components.setdefault('vision_encoder', StubVisionEncoder())
+        components.setdefault('tokenizer', WhitespaceTokenizer())
+        components.setdefault('language_model', StubLanguageModel())
+        return cls(device="cpu", **components)
+    
+    return make
+
+
+
+@pytest.fixture
+def make_analyzer():
+    """
+    Создает LegalDocumentAnalyzer с OCR-заглушкой
+    
+    Именованные аргументы переопределяют его настройки (normalizer,
+    boilerplate_min_pages, visual_engine, ...).
+    """
+    from src.legal_analyzer import LegalDocumentAnalyzer
+    from stubs import StubOCR
+    
+    def make(**settings):
+        analyzer = LegalDocumentAnalyzer(ocr=StubOCR())
+        for name, value in settings.items():
+            if not hasattr(analyzer, name):
+                raise AttributeError(f"У анализатора нет настройки {name}")
+            setattr(analyzer, name, value)
+        return analyzer
+    
+    return make
@@ -0,0 +1,82 @@
+"""
+Заглушки моделей и OCR для тестов: сферы и анализатор без весов
+
+Передаются в настоящие конструкторы (MultimodalBraindler, сферы,
+LegalDocumentAnalyzer), поэтому новые атрибуты __init__ появляются
+и у тестовых объектов.
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+from types import SimpleNamespace
+
+import torch
+import torch.nn as nn
+
+from src.visual_similarity import image_digest
+
+
+class WhitespaceTokenizer:
+    """Токенизатор по пробелам: один токен - одно слово"""
+    
+    pad_token = "<pad>"
+    eos_token = "<pad>"
+    pad_token_id = 0
+    
+    def __init__(self):
+        self.padding_side = "right"
+    
+    def __call__(self, text, add_special_tokens=False):
+        return {"input_ids": text.split()}
+    
+    def decode(self, token_ids, skip_special_tokens=True):
+        return ' '.join(token_ids)
+
+
+class StubLanguageModel(nn.Module):
+    """Языковая модель без весов: generate в тестах подменяется или не вызывается"""
+    
+    def __init__(self, hidden_size: int = 8):
+        super().__init__()
+        self.config = SimpleNamespace(hidden_size=hidden_size, pad_token_id=0, eos_token_id=0)
+    
+    @property
+    def dtype(self):
+        return torch.float32
+    
+    @property
+    def device(self):
+        return torch.device("cpu")
+    
+    def forward(self, input_ids):
+        return None
+
+
+class StubVisionEncoder:
+    """CLIP-заглушка: заданные эмбеддинги по содержимому изображения"""
+    
+    def __init__(self, embeddings=(), dim: int = 2):
+        self.embeddings = {image_digest(image): vector for image, vector in embeddings}
+        self.dim = dim
+        self.calls = 0
+    
+    def get_embedding_dim(self) -> int:
+        return self.dim
+    
+    def encode(self, image):
+        self.calls += 1
+        vector = self.embeddings.get(image_digest(image), [0.0] * self.dim)
+        return torch.tensor([vector], dtype=torch.float32)
+    
+    def encode_batch(self, images):
+        return torch.cat([self.encode(image) for image in images])
+
+
+class StubOCR:
+    """OCR-заглушка: текст документа - его имя"""
+    
+    def extract_text_from_image(self, document):
+        return f"текст {document}"
+    
+    def iter_page_images(self, pdf_path):
+        return iter(())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Тесты ссылок на совпавшие блоки
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+import json
+
+# Добавляем src в путь (и корень - для пакета src с анализатором)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from block_alignment import BlockMatch, BlockRef, CaseText, diff_blocks, matching_spans, raw_block_text
+from text_normalizer import TextNormalizer, canonical_chars
+
+
+# Исходный OCR: шапка (шаблон), перенос, лишние пробелы, табуляция, номер страницы
+RAW_DOCUMENTS = {
+    "обвинение.pdf": {
+        1: "ПРОКУРАТУРА\nСвидетель Иванов показал, что видел автомо-\nбиль   около  дома.\n\n- 1 -",
+        2: "ПРОКУРАТУРА\nПодозреваемый Петров\tпояснил, что вечером находился в квартире.",
+    },
+}
+
+
+def test_case_text_matches_merge_and_resolves_refs():
+    """Общая строка как при склейке, ссылки - страница и смещения в документе"""
+    documents = {
+        "обвинение.pdf": {2: "вторая страница", 1: "первая страница"},
+        "пустой.pdf": {},
+        "справка.pdf": {7: "текст справки"},
+    }
+    case_text = CaseText(documents)
+    
+    assert case_text.text == "первая страница\n\nвторая страница\n\nтекст справки"
+    
+    spans = list(case_text.document_spans())
+    assert spans[0] == ("обвинение.pdf", 0, 32)
+    assert spans[2] == ("справка.pdf", 34, 47)
+    
+    ref = case_text.ref(7, 23)
+    assert (ref.document, ref.page, ref.end_page, ref.start, ref.end) == ("обвинение.pdf", 1, 2, 7, 23)
+    assert case_text.block_text(ref) == "страница\n\nвторая"
+    
+    ref = case_text.ref(40, 47)
+    assert (ref.document, ref.page, ref.start, ref.end) == ("справка.pdf", 7, 6, 13)
+    assert case_text.block_text(ref) == "справки"
+
+
+def test_match_diff_and_json():
+    """Diff и совпадающие участки строятся по ссылкам, JSON - без текста"""
+    prosecutor = CaseText({"обвинение.pdf": {1: "Шапка\n\nСвидетель видел автомобиль у дома."}})
+    investigator = CaseText({"допрос.pdf": {4: "Свидетель видел автомобиль у подъезда."}})
+    match = BlockMatch(
+        prosecutor=prosecutor.ref(7, 44),
+        investigator=investigator.ref(0, 38),
+        score=81.0,
+    )
+    
+    diff = diff_blocks(match, prosecutor, investigator)
+    assert "-Свидетель видел автомобиль у дома." in diff
+    assert "+Свидетель видел автомобиль у подъезда." in diff
+    
+    assert matching_spans(match, prosecutor, investigator, min_length=10) == [(7, 36, 0, 29)]
+    
+    data = json.loads(json.dumps(match.to_dict()))
+    assert data['prosecutor'] == {
+        'document': "обвинение.pdf", 'page': 1, 'end_page': 1, 'start': 7, 'end': 44,
+        'raw_start': None, 'raw_end': None,
+    }
+    assert data['score'] == 81.0
+
+
+def test_refs_map_back_to_raw_ocr_text():
+    """Смещения в нормализованном тексте без шаблонов переводятся в исходный OCR"""
+    normalizer = TextNormalizer()
+    compared = {
+        name: {
+            page_num: normalizer.normalize_page(text).replace("ПРОКУРАТУРА\n", "")
+            for page_num, text in pages.items()
+        }
+        for name, pages in RAW_DOCUMENTS.items()
+    }
+    case_text = CaseText(compared, raw_documents=RAW_DOCUMENTS, canonical=canonical_chars)
+    text = case_text.text
+    
+    ref = case_text.ref(text.index("Свидетель"), text.index("дома.") + 5)
+    assert case_text.block_text(ref) == "Свидетель Иванов показал, что видел автомобиль около дома."
+    assert (ref.page, ref.end_page) == (1, 1)
+    assert case_text.raw_block_text(ref) == (
+        "Свидетель Иванов показал, что видел автомо-\nбиль   около  дома."
+    )
+    
+    # Блок через границу страниц: хвост первой и начало второй страницы
+    ref = BlockRef(**json.loads(json.dumps(
+        case_text.ref(text.index("видел"), text.index("пояснил") + 7).to_dict()
+    )))
+    assert (ref.page, ref.end_page) == (1, 2)
+    assert raw_block_text(RAW_DOCUMENTS, ref).startswith("видел автомо-\nбиль")
+    assert raw_block_text(RAW_DOCUMENTS, ref).endswith("\nПодозреваемый Петров\tпояснил")
+
+
+def test_serialized_result_refs_slice_raw_pages(make_analyzer):
+    """Ссылки из CopyPasteResult.to_json вырезают исходный текст страниц дела"""
+    analyzer = make_analyzer(boilerplate_min_pages=None)
+    
+    copied = "Свидетель Иванов показал, что видел автомо-\nбиль   около  дома."
+    case = analyzer.make_case(
+        "дело",
+        ["обвинение.pdf"],
+        ["допрос.pdf"],
+        {"обвинение.pdf": {1: "ПРОКУРАТУРА\n\n" + copied + "\n\n- 1 -"}},
+        {"допрос.pdf": {3: "Протокол\n\nСвидетель Иванов показал, что видел автомобиль около дома."}},
+    )
+    result = analyzer._make_copypaste_result(analyzer._analyze_texts(case, 40), 0.0)
+    
+    data = json.loads(result.to_json())
+    assert data['identical_sections']
+    
+    match = data['identical_sections'][0]
+    prosecutor = BlockRef(**match['prosecutor'])
+    investigator = BlockRef(**match['investigator'])
+    assert raw_block_text(case.prosecutor_documents, prosecutor) == copied
+    assert raw_block_text(case.investigator_documents, investigator) == copied.replace("автомо-\nбиль   около  ", "автомобиль около ")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Тесты пакетного сравнения блоков: оценки совпадают с fuzzywuzzy
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+import random
+import numpy as np
+from fuzzywuzzy import fuzz
+
+# Добавляем src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import block_scoring
+from block_scoring import ratio, score_matrix
+
+
+def _random_blocks(rng, count, max_length=40):
+    # Малый алфавит - много совпадений и оценок вида x.5 на границе округления
+    return [
+        ''.join(rng.choice('абв гё') for _ in range(rng.randint(0, max_length)))
+        for _ in range(count)
+    ]
+
+
+def _reference(queries, choices):
+    return np.array([[fuzz.ratio(q, c) for c in choices] for q in queries])
+
+
+def test_matrix_equals_fuzz_ratio():
+    """Матрица совпадает с fuzz.ratio по всем парам, включая пустые строки"""
+    rng = random.Random(0)
+    for _ in range(50):
+        queries = _random_blocks(rng, rng.randint(1, 20))
+        choices = _random_blocks(rng, rng.randint(1, 20))
+        
+        scores = score_matrix(queries, choices, chunk_size=3)
+        
+        assert scores.dtype == np.uint8
+        assert (scores == _reference(queries, choices)).all()
+    
+    assert ratio("", "") == fuzz.ratio("", "") == 100
+    assert ratio("блок", "") == fuzz.ratio("блок", "") == 0
+    assert score_matrix([], ["блок"]).shape == (0, 1)
+
+
+def test_cutoff_keeps_scores_above_threshold_exact():
+    """Оценки не ниже порога точные, ниже - меньше порога (или 0)"""
+    rng = random.Random(1)
+    queries = _random_blocks(rng, 30)
+    choices = _random_blocks(rng, 30)
+    reference = _reference(queries, choices)
+    
+    for cutoff in (50, 70.0, 70.3, 95.0):
+        scores = score_matrix(queries, choices, score_cutoff=cutoff)
+        above = reference >= cutoff
+        assert (scores[above] == reference[above]).all()
+        assert (scores[~above] < cutoff).all()
+
+
+def test_fallback_without_rapidfuzz(monkeypatch):
+    """Без rapidfuzz - те же оценки через fuzz.ratio"""
+    monkeypatch.setattr(block_scoring, "RAPIDFUZZ_AVAILABLE", False)
+    rng = random.Random(2)
+    queries = _random_blocks(rng, 5)
+    choices = _random_blocks(rng, 7)
+    
+    assert (score_matrix(queries, choices) == _reference(queries, choices)).all()
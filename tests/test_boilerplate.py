@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Тесты маскирования шаблонного текста дела
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+
+# Добавляем src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from boilerplate import BoilerplateModel, mask_documents, visible_chars
+from text_store import CaseTextStore
+
+
+FORMULA = "руководствуясь ст. ст. 144, 145 и 151 УПК РФ, постановил"
+COPIED = "Свидетель Иванов показал, что видел автомобиль у дома номер семь"
+
+
+EPISODES = ["кража", "грабеж", "разбой", "мошенничество", "растрата", "подлог"]
+
+
+def _pages():
+    """Шапка и формула на каждой странице, скопированный абзац - на двух"""
+    pages = [
+        f"Следственный отдел по району Лист {i + 1}\n\n"
+        f"Рассмотрев материалы об эпизоде {episode} и {EPISODES[i - 1]}, {FORMULA} провести экспертизу"
+        for i, episode in enumerate(EPISODES)
+    ]
+    pages[1] += f"\n\n{COPIED}"
+    pages[4] += f"\n\n{COPIED}"
+    return pages
+
+
+def test_repeated_lines_and_formulas_masked_copy_kept():
+    """Шапки и формулы скрываются, текст с двух страниц (копипаст) остается"""
+    pages = _pages()
+    model = BoilerplateModel(min_pages=5, ngram_size=6).fit(pages)
+    
+    masked, masked_chars = model.mask(pages[1])
+    
+    assert "Следственный отдел" not in masked
+    assert "УПК РФ" not in masked
+    assert COPIED in masked
+    assert masked.startswith("Рассмотрев материалы об эпизоде грабеж")
+    assert "\n\n" in masked  # Абзацы не склеиваются
+    assert masked_chars == visible_chars(pages[1]) - visible_chars(masked)
+
+
+def test_masked_share_reported_and_small_cases_untouched():
+    """Доля скрытого текста считается по всем документам; в маленьком деле шаблонов нет"""
+    pages = _pages()
+    documents = {"том.pdf": dict(enumerate(pages))}
+    model = BoilerplateModel(min_pages=5, ngram_size=6).fit(pages)
+    
+    masked_documents, masked_chars, total_chars = mask_documents(model, documents)
+    assert 0.3 < masked_chars / total_chars < 0.8
+    assert list(masked_documents["том.pdf"]) == list(range(6))
+    
+    # Сборка в хранилище дела: те же тексты и счетчики без вложенных словарей
+    store, store_masked, store_total = mask_documents(
+        model, CaseTextStore.from_documents(documents), collect=CaseTextStore.from_pages
+    )
+    assert isinstance(store, CaseTextStore)
+    assert dict(store["том.pdf"]) == masked_documents["том.pdf"]
+    assert (store_masked, store_total) == (masked_chars, total_chars)
+    
+    small = BoilerplateModel(min_pages=5).fit(pages[:3])
+    assert small.mask(pages[0]) == (pages[0], 0)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Тесты сборки словаря опечаток из словарей Hunspell
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+import tempfile
+
+import pytest
+
+# Добавляем scripts и src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from build_lexicon import build_lexicon, read_word_list
+from typo_fingerprint import Lexicon
+
+
+# Фрагмент ru_RU.aff: кодировка KOI8-R, падежные суффиксы, приставка с cross product
+AFF = """SET KOI8-R
+NEEDAFFIX Z
+
+SFX A Y 3
+SFX A 0 а [^а]
+SFX A 0 ом [^а]
+SFX A я и я
+
+SFX B N 1
+SFX B ть л ть
+
+PFX P Y 1
+PFX P 0 пере .
+"""
+
+DIC = """4
+приговор/AP
+статья/A
+читать/B
+суд/AZ
+"""
+
+
+def _write_dictionary(tmp):
+    for name, content in (("ru_RU.aff", AFF), ("ru_RU.dic", DIC)):
+        with open(os.path.join(tmp, name), 'w', encoding='koi8-r') as f:
+            f.write(content)
+    return os.path.join(tmp, "ru_RU.dic")
+
+
+def test_hunspell_stems_expanded_to_word_forms():
+    """Основы .dic разворачиваются правилами .aff, включая приставку с суффиксом"""
+    with tempfile.TemporaryDirectory() as tmp:
+        words = set(read_word_list(_write_dictionary(tmp)))
+    
+    assert {"приговор", "приговора", "приговором"} <= words
+    assert {"переприговор", "переприговора"} <= words
+    assert {"статья", "статьи"} <= words and "приговори" not in words
+    assert {"читать", "читал"} <= words
+    # NEEDAFFIX: основа без аффикса - не слово
+    assert "суд" not in words and {"суда", "судом"} <= words
+
+
+def test_lexicon_recognizes_inflected_form():
+    """В собранном словаре есть косвенные падежи, а не только основы"""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "lexicon.npy")
+        build_lexicon([_write_dictionary(tmp)], [], output)
+        lexicon = Lexicon.load(output)
+    
+    assert "приговора" in lexicon
+    assert "Приговором" in lexicon
+    assert "приговра" not in lexicon
+
+
+def test_dic_without_aff_is_rejected():
+    """Без .aff словарь Hunspell дал бы только основы - ошибка вместо тихой потери форм"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ru_RU.dic")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(DIC)
+        
+        with pytest.raises(FileNotFoundError):
+            list(read_word_list(path))
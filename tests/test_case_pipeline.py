@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Тесты конвейера обработки дела
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+import tempfile
+import threading
+
+import pytest
+from PIL import Image
+
+# Добавляем src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from case_pipeline import CasePipeline, Stage, build_case_pipeline
+from src.legal_models import (
+    MozgachSphere047_Investigator,
+    MozgachSphere048_Prosecutor,
+    MozgachSphere049_Judge,
+)
+from stubs import StubOCR
+
+
+def test_independent_stages_run_concurrently():
+    """Независимые этапы выполняются одновременно"""
+    barrier = threading.Barrier(2, timeout=5)
+    
+    def meet(value):
+        def func(_):
+            barrier.wait()
+            return value
+        return func
+    
+    pipeline = CasePipeline([
+        Stage("ocr_a", meet("a")),
+        Stage("ocr_b", meet("b")),
+        Stage("merge", lambda r: r["ocr_a"] + r["ocr_b"], deps=["ocr_a", "ocr_b"]),
+    ])
+    
+    assert pipeline.run()["merge"] == "ab"
+
+
+def test_resume_after_failure():
+    """После сбоя повторный запуск не выполняет готовые этапы"""
+    calls = []
+    fail = {"judge": True}
+    
+    def stage(name, func):
+        def run(results):
+            calls.append(name)
+            return func(results)
+        return Stage(name, run, deps=deps[name])
+    
+    def judge(results):
+        if fail["judge"]:
+            raise RuntimeError("сбой")
+        return results["evidence"] * 2
+    
+    deps = {"ocr": [], "evidence": ["ocr"], "judge": ["evidence"]}
+    
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        def make_pipeline():
+            return CasePipeline([
+                stage("ocr", lambda r: 1),
+                stage("evidence", lambda r: r["ocr"] + 1),
+                stage("judge", judge),
+            ], checkpoint_dir=checkpoint_dir, fingerprint="дело")
+        
+        with pytest.raises(RuntimeError):
+            make_pipeline().run()
+        assert calls == ["ocr", "evidence", "judge"]
+        
+        fail["judge"] = False
+        calls.clear()
+        pipeline = make_pipeline()
+        results = pipeline.run()
+        
+        assert results["judge"] == 4
+        assert calls == ["judge"]
+        assert pipeline.resumed == ["evidence"]
+
+
+def test_fingerprint_mismatch_ignores_checkpoints():
+    """Контрольные точки другого набора документов не используются"""
+    calls = []
+    
+    def ocr(_):
+        calls.append("ocr")
+        return "текст"
+    
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        CasePipeline([Stage("ocr", ocr)], checkpoint_dir, fingerprint="v1").run()
+        CasePipeline([Stage("ocr", ocr)], checkpoint_dir, fingerprint="v1").run()
+        CasePipeline([Stage("ocr", ocr)], checkpoint_dir, fingerprint="v2").run()
+    
+    assert calls == ["ocr", "ocr"]
+
+
+def test_cycle_is_rejected():
+    """Цикл в графе этапов - ошибка конфигурации"""
+    with pytest.raises(ValueError):
+        CasePipeline([
+            Stage("a", lambda r: 1, deps=["b"]),
+            Stage("b", lambda r: 1, deps=["a"]),
+        ])
+
+
+class CountingOCR(StubOCR):
+    """OCR-заглушка PDF: два листа на документ, учет распознанных и растеризованных страниц"""
+    
+    def __init__(self):
+        self.recognized = []
+        self.rendered = 0
+    
+    def batch_process_pdfs(self, pdf_paths):
+        self.recognized.extend(pdf_paths)
+        return {
+            os.path.basename(path): {
+                0: f"Протокол {os.path.basename(path)}",
+                1: "Подпись следователя",
+            }
+            for path in pdf_paths
+        }
+    
+    def iter_page_images(self, pdf_path):
+        for shade in (0, 255):
+            self.rendered += 1
+            yield Image.new('L', (32, 32), shade)
+
+
+def test_case_pipeline_resumes_after_prosecution_failure(make_sphere):
+    """Сбой после copypaste: повторный запуск не повторяет OCR и растеризацию"""
+    ocr = CountingOCR()
+    investigator = make_sphere(MozgachSphere047_Investigator, ocr=ocr)
+    prosecutor = make_sphere(MozgachSphere048_Prosecutor, ocr=ocr)
+    judge = make_sphere(MozgachSphere049_Judge)
+    
+    evidence_prompts = []
+    fail = {"prosecutor": True}
+    
+    def investigator_batch_chat(prompts, images=None, batch_size=8):
+        evidence_prompts.extend(prompts)
+        return ["анализ"] * len(prompts)
+    
+    def prosecutor_chat(prompt, image=None):
+        if fail["prosecutor"]:
+            raise RuntimeError("сбой")
+        return "заключение"
+    
+    investigator.batch_chat = investigator_batch_chat
+    prosecutor.chat = prosecutor_chat
+    judge.chat = lambda prompt, image=None: "решение"
+    system = {'investigator': investigator, 'prosecutor': prosecutor, 'judge': judge}
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        docs = {}
+        for name in ("обвинение.pdf", "протокол.pdf", "допрос.pdf"):
+            docs[name] = os.path.join(workdir, name)
+            with open(docs[name], 'wb') as f:
+                f.write(b"%PDF")
+        
+        def make_pipeline():
+            return build_case_pipeline(
+                system,
+                [docs["обвинение.pdf"]],
+                [docs["протокол.pdf"], docs["допрос.pdf"]],
+                "дело",
+                checkpoint_dir=os.path.join(workdir, "runs"),
+            )
+        
+        with pytest.raises(RuntimeError):
+            make_pipeline().run()
+        
+        # OCR - по разу на сторону, страницы растеризованы этапом copypaste
+        assert sorted(ocr.recognized) == sorted(docs.values())
+        assert ocr.rendered == 6
+        
+        # Следователь анализирует документы целиком, а не страницы
+        assert len(evidence_prompts) == 2
+        assert all("Подпись следователя" in prompt for prompt in evidence_prompts)
+        
+        fail["prosecutor"] = False
+        pipeline = make_pipeline()
+        results = pipeline.run()
+        
+        assert results["judgment"]["judgment"] == "решение"
+        assert {"case", "copypaste", "evidence"} <= set(pipeline.resumed)
+        assert sorted(ocr.recognized) == sorted(docs.values())
+        assert ocr.rendered == 6
+        assert len(evidence_prompts) == 2
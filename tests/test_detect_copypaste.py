@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Тесты синхронного и асинхронного обнаружения копипаста
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+import asyncio
+import inspect
+
+# Корень репозитория в путь: анализатор - модуль пакета src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.legal_analyzer import LegalCase, LegalDocumentAnalyzer
+
+
+class FakeVisualEngine:
+    """Визуальное сравнение без моделей: доля страниц с совпадающей меткой"""
+    
+    def fingerprint(self, pages):
+        return list(pages)
+    
+    def visual_similarity(self, fingerprints1, fingerprints2):
+        return 100.0 * sum(page in fingerprints2 for page in fingerprints1) / len(fingerprints1)
+
+
+def _case() -> LegalCase:
+    copied = "Свидетель Иванов показал, что видел автомобиль около дома."
+    return LegalCase(
+        case_name="дело",
+        prosecutor_documents={"обвинение.pdf": {1: "ОБВИНЕНИЕ\n\n" + copied}},
+        investigator_documents={"допрос.pdf": {1: "ПРОТОКОЛ\n\n" + copied}},
+        metadata={'prosecutor_files': [], 'investigator_files': []},
+    )
+
+
+def test_async_signature_matches_sync():
+    """Асинхронная версия принимает те же параметры (и executor)"""
+    sync = list(inspect.signature(LegalDocumentAnalyzer.detect_copypaste).parameters)
+    async_ = list(inspect.signature(LegalDocumentAnalyzer.detect_copypaste_async).parameters)
+    
+    assert async_ == sync + ['executor']
+
+
+def test_async_uses_given_pages_and_matches_sync(make_analyzer):
+    """pages= передается визуальному сравнению в обеих версиях, результаты совпадают"""
+    analyzer = make_analyzer(normalizer=None, boilerplate_min_pages=None, visual_engine=FakeVisualEngine())
+    pages = (["страница-1", "страница-2"], ["страница-2"])
+    
+    result = analyzer.detect_copypaste(_case(), block_size=40, pages=pages)
+    async_result = asyncio.run(
+        analyzer.detect_copypaste_async(_case(), block_size=40, pages=pages)
+    )
+    
+    assert result.visual_similarity == async_result.visual_similarity == 50.0
+    assert result.to_dict() == async_result.to_dict()
+    assert len(result.identical_sections) == 1
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Тесты управления генерацией: длина, стоп-строки, дедлайн, кэш ответов,
+спекулятивное декодирование
+
+Модель и токенизатор - заглушки без весов: токен - символ, модель
+продолжает промпт заданным ответом.
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+from itertools import cycle
+from types import SimpleNamespace
+
+import pytest
+import torch
+import torch.nn as nn
+
+# Добавляем корень репозитория в путь (multimodal_model использует относительные импорты)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import src.multimodal_model as multimodal_model
+from src.generation import (
+    GenerationMonitor,
+    GenerationStats,
+    STOP_CACHE,
+    STOP_DEADLINE,
+    STOP_EOS,
+    STOP_MAX_NEW_TOKENS,
+    STOP_STRING,
+    cut_at_stop_strings,
+)
+from src.multimodal_model import MultimodalBraindler
+from stubs import StubLanguageModel
+
+
+PAD = 0
+
+
+class CharTokenizer:
+    """Токенизатор-заглушка: один символ - один токен (код символа)"""
+    
+    pad_token = "<pad>"
+    eos_token = "<pad>"
+    pad_token_id = PAD
+    
+    def __init__(self):
+        self.padding_side = "right"
+    
+    def __call__(self, texts, return_tensors=None, padding=False, truncation=False, add_special_tokens=True):
+        if isinstance(texts, str):
+            return {"input_ids": [ord(c) for c in texts]}
+        
+        rows = [[ord(c) for c in text] for text in texts]
+        width = max(map(len, rows))
+        input_ids, attention_mask = [], []
+        for row in rows:
+            pad = [PAD] * (width - len(row))
+            mask = [1] * len(row)
+            if self.padding_side == "left":
+                input_ids.append(pad + row)
+                attention_mask.append([0] * len(pad) + mask)
+            else:
+                input_ids.append(row + pad)
+                attention_mask.append(mask + [0] * len(pad))
+        return {"input_ids": torch.tensor(input_ids), "attention_mask": torch.tensor(attention_mask)}
+    
+    def decode(self, token_ids, skip_special_tokens=True):
+        return ''.join(chr(int(i)) for i in token_ids if int(i) != PAD)
+    
+    def batch_decode(self, rows, skip_special_tokens=True):
+        return [self.decode(row) for row in rows]
+    
+    def get_vocab(self):
+        return {chr(code): code for code in range(1, 0x500)}
+
+
+class OtherVocabTokenizer(CharTokenizer):
+    """Черновой токенизатор с другим словарем"""
+    
+    def get_vocab(self):
+        return {'▁' + chr(code): code for code in range(1, 0x500)}
+
+
+class ScriptedLanguageModel(StubLanguageModel):
+    """
+    Языковая модель-заглушка: продолжает промпт ответом reply(промпт)
+    
+    generate проходит по шагам как transformers: после каждого токена
+    вызывает критерии остановки, закончившие строки добиваются паддингом.
+    С assistant_model каждый проход основной модели проверяет черновые
+    токены и дает принятые плюс один собственный; ответ не меняется.
+    """
+    
+    def __init__(self, reply):
+        super().__init__()
+        self.reply = reply
+        self.calls = []
+    
+    def _verify(self, sequences, remaining, assistant_model) -> int:
+        """Проход основной модели: сколько токенов он дает"""
+        accepted = 0
+        if assistant_model is not None:
+            drafted = min(assistant_model.generation_config.num_assistant_tokens, remaining - 1)
+            accepted = assistant_model.draft(sequences, drafted)
+        self(sequences)
+        return accepted + 1
+    
+    def generate(
+        self,
+        input_ids,
+        attention_mask=None,
+        max_new_tokens=None,
+        do_sample=False,
+        pad_token_id=PAD,
+        stopping_criteria=(),
+        assistant_model=None,
+        **kwargs
+    ):
+        self.calls.append({
+            'rows': input_ids.shape[0],
+            'max_new_tokens': max_new_tokens,
+            'do_sample': do_sample,
+            'assistant': assistant_model is not None,
+            **kwargs,
+        })
+        
+        tokenizer = CharTokenizer()
+        targets = [
+            [ord(c) for c in self.reply(tokenizer.decode(row))]
+            for row in input_ids.tolist()
+        ]
+        finished = torch.zeros(input_ids.shape[0], dtype=torch.bool)
+        sequences = input_ids
+        step = 0
+        
+        while step < max_new_tokens and not finished.all():
+            for _ in range(self._verify(sequences, max_new_tokens - step, assistant_model)):
+                tokens = []
+                for row, target in enumerate(targets):
+                    if finished[row] or step >= len(target):
+                        finished[row] = True
+                        tokens.append(pad_token_id)
+                    else:
+                        tokens.append(target[step])
+                sequences = torch.cat([sequences, torch.tensor(tokens)[:, None]], dim=1)
+                step += 1
+                
+                for criterion in stopping_criteria:
+                    finished |= criterion(sequences, None)
+                if finished.all():
+                    break
+        
+        return sequences
+
+
+class DraftLanguageModel(nn.Module):
+    """Черновая модель-заглушка: проход на каждый черновой токен, принятие по сценарию"""
+    
+    def __init__(self, accepted):
+        super().__init__()
+        self.accepted = cycle(accepted)
+        self.generation_config = SimpleNamespace(num_assistant_tokens=None)
+    
+    def forward(self, input_ids):
+        return None
+    
+    def draft(self, sequences, count: int) -> int:
+        """Предлагает count токенов, возвращает, сколько из них верны"""
+        for _ in range(count):
+            self(sequences)
+        return min(next(self.accepted), count)
+
+
+@pytest.fixture
+def make_model(make_sphere):
+    """MultimodalBraindler без весов: токенизатор и языковая модель - заглушки"""
+    def make(reply):
+        return make_sphere(
+            MultimodalBraindler,
+            tokenizer=CharTokenizer(),
+            language_model=ScriptedLanguageModel(reply),
+        )
+    
+    return make
+
+
+def test_cut_at_stop_strings():
+    """Ответ обрезается по самой ранней стоп-строке"""
+    text = "Вывод суда.\nДЕЛО: новое\nТы - СУДЬЯ"
+    
+    assert cut_at_stop_strings(text, ["\nТы - СУДЬЯ", "\nДЕЛО:"]) == "Вывод суда."
+    assert cut_at_stop_strings(" ответ ", None) == "ответ"
+    assert cut_at_stop_strings("ответ", ["", "нет"]) == "ответ"
+
+
+def test_monitor_stops_rows_independently():
+    """Стоп-строка завершает только свою строку пакета, причины сохраняются"""
+    tokenizer = CharTokenizer()
+    prompt = tokenizer(["аб", "вг"])["input_ids"]
+    monitor = GenerationMonitor(tokenizer, prompt_length=2, stop_strings=["\nСТОП"])
+    
+    def step(*rows):
+        return monitor(torch.cat([prompt, torch.tensor([[ord(c) for c in row] for row in rows])], dim=1), None)
+    
+    assert step("да", "не").tolist() == [False, False]
+    assert step("да\nСТОП", "нет ещё").tolist() == [True, False]
+    assert step("да\nСТОП", "нет ещё").tolist() == [False, False]
+    
+    stats = monitor.finish([7, 3], max_new_tokens=3, prompt_tokens=2)
+    assert stats.stop_reasons == [STOP_STRING, STOP_MAX_NEW_TOKENS]
+    assert stats.new_tokens == 7
+    assert stats.prefill_time >= 0 and stats.decode_time >= 0
+
+
+def test_stats_properties():
+    """Скорость декодирования не считает первый токен, причины - через запятую"""
+    stats = GenerationStats(new_tokens=11, decode_time=2.0, stop_reasons=[STOP_EOS, STOP_STRING, STOP_EOS])
+    
+    assert stats.decode_tokens_per_second == 5.0
+    assert stats.stop_reason == "eos,stop_string"
+    assert GenerationStats(new_tokens=1, decode_time=1.0).decode_tokens_per_second == 0.0
+    assert GenerationStats().acceptance_rate == 0.0
+
+
+def test_generate_uses_max_new_tokens_and_stop_strings(make_model):
+    """Длина задается новыми токенами, стоп-строка прерывает генерацию и обрезает ответ"""
+    model = make_model(lambda prompt: "Вывод.\nДЕЛО: повтор шаблона" if "1" in prompt else "короткий")
+    
+    responses = model._generate(
+        ["длинный промпт 1", "2"],
+        max_new_tokens=20,
+        stop_strings=["\nДЕЛО:"],
+        do_sample=False,
+    )
+    
+    assert responses == ["Вывод.", "короткий"]
+    call = model.language_model.calls[0]
+    assert call['max_new_tokens'] == 20 and 'max_length' not in call
+    
+    stats = model.last_generation_stats
+    assert stats.stop_reasons == [STOP_STRING, STOP_EOS]
+    assert stats.new_tokens == len("Вывод.\nДЕЛО:")
+    assert stats.prompt_tokens == len("длинный промпт 1")
+    
+    model._generate(["3"], max_new_tokens=4, stop_strings=[], do_sample=False)
+    assert model.last_generation_stats.stop_reasons == [STOP_MAX_NEW_TOKENS]
+
+
+def test_deadline_aborts_generation(make_model):
+    """Истекший дедлайн останавливает генерацию после первого токена"""
+    model = make_model(lambda prompt: "очень длинный ответ" * 10)
+    
+    responses = model._generate(["промпт"], max_new_tokens=100, stop_strings=[], deadline_ms=0)
+    
+    assert responses == ["о"]
+    assert model.last_generation_stats.stop_reasons == [STOP_DEADLINE]
+
+
+def test_cache_bypassed_for_unseeded_sampling(make_model):
+    """Сэмплирование без seed не кэшируется, с seed - кэшируется и идет по одному запросу"""
+    model = make_model(lambda prompt: f"ответ на {prompt}")
+    model.enable_response_cache()
+    prompts = ["первый", "второй", "третий"]
+    
+    for _ in range(2):
+        assert model._cached_generate(prompts, [None] * 3, batch_size=8, do_sample=True) == [
+            f"ответ на {prompt}" for prompt in prompts
+        ]
+    assert [call['rows'] for call in model.language_model.calls] == [3, 3]
+    assert len(model.response_cache) == 0
+    
+    model.language_model.calls.clear()
+    for _ in range(2):
+        model._cached_generate(prompts, [None] * 3, batch_size=8, do_sample=True, seed=7)
+    assert [call['rows'] for call in model.language_model.calls] == [1, 1, 1]
+    assert model.last_generation_stats.stop_reasons == [STOP_CACHE] * 3
+    
+    # Другой seed - другой ключ кэша; жадное декодирование кэшируется пакетом
+    model.language_model.calls.clear()
+    model._cached_generate(prompts[:1], [None], do_sample=True, seed=8)
+    model._cached_generate(prompts, [None] * 3, batch_size=8, do_sample=False)
+    model._cached_generate(prompts, [None] * 3, batch_size=8, do_sample=False)
+    assert [call['rows'] for call in model.language_model.calls] == [1, 3]
+
+
+def test_deadline_responses_not_cached(make_model):
+    """Ответ, прерванный дедлайном, не попадает в кэш"""
+    model = make_model(lambda prompt: "длинный ответ")
+    model.enable_response_cache()
+    
+    model._cached_generate(["промпт"], [None], do_sample=False, deadline_ms=0)
+    assert len(model.response_cache) == 0
+    
+    assert model._cached_generate(["промпт"], [None], do_sample=False) == ["длинный ответ"]
+    assert model._cached_generate(["промпт"], [None], do_sample=False) == ["длинный ответ"]
+    assert len(model.language_model.calls) == 2
+
+
+@pytest.fixture
+def draft_loader(monkeypatch):
+    """Подменяет загрузку черновой модели: (модель, токенизатор) по имени"""
+    loaded = {}
+    
+    def install(draft, tokenizer):
+        monkeypatch.setattr(multimodal_model, 'AutoTokenizer', SimpleNamespace(
+            from_pretrained=lambda name: loaded.setdefault('tokenizer', tokenizer)
+        ))
+        monkeypatch.setattr(multimodal_model, 'AutoModelForCausalLM', SimpleNamespace(
+            from_pretrained=lambda name, torch_dtype=None: loaded.setdefault(name, draft)
+        ))
+        return loaded
+    
+    return install
+
+
+def test_speculative_decoding_accounts_accepted_tokens(make_model, draft_loader):
+    """Черновые и принятые токены считаются по проходам моделей, ответ не меняется"""
+    reply = lambda prompt: "Суд установил, что вина доказана полностью."
+    loaded = draft_loader(DraftLanguageModel(accepted=[4, 2]), CharTokenizer())
+    
+    plain = make_model(reply)
+    expected = plain._generate(["промпт"], max_new_tokens=16, stop_strings=[], do_sample=False)
+    
+    model = make_model(reply)
+    model.enable_speculative_decoding("draft", num_assistant_tokens=4)
+    responses = model._generate(["промпт"], max_new_tokens=16, stop_strings=[], do_sample=False)
+    
+    assert list(loaded) == ['tokenizer', 'draft']
+    assert responses == expected
+    assert model.language_model.calls[0]['assistant']
+    assert 'assistant_tokenizer' not in model.language_model.calls[0]
+    
+    # Черновых по проверкам 4, 4, 4, 2, принято 4, 2, 4, 2: 5 + 3 + 5 + 3 = 16 токенов
+    stats = model.last_generation_stats
+    assert stats.new_tokens == 16
+    assert stats.draft_tokens == 14
+    assert stats.accepted_tokens == 12
+    assert stats.acceptance_rate == pytest.approx(12 / 14)
+
+
+def test_speculative_decoding_only_for_single_requests(make_model, draft_loader):
+    """Пакет генерируется без черновой модели, после выключения - тоже"""
+    draft_loader(DraftLanguageModel(accepted=[1]), CharTokenizer())
+    model = make_model(lambda prompt: "ответ")
+    model.enable_speculative_decoding("draft")
+    
+    assert model.draft_model.generation_config.num_assistant_tokens == model.NUM_ASSISTANT_TOKENS
+    
+    model._generate(["первый", "второй"], stop_strings=[], do_sample=False)
+    assert model.last_generation_stats.draft_tokens == 0
+    
+    model.disable_speculative_decoding()
+    target_calls = model._target_forward_calls
+    model._generate(["первый"], stop_strings=[], do_sample=False)
+    assert [call['assistant'] for call in model.language_model.calls] == [False, False]
+    
+    # Хуки сняты: проходы основной модели больше не считаются
+    assert model._target_forward_calls == target_calls
+    assert not model.language_model._forward_hooks
+
+
+def test_speculative_decoding_translates_other_vocabulary(make_model, draft_loader):
+    """Черновая модель с другим словарем: transformers получает оба токенизатора"""
+    draft_loader(DraftLanguageModel(accepted=[2]), OtherVocabTokenizer())
+    model = make_model(lambda prompt: "ответ")
+    model.enable_speculative_decoding("draft", num_assistant_tokens=2)
+    
+    assert model._generate(["промпт"], stop_strings=[], do_sample=False) == ["ответ"]
+    call = model.language_model.calls[0]
+    assert call['tokenizer'] is model.tokenizer
+    assert call['assistant_tokenizer'] is model.draft_tokenizer
+    
+    with pytest.raises(ValueError):
+        make_model(lambda prompt: "").enable_speculative_decoding()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Тесты сервиса приема документов
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+import json
+import tempfile
+import threading
+import time
+import types
+import urllib.request
+
+import numpy as np
+from PIL import Image
+
+# Корень репозитория в путь: сервис - модуль пакета src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.ingestion import IngestionService, PageIndexIndexer, TextStoreIndexer
+
+
+class FakeOCR:
+    """OCR-заглушка: страница на каждую строку файла"""
+    
+    def __init__(self, release: threading.Event = None):
+        self.calls = []
+        self.release = release
+    
+    def batch_process_pdfs(self, pdf_paths, output_dir=None):
+        if self.release is not None:
+            self.release.wait(5)
+        path = pdf_paths[0]
+        self.calls.append(os.path.basename(path))
+        with open(path, encoding='utf-8') as f:
+            return {os.path.basename(path): dict(enumerate(f.read().splitlines()))}
+
+
+class FakeEncoder:
+    """VisionEncoder-заглушка: эмбеддинг - яркость страницы и ее дополнение"""
+    
+    def get_embedding_dim(self):
+        return 2
+    
+    def encode_batch(self, images):
+        brightness = [image.getpixel((0, 0))[0] for image in images]
+        array = np.array([[value, 255 - value] for value in brightness], dtype=np.float32)
+        return types.SimpleNamespace(cpu=lambda: types.SimpleNamespace(numpy=lambda: array))
+
+
+class RenderingOCR(FakeOCR):
+    """OCR-заглушка с растеризацией: страница на строку, яркость по номеру"""
+    
+    def iter_page_images(self, path):
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        for i in range(len(lines)):
+            yield Image.new('L', (8, 8), 40 * i)
+
+
+def _drain(service):
+    """Выполняет задания очереди в текущем потоке (прием или удаление)"""
+    while not service._queue.empty():
+        name, signature = service._queue.get()
+        if signature is None:
+            service.remove_document(name)
+        else:
+            service.process_document(name, signature)
+        service._in_flight.pop(name, None)
+
+
+def _write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def test_new_and_changed_pdfs_ingested_once():
+    """Новые и измененные PDF распознаются, неизмененные - нет; реестр переживает перезапуск"""
+    with tempfile.TemporaryDirectory() as tmp:
+        watch, workspace = os.path.join(tmp, "Тома"), os.path.join(tmp, "workspace")
+        os.makedirs(watch)
+        _write(os.path.join(watch, "том1.pdf"), "стр1\nстр2")
+        _write(os.path.join(watch, "notes.txt"), "не PDF")
+        
+        indexed = []
+        ocr = FakeOCR()
+        service = IngestionService(watch, workspace, ocr=ocr, indexers=[lambda path, texts: indexed.append(len(texts))])
+        
+        # Первый проход только запоминает сигнатуру (файл мог копироваться)
+        assert service.scan_once() == 0
+        assert service.scan_once() == 1
+        assert service.process_document(*service._queue.get()) == {0: "стр1", 1: "стр2"}
+        service._in_flight.clear()
+        assert service.scan_once() == 0
+        
+        _write(os.path.join(watch, "том1.pdf"), "стр1\nстр2\nстр3")
+        os.utime(os.path.join(watch, "том1.pdf"), ns=(1, 1))
+        service.scan_once()
+        assert service.scan_once() == 1
+        service.process_document(*service._queue.get())
+        
+        assert ocr.calls == ["том1.pdf", "том1.pdf"]
+        assert indexed == [2, 3]
+        
+        with open(os.path.join(workspace, "documents.json"), encoding='utf-8') as f:
+            assert json.load(f)["том1.pdf"]["pages"] == 3
+        
+        restarted = IngestionService(watch, workspace, ocr=ocr)
+        restarted.scan_once()
+        assert restarted.scan_once() == 0
+
+
+def test_bounded_queue_backpressure_and_http_endpoints():
+    """Очередь ограничена, лишние файлы ждут следующего прохода; /health и /metrics отвечают"""
+    with tempfile.TemporaryDirectory() as tmp:
+        watch, workspace = os.path.join(tmp, "in"), os.path.join(tmp, "ws")
+        os.makedirs(watch)
+        for i in range(4):
+            _write(os.path.join(watch, f"том{i}.pdf"), f"текст {i}")
+        
+        release = threading.Event()
+        service = IngestionService(watch, workspace, ocr=FakeOCR(release), workers=1, max_queue=1, poll_interval=0.05)
+        service.start(http_port=0)
+        try:
+            url = f"http://127.0.0.1:{service.http_port}"
+            with urllib.request.urlopen(url + "/health") as response:
+                assert json.load(response)["status"] == "ok"
+            
+            time.sleep(0.3)
+            assert service.metrics()["backpressure"] > 0
+            
+            release.set()
+            deadline = time.monotonic() + 10
+            while service.metrics()["processed"] < 4 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert service.wait_idle(5)
+            
+            with urllib.request.urlopen(url + "/metrics") as response:
+                metrics = response.read().decode('utf-8')
+            assert "braindler_ingest_processed_total 4" in metrics
+            assert "braindler_ingest_queue_depth 0" in metrics
+        finally:
+            service.stop()
+        
+        assert service.health()["status"] == "unhealthy"
+
+
+def test_default_indexers_follow_moves_and_deletions():
+    """Тексты и индекс страниц ведутся по умолчанию; перемещенный и удаленный файлы убираются"""
+    with tempfile.TemporaryDirectory() as tmp:
+        watch, workspace = os.path.join(tmp, "Тома"), os.path.join(tmp, "workspace")
+        os.makedirs(os.path.join(watch, "архив"))
+        _write(os.path.join(watch, "том1.pdf"), "стр1\nстр2")
+        _write(os.path.join(watch, "том2.pdf"), "стр1")
+        
+        service = IngestionService(watch, workspace, ocr=RenderingOCR(), vision_encoder=FakeEncoder())
+        service.scan_once()
+        assert service.scan_once() == 2
+        _drain(service)
+        
+        store = TextStoreIndexer(os.path.join(workspace, "text_store"), watch).load()
+        assert {name: dict(pages) for name, pages in store.items()} == {
+            "том1.pdf": {0: "стр1", 1: "стр2"},
+            "том2.pdf": {0: "стр1"},
+        }
+        page_index = service.indexers[1].index
+        assert sorted(page_index.keys) == ["том1.pdf#0", "том1.pdf#1", "том2.pdf#0"]
+        
+        # Перемещение: старое имя удаляется после двух проходов без файла
+        os.replace(os.path.join(watch, "том2.pdf"), os.path.join(watch, "архив", "том2.pdf"))
+        os.remove(os.path.join(watch, "том1.pdf"))
+        assert service.scan_once() == 0
+        assert service.scan_once() == 3
+        _drain(service)
+        
+        moved = os.path.join("архив", "том2.pdf")
+        assert sorted(service.registry) == [moved]
+        assert not os.path.exists(service.document_dir("том1.pdf"))
+        assert list(TextStoreIndexer(os.path.join(workspace, "text_store"), watch).load()) == [moved]
+        assert page_index.keys == [f"{moved}#0"]
+        
+        # Индекс сохранен на диск
+        reopened = PageIndexIndexer(
+            os.path.join(workspace, "page_index"),
+            watch,
+            RenderingOCR().iter_page_images,
+            service.indexers[1].visual_engine,
+        )
+        assert reopened.index.keys == [f"{moved}#0"]
+        
+        # Отключенный том не приводит к удалению документов
+        os.replace(watch, watch + "_отключен")
+        assert service.scan_once() == service.scan_once() == 0
+        assert sorted(service.registry) == [moved]
+        assert service.metrics()["documents"] == 1
+
+
+def test_text_store_rewrites_only_ingested_document():
+    """Прием документа переписывает только его хранилище, остальные не трогаются"""
+    with tempfile.TemporaryDirectory() as tmp:
+        watch, store_dir = os.path.join(tmp, "Тома"), os.path.join(tmp, "text_store")
+        indexer = TextStoreIndexer(store_dir, watch)
+        indexer(os.path.join(watch, "том1.pdf"), {0: "стр1", 1: "стр2"})
+        indexer(os.path.join(watch, "архив", "том2.pdf"), {0: "старый"})
+        
+        first = os.path.join(store_dir, indexer.documents["том1.pdf"], "data.npy")
+        before = os.stat(first)
+        
+        indexer(os.path.join(watch, "архив", "том2.pdf"), {0: "новый", 3: "стр4"})
+        indexer(os.path.join(watch, "том3.pdf"), {})
+        indexer.remove(os.path.join(watch, "том3.pdf"))
+        
+        after = os.stat(first)
+        assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+        
+        # Список документов на диске: повторное открытие видит тексты по порядку приема
+        store = TextStoreIndexer(store_dir, watch).load()
+        assert {name: dict(pages) for name, pages in store.items()} == {
+            "том1.pdf": {0: "стр1", 1: "стр2"},
+            os.path.join("архив", "том2.pdf"): {0: "новый", 3: "стр4"},
+        }
+        assert store.joined_text() == "стр1\n\nстр2\n\nновый\n\nстр4"
+        assert sorted(os.listdir(store_dir)) == sorted(["documents.json", "том1.pdf", "архив__том2.pdf"])
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Тесты конвейерного сбора доказательств следователем
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+import threading
+
+import pytest
+
+# Добавляем корень репозитория в путь (legal_models использует относительные импорты)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.legal_models import MozgachSphere047_Investigator
+from stubs import StubOCR
+
+
+@pytest.fixture
+def make_investigator(make_sphere):
+    """Следователь без весов модели: OCR и генерация - заглушки"""
+    def make():
+        investigator = make_sphere(MozgachSphere047_Investigator, ocr=StubOCR())
+        investigator._investigator_prompt = lambda text, question: text
+        investigator.batch_chat = lambda prompts, images, batch_size: [
+            f"анализ: {prompt}" for prompt in prompts
+        ]
+        return investigator
+    
+    return make
+
+
+@pytest.mark.parametrize("with_texts", [False, True])
+def test_collect_evidence_more_documents_than_batch(make_investigator, with_texts):
+    """Документов больше batch_size: каждый анализ соответствует своему документу"""
+    documents = [f"стр{i}" for i in range(20)]
+    texts = [f"готовый текст {i}" for i in range(20)] if with_texts else None
+    progress = []
+    
+    evidence = make_investigator().collect_evidence(
+        documents,
+        "дело",
+        batch_size=4,
+        progress_callback=lambda done, total: progress.append((done, total)),
+        texts=texts,
+    )
+    
+    expected = texts or [f"текст стр{i}" for i in range(20)]
+    assert [finding['document'] for finding in evidence['findings']] == list(range(1, 21))
+    assert [finding['analysis'] for finding in evidence['findings']] == [
+        f"анализ: {text}" for text in expected
+    ]
+    assert progress[-1] == (20, 20) and len(progress) == 5
+
+
+def test_ocr_overlaps_generation_and_images_follow_batches(make_investigator):
+    """OCR следующего пакета идет во время генерации текущего, изображения - по пакетам"""
+    documents = [f"стр{i}" for i in range(10)]
+    recognized = []
+    next_batch_ready = threading.Event()
+    calls = []
+    
+    class RecordingOCR:
+        def extract_text_from_image(self, document):
+            recognized.append(document)
+            if document == "стр3":
+                next_batch_ready.set()
+            return f"текст {document}"
+    
+    def batch_chat(prompts, images, batch_size):
+        # Пока генерируется первый пакет, документ #4 распознается в фоне
+        calls.append((list(images), next_batch_ready.wait(timeout=5)))
+        return [f"анализ {i}" for i in range(len(prompts))]
+    
+    investigator = make_investigator()
+    investigator.ocr = RecordingOCR()
+    investigator.batch_chat = batch_chat
+    
+    evidence = investigator.collect_evidence(documents, "дело", batch_size=3, ocr_workers=2)
+    
+    assert [images for images, _ in calls] == [documents[0:3], documents[3:6], documents[6:9], documents[9:]]
+    assert calls[0][1]
+    assert sorted(recognized) == sorted(documents)
+    assert len(evidence['findings']) == 10
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Тесты map-reduce анализа дела судьей
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+import re
+
+import pytest
+
+# Добавляем корень репозитория в путь (legal_models использует относительные импорты)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.legal_models import MozgachSphere049_Judge
+
+
+@pytest.fixture
+def make_judge(make_sphere):
+    """Судья без весов модели: генерация возвращает длинные ответы"""
+    def make(answer_words: int = 300):
+        judge = make_sphere(MozgachSphere049_Judge)
+        judge.reduce_calls = []
+        judge.final_prompts = []
+        
+        def batch_chat(prompts, images=None, batch_size=8):
+            if images is None:
+                judge.reduce_calls.append(prompts)
+            return ["вывод " * answer_words for _ in prompts]
+        
+        def chat(prompt, image=None):
+            judge.final_prompts.append(prompt)
+            return "вердикт"
+        
+        judge.batch_chat = batch_chat
+        judge.chat = chat
+        return judge
+    
+    return make
+
+
+def _labels(text: str):
+    """Диапазоны документов из подписей анализов"""
+    return [
+        (int(first), int(last or first))
+        for first, last in re.findall(r'Документы? (\d+)(?:-(\d+))?:', text)
+    ]
+
+
+def test_format_analysis_labels_and_truncates_to_half_budget(make_judge):
+    """Анализ подписан номерами документов и не длиннее половины бюджета"""
+    judge = make_judge()
+    
+    single = judge._format_analysis(3, 3, "слово " * 500, budget=100)
+    merged = judge._format_analysis(1, 8, "итог", budget=100)
+    
+    assert single[:2] == (3, 3)
+    assert single[2].startswith("Документ 3:")
+    assert judge._count_tokens(single[2]) == 50
+    assert merged == (1, 8, "Документы 1-8: итог")
+
+
+def test_pack_by_tokens_keeps_order_and_at_least_two_per_group(make_judge):
+    """Группы укладываются в бюджет, но содержат минимум два анализа"""
+    judge = make_judge()
+    items = [(i, i, "слово " * tokens) for i, tokens in enumerate([30, 30, 30, 90, 90, 10, 5])]
+    
+    groups = judge._pack_by_tokens(items, budget=100)
+    
+    assert [[item[0] for item in group] for group in groups] == [[0, 1, 2], [3, 4], [5, 6]]
+    assert [item for group in groups for item in group] == items
+
+
+def test_map_reduce_converges_within_budget(make_judge):
+    """Свертка сходится за log2 уровней, материалы вердикта в бюджете, документы не теряются"""
+    judge = make_judge()
+    budget = 200
+    
+    verdict = judge.analyze_case_visually(
+        [f"стр{i}" for i in range(40)],
+        "дело",
+        batch_size=8,
+        group_token_budget=budget,
+    )
+    
+    assert verdict == "вердикт"
+    
+    # Каждый уровень как минимум вдвое сокращает количество анализов
+    sizes = [40] + [len(prompts) for prompts in judge.reduce_calls]
+    assert all(after <= (before + 1) // 2 for before, after in zip(sizes, sizes[1:]))
+    assert len(judge.reduce_calls) <= 6
+    
+    # Группа свертки укладывается в бюджет
+    for prompts in judge.reduce_calls:
+        for prompt in prompts:
+            analyses = prompt.split("АНАЛИЗЫ:")[1].split("Сохрани номера")[0]
+            assert judge._count_tokens(analyses) <= budget
+    
+    # Итоговые анализы помещаются в бюджет без сжатия и покрывают все документы по порядку
+    materials = judge.final_prompts[0].split("АНАЛИЗЫ ДОКУМЕНТОВ:")[1].split("ИТОГОВЫЙ ВЕРДИКТ")[0]
+    labels = _labels(materials)
+    assert judge._count_tokens(materials) <= budget
+    assert labels[0][0] == 1 and labels[-1][1] == 40
+    assert all(previous[1] + 1 == current[0] for previous, current in zip(labels, labels[1:]))
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Тесты бэкендов Tesseract
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+import ctypes
+import stat
+import tempfile
+import types
+
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+# Добавляем src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import ocr_backends
+from ocr_backends import CAPIBackend, EasyOCRBackend, PipeBackend, parse_tsv, PSM_SINGLE_BLOCK
+
+
+TSV = (
+    "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext\n"
+    "1\t1\t0\t0\t0\t0\t0\t0\t100\t50\t-1\t\n"
+    "5\t1\t1\t1\t1\t1\t10\t20\t30\t12\t96.5\tПРИГОВОР\n"
+    "5\t1\t1\t1\t1\t2\t45\t20\t15\t12\t91.0\tсуда\n"
+)
+
+# Заглушка tesseract: проверяет, что изображение пришло в stdin как PNM
+FAKE_TESSERACT = """#!/bin/sh
+header=$(head -c 2)
+[ "$header" = "P5" ] || { echo "ожидался PGM в stdin" >&2; exit 1; }
+[ "$1" = "stdin" ] && [ "$2" = "stdout" ] || exit 2
+for arg in "$@"; do
+    if [ "$arg" = "tsv" ]; then printf '%s' "$TSV_OUTPUT"; exit 0; fi
+done
+echo "ПРИГОВОР суда psm=$6 $7 $8"
+"""
+
+
+def test_parse_tsv_matches_image_to_data_format():
+    """TSV разбирается в колонки pytesseract.Output.DICT, заголовок необязателен"""
+    data = parse_tsv(TSV)
+    
+    assert data['text'] == ['', 'ПРИГОВОР', 'суда']
+    assert data['conf'] == [-1.0, 96.5, 91.0]
+    assert data['left'] == [0, 10, 45]
+    assert parse_tsv(TSV.split('\n', 1)[1]) == data
+
+
+def test_pipe_backend_passes_pages_through_stdin():
+    """PipeBackend передает страницу через stdin и не пишет временные файлы"""
+    with tempfile.TemporaryDirectory() as tmp:
+        command = os.path.join(tmp, "tesseract")
+        with open(command, 'w') as f:
+            f.write(FAKE_TESSERACT)
+        os.chmod(command, os.stat(command).st_mode | stat.S_IEXEC)
+        
+        os.environ['TSV_OUTPUT'] = TSV
+        try:
+            backend = PipeBackend("rus+eng", workers=2, tesseract_cmd=command)
+            page = Image.new('L', (64, 32), 255)
+            
+            text = backend.image_to_string(page, psm=PSM_SINGLE_BLOCK)
+            data = backend.image_to_data(page)
+            
+            # PNM без разрешения: DPI растеризации передается флагом
+            with_dpi = backend.image_to_string(page, psm=PSM_SINGLE_BLOCK, dpi=200)
+            page.info['dpi'] = (150, 150)
+            from_info = backend.image_to_string(page, psm=PSM_SINGLE_BLOCK)
+        finally:
+            del os.environ['TSV_OUTPUT']
+        
+        assert os.listdir(tmp) == ["tesseract"]
+    
+    assert text.strip() == "ПРИГОВОР суда psm=6"
+    assert data['text'][1:] == ['ПРИГОВОР', 'суда']
+    assert with_dpi.strip() == "ПРИГОВОР суда psm=6 --dpi 200"
+    assert from_info.strip() == "ПРИГОВОР суда psm=6 --dpi 150"
+
+
+class FakeLibTesseract:
+    """Заглушка C API libtesseract: считает загрузки моделей и освобождения строк"""
+    
+    def __init__(self):
+        self.handles = 0
+        self.inits = []
+        self.images = []
+        self.buffers = {}
+        self.deleted = []
+        self.ended = []
+        self.resolutions = []
+    
+    def TessBaseAPICreate(self):
+        self.handles += 1
+        return self.handles
+    
+    def TessBaseAPIInit3(self, api, datapath, language):
+        self.inits.append((api, language))
+        return 0
+    
+    def TessBaseAPISetPageSegMode(self, api, psm):
+        self.psm = psm
+    
+    def TessBaseAPISetImage(self, api, pixels, width, height, bytes_per_pixel, bytes_per_line):
+        self.images.append((api, len(pixels), width, height, bytes_per_pixel, bytes_per_line))
+    
+    def TessBaseAPISetSourceResolution(self, api, ppi):
+        self.resolutions.append(ppi)
+    
+    def _result(self, text):
+        buffer = ctypes.create_string_buffer(text.encode('utf-8'))
+        self.buffers[ctypes.addressof(buffer)] = buffer
+        return ctypes.addressof(buffer)
+    
+    def TessBaseAPIGetUTF8Text(self, api):
+        return self._result(f"ПРИГОВОР суда psm={self.psm}\n")
+    
+    def TessBaseAPIGetTsvText(self, api, page_number):
+        return self._result(TSV.split('\n', 1)[1])
+    
+    def TessBaseAPIClear(self, api):
+        pass
+    
+    def TessDeleteText(self, pointer):
+        self.deleted.append(pointer)
+    
+    def TessBaseAPIEnd(self, api):
+        self.ended.append(api)
+    
+    def TessBaseAPIDelete(self, api):
+        pass
+
+
+def test_capi_backend_loads_models_once_per_worker(monkeypatch):
+    """CAPIBackend загружает модели один раз на экземпляр и освобождает строки результата"""
+    lib = FakeLibTesseract()
+    monkeypatch.setattr(ocr_backends, 'load_libtesseract', lambda path=None: lib)
+    
+    backend = CAPIBackend("rus+eng", workers=2)
+    texts = [
+        backend.image_to_string(Image.new('L', (64, 32), 255), psm=PSM_SINGLE_BLOCK)
+        for _ in range(5)
+    ]
+    data = backend.image_to_data(Image.new('RGBA', (10, 4)), dpi=300)
+    backend.close()
+    
+    assert lib.inits == [(1, b'rus+eng'), (2, b'rus+eng')]
+    assert texts == ["ПРИГОВОР суда psm=6\n"] * 5
+    assert data['text'][1:] == ['ПРИГОВОР', 'суда']
+    assert lib.images[0][1:] == (64 * 32, 64, 32, 1, 64)
+    assert lib.images[-1][1:] == (10 * 4 * 3, 10, 4, 3, 30)
+    assert sorted(lib.deleted) == sorted(lib.buffers)
+    assert sorted(lib.ended) == [1, 2]
+    
+    # Разрешение задается только там, где оно известно
+    assert lib.resolutions == [300]
+
+
+def test_capi_backend_recognizes_with_real_libtesseract():
+    """Интеграция с установленной libtesseract: текст и TSV через ctypes"""
+    try:
+        backend = CAPIBackend("eng", workers=2)
+    except OSError:
+        pytest.skip("libtesseract не установлена")
+    except RuntimeError:
+        pytest.skip("нет модели языка eng")
+    
+    page = Image.new('L', (600, 120), 255)
+    ImageDraw.Draw(page).text((20, 30), "JUSTICE 2025", fill=0, font=ImageFont.load_default(size=48))
+    
+    try:
+        text = backend.image_to_string(page, psm=PSM_SINGLE_BLOCK, dpi=300)
+        data = backend.image_to_data(page, psm=PSM_SINGLE_BLOCK, dpi=300)
+    finally:
+        backend.close()
+    
+    assert "JUSTICE" in text
+    assert "JUSTICE" in data['text']
+    assert max(data['conf']) > 50
+
+
+def test_create_backend_prefers_capi_over_pipe(monkeypatch):
+    """Без tesserocr выбирается C API, процесс на страницу - только без libtesseract"""
+    monkeypatch.setitem(sys.modules, 'tesserocr', None)
+    monkeypatch.setattr(ocr_backends, 'load_libtesseract', lambda path=None: FakeLibTesseract())
+    assert ocr_backends.create_tesseract_backend("rus", workers=1).name == "tesseract-capi"
+    
+    def missing(path=None):
+        raise OSError("libtesseract не найдена")
+    
+    monkeypatch.setattr(ocr_backends, 'load_libtesseract', missing)
+    assert ocr_backends.create_tesseract_backend("rus", workers=1).name == "tesseract-pipe"
+
+
+def test_easyocr_reader_shared_and_pages_batched(monkeypatch):
+    """Reader EasyOCR создается один раз, страницы одного размера - одним пакетом"""
+    created, batches = [], []
+    
+    class FakeReader:
+        def __init__(self, languages, gpu=False, verbose=True):
+            created.append(languages)
+        
+        def readtext_batched(self, arrays, batch_size=1):
+            batches.append(len(arrays))
+            return [[(None, f"{a.shape[1]}x{a.shape[0]}", 0.9)] for a in arrays]
+    
+    monkeypatch.setitem(sys.modules, 'easyocr', types.SimpleNamespace(Reader=FakeReader))
+    monkeypatch.setattr(ocr_backends, '_easyocr_readers', {})
+    
+    first = EasyOCRBackend(['rus', 'eng'])
+    second = EasyOCRBackend(('rus', 'eng'), batch_size=4)
+    pages = [Image.new('L', size, 255) for size in [(20, 10), (30, 10), (20, 10)]]
+    texts = second.images_to_strings(pages)
+    
+    assert created == [['ru', 'en']]
+    assert first.reader is second.reader
+    assert texts == ['20x10', '30x10', '20x10']
+    assert sorted(batches) == [1, 2]
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Тесты распознавания PDF в OCREngine
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+import tempfile
+import threading
+
+import fitz
+import pytest
+
+# Добавляем корень репозитория в путь (ocr_engine использует относительные импорты)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src import ocr_engine
+from src.ocr_backends import parse_tsv
+from src.ocr_engine import OCREngine
+from src.ocr_manifest import OCRManifest
+
+
+TSV = (
+    "5\t1\t1\t1\t1\t1\t10\t20\t30\t12\t96.5\tПРИГОВОР\n"
+    "5\t1\t1\t1\t1\t2\t45\t20\t15\t12\t91.0\tсуда\n"
+)
+
+
+class FakeBackend:
+    """
+    Бэкенд Tesseract: записывает поток и DPI каждой страницы
+    
+    meet - столько первых страниц ждут друг друга (последовательный OCR
+    не пройдет), fail_after - после стольких страниц распознавание падает.
+    """
+    
+    name = "fake"
+    
+    def __init__(self, workers: int, meet: int = 0, fail_after: int = None):
+        self.workers = workers
+        self.calls = []
+        self.lock = threading.Lock()
+        self.meet = meet
+        self.barrier = threading.Barrier(meet, timeout=5) if meet else None
+        self.fail_after = fail_after
+    
+    def image_to_data(self, image, psm=3, dpi=None):
+        with self.lock:
+            self.calls.append((threading.get_ident(), dpi))
+            count = len(self.calls)
+        if self.fail_after is not None and count > self.fail_after:
+            raise RuntimeError("сбой Tesseract")
+        if count <= self.meet:
+            self.barrier.wait()
+        return parse_tsv(TSV)
+    
+    def close(self):
+        pass
+
+
+def _make_pdf(path: str, pages: int, scanned=None):
+    """PDF с текстовым слоем; страницы из scanned - только графика, как скан"""
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page(width=300, height=400)
+        for line in range(8):
+            if scanned is None or page_num in scanned:
+                page.draw_rect(fitz.Rect(30, 34 + line * 30, 230, 40 + line * 30), fill=(0, 0, 0))
+            else:
+                page.insert_text((30, 40 + line * 30), f"Page {page_num} line {line}", fontsize=10)
+    doc.save(path)
+    doc.close()
+
+
+@pytest.fixture
+def engine():
+    engine = OCREngine(min_dpi=72, dpi=150)
+    engine._backend = FakeBackend(workers=3, meet=2)
+    return engine
+
+
+def test_adaptive_ocr_runs_pages_in_parallel_with_own_documents(engine, monkeypatch):
+    """Страницы распознаются потоками пула, у каждого потока свой документ fitz"""
+    opened = []
+    fitz_open = fitz.open
+    
+    def counting_open(*args, **kwargs):
+        doc = fitz_open(*args, **kwargs)
+        opened.append(doc)
+        return doc
+    
+    monkeypatch.setattr(ocr_engine.fitz, 'open', counting_open)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "дело.pdf")
+        _make_pdf(pdf_path, 7)
+        opened.clear()
+        
+        results = engine.ocr_pdf(pdf_path, start_page=1)
+    
+    assert list(results) == list(range(1, 7))
+    assert set(results.values()) == {"ПРИГОВОР суда"}
+    assert [stats.page_num for stats in engine.last_page_stats] == list(range(1, 7))
+    
+    # Подсчет страниц и по документу на поток; все закрыты
+    threads = {thread for thread, _ in engine.backend.calls}
+    assert 2 <= len(threads) <= 3
+    assert len(opened) == 1 + len(threads)
+    assert all(doc.is_closed for doc in opened)
+    
+    # Tesseract получает DPI растеризации каждой страницы
+    assert all(dpi is not None and 72 <= dpi <= 150 for _, dpi in engine.backend.calls)
+
+
+def test_resumable_ocr_decides_per_page_and_keeps_failed_pages_pending(engine):
+    """Скан внутри текстового PDF распознается, страницы упавшей порции не отмечаются"""
+    engine._backend = FakeBackend(workers=1, fail_after=1)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "дело.pdf")
+        _make_pdf(pdf_path, 4, scanned={1, 3})
+        manifest = OCRManifest(os.path.join(tmp, "out"))
+        
+        # Порция [0, 2): текстовый слой и OCR; порция [2, 4): OCR страницы 3 падает
+        with pytest.raises(RuntimeError):
+            engine.ocr_pdf_resumable(pdf_path, manifest, chunk_pages=2)
+        
+        recorded = manifest.load_pages("дело.pdf")
+        assert sorted(recorded) == [0, 1]
+        assert "Page 0 line 0" in recorded[0]
+        assert recorded[1] == "ПРИГОВОР суда"
+        
+        engine._backend = FakeBackend(workers=1)
+        results = engine.ocr_pdf_resumable(pdf_path, OCRManifest(os.path.join(tmp, "out")), chunk_pages=2)
+        
+        # Повторно распознана только страница 3
+        assert len(engine.backend.calls) == 1
+        assert list(results) == [0, 1, 2, 3]
+        assert "Page 2 line 0" in results[2]
+        assert results[1] == results[3] == "ПРИГОВОР суда"
+        assert OCRManifest(os.path.join(tmp, "out")).is_complete(pdf_path)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Тесты колоночной разметки OCR
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+# Добавляем src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ocr_layout import OCRLayout
+
+
+def _tesseract_data(lines):
+    """Результат image_to_data (Output.DICT) для строк слов одного блока"""
+    data = {name: [] for name in (
+        'text', 'conf', 'block_num', 'par_num', 'line_num',
+        'left', 'top', 'width', 'height'
+    )}
+    
+    def add(text, conf, line_num, left, top):
+        data['text'].append(text)
+        data['conf'].append(conf)
+        data['block_num'].append(1)
+        data['par_num'].append(1)
+        data['line_num'].append(line_num)
+        data['left'].append(left)
+        data['top'].append(top)
+        data['width'].append(10 * len(text))
+        data['height'].append(20)
+    
+    for line_num, words in enumerate(lines, start=1):
+        add('', -1, line_num, 0, 0)  # строка уровня разметки без текста
+        for i, word in enumerate(words):
+            add(word, 90.0 + i, line_num, 100 * i, 30 * line_num)
+    
+    return data
+
+
+def test_layout_matches_word_dicts():
+    """Разметка воспроизводит слова, строки и рамки Tesseract"""
+    layout = OCRLayout.from_tesseract(_tesseract_data([
+        ["Протокол", "допроса"],
+        ["свидетеля", "Иванова", "И.И."],
+    ]))
+    
+    assert layout.words == ["Протокол", "допроса", "свидетеля", "Иванова", "И.И."]
+    assert layout.lines == ["Протокол допроса", "свидетеля Иванова И.И."]
+    assert list(layout.line_ids) == [0, 0, 1, 1, 1]
+    
+    record = layout.word_records()[3]
+    assert record == {'text': "Иванова", 'confidence': 91.0, 'bbox': (100, 60, 70, 20)}
+    
+    assert layout.line_boxes().tolist() == [[0, 30, 170, 20], [0, 60, 240, 20]]
+    assert layout.block_text(1) == layout.text
+
+
+def test_paragraphs_and_blocks_separated_by_blank_line():
+    """Смена блока или абзаца - пустая строка, как в image_to_string"""
+    data = _tesseract_data([["Первый", "абзац"], ["продолжение"], ["Второй", "абзац"], ["Третий"]])
+    # Строки 1-2 - абзац 1 блока 1, строка 3 - абзац 2, строка 4 - блок 2
+    for i, line_num in enumerate(data['line_num']):
+        if line_num == 3:
+            data['par_num'][i] = 2
+        if line_num == 4:
+            data['block_num'][i] = 2
+    
+    layout = OCRLayout.from_tesseract(data)
+    
+    assert layout.text == "Первый абзац\nпродолжение\n\nВторой абзац\n\nТретий"
+    assert layout.text.split('\n\n') == ["Первый абзац\nпродолжение", "Второй абзац", "Третий"]
+    assert layout.words == ["Первый", "абзац", "продолжение", "Второй", "абзац", "Третий"]
+    assert layout.lines == ["Первый абзац", "продолжение", "Второй абзац", "Третий"]
+    assert list(layout.line_ids) == [0, 0, 1, 2, 2, 3]
+    assert layout.block_text(2) == "Третий"
+
+
+def test_layout_memory_is_an_order_of_magnitude_smaller():
+    """Колоночная разметка много меньше списка словарей"""
+    words = [f"слово{i}" for i in range(3000)]
+    layout = OCRLayout.from_tesseract(_tesseract_data([words[i:i + 10] for i in range(0, 3000, 10)]))
+    
+    def deep_size(record):
+        return (
+            sys.getsizeof(record)
+            + sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in record.items())
+            + sum(sys.getsizeof(value) for value in record['bbox'])
+        )
+    
+    dict_bytes = sys.getsizeof([]) + sum(deep_size(record) for record in layout.word_records())
+    
+    assert layout.nbytes * 10 < dict_bytes
+
+
+def test_parquet_roundtrip():
+    """Разметка сохраняется в Parquet и загружается без потерь"""
+    pytest.importorskip("pyarrow")
+    
+    layout = OCRLayout.from_tesseract(_tesseract_data([["Постановление", "суда"], ["г.", "Москва"]]))
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "page.parquet")
+        layout.save_parquet(path)
+        loaded = OCRLayout.load_parquet(path)
+    
+    assert loaded.text == layout.text
+    for name in ('starts', 'ends', 'confidences', 'boxes', 'line_ids', 'block_ids'):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(layout, name))
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Тесты манифеста пакетного OCR
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+import tempfile
+
+# Добавляем src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ocr_manifest import OCRManifest, page_runs
+
+
+def test_resume_skips_recorded_pages_and_drops_torn_line():
+    """После сбоя остаются только нераспознанные страницы, оборванная строка отбрасывается"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "том1.pdf")
+        with open(pdf_path, 'wb') as f:
+            f.write(b"%PDF-1.4 fake")
+        
+        manifest = OCRManifest(os.path.join(tmp, "out"))
+        assert manifest.begin(pdf_path, total_pages=6) == {}
+        manifest.record_pages("том1.pdf", {0: "ПРИГОВОР", 1: ""})
+        
+        # Сбой во время записи страницы 2
+        with open(manifest.pages_path("том1.pdf"), 'a', encoding='utf-8') as f:
+            f.write('{"page": 2, "text": "обор')
+        
+        resumed = OCRManifest(os.path.join(tmp, "out"))
+        done = resumed.begin(pdf_path, total_pages=6)
+        assert done == {0: "ПРИГОВОР", 1: ""}
+        assert resumed.pending_pages("том1.pdf", done) == [2, 3, 4, 5]
+        assert resumed.pending_pages("том1.pdf", done, end_page=4) == [2, 3]
+        
+        resumed.record_pages("том1.pdf", {2: "суда"})
+        assert resumed.load_pages("том1.pdf")[2] == "суда"
+        assert not resumed.is_complete(pdf_path)
+        
+        resumed.mark_complete("том1.pdf")
+        assert OCRManifest(os.path.join(tmp, "out")).is_complete(pdf_path)
+        
+        # Файл изменился - результаты сбрасываются
+        with open(pdf_path, 'ab') as f:
+            f.write(b"more")
+        assert not resumed.is_complete(pdf_path)
+        assert resumed.begin(pdf_path, total_pages=7) == {}
+
+
+def test_same_size_replacement_is_reprocessed():
+    """Файл того же размера с другим mtime считается измененным"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "том1.pdf")
+        with open(pdf_path, 'wb') as f:
+            f.write(b"%PDF-1.4 scan A")
+        os.utime(pdf_path, ns=(1_000_000_000, 1_000_000_000))
+        
+        manifest = OCRManifest(os.path.join(tmp, "out"))
+        manifest.begin(pdf_path, total_pages=1)
+        manifest.record_pages("том1.pdf", {0: "старый скан"})
+        manifest.mark_complete("том1.pdf")
+        assert OCRManifest(manifest.output_dir).is_complete(pdf_path)
+        
+        # Пересканированный том того же размера
+        with open(pdf_path, 'wb') as f:
+            f.write(b"%PDF-1.4 scan B")
+        os.utime(pdf_path, ns=(2_000_000_000, 2_000_000_000))
+        
+        reopened = OCRManifest(manifest.output_dir)
+        assert not reopened.is_complete(pdf_path)
+        assert reopened.begin(pdf_path, total_pages=1) == {}
+        assert reopened.entries["том1.pdf"]["mtime_ns"] == 2_000_000_000
+
+
+def test_page_runs_split_by_gaps_and_length():
+    """Страницы группируются в непрерывные порции ограниченной длины"""
+    assert page_runs([5, 0, 1, 2, 3, 7], max_run=3) == [(0, 3), (3, 4), (5, 6), (7, 8)]
+    assert page_runs([], max_run=8) == []
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Тесты предобработки страниц перед OCR
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# Добавляем src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ocr_preprocessing import (
+    crop_margins,
+    estimate_skew,
+    estimate_text_height,
+    otsu_threshold,
+    preprocess_page,
+)
+
+
+def _page(line_height: int = 12, lines: int = 20) -> Image.Image:
+    """Синтетическая страница: строки текста - темные полосы с пробелами-словами"""
+    page = Image.new('L', (800, 1000), 235)
+    draw = ImageDraw.Draw(page)
+    for i in range(lines):
+        top = 150 + i * line_height * 2
+        for left in range(120, 660, 60):
+            draw.rectangle((left, top, left + 45, top + line_height - 1), fill=20)
+    return page
+
+
+def test_otsu_separates_text_from_background():
+    """Порог Оцу лежит между текстом и фоном"""
+    pixels = np.asarray(_page())
+    assert 20 <= otsu_threshold(pixels) < 235
+
+
+def test_skew_is_detected_and_corrected():
+    """Наклон страницы оценивается и выравнивается"""
+    skewed = _page().rotate(3, resample=Image.BILINEAR, fillcolor=235)
+    assert abs(estimate_skew(skewed) + 3) <= 0.5
+    
+    page, info = preprocess_page(skewed)
+    assert abs(info.skew_angle + 3) <= 0.5
+    assert abs(info.text_height - 12) <= 2
+
+
+def test_margins_cropped_and_text_height_measured():
+    """Поля обрезаются, высота строк не зависит от обрезки"""
+    page = _page(line_height=16)
+    cropped = crop_margins(page, padding=10)
+    
+    assert cropped.size == (660 - 120 - 15 + 1 + 20, 20 * 32 - 16 + 20)
+    assert estimate_text_height(page) == estimate_text_height(cropped) == 16
+    assert estimate_text_height(Image.new('L', (100, 100), 255)) == 0.0
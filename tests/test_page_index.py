@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Тесты ANN-индекса эмбеддингов страниц
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+# Добавляем src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from page_index import PageEmbeddingIndex
+
+
+def _clustered_vectors(n: int = 2000, dim: int = 64, seed: int = 0) -> np.ndarray:
+    """Синтетические эмбеддинги страниц, сгруппированные вокруг центров"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((20, dim)).astype(np.float32)
+    return centers[rng.integers(0, 20, n)] + 0.3 * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def test_search_matches_brute_force():
+    """Индекс находит те же ближайшие страницы, что и полный перебор"""
+    vectors = _clustered_vectors()
+    index = PageEmbeddingIndex(dim=64, n_probe=8)
+    index.add(vectors, [f"page#{i}" for i in range(len(vectors))])
+
+    queries = vectors[:50] + 0.01
+    _, ids = index.search(queries, k=5)
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(queries @ normalized.T), axis=1)[:, 0]
+
+    assert (ids[:, 0] == expected).mean() >= 0.95
+
+
+def test_incremental_add_and_keys():
+    """Страницы, добавленные после первого поиска, тоже находятся"""
+    vectors = _clustered_vectors(n=500)
+    index = PageEmbeddingIndex(dim=64)
+    index.add(vectors[:400], [f"page#{i}" for i in range(400)])
+    index.search(vectors[0], k=1)
+    index.add(vectors[400:], [f"page#{i}" for i in range(400, 500)])
+
+    key, score = index.search_keys(vectors[450], k=1)[0]
+
+    assert key == "page#450"
+    assert score > 0.99
+    assert len(index) == 500
+
+
+def test_save_load_mmap():
+    """Сохраненный индекс открывается через mmap и дает те же результаты"""
+    vectors = _clustered_vectors(n=300)
+    index = PageEmbeddingIndex(dim=64)
+    index.add(vectors, [f"page#{i}" for i in range(300)])
+    _, expected = index.search(vectors[:10], k=3)
+
+    with tempfile.TemporaryDirectory() as path:
+        index.save(path)
+        loaded = PageEmbeddingIndex.load(path, mmap=True)
+
+        assert isinstance(loaded.vectors, np.memmap)
+
+        _, ids = loaded.search(vectors[:10], k=3)
+        assert (ids == expected).all()
+        assert np.allclose(
+            loaded.reconstruct("page#7"),
+            vectors[7] / np.linalg.norm(vectors[7]),
+            atol=1e-3
+        )
+
+
+def test_remove_pages_keeps_search_and_keys_consistent():
+    """Удаленные страницы не находятся, оставшиеся - по прежним ключам и векторам"""
+    vectors = _clustered_vectors(300)
+    keys = [f"том_{i // 100}.pdf#{i % 100}" for i in range(300)]
+    index = PageEmbeddingIndex(dim=64, n_lists=8, n_probe=8)
+    index.add(vectors, keys)
+    
+    assert index.remove([key for key in keys if key.startswith("том_1.pdf#")] + ["нет.pdf#0"]) == 100
+    assert len(index) == 200
+    assert all(not key.startswith("том_1.pdf#") for key in index.keys)
+    
+    kept = [i for i in range(300) if i // 100 != 1]
+    for i in kept[::37]:
+        assert np.allclose(index.reconstruct(keys[i]), index._normalize(vectors[i])[0], atol=1e-2)
+        assert index.search_keys(vectors[i], k=1)[0][0] == keys[i]
+    
+    # Документ добавляется заново после удаления
+    index.add(vectors[100:110], keys[100:110])
+    assert index.search_keys(vectors[105], k=1)[0][0] == keys[105]
+
+
+def test_clusters_retrained_when_index_grows():
+    """Кластеры, обученные на первом документе, переобучаются по мере роста индекса"""
+    vectors = _clustered_vectors(n=1600)
+    index = PageEmbeddingIndex(dim=64, n_probe=2)
+    index.add(vectors[:100], [f"page#{i}" for i in range(100)])
+    index.search(vectors[0], k=1)
+    assert (index.trained_size, index.n_lists) == (100, 10)
+
+    # Рост меньше чем в retrain_factor раз - кластеры прежние
+    centroids = index.centroids
+    index.add(vectors[100:399], [f"page#{i}" for i in range(100, 399)])
+    index.search(vectors[0], k=1)
+    assert index.centroids is centroids
+
+    index.add(vectors[399:], [f"page#{i}" for i in range(399, 1600)])
+    key, _ = index.search_keys(vectors[1500], k=1)[0]
+    assert key == "page#1500"
+    assert (index.trained_size, index.n_lists) == (1600, 40)
+    assert (np.diff(index.list_offsets) > 0).sum() > 10
+    assert index.list_offsets[-1] == len(index.ids) == 1600
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index.save(tmp)
+        loaded = PageEmbeddingIndex.load(tmp)
+
+    assert (loaded.trained_size, loaded.n_lists, loaded.requested_lists) == (1600, 40, None)
+    assert loaded.search_keys(vectors[1500], k=1)[0][0] == "page#1500"
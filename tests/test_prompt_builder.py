@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Тесты сборки промптов с бюджетом токенов
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+
+# Добавляем src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from prompt_builder import PromptBuilder, TokenCounter
+
+
+class WhitespaceTokenizer:
+    """Токенизатор по пробелам: один токен - одно слово"""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    def __call__(self, text, add_special_tokens=False):
+        self.calls += 1
+        return {"input_ids": text.split()}
+    
+    def decode(self, token_ids, skip_special_tokens=True):
+        return ' '.join(token_ids)
+
+
+def test_prompt_fits_budget():
+    """Собранный промпт не превышает бюджет, инструкции сохраняются целиком"""
+    counter = TokenCounter(WhitespaceTokenizer())
+    document = "Свидетель Петров видел подозреваемого у магазина. " * 50
+    
+    prompt = (
+        PromptBuilder(counter, budget=40)
+        .add_fixed("Инструкция следователя:\n")
+        .add_section(document)
+        .add_fixed("\nОтвет:")
+        .build()
+    )
+    
+    assert len(prompt.split()) <= 40
+    assert prompt.startswith("Инструкция следователя:")
+    assert prompt.endswith("Ответ:")
+
+
+def test_extractive_selection_prefers_query_terms():
+    """При сжатии сохраняются фрагменты с терминами запроса"""
+    counter = TokenCounter(WhitespaceTokenizer())
+    text = (
+        "Погода в день событий была ясной. "
+        "Подозреваемый Иванов задержан у кассы магазина. "
+        "Протокол составлен на бланке установленного образца."
+    )
+    
+    compressed = PromptBuilder(counter, budget=100).compress(
+        text, max_tokens=8, query="задержание Иванов касса"
+    )
+    
+    assert "Иванов" in compressed
+    assert "Погода" not in compressed
+
+
+def test_budget_redistribution_and_cache():
+    """Излишек короткой секции достается длинной, токены считаются один раз"""
+    tokenizer = WhitespaceTokenizer()
+    counter = TokenCounter(tokenizer)
+    short = "Краткое заключение прокурора."
+    long = " ".join(f"факт{i}." for i in range(100))
+    
+    builder = PromptBuilder(counter, budget=60).add_section(short).add_section(long)
+    prompt = builder.build()
+    
+    assert short in prompt
+    assert 50 <= len(prompt.split()) <= 60
+    
+    calls = tokenizer.calls
+    counter.count(short)
+    assert tokenizer.calls == calls
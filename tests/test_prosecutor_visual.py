@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Тесты визуального сравнения документов прокурором
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+# Добавляем корень репозитория в путь (legal_models использует относительные импорты)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.legal_models import MozgachSphere048_Prosecutor
+from stubs import StubOCR, StubVisionEncoder
+
+
+def _page(seed: int, size=(128, 160)) -> Image.Image:
+    """Синтетическая страница: строки текста - черные полосы на белом"""
+    rng = np.random.default_rng(seed)
+    image = Image.new('L', size, 255)
+    draw = ImageDraw.Draw(image)
+    for _ in range(25):
+        x = int(rng.integers(0, size[0] - 40))
+        y = int(rng.integers(0, size[1] - 6))
+        draw.rectangle([x, y, x + int(rng.integers(10, 40)), y + 4], fill=0)
+    return image
+
+
+@pytest.fixture
+def make_prosecutor(make_sphere):
+    """Прокурор без весов модели: CLIP и генерация - заглушки"""
+    def make(embeddings):
+        prosecutor = make_sphere(
+            MozgachSphere048_Prosecutor,
+            ocr=StubOCR(),
+            vision_encoder=StubVisionEncoder(embeddings),
+        )
+        prosecutor.calls = []
+        
+        def batch_chat(prompts, images=None, batch_size=8):
+            prosecutor.calls.append(('batch_chat', len(prompts)))
+            return [f"анализ {i}" for i in range(len(prompts))]
+        
+        def chat(prompt, image=None):
+            prosecutor.calls.append(('chat', prompt))
+            return "вердикт"
+        
+        prosecutor.batch_chat = batch_chat
+        prosecutor.chat = chat
+        return prosecutor
+    
+    return make
+
+
+def test_dissimilar_pair_skips_language_model(make_prosecutor):
+    """Разные страницы с далекими эмбеддингами отсеиваются без генерации"""
+    first, second = _page(1), _page(2)
+    prosecutor = make_prosecutor([(first, [1.0, 0.0]), (second, [0.0, 1.0])])
+    
+    verdict = prosecutor.detect_copypaste_visual(first, second)
+    
+    assert "визуально различаются" in verdict
+    assert prosecutor.calls == []
+
+
+def test_copied_pair_batches_analyses_and_reuses_encodings(make_prosecutor):
+    """Копия: два анализа одним пакетом и сравнение; повторный вызов не кодирует заново"""
+    page = _page(1)
+    prosecutor = make_prosecutor([(page, [1.0, 0.0])])
+    
+    assert prosecutor.detect_copypaste_visual(page, page.copy()) == "вердикт"
+    assert prosecutor.detect_copypaste_visual(page.copy(), page) == "вердикт"
+    
+    assert [call[0] for call in prosecutor.calls] == ['batch_chat', 'chat'] * 2
+    assert prosecutor.calls[0] == ('batch_chat', 2)
+    assert "pHash 100.0%, CLIP 100.0%" in prosecutor.calls[1][1]
+    assert prosecutor.vision_encoder.calls == 1
+
+
+def test_layout_reuse_passes_by_embedding_alone(make_prosecutor):
+    """Хэши различаются, но CLIP видит тот же макет: пара идет на сравнение моделью"""
+    first, second = _page(1), _page(2)
+    prosecutor = make_prosecutor([(first, [1.0, 0.1]), (second, [1.0, 0.0])])
+    
+    assert prosecutor.detect_copypaste_visual(first, second) == "вердикт"
+    assert [call[0] for call in prosecutor.calls] == ['batch_chat', 'chat']
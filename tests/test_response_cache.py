@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Тесты кэша ответов сфер
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+
+# Добавляем src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import response_cache
+from response_cache import ResponseCache
+
+
+class FakeClock:
+    """Управляемое время вместо time.time"""
+    
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+def _key(prompt, **params):
+    return ResponseCache.make_key(prompt, None, "mozgach", None, params)
+
+
+def test_key_normalizes_prompt_whitespace_only():
+    """Пробелы в промпте не влияют на ключ, остальные параметры - влияют"""
+    key = _key("Проанализируй   документ:\n\n  протокол", temperature=0.0)
+    
+    assert key == _key("Проанализируй документ: протокол", temperature=0.0)
+    assert key != _key("Проанализируй документ: протокол", temperature=0.7)
+    assert key != _key("проанализируй документ: протокол", temperature=0.0)
+    assert key != ResponseCache.make_key(
+        "Проанализируй документ: протокол", "digest", "mozgach", None, {'temperature': 0.0}
+    )
+    assert key != ResponseCache.make_key(
+        "Проанализируй документ: протокол", None, "mozgach", "legal-lora", {'temperature': 0.0}
+    )
+
+
+def test_ttl_expires_entries(monkeypatch):
+    """Запись старше ttl_seconds считается промахом и удаляется"""
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache.time, 'time', clock)
+    cache = ResponseCache(ttl_seconds=60)
+    
+    cache.put("ключ", "ответ")
+    clock.now += 59
+    assert cache.get("ключ") == "ответ"
+    
+    clock.now += 2
+    assert cache.get("ключ") is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_lru_evicts_least_recently_used(monkeypatch):
+    """При переполнении вытесняется запись, к которой давно не обращались"""
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache.time, 'time', clock)
+    cache = ResponseCache(max_entries=2, ttl_seconds=None)
+    
+    cache.put("первый", "1")
+    clock.now += 1
+    cache.put("второй", "2")
+    clock.now += 1
+    assert cache.get("первый") == "1"  # "второй" становится самым давним
+    clock.now += 1
+    cache.put("третий", "3")
+    
+    assert len(cache) == 2
+    assert cache.get("второй") is None
+    assert cache.get("первый") == "1"
+    assert cache.get("третий") == "3"
+
+
+def test_entries_persist_across_reopen(tmp_path):
+    """Кэш на диске переживает перезапуск, в памяти - нет"""
+    path = str(tmp_path / "responses.sqlite")
+    
+    cache = ResponseCache(path)
+    cache.put(_key("промпт"), "сохраненный ответ")
+    cache.close()
+    
+    reopened = ResponseCache(path)
+    assert reopened.get(_key("промпт")) == "сохраненный ответ"
+    reopened.clear()
+    reopened.close()
+    
+    assert ResponseCache(path).get(_key("промпт")) is None
+    assert ResponseCache().get(_key("промпт")) is None
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Тесты асинхронного планировщика генерации
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+import asyncio
+import threading
+
+# Добавляем src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from scheduler import GenerationScheduler
+
+
+class EchoModel:
+    """Модель-заглушка: отвечает промптом в верхнем регистре"""
+    
+    def __init__(self, fail_on: str = None):
+        self.calls = []
+        self.threads = set()
+        self.fail_on = fail_on
+    
+    def batch_chat(self, prompts, images=None, batch_size=8, **kwargs):
+        self.calls.append((list(prompts), kwargs))
+        self.threads.add(threading.get_ident())
+        if self.fail_on in prompts:
+            raise RuntimeError("ошибка генерации")
+        return [prompt.upper() for prompt in prompts]
+
+
+def test_concurrent_requests_are_batched():
+    """Одновременные запросы объединяются в пакет, ответы по порядку"""
+    model = EchoModel()
+    scheduler = GenerationScheduler(model, max_batch_size=4, max_wait_ms=50)
+    
+    async def run():
+        answers = await asyncio.gather(*(
+            scheduler.submit(f"вопрос {i}") for i in range(8)
+        ))
+        await scheduler.aclose()
+        return answers
+    
+    answers = asyncio.run(run())
+    
+    assert answers == [f"ВОПРОС {i}" for i in range(8)]
+    assert scheduler.batches == 2
+    assert all(len(prompts) == 4 for prompts, _ in model.calls)
+    assert len(model.threads) == 1
+
+
+def test_requests_grouped_by_generation_params():
+    """Запросы с разными параметрами генерации не смешиваются в пакете"""
+    model = EchoModel()
+    scheduler = GenerationScheduler(model, max_wait_ms=50)
+    
+    async def run():
+        answers = await asyncio.gather(
+            scheduler.submit("a", max_new_tokens=16),
+            scheduler.submit("b", max_new_tokens=32),
+            scheduler.submit("c", max_new_tokens=16),
+        )
+        await scheduler.aclose()
+        return answers
+    
+    assert asyncio.run(run()) == ["A", "B", "C"]
+    assert sorted((prompts, kwargs['max_new_tokens']) for prompts, kwargs in model.calls) == [
+        (["a", "c"], 16),
+        (["b"], 32),
+    ]
+
+
+def test_errors_reach_callers_and_scheduler_survives():
+    """Ошибка генерации передается вызывающим, планировщик продолжает работу"""
+    model = EchoModel(fail_on="плохой")
+    scheduler = GenerationScheduler(model, max_wait_ms=1)
+    
+    async def run():
+        try:
+            await scheduler.submit("плохой")
+        except RuntimeError as e:
+            error = str(e)
+        answer = await scheduler.submit("хороший")
+        await scheduler.aclose()
+        return error, answer
+    
+    assert asyncio.run(run()) == ("ошибка генерации", "ХОРОШИЙ")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Тесты стратегий разбиения текста на блоки
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+import random
+
+# Добавляем src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from segmentation import SEGMENTERS, ParagraphSegmenter, TextOffsets, make_segmenter
+
+
+def legacy_split(text, block_size):
+    """Прежнее разбиение LegalDocumentAnalyzer._split_into_blocks"""
+    blocks = []
+    current_block = ""
+    for para in text.split('\n\n'):
+        if len(current_block) + len(para) < block_size:
+            current_block += para + '\n\n'
+        else:
+            if current_block.strip():
+                blocks.append(current_block.strip())
+            current_block = para + '\n\n'
+    if current_block.strip():
+        blocks.append(current_block.strip())
+    return blocks
+
+
+def test_paragraph_matches_legacy_split():
+    """paragraph дает те же блоки, что и склейка строк, в том числе для диапазонов"""
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = ''.join(rng.choice('ab. \n ') for _ in range(rng.randint(0, 60)))
+        block_size = rng.randint(1, 25)
+        offsets = TextOffsets(text)
+        
+        spans = ParagraphSegmenter(block_size).segment(offsets)
+        assert [text[start:end] for start, end in spans] == legacy_split(text, block_size)
+        
+        start = rng.randint(0, len(text))
+        end = rng.randint(start, len(text))
+        spans = ParagraphSegmenter(block_size).segment(offsets, start, end)
+        assert [text[a:b] for a, b in spans] == legacy_split(text[start:end], block_size)
+
+
+def test_strategies_split_ocr_text_without_blank_lines():
+    """Текст без пустых строк: paragraph - один блок, остальные стратегии его делят"""
+    sentence = "Свидетель показал, что видел автомобиль около дома."
+    text = '\n'.join([sentence] * 40)
+    offsets = TextOffsets(text)
+    
+    assert len(make_segmenter("paragraph", 200).segment(offsets)) == 1
+    
+    for strategy in ("sentence", "window", "tokens"):
+        spans = make_segmenter(strategy, 200).segment(offsets)
+        assert len(spans) > 5, strategy
+        for start, end in spans:
+            block = text[start:end]
+            assert block == block.strip() and len(block) <= 260
+    
+    sentences = make_segmenter("sentence", 200).segment(offsets)
+    assert all(text[end - 1] == '.' for _, end in sentences)
+    assert set(SEGMENTERS) == {"paragraph", "sentence", "window", "tokens"}
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Тесты структурных отпечатков документов
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+
+# Добавляем src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from structure_fingerprint import StructureFingerprinter, fingerprint_text, rank_document_pairs
+
+
+RESOLUTION = """ПОСТАНОВЛЕНИЕ
+о возбуждении уголовного дела
+
+УСТАНОВИЛ:
+
+{body}
+
+1. Возбудить уголовное дело по признакам преступления.
+2. Принять уголовное дело к своему производству.
+- копию постановления направить прокурору
+- уведомить заявителя"""
+
+REPORT = """Справка
+
+{body}
+
+Приложение на трех листах."""
+
+
+def test_fingerprint_keeps_structure_ignores_wording():
+    """Отредактированная копия сохраняет структуру, другой документ - нет"""
+    original = fingerprint_text(RESOLUTION.format(body="Гражданин И. сообщил о краже имущества. " * 4))
+    edited = fingerprint_text(RESOLUTION.format(body="Гражданка П. заявила о хищении телефона. " * 4))
+    other = fingerprint_text(REPORT.format(body="Проверка проведена в полном объеме. " * 10))
+    
+    assert original.headings == 2 and original.clauses == 2 and original.list_items == 2
+    assert original.similarity(edited) == 1.0
+    assert original.similarity(other) < 0.5
+
+
+def test_rank_pairs_and_cache():
+    """Пары ранжируются по структуре, отпечатки считаются один раз"""
+    fingerprinter = StructureFingerprinter()
+    prosecutor = {
+        "обвинение.pdf": {0: RESOLUTION.format(body="Текст обвинения. " * 5)},
+    }
+    investigator = {
+        "справка.pdf": {0: REPORT.format(body="Текст справки. " * 5), 1: "Лист 2"},
+        "постановление.pdf": {3: RESOLUTION.format(body="Текст постановления. " * 5)},
+    }
+    
+    pairs = rank_document_pairs(
+        fingerprinter.fingerprint_documents(prosecutor),
+        fingerprinter.fingerprint_documents(investigator),
+    )
+    
+    assert [pair[1] for pair in pairs] == ["постановление.pdf", "справка.pdf"]
+    assert pairs[0][2] == 1.0
+    
+    cached = fingerprinter.fingerprint(investigator["постановление.pdf"])
+    assert fingerprinter.fingerprint(investigator["постановление.pdf"]) is cached
+    assert len(fingerprinter._cache) == 3
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Тесты нормализации текста OCR
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+
+# Добавляем src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from text_normalizer import TextNormalizer, fix_homoglyphs, normalize_text
+
+
+def test_ocr_noise_canonicalized():
+    """Двойники, переносы, лигатуры, тире, кавычки и пробелы приводятся к одному виду"""
+    raw = "Пoстановление  o  вoзбуждении\r\nдока-\nзательство «ООО Рога» — ﬁnal\n\n\n\nсвидетель Пётр  "
+    
+    assert normalize_text(raw) == (
+        "Постановление о возбуждении\n"
+        "доказательство \"ООО Рога\" - final\n\n"
+        "свидетель Петр"
+    )
+    
+    # Английский текст не трогается, смешанные слова исправляются всегда
+    assert fix_homoglyphs("Cool POP text") == "Cool POP text"
+    assert fix_homoglyphs("Cool Пaспорт") == "Cool Паспорт"
+
+
+def test_page_numbers_and_running_headers_stripped():
+    """Номера страниц и повторяющиеся колонтитулы удаляются, абзацы сохраняются"""
+    pages = {
+        page_num: f"Прокуратура г. Москвы\nПротокол допроса {page_num}\n\nОтвет на вопрос {page_num * 7}\n- {page_num + 1} -"
+        for page_num in range(4)
+    }
+    
+    normalizer = TextNormalizer()
+    normalized = normalizer.normalize_document(pages)
+    
+    assert normalized[2] == "Протокол допроса 2\n\nОтвет на вопрос 14"
+    assert TextNormalizer(strip_headers=False).normalize_document(pages)[0].startswith("Прокуратура")
+    
+    # Одинаковые страницы нормализуются один раз
+    assert normalizer.normalize_page(pages[0]) is normalizer.normalize_page(pages[0])
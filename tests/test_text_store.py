@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Тесты хранилища текста дела
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+# Добавляем src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from text_store import CaseTextStore
+
+
+DOCUMENTS = {
+    "том1.pdf": {1: "ПОСТАНОВЛЕНИЕ\nо возбуждении дела", 0: "Том 1"},
+    "пустой.pdf": {},
+    "том2.pdf": {4: "Обвинительное заключение", 7: ""},
+}
+
+
+def test_store_is_a_lazy_mapping_over_one_buffer():
+    """Хранилище ведет себя как {файл: {страница: текст}} и склеивает текст как раньше"""
+    store = CaseTextStore.from_documents(DOCUMENTS)
+    
+    assert list(store) == ["том1.pdf", "пустой.pdf", "том2.pdf"]
+    assert {name: dict(pages) for name, pages in store.items()} == {
+        name: dict(sorted(pages.items())) for name, pages in DOCUMENTS.items()
+    }
+    assert 5 not in store["том2.pdf"] and 7 in store["том2.pdf"]
+    assert bytes(store["том1.pdf"].page_bytes(0)) == "Том 1".encode('utf-8')
+    assert store.nbytes == len(store.data)
+    
+    merged = '\n\n'.join(
+        pages[page_num] for pages in DOCUMENTS.values() for page_num in sorted(pages)
+    )
+    assert store.joined_text() == merged
+    
+    tail = store.slice_documents(1)
+    assert np.shares_memory(tail.data, store.data)
+    assert list(tail) == ["пустой.pdf", "том2.pdf"]
+    assert tail.document_text("том2.pdf") == "Обвинительное заключение\n\n"
+
+
+def test_from_pages_streams_into_buffer_without_copy():
+    """Поток страниц кодируется сразу в буфер; пустые документы сохраняются по doc_names"""
+    store = CaseTextStore.from_documents(DOCUMENTS)
+    upper = CaseTextStore.from_pages(
+        ((name, page_num, text.upper()) for name, page_num, text in store.iter_pages()),
+        doc_names=list(store),
+    )
+    
+    assert isinstance(upper.data.base.obj, bytearray)
+    assert list(upper) == ["том1.pdf", "пустой.pdf", "том2.pdf"]
+    assert dict(upper["том1.pdf"]) == {0: "ТОМ 1", 1: "ПОСТАНОВЛЕНИЕ\nО ВОЗБУЖДЕНИИ ДЕЛА"}
+    assert len(upper["пустой.pdf"]) == 0
+    np.testing.assert_array_equal(upper.doc_offsets, store.doc_offsets)
+    
+    with pytest.raises(ValueError):
+        CaseTextStore.from_pages([("том2.pdf", 4, ""), ("том1.pdf", 0, "")], doc_names=list(store))
+
+
+def test_save_load_mmap_and_arrow_round_trip():
+    """Срез сохраняется компактно, открывается через mmap и проходит через Arrow"""
+    store = CaseTextStore.from_documents(DOCUMENTS).slice_documents(2)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store.save(tmp)
+        loaded = CaseTextStore.load(tmp)
+        assert isinstance(loaded.data, np.memmap)
+        assert dict(loaded["том2.pdf"]) == {4: "Обвинительное заключение", 7: ""}
+        del loaded
+    
+    pytest.importorskip("pyarrow")
+    full = CaseTextStore.from_documents(DOCUMENTS)
+    table = full.to_arrow()
+    assert table.column('text').to_pylist()[:2] == ["Том 1", "ПОСТАНОВЛЕНИЕ\nо возбуждении дела"]
+    
+    restored = CaseTextStore.from_arrow(table)
+    assert np.shares_memory(restored.data, full.data)
+    assert restored.joined_text() == full.joined_text()
+    assert list(restored) == ["том1.pdf", "том2.pdf"]  # Пустые документы в Arrow не попадают
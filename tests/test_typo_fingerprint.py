@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Тесты поиска общих опечаток
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+import tempfile
+
+# Добавляем src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from typo_fingerprint import Lexicon, find_shared_typos, tokenize
+
+
+WORDS = [
+    "свидетель", "показал", "что", "видел", "автомобиль", "около", "дома",
+    "подозреваемый", "пояснил", "вечером", "находился", "квартире", "протокол",
+]
+
+
+def test_lexicon_sorted_hashes_round_trip():
+    """Словарь из хэшей: ё/регистр не различаются, сохраняется и загружается"""
+    lexicon = Lexicon.from_words(WORDS + ["ещё"])
+    
+    assert "Свидетель" in lexicon and "еще" in lexicon
+    assert "свидетль" not in lexicon
+    assert lexicon.out_of_vocabulary(["дома", "дамо", "дамо"]) == {"дамо"}
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "lexicon.npy")
+        lexicon.save(path)
+        assert len(Lexicon.load(path)) == len(WORDS) + 1
+
+
+def test_typos_shared_between_sides_reported():
+    """Общая опечатка находится, фамилии и опечатки одной стороны - нет"""
+    lexicon = Lexicon.from_words(WORDS)
+    prosecutor = {
+        "обвинение.pdf": {0: "Свидетель Кузнецов показал, что видел автомабиль около дома"},
+        "справка.pdf": {0: "протокол подозреваемый пояснил"},
+    }
+    investigator = {
+        "допрос.pdf": {0: "Свидетель Кузнецов показал, что видел автомабиль около дамо"},
+        "постановление.pdf": {3: "подозреваемый пояснил, что вечером находился в квартере"},
+    }
+    
+    shared = find_shared_typos(prosecutor, investigator, lexicon)
+    
+    assert [typo.word for typo in shared] == ["автомабиль"]
+    assert shared[0].prosecutor_documents == ["обвинение.pdf"]
+    assert shared[0].investigator_documents == ["допрос.pdf"]
+    
+    # Слова, встречающиеся почти во всех документах, - не опечатки
+    assert find_shared_typos(prosecutor, investigator, lexicon, max_documents=1) == []
+    assert "кузнецов" in tokenize("Кузнецов", skip_capitalized=False)
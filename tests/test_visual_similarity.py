@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Тесты визуального сходства страниц
+
+© 2025 NativeMind - NativeMindNONC License
+"""
+
+import sys
+import os
+
+import numpy as np
+import torch
+from PIL import Image, ImageDraw
+
+# Добавляем src в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from visual_similarity import (
+    PageFingerprints,
+    VisualSimilarityEngine,
+    cosine_similarity,
+    dhash,
+    hash_similarity,
+    phash,
+)
+
+
+def _page(seed: int, size=(128, 160)) -> Image.Image:
+    """Синтетическая страница: строки текста - черные полосы на белом"""
+    rng = np.random.default_rng(seed)
+    image = Image.new('L', size, 255)
+    draw = ImageDraw.Draw(image)
+    for _ in range(25):
+        x = int(rng.integers(0, size[0] - 40))
+        y = int(rng.integers(0, size[1] - 6))
+        draw.rectangle([x, y, x + int(rng.integers(10, 40)), y + 4], fill=0)
+    return image
+
+
+def _shifted(image: Image.Image, dx: int = 3, dy: int = 2) -> Image.Image:
+    """Та же страница, отсканированная со сдвигом"""
+    shifted = Image.new('L', image.size, 255)
+    shifted.paste(image, (dx, dy))
+    return shifted
+
+
+def test_hashes_identical_shifted_unrelated():
+    """Копия совпадает полностью, сдвиг почти не меняет хэш, другая страница - далеко"""
+    for seed in range(5):
+        page = _page(seed)
+        for image_hash in (phash, dhash):
+            assert hash_similarity(image_hash(page), image_hash(page.copy())) == 1.0
+            assert hash_similarity(image_hash(page), image_hash(_shifted(page))) >= 0.85
+            assert hash_similarity(image_hash(page), image_hash(_page(seed + 100))) <= 0.75
+
+
+def _random_fingerprints(n: int, seed: int, dim: int = 16) -> PageFingerprints:
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((n, dim)).astype(np.float32)
+    return PageFingerprints(
+        phashes=rng.integers(0, 2**63, n, dtype=np.uint64),
+        dhashes=rng.integers(0, 2**63, n, dtype=np.uint64),
+        embeddings=embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True),
+    )
+
+
+def test_chunked_matrix_matches_brute_force():
+    """Матрица и поиск копий блоками по chunk_size совпадают с попарным перебором"""
+    fingerprints1 = _random_fingerprints(30, seed=1)
+    fingerprints2 = _random_fingerprints(11, seed=2)
+    
+    # Часть страниц - почти копии: один бит хэша отличается
+    for i, j in [(0, 3), (8, 0), (29, 10)]:
+        fingerprints1.phashes[i] = fingerprints2.phashes[j] ^ np.uint64(1)
+        fingerprints1.dhashes[i] = fingerprints2.dhashes[j]
+    
+    expected = np.array([
+        [
+            max(
+                (hash_similarity(fingerprints1.phashes[i], fingerprints2.phashes[j])
+                 + hash_similarity(fingerprints1.dhashes[i], fingerprints2.dhashes[j])) / 2,
+                cosine_similarity(fingerprints1.embeddings[i], fingerprints2.embeddings[j]),
+            )
+            for j in range(len(fingerprints2))
+        ]
+        for i in range(len(fingerprints1))
+    ], dtype=np.float32)
+    
+    chunked = VisualSimilarityEngine(chunk_size=7)
+    whole = VisualSimilarityEngine(chunk_size=1024)
+    
+    np.testing.assert_allclose(chunked.similarity_matrix(fingerprints1, fingerprints2), expected, atol=1e-5)
+    np.testing.assert_allclose(whole.similarity_matrix(fingerprints1, fingerprints2), expected, atol=1e-5)
+    
+    matches = chunked.find_copied_pages(fingerprints1, fingerprints2)
+    np.testing.assert_array_equal(matches, whole.find_copied_pages(fingerprints1, fingerprints2))
+    assert {i: int(matches[i]) for i in np.flatnonzero(matches >= 0)} == {0: 3, 8: 0, 29: 10}
+
+
+class FakeEncoder:
+    """CLIP-заглушка: записывает размер пакета и сколько страниц уже отдано"""
+    
+    def __init__(self, rendered):
+        self.rendered = rendered
+        self.calls = []
+    
+    def encode_batch(self, images):
+        self.calls.append((len(images), len(self.rendered)))
+        return torch.tensor([[float(np.asarray(image)[0, 0, 0]), 1.0] for image in images])
+
+
+def test_fingerprint_streams_pages_from_generator():
+    """Генератор страниц хэшируется по мере растеризации, CLIP - пакетами batch_size"""
+    rendered = []
+    
+    def pages():
+        for seed in range(7):
+            rendered.append(seed)
+            yield _page(seed)
+    
+    encoder = FakeEncoder(rendered)
+    engine = VisualSimilarityEngine(vision_encoder=encoder, batch_size=3)
+    fingerprints = engine.fingerprint(pages())
+    
+    # Пакет кодируется сразу, как только набран: следующие страницы еще не растеризованы
+    assert encoder.calls == [(3, 3), (3, 6), (1, 7)]
+    assert len(fingerprints) == 7
+    assert fingerprints.embeddings.shape == (7, 2)
+    np.testing.assert_allclose(np.linalg.norm(fingerprints.embeddings, axis=1), 1.0, atol=1e-6)
+    
+    expected = engine.fingerprint([_page(seed) for seed in range(7)])
+    np.testing.assert_array_equal(fingerprints.phashes, expected.phashes)
+    np.testing.assert_array_equal(fingerprints.dhashes, expected.dhashes)
+    assert len(engine.fingerprint(iter([]))) == 0